@@ -1,13 +1,361 @@
-from fastapi import FastAPI, HTTPException, UploadFile, File
-from fastapi.responses import StreamingResponse
+import time
+STARTED = time.perf_counter()
+
+from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Request, Depends, WebSocket
+from fastapi.responses import StreamingResponse, Response, JSONResponse, PlainTextResponse, FileResponse
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
 from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+import asyncio
+import base64
 import io
+import json
+import logging
 import os
-from src.setup.config_manager import ConfigManager
+import threading
+import uuid
+from src.setup.config_manager import ConfigManager, ConfigSnapshot
+from src.chat.client import ChatClient
+from src.chat.context import ConversationContext
+from src.chat.semantic_cache import SemanticCache
+from src.voice.pipeline import SpeechPipeline
+from src.voice.telephony import MediaStreamSession
+from src.voice.stt import STTFactory
+from src.voice.audio_cache import AudioCache, cache_key
+from src.voice.audio_store import AudioStore, MEDIA_TYPES
+from src.voice import shared_cache
+from src.server.admission import (
+    BATCH, INTERACTIVE, PRIORITIES, ClientRateLimiter, Overloaded, PriorityScheduler, ScheduledTTS, match_api_key
+)
+from src.server.metrics import REGISTRY
+from src.server.call_events import CallEventLog
+from src.server.cancellation import Cancelled, CancelToken
+from src.catalog.render_catalog import RenderCatalog, audio_duration_ms
+from src.voice.templates import TemplateRenderer, pcm_to_wav
+from src.voice.scenario import PromptResult, ScenarioEngine, compile_scenarios
 from tts_engine import TTSFactory
 
-app = FastAPI(title="Halloisland API")
+IMPORT_SECONDS = time.perf_counter() - STARTED
+
+logger = logging.getLogger("api")
+
+def build_services(config: ConfigManager, audio_cache: Optional[AudioCache] = None,
+                   events: Optional[CallEventLog] = None, snapshot: Optional[ConfigSnapshot] = None) -> Dict:
+    """
+    Create providers, caches and the pipeline; SDKs are imported by the providers on first use.
+
+    Args:
+        config: Manager the endpoints read live settings from
+        audio_cache: Cache to carry over from a previous build
+        events: Call event log to carry over from a previous build
+        snapshot: Settings to build from, e.g. a reload candidate not yet applied;
+            defaults to the manager's current snapshot
+    """
+    settings = snapshot or config.snapshot
+    provider = TTSFactory.create_provider(settings)
+
+    # Live calls and batch rendering share the provider quota through one scheduler
+    admission = settings.get("admission") or {}
+    quota = (settings.get("rate_limits") or {}).get(provider.name, {})
+    scheduler = PriorityScheduler(
+        max_concurrent=int(quota.get("max_concurrent", 4)),
+        interactive_concurrency=int(admission.get("interactive_concurrency", 4)),
+        batch_concurrency=int(admission.get("batch_concurrency", 2)),
+        max_queue=int(admission.get("max_queue", 32)),
+        interactive_deadline=float(admission.get("interactive_deadline_ms", 1500)) / 1000
+    )
+    tts_provider = ScheduledTTS(provider, scheduler, INTERACTIVE)
+    batch_tts_provider = ScheduledTTS(provider, scheduler, BATCH)
+
+    # Prompt templates with cached static fragments; keys include the provider, so a
+    # cache carried over a config reload stays valid
+    if audio_cache is None:
+        # Under the pre-fork supervisor every worker uses the one shared-memory cache
+        audio_cache = shared_cache.current() or AudioCache(max_bytes=int((settings.get("audio_cache") or {}).get("max_mb", 256)) * 1024 * 1024)
+    template_renderer = TemplateRenderer(
+        tts_provider,
+        audio_cache,
+        crossfade_ms=int((settings.get("audio_settings") or {}).get("crossfade_ms", 15)),
+        # Speculative prompts must not take provider slots from live calls
+        prefetch_tts=batch_tts_provider,
+        prefetch_wait=float(admission.get("interactive_deadline_ms", 1500)) / 1000
+    )
+    for name, text in (settings.get("prompt_templates") or {}).items():
+        template_renderer.register(name, text)
+    speculation = settings.get("scenario_speculation") or {}
+    scenarios = ScenarioEngine(
+        template_renderer,
+        compile_scenarios(settings.get("scenarios"), template_renderer.templates),
+        min_probability=float(speculation.get("min_probability", 0.1)),
+        max_fragments=int(speculation.get("max_fragments", 10)),
+        prior_strength=float(speculation.get("prior_strength", 10))
+    )
+
+    # Speech-to-speech pipeline
+    stt_provider = STTFactory.create_provider(settings)
+    chat_client = ChatClient(settings.get("openai_key") or os.environ.get("OPENAI_API_KEY", ""))
+
+    # Repeated opening questions are answered, with their audio, without an LLM round trip
+    semantic = settings.get("semantic_cache") or {}
+    answer_cache = None
+    if semantic.get("enabled", True):
+        answer_cache = SemanticCache(
+            chat_client.embed,
+            threshold=float(semantic.get("threshold", 0.92)),
+            max_entries=int(semantic.get("max_entries", 5000)),
+            audit_path=Path(semantic["audit_log"]) if semantic.get("audit_log") else None
+        )
+    store = settings.get("audio_store") or {}
+    # Per-call stage latencies; the log outlives config reloads like the audio cache
+    if events is None:
+        event_settings = settings.get("call_events") or {}
+        if event_settings.get("enabled", True):
+            events = CallEventLog(
+                Path(event_settings.get("path", "logs/call-events")),
+                segment_bytes=int(event_settings.get("segment_mb", 16)) * 1024 * 1024,
+                segment_seconds=float(event_settings.get("segment_seconds", 300)),
+                compact_interval=float(event_settings.get("compact_seconds", 3600)) or None
+            )
+    pipeline = SpeechPipeline(
+        stt_provider,
+        chat_client,
+        tts_provider,
+        voice=(settings.get("voices") or {}).get("assistant", "alloy"),
+        context=ConversationContext(chat_client),
+        answer_cache=answer_cache,
+        events=events
+    )
+    return {
+        "config": config,
+        "tts_provider": tts_provider,
+        "batch_tts_provider": batch_tts_provider,
+        "scheduler": scheduler,
+        "client_limiter": ClientRateLimiter(
+            rate=float(admission.get("client_rate_per_s", 5)),
+            burst=float(admission.get("client_burst", 20))
+        ),
+        "stt_provider": stt_provider,
+        "chat_client": chat_client,
+        "audio_cache": audio_cache,
+        "audio_store": AudioStore(
+            Path(store.get("path", "audio_store")),
+            max_bytes=int(store.get("max_mb") or 0) * 1024 * 1024 or None,
+            max_age=float(store.get("max_age_days") or 0) * 86400 or None
+        ),
+        "template_renderer": template_renderer,
+        "scenarios": scenarios,
+        "answer_cache": answer_cache,
+        "events": events,
+        "pipeline": pipeline
+    }
+
+def warm_up(services: Dict, only: Optional[Iterable[str]] = None) -> Dict[str, float]:
+    """
+    Open pooled connections and optionally pre-synthesize prompt audio.
+
+    Args:
+        services: Services from ``build_services``
+        only: Names of the steps to run, e.g. to retry the ones that failed
+
+    Returns:
+        Seconds spent per step; failed steps are logged and reported as negative
+    """
+    config = services["config"]
+    startup = config.get("startup") or {}
+    steps = []
+    if startup.get("warm_up", True):
+        steps += [
+            ("tts", services["tts_provider"].warm_up),
+            ("stt", services["stt_provider"].warm_up),
+            ("chat", services["chat_client"].warm_up),
+        ]
+    if startup.get("preload_prompts", False):
+        voice = (config.get("voices") or {}).get("assistant", "alloy")
+        steps.append(("prompts", lambda: services["template_renderer"].prepare(voice)))
+    if only is not None:
+        steps = [(name, step) for name, step in steps if name in set(only)]
+
+    timings = {}
+    for name, step in steps:
+        started = time.perf_counter()
+        try:
+            step()
+            timings[name] = time.perf_counter() - started
+        except Exception as e:
+            logger.warning(f"Warm-up step '{name}' failed: {e}")
+            timings[name] = -1.0
+    return timings
+
+def failed_steps(timings: Dict[str, float], startup) -> Tuple[List[str], List[str]]:
+    """Failed warm-up steps split into (required, optional) by ``startup.required_steps``"""
+    required = set(startup.get("required_steps", ("tts", "stt", "chat")))
+    failed = sorted(name for name, seconds in timings.items() if seconds < 0)
+    return [n for n in failed if n in required], [n for n in failed if n not in required]
+
+async def _evict_periodically(app: FastAPI) -> None:
+    """Keep the audio store within its size and age limits, and the catalog in step with it"""
+    while True:
+        await asyncio.sleep(float((service("config").get("audio_store") or {}).get("evict_interval_s", 600)))
+        try:
+            evicted = await asyncio.to_thread(service("audio_store").evict)
+            if evicted and app.state.catalog:
+                await app.state.catalog.delete(evicted)
+        except Exception as e:
+            logger.error(f"Audio store eviction failed: {e}")
+
+async def _warm(app: FastAPI) -> None:
+    """Warm the services; readiness waits until every required step has succeeded"""
+    started = time.perf_counter()
+    timings = await asyncio.to_thread(warm_up, app.state.services)
+    app.state.startup["warm_up"] = timings
+    while True:
+        startup = service("config").get("startup") or {}
+        required, optional = failed_steps(timings, startup)
+        app.state.startup["failed"] = required + optional
+        if not required:
+            break
+        retry = float(startup.get("warm_up_retry_seconds", 10.0))
+        logger.error(f"Not ready: warm-up of {', '.join(required)} failed, retrying in {retry:g}s")
+        await asyncio.sleep(retry)
+        # A config reload may have replaced the services in the meantime
+        timings.update(await asyncio.to_thread(warm_up, app.state.services, required))
+    app.state.startup["warm_up_seconds"] = time.perf_counter() - started
+    app.state.ready = True
+    if optional:
+        logger.warning(f"API ready but degraded, optional warm-up steps failed: {', '.join(optional)}")
+    else:
+        logger.info(f"API ready: {app.state.startup}")
+
+def close_services(services: Dict) -> None:
+    """Release what one build of the services owns; the caches and event log it shares are left open"""
+    services["template_renderer"].close()
+    services["pipeline"].close()
+    services["chat_client"].close()
+
+# Requests use the services that were current when they started; a replaced build
+# is closed once the last of them finishes
+_pinned: ContextVar[Optional[Dict]] = ContextVar("services", default=None)
+_in_use: Dict[int, int] = {}
+_retired: Dict[int, Dict] = {}
+_in_use_lock = threading.Lock()
+
+def _acquire(services: Dict) -> None:
+    with _in_use_lock:
+        _in_use[id(services)] = _in_use.get(id(services), 0) + 1
+
+def _release(services: Dict) -> None:
+    with _in_use_lock:
+        _in_use[id(services)] -= 1
+        if _in_use[id(services)]:
+            return
+        del _in_use[id(services)]
+        retired = _retired.pop(id(services), None)
+    if retired:
+        close_services(retired)
+
+def _retire(services: Dict) -> None:
+    with _in_use_lock:
+        if _in_use.get(id(services)):
+            _retired[id(services)] = services
+            return
+    close_services(services)
+
+class PinServices:
+    """ASGI middleware holding each request and websocket to one build of the services"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        services = getattr(app.state, "services", None)
+        if scope["type"] not in ("http", "websocket") or services is None:
+            await self.app(scope, receive, send)
+            return
+        _acquire(services)
+        token = _pinned.set(services)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _pinned.reset(token)
+            _release(services)
+
+def _reload_services(snapshot: ConfigSnapshot):
+    """
+    Build and warm providers for a candidate config snapshot.
+
+    Raising, e.g. because a required warm-up step failed, keeps the current snapshot
+    and services. Returns the swap to run once
+    the snapshot is applied; the replaced services are closed after the requests
+    still using them finish.
+    """
+    current = app.state.services
+    services = build_services(current["config"], current["audio_cache"], current["events"], snapshot=snapshot)
+    try:
+        required, _ = failed_steps(warm_up(services), snapshot.get("startup") or {})
+        if required:
+            raise RuntimeError(f"warm-up of {', '.join(required)} failed")
+    except Exception:
+        close_services(services)
+        raise
+
+    def swap() -> None:
+        previous = app.state.services
+        # Calls in progress and the learned transition counts carry over to the new scenarios
+        services["scenarios"].adopt(previous["scenarios"])
+        app.state.services = services
+        _retire(previous)
+        logger.info(f"Services rebuilt for config version {snapshot.version}")
+    return swap
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    started = time.perf_counter()
+    app.state.ready = False
+    app.state.media_streams = set()
+    config = ConfigManager()
+    app.state.services = build_services(config)
+
+    # Hot reload: config.json is polled, and SIGHUP forces a re-read
+    config.on_reload(_reload_services)
+    interval = float((config.get("startup") or {}).get("config_reload_seconds", 2.0))
+    if interval > 0:
+        config.watch(interval)
+    try:
+        config.reload_on_signal()
+    except ValueError:
+        # Signal handlers can only be installed from the main thread
+        pass
+    app.state.startup = {
+        "import_seconds": IMPORT_SECONDS,
+        "build_seconds": time.perf_counter() - started
+    }
+    # Optional render catalog; the API keeps serving without it
+    app.state.catalog = None
+    dsn = (config.get("catalog") or {}).get("dsn") or os.environ.get("POSTGRES_URL")
+    if dsn:
+        try:
+            app.state.catalog = await RenderCatalog(dsn).connect()
+        except Exception as e:
+            logger.warning(f"Render catalog unavailable: {e}")
+
+    # Serve liveness while warming; /readyz flips once connections are open
+    warming = asyncio.create_task(_warm(app))
+    evicting = asyncio.create_task(_evict_periodically(app))
+    yield
+    warming.cancel()
+    evicting.cancel()
+    config.close()
+    if app.state.catalog:
+        await app.state.catalog.close()
+    close_services(app.state.services)
+    if app.state.services["events"]:
+        app.state.services["events"].close()
+
+app = FastAPI(title="Halloisland API", lifespan=lifespan)
+app.add_middleware(PinServices)
 
 # Configure CORS
 app.add_middleware(
@@ -18,50 +366,406 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize TTS
-config = ConfigManager()
-tts_provider = TTSFactory.create_provider(config)
+def service(name: str):
+    return (_pinned.get() or app.state.services)[name]
+
+def identify_client(api_key: Optional[str], address: Optional[str]) -> Optional[str]:
+    """
+    Rate-limit identity of a caller: a configured API key, else the client address.
+
+    An unvalidated key would let a client dodge its limit by sending a new value
+    on every request, so keys only count once checked against ``admission.api_keys``.
+
+    Returns:
+        The identity, or None if a key was presented that is not configured
+    """
+    keys = (service("config").get("admission") or {}).get("api_keys") or ()
+    if api_key and keys:
+        fingerprint = match_api_key(api_key, keys)
+        return f"key:{fingerprint}" if fingerprint else None
+    return f"addr:{address or 'unknown'}"
+
+async def admit_client(request: Request) -> str:
+    """Per-client token bucket keyed by a configured API key, falling back to the client address"""
+    client = identify_client(request.headers.get("x-api-key"), request.client.host if request.client else None)
+    if client is None:
+        raise HTTPException(status_code=401, detail="Invalid API key")
+    retry_after = service("client_limiter").check(client)
+    if retry_after:
+        raise HTTPException(status_code=429, detail="Rate limit exceeded",
+                            headers={"Retry-After": str(max(1, round(retry_after)))})
+    return client
+
+@app.exception_handler(Overloaded)
+async def overloaded(request: Request, exc: Overloaded):
+    return JSONResponse({"detail": str(exc)}, status_code=503,
+                        headers={"Retry-After": str(max(1, round(exc.retry_after)))})
+
+@app.exception_handler(Cancelled)
+async def cancelled(request: Request, exc: Cancelled):
+    # 499 Client Closed Request; usually nobody is left to read it
+    return JSONResponse({"detail": str(exc)}, status_code=499)
+
+@asynccontextmanager
+async def cancel_on_disconnect(request: Request, cancel: CancelToken, poll: float = 0.1):
+    """
+    Cancel the token when the HTTP client disconnects.
+
+    Starlette only notices a disconnect when a write fails, which never
+    happens while we are waiting on the provider, so the connection is polled.
+    """
+    async def watch():
+        while not cancel.cancelled:
+            if await request.is_disconnected():
+                cancel.cancel("disconnect")
+                return
+            await asyncio.sleep(poll)
 
-@app.post("/api/tts")
-async def text_to_speech(text: str, voice: str = "alloy"):
-    """Convert text to speech"""
+    watcher = asyncio.create_task(watch())
     try:
-        # Create temporary file path
-        output_file = Path("temp.mp3")
-        
-        # Generate speech
-        result = tts_provider.generate_speech(text, output_file, voice)
-        
-        if not result:
-            raise HTTPException(status_code=500, detail="TTS generation failed")
-        
-        # Read the generated audio file
-        audio_data = output_file.read_bytes()
-        
-        # Clean up
-        output_file.unlink()
+        yield cancel
+    finally:
+        watcher.cancel()
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus text exposition of this worker's metrics"""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/healthz")
+async def healthz():
+    """Liveness: the process is up and serving"""
+    return {"status": "ok"}
+
+@app.get("/readyz")
+async def readyz():
+    """
+    Readiness: providers are built and every required warm-up step has succeeded.
+
+    Failed steps are listed; optional ones (such as prompt preloading) leave the
+    API ready but degraded.
+    """
+    startup = getattr(app.state, "startup", {})
+    failed = startup.get("failed", [])
+    if not getattr(app.state, "ready", False):
+        return JSONResponse({"status": "unavailable" if failed else "warming", "failed": failed}, status_code=503)
+    return {"status": "degraded" if failed else "ready", "failed": failed, "startup": startup}
+
+@app.post("/api/tts", dependencies=[Depends(admit_client)])
+async def text_to_speech(request: Request, text: str, voice: str = "alloy", priority: str = INTERACTIVE,
+                         as_url: bool = False):
+    """
+    Convert text to speech; bulk callers should pass priority=batch.
+
+    With ``as_url`` the response is the render's immutable ``/api/audio`` URL
+    instead of the audio itself, so clients and CDNs can cache it.
+    """
+    if priority not in PRIORITIES:
+        raise HTTPException(status_code=400, detail=f"priority must be one of: {', '.join(PRIORITIES)}")
+    try:
+        # Normalized text keys the cache so "kl. 14:00" and "klukkan fjórtán" share audio
+        tts_provider = service("batch_tts_provider" if priority == BATCH else "tts_provider")
+        audio_cache, audio_store = service("audio_cache"), service("audio_store")
+        spoken = tts_provider.prepare_text(text)
+        key = cache_key(spoken, voice, tts_provider.name, "mp3")
+
+        catalog = app.state.catalog
+        audio_data = audio_cache.get(key)
+        if audio_data is None:
+            stored = audio_store.get(key, "mp3")
+            if stored is not None and as_url:
+                if catalog:
+                    catalog.touch(key)
+                return {"url": audio_store.url(key, "mp3"), "etag": key}
+            if stored is not None:
+                audio_data = stored.read_bytes()
+                if catalog:
+                    catalog.touch(key)
+            else:
+                started = time.perf_counter()
+                # A client that hangs up stops the provider request instead of paying for unheard audio
+                async with cancel_on_disconnect(request, CancelToken()) as cancel:
+                    audio_data = await run_in_threadpool(tts_provider.synthesize, spoken, voice, cancel=cancel)
+                latency_ms = int((time.perf_counter() - started) * 1000)
+                if service("events"):
+                    service("events").emit("-", "synthesize", tts_provider.name, latency_ms / 1000,
+                                           bytes=len(audio_data))
+                path = await run_in_threadpool(audio_store.put, key, "mp3", audio_data)
+                if catalog:
+                    catalog.record({
+                        "render_key": key, "text": spoken, "voice": voice, "provider": tts_provider.name,
+                        "format": "mp3", "bytes": len(audio_data), "latency_ms": latency_ms, "location": str(path),
+                        "duration_ms": audio_duration_ms(audio_data, "mp3")
+                    })
+            audio_cache.set(key, audio_data)
+        else:
+            if catalog:
+                catalog.touch(key)
+            if as_url:
+                await run_in_threadpool(audio_store.put, key, "mp3", audio_data)
+
+        if as_url:
+            return {"url": audio_store.url(key, "mp3"), "etag": key}
         
         # Return audio stream
         return StreamingResponse(
             io.BytesIO(audio_data),
             media_type="audio/mpeg",
             headers={
-                "Content-Disposition": "attachment;filename=audio.mp3"
+                "Content-Disposition": "attachment;filename=audio.mp3",
+                "ETag": f'"{key}"'
             }
         )
+    except (Overloaded, Cancelled):
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.api_route("/api/audio/{key}.{ext}", methods=["GET", "HEAD"])
+async def get_audio(key: str, ext: str, request: Request):
+    """Serve a stored render; the URL names its content, so it is cacheable forever"""
+    audio_store = service("audio_store")
+    if not audio_store.valid(key, ext):
+        raise HTTPException(status_code=404, detail="Unknown audio")
+    path = audio_store.get(key, ext)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Unknown audio")
+
+    etag = f'"{key}"'
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=31536000, immutable"}
+    if_none_match = request.headers.get("if-none-match", "")
+    if if_none_match.strip() == "*" or etag in [t.strip().removeprefix("W/") for t in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+
+    # FileResponse answers Range requests and hands the file to the server's sendfile path when offered
+    return FileResponse(path, media_type=MEDIA_TYPES[ext], headers=headers)
+
+@app.post("/api/converse", dependencies=[Depends(admit_client)])
+async def converse(request: Request, audio: UploadFile = File(...), history: str = Form("[]"),
+                   voice: Optional[str] = Form(None)):
+    """
+    Speech-to-speech turn streamed back as newline-delimited JSON events.
+
+    Turns of one call should share an ``X-Call-Id`` header so their events can be
+    grouped in the call event log and a new turn barges in on the previous one;
+    a fresh id is used otherwise. Disconnecting cancels the turn's synthesis.
+    """
+    try:
+        turns = json.loads(history)
+    except json.JSONDecodeError:
+        raise HTTPException(status_code=400, detail="history must be a JSON list of messages")
+    
+    audio_bytes = await audio.read()
+    if not audio_bytes:
+        raise HTTPException(status_code=400, detail="Empty audio upload")
+    
+    call_id = request.headers.get("x-call-id") or uuid.uuid4().hex
+    
+    async def ndjson():
+        cancel = CancelToken()
+        events = service("pipeline").run(audio_bytes, audio.filename or "speech.webm", turns, voice,
+                                         call_id=call_id, cancel=cancel)
+        try:
+            async with cancel_on_disconnect(request, cancel):
+                while True:
+                    # Pull events on a worker thread so this loop stays responsive to disconnects
+                    event = await run_in_threadpool(next, events, None)
+                    if event is None:
+                        break
+                    if "audio" in event:
+                        event = {**event, "audio": base64.b64encode(event["audio"]).decode("ascii")}
+                    yield json.dumps(event, ensure_ascii=False) + "\n"
+        except Exception as e:
+            # Headers are already sent, so report failures in-band
+            yield json.dumps({"type": "error", "detail": str(e)}, ensure_ascii=False) + "\n"
+        finally:
+            # Stopped early (client gone): stop the turn's queued and in-flight synthesis
+            cancel.cancel("disconnect")
+    
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson", headers={"X-Call-Id": call_id})
+
+@app.websocket("/api/media-stream")
+async def media_stream(websocket: WebSocket):
+    """
+    Phone audio as a Twilio/Vonage-style media stream: JSON messages carrying
+    20 ms of 8 kHz μ-law in both directions, with mark/clear for playback control.
+
+    Every call spends STT, LLM and TTS, so streams must authenticate with a key
+    from ``admission.api_keys``: an ``X-Api-Key`` header, a ``token`` query
+    parameter, or a ``token`` custom parameter in the stream's start message
+    (Twilio cannot send either of the others). Calls also pass the per-client
+    rate limit and a cap on concurrent streams.
+    """
+    keys = (service("config").get("admission") or {}).get("api_keys") or ()
+    telephony = service("config").get("telephony") or {}
+    if not keys:
+        logger.warning("Media stream refused: configure admission.api_keys to accept phone calls")
+        await websocket.close(code=1008)
+        return
+    address = websocket.client.host if websocket.client else None
+    presented = websocket.headers.get("x-api-key") or websocket.query_params.get("token")
+    client = identify_client(presented, address)
+    if client is None:
+        await websocket.close(code=1008)
+        return
+    streams = app.state.media_streams
+    if service("client_limiter").check(client) or len(streams) >= int(telephony.get("max_calls", 200)):
+        # 1013: try again later
+        await websocket.close(code=1013)
+        return
+
+    def authorize(start: Dict) -> bool:
+        token = (start.get("customParameters") or {}).get("token")
+        return bool(token) and match_api_key(str(token), keys) is not None
+
+    await websocket.accept()
+    session = MediaStreamSession(
+        websocket,
+        service("pipeline"),
+        lead_ms=int(telephony.get("lead_ms", 100)),
+        burst_ms=int(telephony.get("burst_ms", 60)),
+        jitter_depth=int(telephony.get("jitter_depth", 3)),
+        authorize=None if presented else authorize
+    )
+    streams.add(session)
+    try:
+        await session.run()
+    finally:
+        streams.discard(session)
+
+@app.post("/api/calls/{call_id}/barge-in", dependencies=[Depends(admit_client)])
+async def barge_in(call_id: str):
+    """The caller started speaking: stop synthesizing the reply in progress on this call"""
+    return {"cancelled": service("pipeline").barge_in(call_id)}
+
+@app.post("/api/answers/{entry_id}/false-hit", dependencies=[Depends(admit_client)])
+async def report_false_hit(entry_id: int, question: Optional[str] = None):
+    """Report a cached answer that was given to a different question; it is evicted"""
+    answer_cache = service("answer_cache")
+    if answer_cache is None:
+        raise HTTPException(status_code=404, detail="Semantic answer cache is disabled")
+    evicted = answer_cache.report_false_hit(entry_id, question)
+    return {"evicted": evicted, "stats": answer_cache.stats()}
+
+@app.post("/api/prompt/{name}", dependencies=[Depends(admit_client)])
+async def render_prompt(name: str, slots: Dict[str, str], voice: str = "alloy"):
+    """Render a prompt template, synthesizing only the slot values"""
+    template_renderer = service("template_renderer")
+    if name not in template_renderer.templates:
+        raise HTTPException(status_code=404, detail=f"Unknown prompt template: {name}")
+    try:
+        audio = await run_in_threadpool(template_renderer.render, name, voice, slots)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Overloaded:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return Response(audio, media_type="audio/wav")
+
+def _scenario_audio(result: PromptResult) -> Response:
+    headers = {"X-Call-Id": result.call_id, "X-Scenario-State": result.state, "X-Speculation": result.outcome}
+    if result.final:
+        headers["X-Scenario-Final"] = "true"
+    return Response(pcm_to_wav(result.audio), media_type="audio/wav", headers=headers)
+
+@app.get("/api/scenarios")
+async def list_scenarios():
+    """Scenario state graphs and speculation hit rates"""
+    engine = service("scenarios")
+    return {
+        "scenarios": {
+            name: {
+                "start": scenario.start,
+                "states": {s.name: [t.target for t in s.transitions] for s in scenario.states.values()}
+            }
+            for name, scenario in engine.scenarios.items()
+        },
+        "speculation": engine.stats()
+    }
+
+@app.post("/api/scenarios/{name}/calls", dependencies=[Depends(admit_client)])
+async def start_scenario(request: Request, name: str, voice: str = "alloy", slots: Optional[Dict[str, str]] = None):
+    """
+    Start a scripted call and return its first prompt as WAV.
+
+    The call id is taken from ``X-Call-Id`` or generated, and echoed back; the
+    state entered and where its audio came from are in ``X-Scenario-State``
+    and ``X-Speculation``.
+    """
+    engine = service("scenarios")
+    if name not in engine.scenarios:
+        raise HTTPException(status_code=404, detail=f"Unknown scenario: {name}")
+    call_id = request.headers.get("x-call-id") or uuid.uuid4().hex
+    try:
+        result = await run_in_threadpool(engine.start, name, call_id, voice, slots)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return _scenario_audio(result)
+
+@app.post("/api/calls/{call_id}/scenario", dependencies=[Depends(admit_client)])
+async def advance_scenario(call_id: str, text: Optional[str] = None, state: Optional[str] = None,
+                           slots: Optional[Dict[str, str]] = None):
+    """
+    Move a scripted call on with the caller's transcript, or to an explicit state.
+
+    Returns the next prompt as WAV, usually already synthesized by speculation,
+    or 204 when no scripted transition matches and the reply should come from
+    ``/api/converse``.
+    """
+    try:
+        result = await run_in_threadpool(service("scenarios").advance, call_id, text, state, slots)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"No scripted call in progress: {call_id}")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if result is None:
+        return Response(status_code=204, headers={"X-Call-Id": call_id})
+    return _scenario_audio(result)
+
+@app.delete("/api/calls/{call_id}/scenario", dependencies=[Depends(admit_client)])
+async def end_scenario(call_id: str):
+    """The call ended: stop speculating for it"""
+    return {"ended": service("scenarios").end(call_id)}
+
 @app.post("/api/info")
 async def get_info():
     """Get API information"""
     return {
         "name": "Halloisland TTS/STT API",
         "version": "1.0.0",
-        "features": ["tts"],
+        "features": ["tts", "converse", "prompts", "media-stream", "scenarios"],
+        "prompts": {name: t.slots for name, t in service("template_renderer").templates.items()},
+        "scenarios": list(service("scenarios").scenarios),
         "voices": ["alloy", "echo", "fable", "onyx", "nova", "shimmer"]
     }
 
+def benchmark_startup() -> Dict[str, float]:
+    """Measure import, build and warm-up cost of a cold start in this process"""
+    config = ConfigManager()
+    started = time.perf_counter()
+    services = build_services(config)
+    built = time.perf_counter() - started
+    timings = warm_up(services)
+    services["chat_client"].close()
+    if services["events"]:
+        services["events"].close()
+
+    print(f"imports:  {IMPORT_SECONDS * 1000:8.1f} ms")
+    print(f"build:    {built * 1000:8.1f} ms")
+    for name, seconds in timings.items():
+        status = "❌ failed" if seconds < 0 else f"{seconds * 1000:8.1f} ms"
+        print(f"warm {name + ':':<6}{status}")
+    return {"imports": IMPORT_SECONDS, "build": built, **timings}
+
 if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=int(os.getenv("PORT", "80")))
\ No newline at end of file
+    import argparse
+    parser = argparse.ArgumentParser(description="Halloisland TTS/STT API")
+    parser.add_argument("--benchmark", action="store_true", help="Report cold-start import and warm-up cost, then exit")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark_startup()
+    else:
+        import uvicorn
+        uvicorn.run(app, host="0.0.0.0", port=int(os.getenv("PORT", "80")))
\ No newline at end of file
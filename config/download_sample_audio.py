@@ -1,59 +1,35 @@
 """
 Download a sample Icelandic audio file for testing STT models
+
+Files, checksums, licenses and reference transcripts are listed in
+config/datasets/icelandic_samples.json. Downloads run in parallel, resume
+partial files and skip files that are already present and valid. Set
+SAMPLE_AUDIO_MIRROR (or pass --mirror) to fetch from a local mirror instead.
 """
-import requests
 import os
+import sys
 from pathlib import Path
 
-# Create directory for samples
+# Resolve src/ from the repository root rather than the config/src copy
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.datasets.fetcher import main as fetch_main
+
+MANIFEST = Path(__file__).resolve().parent / "datasets" / "icelandic_samples.json"
 SAMPLE_DIR = Path("icelandic_samples")
-SAMPLE_DIR.mkdir(exist_ok=True)
-
-# Sample URLs - Icelandic audio files
-SAMPLES = [
-    {
-        "name": "icelandic_sample1.mp3",
-        "url": "https://www.101languages.net/icelandic/wp-content/uploads/sites/83/2017/05/Icelandic-Lesson-1-Listen-to-the-Phrases.mp3"
-    },
-    {
-        "name": "icelandic_sample2.mp3",
-        "url": "https://gagnryni.is/wp-content/uploads/2020/04/Icelandic-for-Dummies-Lesson-1.mp3"
-    }
-]
-
-def download_file(url, destination):
-    """Download file from URL to destination"""
-    try:
-        response = requests.get(url, stream=True)
-        response.raise_for_status()
-        
-        with open(destination, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                f.write(chunk)
-        
-        return True
-    except Exception as e:
-        print(f"Error downloading {url}: {str(e)}")
-        return False
 
 def main():
     """Download sample files"""
     print("Downloading Icelandic audio samples...")
-    
-    success_count = 0
-    for sample in SAMPLES:
-        destination = SAMPLE_DIR / sample["name"]
-        print(f"Downloading {sample['name']}...")
-        
-        if download_file(sample["url"], destination):
-            print(f"✅ Successfully downloaded {destination}")
-            success_count += 1
-        else:
-            print(f"❌ Failed to download {sample['name']}")
-    
-    print(f"\nDownloaded {success_count} of {len(SAMPLES)} samples to {SAMPLE_DIR.absolute()}")
+
+    report = fetch_main([str(MANIFEST), "--dest", str(SAMPLE_DIR)] + sys.argv[1:])
+
+    downloaded = len(report["files"]) - len(report["failed"])
+    print(f"\n{downloaded} of {len(report['files'])} samples ready in {SAMPLE_DIR.absolute()}")
     print("\nYou can use these samples to test STT models with the command:")
     print(f"python icelandic_stt_comparison.py {SAMPLE_DIR}/icelandic_sample1.mp3")
+    if report["failed"]:
+        sys.exit(1)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -10,6 +10,8 @@ from pathlib import Path
 import argparse
 from dotenv import load_dotenv
 import json
+import threading
+from functools import lru_cache
 
 # Load environment variables
 load_dotenv()
@@ -147,18 +149,34 @@ def whisper_stt(audio_file):
         print(f"❌ OpenAI Whisper error: {str(e)}")
         return None
 
+WHISPER_LOCAL_MODEL = "carlosdanielhernandezmena/whisper-large-icelandic-10k-steps-1000h"
+
+# lru_cache does not stop concurrent first calls from each loading the model
+_whisper_local_lock = threading.Lock()
+
+def load_whisper_local():
+    """Load the local Whisper model once per process, shared by every audio file"""
+    with _whisper_local_lock:
+        return _load_whisper_local()
+
+@lru_cache(maxsize=1)
+def _load_whisper_local():
+    from transformers import AutoProcessor, AutoModelForSpeechSeq2Seq
+
+    print("Loading whisper model...")
+    processor = AutoProcessor.from_pretrained(WHISPER_LOCAL_MODEL)
+    model = AutoModelForSpeechSeq2Seq.from_pretrained(WHISPER_LOCAL_MODEL)
+    return processor, model
+
 def whisper_local_stt(audio_file):
     """Local Whisper model for Icelandic"""
     try:
-        from transformers import AutoProcessor, AutoModelForSpeechSeq2Seq
         import torch
         import librosa
         import numpy as np
         
         # Load model
-        print("Loading whisper model...")
-        processor = AutoProcessor.from_pretrained("carlosdanielhernandezmena/whisper-large-icelandic-10k-steps-1000h")
-        model = AutoModelForSpeechSeq2Seq.from_pretrained("carlosdanielhernandezmena/whisper-large-icelandic-10k-steps-1000h")
+        processor, model = load_whisper_local()
         
         # Load audio
         waveform, sample_rate = librosa.load(audio_file, sr=16000)
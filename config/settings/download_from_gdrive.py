@@ -1,31 +1,46 @@
 """
 Download files from Google Drive 'helloiceland' folder
+
+Runs as an incremental sync: the folder tree is listed page by page, files whose
+md5Checksum/modifiedTime match the local manifest are skipped, and the rest are
+streamed to temp files by a bounded pool of workers and renamed into place.
 """
 import os
+import re
+import json
 import pickle
-import io
-from googleapiclient.discovery import build
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
-from googleapiclient.http import MediaIoBaseDownload
+import hashlib
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
+from typing import Callable, Dict, Iterator, Optional, Tuple
 
 # Set up directory for downloaded files
 DOWNLOAD_DIR = Path("helloiceland_files")
-DOWNLOAD_DIR.mkdir(exist_ok=True)
+MANIFEST_NAME = ".gdrive_manifest.json"
 
 # Google Drive API scope
 SCOPES = ['https://www.googleapis.com/auth/drive.readonly']
 
+FOLDER_MIME_TYPE = 'application/vnd.google-apps.folder'
+LIST_FIELDS = 'nextPageToken, files(id, name, mimeType, md5Checksum, modifiedTime, size)'
+CHUNK_SIZE = 8 * 1024 * 1024
+# Path separators and control characters have no place in a single path component
+UNSAFE_NAME_CHARS = re.compile(r'[/\\\x00-\x1f]')
+
 def authenticate():
     """Authenticate with Google Drive API"""
+    from google_auth_oauthlib.flow import InstalledAppFlow
+    from google.auth.transport.requests import Request
+
     creds = None
-    
+
     # Check if token file exists
     if os.path.exists('token.pickle'):
         with open('token.pickle', 'rb') as token:
             creds = pickle.load(token)
-    
+
     # If credentials don't exist or are invalid, get new ones
     if not creds or not creds.valid:
         if creds and creds.expired and creds.refresh_token:
@@ -34,108 +49,268 @@ def authenticate():
             flow = InstalledAppFlow.from_client_secrets_file(
                 'credentials.json', SCOPES)
             creds = flow.run_local_server(port=0)
-        
+
         # Save credentials for future use
         with open('token.pickle', 'wb') as token:
             pickle.dump(creds, token)
-    
+
     return creds
 
 def find_folder_id(service, folder_name="helloiceland"):
     """Find the Google Drive folder ID by name"""
-    query = f"mimeType='application/vnd.google-apps.folder' and name='{folder_name}'"
-    
+    query = f"mimeType='{FOLDER_MIME_TYPE}' and name='{folder_name}' and trashed=false"
+
     results = service.files().list(
         q=query,
         spaces='drive',
         fields='files(id, name)'
     ).execute()
-    
+
     items = results.get('files', [])
-    
+
     if not items:
         print(f"No folder named '{folder_name}' found.")
         return None
-    
+
     # Return the first matching folder ID
     return items[0]['id']
 
 def list_files_in_folder(service, folder_id):
-    """List all files in a specific folder"""
-    query = f"'{folder_id}' in parents"
-    
-    results = service.files().list(
-        q=query,
-        spaces='drive',
-        fields='files(id, name, mimeType)'
-    ).execute()
-    
-    return results.get('files', [])
-
-def download_file(service, file_id, file_name):
-    """Download a file from Google Drive"""
-    request = service.files().get_media(fileId=file_id)
-    
-    file_path = DOWNLOAD_DIR / file_name
-    
-    with io.BytesIO() as fh:
-        downloader = MediaIoBaseDownload(fh, request)
-        done = False
-        
-        while not done:
-            status, done = downloader.next_chunk()
-            print(f"Download {int(status.progress() * 100)}%")
-        
-        # Write to file
-        fh.seek(0)
-        with open(file_path, 'wb') as f:
-            f.write(fh.read())
-    
+    """List all files in a specific folder, following every result page"""
+    query = f"'{folder_id}' in parents and trashed=false"
+    page_token = None
+
+    while True:
+        results = service.files().list(
+            q=query,
+            spaces='drive',
+            fields=LIST_FIELDS,
+            # A stable order keeps the same file first among duplicate names on every run
+            orderBy='createdTime',
+            pageSize=1000,
+            pageToken=page_token
+        ).execute()
+
+        yield from results.get('files', [])
+
+        page_token = results.get('nextPageToken')
+        if not page_token:
+            break
+
+def safe_name(name: str) -> str:
+    """
+    Make a Drive file name usable as one local path component.
+
+    Drive names may contain '/' or be '.' or '..', which would otherwise
+    place files outside the sync directory.
+    """
+    name = UNSAFE_NAME_CHARS.sub('_', name).strip()
+    return '_' * max(len(name), 1) if not name.strip('.') else name
+
+def unique_name(name: str, file: Dict, taken: set) -> str:
+    """
+    Give a file a local name no earlier sibling has taken.
+
+    Drive allows several files with the same name in one folder; the first keeps
+    its name and the rest get their file id added, e.g. 'a (1AbCdEfG).wav'.
+    """
+    if name not in taken:
+        return name
+    is_folder = file['mimeType'] == FOLDER_MIME_TYPE
+    stem, suffix = (name, '') if is_folder else (Path(name).stem, Path(name).suffix)
+    return f"{stem} ({safe_name(file['id'])[:8]}){suffix}"
+
+def walk_folder(service, folder_id, prefix: Path = Path()) -> Iterator[Tuple[Path, Dict]]:
+    """Yield (relative path, file) for every file below a folder, recursing into subfolders"""
+    taken = set()
+    for file in list_files_in_folder(service, folder_id):
+        name = safe_name(file['name'])
+        unique = unique_name(name, file, taken)
+        if unique != name:
+            print(f"❌ Duplicate name {prefix / name}, saving file {file['id']} as {prefix / unique}")
+        taken.add(unique)
+        path = prefix / unique
+        if file['mimeType'] == FOLDER_MIME_TYPE:
+            yield from walk_folder(service, file['id'], path)
+        elif file['mimeType'].startswith('application/vnd.google-apps.'):
+            # Docs, Sheets etc. have no binary content to download
+            print(f"Skipping Google Workspace file: {path}")
+        else:
+            yield path, file
+
+def load_manifest(path: Path) -> Dict[str, Dict]:
+    if path.exists():
+        try:
+            return json.loads(path.read_text(encoding='utf-8'))
+        except json.JSONDecodeError:
+            print(f"❌ Ignoring unreadable manifest {path}")
+    return {}
+
+def save_manifest(path: Path, manifest: Dict[str, Dict]) -> None:
+    tmp = path.with_suffix('.tmp')
+    tmp.write_text(json.dumps(manifest, ensure_ascii=False, indent=2, sort_keys=True), encoding='utf-8')
+    os.replace(tmp, path)
+
+def is_unchanged(file: Dict, entry: Optional[Dict], local_path: Path) -> bool:
+    """Whether the local copy still matches the Drive file"""
+    if not entry or not local_path.exists() or entry.get('id') != file['id']:
+        return False
+    if file.get('md5Checksum'):
+        return entry.get('md5Checksum') == file['md5Checksum']
+    return entry.get('modifiedTime') == file.get('modifiedTime')
+
+class _HashingWriter:
+    """File wrapper that hashes chunks as the downloader writes them"""
+
+    def __init__(self, fh):
+        self.fh = fh
+        self.md5 = hashlib.md5()
+
+    def write(self, data):
+        self.md5.update(data)
+        return self.fh.write(data)
+
+def _media_downloader(fh, request):
+    from googleapiclient.http import MediaIoBaseDownload
+    return MediaIoBaseDownload(fh, request, chunksize=CHUNK_SIZE)
+
+def download_file(service, file: Dict, file_path: Path, downloader_factory: Callable = _media_downloader) -> Path:
+    """Stream a file from Google Drive to a temp file, verify it and rename it into place"""
+    request = service.files().get_media(fileId=file['id'])
+
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = file_path.with_name(f".{file_path.name}.part")
+
+    try:
+        with open(tmp_path, 'wb') as fh:
+            writer = _HashingWriter(fh)
+            downloader = downloader_factory(writer, request)
+            done = False
+            while not done:
+                _, done = downloader.next_chunk()
+
+        if file.get('md5Checksum') and writer.md5.hexdigest() != file['md5Checksum']:
+            raise IOError(f"Checksum mismatch for {file_path.name}")
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
     return file_path
 
+def sync_folder(service_factory: Callable, folder_id: str, dest: Path, workers: int = 4, full: bool = False,
+                downloader_factory: Callable = _media_downloader) -> Dict[str, int]:
+    """
+    Mirror a Drive folder tree into ``dest``, downloading only new or changed files.
+
+    Args:
+        service_factory: Returns a Drive service; called once per worker thread because
+            the client library is not thread-safe
+        folder_id: Root folder to mirror
+        dest: Local directory
+        workers: Concurrent downloads
+        full: Ignore the manifest and download everything
+        downloader_factory: Creates a chunked downloader for (file handle, request)
+
+    Returns:
+        Counts of downloaded, skipped and failed files
+    """
+    dest.mkdir(parents=True, exist_ok=True)
+    manifest_path = dest / MANIFEST_NAME
+    manifest = {} if full else load_manifest(manifest_path)
+    local = threading.local()
+
+    def thread_service():
+        if not hasattr(local, 'service'):
+            local.service = service_factory()
+        return local.service
+
+    def fetch(rel_path: Path, file: Dict) -> Path:
+        return download_file(thread_service(), file, dest / rel_path, downloader_factory)
+
+    counts = {"downloaded": 0, "skipped": 0, "failed": 0}
+    seen = set()
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {}
+        # Listing runs on this thread while earlier files are already downloading
+        for rel_path, file in walk_folder(thread_service(), folder_id):
+            key = rel_path.as_posix()
+            seen.add(key)
+            if not (dest / rel_path).resolve().is_relative_to(dest.resolve()):
+                counts["failed"] += 1
+                print(f"❌ Refusing {key}: outside {dest}")
+                continue
+            if is_unchanged(file, manifest.get(key), dest / rel_path):
+                counts["skipped"] += 1
+                continue
+            futures[executor.submit(fetch, rel_path, file)] = (key, file)
+
+        try:
+            for done_count, future in enumerate(as_completed(futures), 1):
+                key, file = futures[future]
+                try:
+                    future.result()
+                except Exception as e:
+                    counts["failed"] += 1
+                    print(f"❌ Failed {key}: {str(e)}")
+                    continue
+
+                counts["downloaded"] += 1
+                print(f"✅ Downloaded {key}")
+                manifest[key] = {
+                    "id": file['id'],
+                    "md5Checksum": file.get('md5Checksum'),
+                    "modifiedTime": file.get('modifiedTime'),
+                    "size": file.get('size')
+                }
+                # Checkpoint so an interrupted sync resumes where it stopped
+                if done_count % 50 == 0:
+                    save_manifest(manifest_path, manifest)
+        finally:
+            # Files removed from Drive drop out of the manifest; local copies are left alone
+            for key in set(manifest) - seen:
+                manifest.pop(key)
+            save_manifest(manifest_path, manifest)
+
+    return counts
+
 def main():
     """Main function to download files from Google Drive"""
+    parser = argparse.ArgumentParser(description="Sync the 'helloiceland' Google Drive folder")
+    parser.add_argument("--folder", default="helloiceland", help="Drive folder name")
+    parser.add_argument("--dest", type=Path, default=DOWNLOAD_DIR, help="Local directory")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent downloads")
+    parser.add_argument("--full", action="store_true", help="Ignore the manifest and re-download everything")
+    args = parser.parse_args()
+
     print("Authenticating with Google Drive...")
-    
+
     try:
+        from googleapiclient.discovery import build
+
         # Authenticate
         creds = authenticate()
-        service = build('drive', 'v3', credentials=creds)
-        
+
+        def service_factory():
+            return build('drive', 'v3', credentials=creds, cache_discovery=False)
+
         # Find the folder
-        print("Looking for 'helloiceland' folder...")
-        folder_id = find_folder_id(service)
-        
+        print(f"Looking for '{args.folder}' folder...")
+        folder_id = find_folder_id(service_factory(), args.folder)
+
         if not folder_id:
             return
-        
-        # List files in the folder
-        print(f"Listing files in the folder...")
-        files = list_files_in_folder(service, folder_id)
-        
-        if not files:
-            print("No files found in the folder.")
-            return
-        
-        print(f"Found {len(files)} files. Starting download...")
-        
-        # Download each file
-        for file in files:
-            file_id = file['id']
-            file_name = file['name']
-            mime_type = file['mimeType']
-            
-            # Skip folders
-            if mime_type == 'application/vnd.google-apps.folder':
-                print(f"Skipping subfolder: {file_name}")
-                continue
-                
-            print(f"Downloading {file_name}...")
-            file_path = download_file(service, file_id, file_name)
-            print(f"Downloaded to {file_path}")
-        
-        print(f"\nAll files downloaded to {DOWNLOAD_DIR.absolute()}")
-        
+
+        print(f"Syncing into {args.dest.absolute()} with {args.workers} workers...")
+        counts = sync_folder(service_factory, folder_id, args.dest, workers=args.workers, full=args.full)
+
+        print(f"\nDownloaded {counts['downloaded']}, unchanged {counts['skipped']}, failed {counts['failed']}")
+        print(f"Files are in {args.dest.absolute()}")
+
+    except ImportError as e:
+        print(f"❌ Google API client not installed ({str(e)}). "
+              "Run 'pip install google-api-python-client google-auth-oauthlib'")
     except Exception as e:
         print(f"Error: {str(e)}")
         print("\nTo use this script, you need to:")
@@ -146,4 +321,4 @@ def main():
         print("5. Place 'credentials.json' in the same directory as this script")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
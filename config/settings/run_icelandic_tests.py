@@ -5,19 +5,77 @@ This script:
 1. Downloads Icelandic audio files from Google Drive
 2. Runs TTS comparison tests
 3. Runs STT comparison tests on the downloaded files
+
+Everything runs in one process as memoized stages: each stage declares the files
+and parameters it depends on and the files it produces, stages whose inputs are
+unchanged since their last successful run are skipped, and independent stages
+(TTS providers, STT per audio file) run concurrently.
 """
 import os
-import subprocess
 import sys
-from pathlib import Path
+import json
+import shutil
 import argparse
+import importlib.util
+import subprocess
+import threading
+from importlib import metadata
+from pathlib import Path
+
+# Resolve src/ from the repository root rather than the config/src copy
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from src.stages.runner import Stage, StageRunner
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+# Companion scripts are looked up next to the working directory first, then in the repo
+SEARCH_PATH = [Path.cwd(), SCRIPT_DIR, SCRIPT_DIR.parent]
+
+REQUIREMENTS = Path("requirements_icelandic.txt")
+GDRIVE_DIR = Path("helloiceland_files")
+SAMPLE_DIR = Path("icelandic_samples")
+SAMPLE_MANIFEST = SCRIPT_DIR.parent / "datasets" / "icelandic_samples.json"
+TTS_OUTPUT_DIR = Path("icelandic_tts_samples")
+STT_OUTPUT_DIR = Path("icelandic_stt_results")
+AUDIO_EXTENSIONS = ('.wav', '.mp3', '.ogg', '.flac')
+
+TTS_PROVIDERS = {
+    "Google": "google_tts",
+    "Azure": "azure_tts",
+    "OpenAI": "openai_tts",
+    "Tiro": "tiro_tts"
+}
+
+_modules = {}
+_modules_lock = threading.Lock()
+
+def find_script(filename):
+    for directory in SEARCH_PATH:
+        if (directory / filename).exists():
+            return directory / filename
+    raise FileNotFoundError(f"{filename} not found in {', '.join(str(d) for d in SEARCH_PATH)}")
+
+def load_script(name):
+    """Import a companion script once, in this process"""
+    with _modules_lock:
+        if name not in _modules:
+            spec = importlib.util.spec_from_file_location(name, find_script(f"{name}.py"))
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            _modules[name] = module
+        return _modules[name]
+
+def list_audio(directory):
+    if not directory.exists():
+        return []
+    return sorted(str(p) for p in directory.iterdir() if p.suffix.lower() in AUDIO_EXTENSIONS)
 
 def check_env_file():
     """Check if .env file exists and has API keys"""
     if not os.path.exists(".env"):
         print("Creating .env file from template...")
         if os.path.exists(".env.icelandic"):
-            subprocess.run(["cp", ".env.icelandic", ".env"])
+            shutil.copy(".env.icelandic", ".env")
             print("Created .env file. Please edit it to add your API keys.")
             print("Then run this script again.")
             return False
@@ -39,132 +97,168 @@ def check_env_file():
     
     return True
 
+def missing_requirements(path):
+    """Requirement names from a requirements file that are not installed"""
+    missing = []
+    for line in path.read_text(encoding="utf-8").splitlines():
+        line = line.split("#", 1)[0].strip()
+        if not line or line.startswith("-"):
+            continue
+        name = line.split()[0]
+        for sep in ("[", "=", "<", ">", "!", "~", ";"):
+            name = name.split(sep, 1)[0]
+        try:
+            metadata.version(name)
+        except metadata.PackageNotFoundError:
+            missing.append(line)
+    return missing
+
 def install_requirements():
-    """Install required packages"""
-    print("Installing required packages...")
-    
-    try:
-        subprocess.run([
-            sys.executable, "-m", "pip", "install", "-r", "requirements_icelandic.txt"
-        ], check=True)
-        print("Successfully installed requirements.")
-        return True
-    except subprocess.CalledProcessError as e:
-        print(f"Error installing requirements: {e}")
-        return False
-
-def download_from_gdrive():
-    """Download files from Google Drive"""
+    """Install required packages that are not already present"""
+    missing = missing_requirements(REQUIREMENTS)
+    if not missing:
+        print("✅ Requirements already installed.")
+        return {"installed": []}
+
+    print(f"Installing {len(missing)} missing packages...")
+    for requirement in missing:
+        subprocess.run([sys.executable, "-m", "pip", "install", *requirement.split()], check=True)
+    print("✅ Successfully installed requirements.")
+    return {"installed": sorted(missing)}
+
+def download_from_gdrive(workers=4):
+    """Sync files from Google Drive, with rclone if configured and the Drive API otherwise"""
     print("\n--- Downloading files from Google Drive ---")
-    
-    # Check if files already downloaded
-    if os.path.exists("helloiceland_files") and len(os.listdir("helloiceland_files")) > 0:
-        print("helloiceland_files directory already contains files.")
-        user_input = input("Download again? (y/n): ")
-        if user_input.lower() != "y":
-            return True
-    
-    # Try rclone method first (easier)
+
     try:
+        rclone = load_script("download_with_rclone")
         print("Attempting download using rclone...")
-        subprocess.run([
-            sys.executable, "download_with_rclone.py"
-        ], check=True)
-        
-        # Check if download was successful
-        if os.path.exists("helloiceland_files") and len(os.listdir("helloiceland_files")) > 0:
-            print("Successfully downloaded files using rclone.")
-            return True
-        else:
-            print("rclone download failed or found no files.")
-    except (subprocess.CalledProcessError, FileNotFoundError):
-        print("rclone method failed.")
-    
-    # Fall back to Google Drive API method
-    try:
-        print("\nAttempting download using Google Drive API...")
-        subprocess.run([
-            sys.executable, "download_from_gdrive.py"
-        ], check=True)
-        
-        # Check if download was successful
-        if os.path.exists("helloiceland_files") and len(os.listdir("helloiceland_files")) > 0:
-            print("Successfully downloaded files using Google Drive API.")
-            return True
-        else:
-            print("Google Drive API download failed or found no files.")
-            return False
-    except (subprocess.CalledProcessError, FileNotFoundError):
-        print("Both download methods failed.")
-        return False
+        if rclone.setup_rclone():
+            rclone.download_files()
+            if list_audio(GDRIVE_DIR):
+                print("✅ Successfully downloaded files using rclone.")
+                return {"files": len(list_audio(GDRIVE_DIR))}
+        print("rclone download failed or found no files.")
+    except (FileNotFoundError, OSError) as e:
+        print(f"rclone method failed: {str(e)}")
 
-def run_tts_comparison():
-    """Run TTS comparison tests"""
-    print("\n--- Running Text-to-Speech Comparison ---")
-    
-    try:
-        subprocess.run([
-            sys.executable, "icelandic_tts_comparison.py"
-        ], check=True)
-        print("TTS comparison completed.")
-        return True
-    except subprocess.CalledProcessError as e:
-        print(f"Error running TTS comparison: {e}")
-        return False
-
-def run_stt_comparison():
-    """Run STT comparison tests"""
-    print("\n--- Running Speech-to-Text Comparison ---")
-    
-    # Get audio files
-    audio_files = []
-    
-    # Check downloaded files first
-    if os.path.exists("helloiceland_files"):
-        for file in os.listdir("helloiceland_files"):
-            if file.lower().endswith(('.wav', '.mp3', '.ogg', '.flac')):
-                audio_files.append(os.path.join("helloiceland_files", file))
-    
-    # If no files from Google Drive, check sample files
-    if not audio_files and os.path.exists("icelandic_samples"):
-        for file in os.listdir("icelandic_samples"):
-            if file.lower().endswith(('.wav', '.mp3', '.ogg', '.flac')):
-                audio_files.append(os.path.join("icelandic_samples", file))
-    
-    # If still no files, download samples
-    if not audio_files:
-        print("No audio files found. Downloading samples...")
-        try:
-            subprocess.run([
-                sys.executable, "download_sample_audio.py"
-            ], check=True)
-            
-            if os.path.exists("icelandic_samples"):
-                for file in os.listdir("icelandic_samples"):
-                    if file.lower().endswith(('.wav', '.mp3', '.ogg', '.flac')):
-                        audio_files.append(os.path.join("icelandic_samples", file))
-        except subprocess.CalledProcessError:
-            print("Error downloading sample audio.")
-    
-    # Run STT comparison on each audio file
+    print("\nAttempting download using Google Drive API...")
+    gdrive = load_script("download_from_gdrive")
+    from googleapiclient.discovery import build
+
+    creds = gdrive.authenticate()
+
+    def service_factory():
+        return build('drive', 'v3', credentials=creds, cache_discovery=False)
+
+    folder_id = gdrive.find_folder_id(service_factory())
+    if not folder_id:
+        raise RuntimeError("Google Drive folder 'helloiceland' not found")
+    counts = gdrive.sync_folder(service_factory, folder_id, GDRIVE_DIR, workers=workers)
+    print(f"✅ Downloaded {counts['downloaded']}, unchanged {counts['skipped']}, failed {counts['failed']}")
+    return counts
+
+def collect_audio(workers=4):
+    """Audio files to test: the Drive corpus if present, otherwise the sample set"""
+    audio_files = list_audio(GDRIVE_DIR) or list_audio(SAMPLE_DIR)
     if audio_files:
-        print(f"Found {len(audio_files)} audio files for testing.")
-        success = True
-        
-        for audio_file in audio_files:
-            print(f"\nTesting with {audio_file}...")
-            try:
-                subprocess.run([
-                    sys.executable, "icelandic_stt_comparison.py", audio_file
-                ], check=True)
-            except subprocess.CalledProcessError:
-                print(f"Error processing {audio_file}")
-                success = False
-        
-        return success
-    else:
-        print("No audio files found for testing.")
-        return False
+        return audio_files
+
+    from src.datasets.fetcher import fetch_dataset
+
+    print("No audio files found. Fetching samples...")
+    report = fetch_dataset(SAMPLE_MANIFEST, SAMPLE_DIR, workers=workers, mirror=os.environ.get("SAMPLE_AUDIO_MIRROR"))
+    if report["failed"]:
+        print(f"❌ {len(report['failed'])} samples failed to download")
+    return list_audio(SAMPLE_DIR)
+
+def run_tts_provider(provider):
+    """Generate one provider's TTS sample"""
+    tts = load_script("icelandic_tts_comparison")
+    output = TTS_OUTPUT_DIR / f"{provider.lower()}_icelandic.mp3"
+    if not getattr(tts, TTS_PROVIDERS[provider])(tts.TEST_TEXT, output):
+        raise RuntimeError(f"{provider} TTS failed")
+    return str(output)
+
+def run_stt_file(audio_file):
+    """Transcribe one audio file with every STT provider"""
+    stt = load_script("icelandic_stt_comparison")
+    print(f"\nTesting with {audio_file}...")
+    results = stt.process_audio(audio_file)
+
+    output_file = STT_OUTPUT_DIR / f"results_{Path(audio_file).stem}.json"
+    with open(output_file, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+
+    successful = [p for p, t in results.items() if t]
+    if not successful:
+        # Not memoized, so the file is retried on the next run
+        raise RuntimeError(f"No provider transcribed {audio_file}")
+    print(f"✅ {audio_file}: transcribed with {len(successful)} out of {len(results)} providers")
+    return successful
+
+def stt_stages(audio_files, deps):
+    stt_script = find_script("icelandic_stt_comparison.py")
+    return [
+        Stage(
+            name=f"stt:{audio_file}",
+            func=run_stt_file,
+            params={"audio_file": audio_file},
+            inputs=[Path(audio_file), stt_script, Path(".env")],
+            outputs=[STT_OUTPUT_DIR / f"results_{Path(audio_file).stem}.json"],
+            deps=deps
+        )
+        for audio_file in audio_files
+    ]
+
+def build_runner(args):
+    """Register the stages selected by the command line"""
+    runner = StageRunner(cache_dir=Path(".stage_cache"), workers=args.workers)
+    setup_deps = []
+
+    if not args.skip_install:
+        runner.add(Stage(name="install", func=install_requirements, inputs=[REQUIREMENTS]))
+        setup_deps = ["install"]
+
+    if not args.stt_only:
+        tts_script = find_script("icelandic_tts_comparison.py")
+        for provider in TTS_PROVIDERS:
+            runner.add(Stage(
+                name=f"tts:{provider}",
+                func=run_tts_provider,
+                params={"provider": provider},
+                inputs=[tts_script, Path(".env")],
+                outputs=[TTS_OUTPUT_DIR / f"{provider.lower()}_icelandic.mp3"],
+                deps=setup_deps
+            ))
+
+    if not args.tts_only:
+        audio_deps = list(setup_deps)
+        if args.download:
+            runner.add(Stage(name="fetch:gdrive", func=download_from_gdrive, params={"workers": args.workers},
+                             deps=setup_deps, memoize=False))
+            audio_deps.append("fetch:gdrive")
+        runner.add(Stage(
+            name="fetch:audio",
+            func=collect_audio,
+            params={"workers": args.workers},
+            inputs=[GDRIVE_DIR, SAMPLE_DIR, SAMPLE_MANIFEST],
+            deps=audio_deps,
+            # STT stages are only known once the audio list is; they depend on setup, not on the
+            # list itself, so adding one file does not invalidate every other file's results
+            expand=lambda audio_files: stt_stages(audio_files, setup_deps)
+        ))
+
+    return runner
+
+def print_summary(results):
+    print("\n--- Stages ---")
+    icons = {"ran": "✅", "cached": "⏭️ ", "failed": "❌", "skipped": "⏸️ "}
+    for name, result in results.items():
+        line = f"{icons[result['status']]} {name}: {result['status']} ({result['seconds']:.2f}s)"
+        if result.get("error"):
+            line += f" - {result['error']}"
+        print(line)
 
 def main():
     """Main function"""
@@ -173,6 +267,8 @@ def main():
     parser.add_argument("--stt-only", action="store_true", help="Run only STT tests")
     parser.add_argument("--skip-download", action="store_true", help="Skip downloading files from Google Drive")
     parser.add_argument("--skip-install", action="store_true", help="Skip installing requirements")
+    parser.add_argument("--force", action="store_true", help="Rerun every stage, ignoring memoized results")
+    parser.add_argument("--workers", type=int, default=4, help="Stages run concurrently")
     args = parser.parse_args()
     
     print("=== Icelandic TTS and STT Testing Suite ===")
@@ -181,28 +277,24 @@ def main():
     if not check_env_file():
         return
     
-    # Install requirements
-    if not args.skip_install:
-        if not install_requirements():
-            return
-    
-    # Download files from Google Drive
-    if not args.skip_download and not args.tts_only:
-        download_from_gdrive()
-    
-    # Run tests
-    if not args.stt_only:
-        run_tts_comparison()
-    
-    if not args.tts_only:
-        run_stt_comparison()
+    # Ask before the stages start, so no prompt interleaves with concurrent output
+    args.download = not args.skip_download and not args.tts_only
+    if args.download and list_audio(GDRIVE_DIR) and not args.force:
+        print("helloiceland_files directory already contains files.")
+        args.download = input("Download again? (y/n): ").lower() == "y"
+
+    TTS_OUTPUT_DIR.mkdir(exist_ok=True)
+    STT_OUTPUT_DIR.mkdir(exist_ok=True)
+
+    results = build_runner(args).run(force=args.force)
+    print_summary(results)
     
     print("\n=== Testing Complete ===")
     print("Results:")
-    if not args.stt_only and os.path.exists("icelandic_tts_samples"):
-        print(f"- TTS samples: {Path('icelandic_tts_samples').absolute()}")
-    if not args.tts_only and os.path.exists("icelandic_stt_results"):
-        print(f"- STT results: {Path('icelandic_stt_results').absolute()}")
+    if not args.stt_only and TTS_OUTPUT_DIR.exists():
+        print(f"- TTS samples: {TTS_OUTPUT_DIR.absolute()}")
+    if not args.tts_only and STT_OUTPUT_DIR.exists():
+        print(f"- STT results: {STT_OUTPUT_DIR.absolute()}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,9 +1,113 @@
 from pathlib import Path
+import atexit
+import copy
+import json
 import logging
+import logging.handlers
+import queue
+import threading
 import yaml
-from typing import Optional, Dict, Any
+from datetime import datetime, timezone
+from typing import Optional, Dict, Any, Tuple
 import os
 
+# LogRecord attributes that are not user-supplied ``extra`` fields
+_RECORD_FIELDS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, including any ``extra`` fields passed to the log call."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "module": record.module,
+            "line": record.lineno,
+            "thread": record.threadName
+        }
+        entry.update({k: v for k, v in vars(record).items() if k not in _RECORD_FIELDS})
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        if record.stack_info:
+            entry["stack"] = record.stack_info
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    Queue handler that leaves formatting to the listener thread.
+
+    The stock handler runs the full formatter on the logging thread; this one
+    only merges the message arguments (which may be mutable objects) and renders
+    tracebacks, so a log call on a hot path costs little more than a queue put.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg, record.args = record.getMessage(), None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+# Queue handler and listener per logger name, shared by every AIStructureConfig instance
+_listeners: Dict[str, Tuple[logging.Handler, logging.handlers.QueueListener, Path]] = {}
+_listeners_lock = threading.Lock()
+
+def _stop_listeners() -> None:
+    with _listeners_lock:
+        for handler, listener, _ in _listeners.values():
+            listener.stop()
+            for target in listener.handlers:
+                target.close()
+        _listeners.clear()
+
+atexit.register(_stop_listeners)
+
+def _file_handler(path: Path, rotation: Dict[str, Any]) -> logging.Handler:
+    """Size-based rotation by default, time-based when ``rotation.when`` is set."""
+    backup_count = int(rotation.get("backup_count", 5))
+    if rotation.get("when"):
+        return logging.handlers.TimedRotatingFileHandler(
+            path, when=rotation["when"], backupCount=backup_count, encoding="utf-8", utc=True)
+    return logging.handlers.RotatingFileHandler(
+        path, maxBytes=int(rotation.get("max_bytes", 10 * 1024 * 1024)), backupCount=backup_count,
+        encoding="utf-8")
+
+def attach_queue_logging(name: str, path: Path, level: int, formatter: logging.Formatter,
+                         rotation: Dict[str, Any]) -> logging.Logger:
+    """
+    Route a logger's records through a queue to a rotating file written by a listener thread.
+
+    Safe to call repeatedly: the logger keeps a single queue handler, whose level
+    and formatter are updated in place, and a new file handler is only opened
+    when the log path changes.
+    """
+    logger = logging.getLogger(name)
+    logger.setLevel(level)
+    with _listeners_lock:
+        existing = _listeners.get(name)
+        if existing and existing[2] == path:
+            existing[1].handlers[0].setFormatter(formatter)
+            return logger
+        if existing:
+            logger.removeHandler(existing[0])
+            existing[1].stop()
+            existing[1].handlers[0].close()
+
+        file_handler = _file_handler(path, rotation)
+        file_handler.setFormatter(formatter)
+        records: "queue.SimpleQueue" = queue.SimpleQueue()
+        queue_handler = _DeferredQueueHandler(records)
+        listener = logging.handlers.QueueListener(records, file_handler, respect_handler_level=True)
+        listener.start()
+        logger.addHandler(queue_handler)
+        _listeners[name] = (queue_handler, listener, path)
+    return logger
+
 class AIStructureConfig:
     """Manages AI documentation and structure configuration."""
     
@@ -90,7 +194,13 @@ class AIStructureConfig:
                 },
                 "logging": {
                     "level": "INFO",
-                    "format": "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+                    "format": "%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+                    "json": True,
+                    "rotation": {
+                        "max_bytes": 10485760,
+                        "backup_count": 5,
+                        "when": None
+                    }
                 }
             }
             
@@ -110,6 +220,10 @@ class AIStructureConfig:
     def _setup_logging(self, log_level: Optional[str] = None) -> None:
         """
         Configure logging with specific handlers for different components.
+
+        Records are handed to a queue and written by a background listener, so
+        callers never block on file I/O. Creating further instances reuses the
+        existing handlers instead of adding duplicates.
         
         Args:
             log_level: Optional logging level to override config.
@@ -117,20 +231,13 @@ class AIStructureConfig:
         log_config = self.config.get('logging', {})
         level = getattr(logging, log_level or log_config.get('level', 'INFO'))
         log_format = log_config.get('format', '%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+        rotation = log_config.get('rotation') or {}
         
-        # Create formatters and handlers
-        formatter = logging.Formatter(log_format)
+        # Structured records unless the config asks for the plain format
+        formatter = JsonFormatter() if log_config.get('json', True) else logging.Formatter(log_format)
         
         # Voice processing logger
-        voice_logger = logging.getLogger('voice')
-        voice_logger.setLevel(level)
-        voice_handler = logging.FileHandler(self.logs_dir / 'voice-logs/processing.log')
-        voice_handler.setFormatter(formatter)
-        voice_logger.addHandler(voice_handler)
+        attach_queue_logging('voice', self.logs_dir / 'voice-logs/processing.log', level, formatter, rotation)
         
         # Call handling logger
-        call_logger = logging.getLogger('calls')
-        call_logger.setLevel(level)
-        call_handler = logging.FileHandler(self.logs_dir / 'call-logs/handling.log')
-        call_handler.setFormatter(formatter)
-        call_logger.addHandler(call_handler)
\ No newline at end of file
+        attach_queue_logging('calls', self.logs_dir / 'call-logs/handling.log', level, formatter, rotation)
\ No newline at end of file
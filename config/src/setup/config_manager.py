@@ -1,7 +1,90 @@
 import os
 import json
+import logging
+import signal
+import threading
+from collections import abc
+from dataclasses import dataclass, field, fields
 from pathlib import Path
-from typing import Dict, Any
+from types import MappingProxyType
+from typing import Dict, Any, Callable, List, Mapping, Optional, get_origin
+
+logger = logging.getLogger("setup.config")
+
+ENV_PREFIX = "PODCAST_"
+
+# Provider keys read from their conventional environment variables
+ENV_KEYS = {
+    "openai_key": "OPENAI_API_KEY",
+    "elevenlabs_key": "ELEVENLABS_API_KEY",
+    "azure_key": "AZURE_SPEECH_KEY"
+}
+
+def deep_merge(base: Dict[str, Any], override: Dict[str, Any]) -> Dict[str, Any]:
+    """Merge ``override`` into a copy of ``base``, recursing into nested dictionaries."""
+    merged = dict(base)
+    for key, value in override.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = deep_merge(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+def _freeze(value: Any) -> Any:
+    """Read-only view of nested config values."""
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+@dataclass(frozen=True, slots=True)
+class ConfigSnapshot:
+    """Immutable, fully resolved configuration; replaced as a whole on reload."""
+
+    podcast_script: str
+    output_dir: str
+    tts_provider: str
+    stt_provider: str
+    normalize_text: bool
+    voices: Mapping[str, str]
+    audio_settings: Mapping[str, Any]
+    audio_cache: Mapping[str, Any]
+    startup: Mapping[str, Any]
+    prompt_templates: Mapping[str, str]
+    rate_limits: Mapping[str, Any]
+    openai_key: Optional[str] = None
+    elevenlabs_key: Optional[str] = None
+    azure_key: Optional[str] = None
+    values: Mapping[str, Any] = field(default_factory=dict, repr=False)
+    version: int = 0
+
+    @classmethod
+    def from_dict(cls, values: Dict[str, Any], version: int = 0) -> "ConfigSnapshot":
+        """
+        Validate and freeze a merged configuration.
+
+        Args:
+            values: Defaults merged with file and environment settings
+            version: Reload counter, increasing with every applied change
+
+        Raises:
+            ValueError: If a known setting has the wrong type
+        """
+        frozen = _freeze(values)
+        known = {}
+        for f in fields(cls):
+            if f.name in ("values", "version") or f.name not in frozen:
+                continue
+            value = frozen[f.name]
+            expected = Mapping if get_origin(f.type) is abc.Mapping else {bool: bool, str: str}.get(f.type)
+            if expected and value is not None and not isinstance(value, expected):
+                raise ValueError(f"Config '{f.name}' must be {expected.__name__}, got {type(value).__name__}")
+            known[f.name] = value
+        return cls(**known, values=frozen, version=version)
+
+    def get(self, key: str, default=None) -> Any:
+        return self.values.get(key, default)
 
 class ConfigManager:
     def __init__(self, config_path: str = "config.json"):
@@ -10,33 +93,169 @@ class ConfigManager:
             "podcast_script": "podcast_script.md",
             "output_dir": "podcast_output",
             "tts_provider": "openai",
+            "stt_provider": "openai",
+            "normalize_text": True,
             "voices": {
                 "kynnir": "echo",
-                "gestur": "onyx"
+                "gestur": "onyx",
+                "assistant": "alloy"
             },
             "audio_settings": {
                 "sample_rate": 44100,
-                "bit_depth": 256
+                "bit_depth": 256,
+                "speaker_gap_ms": 400,
+                "segment_gap_ms": 1000,
+                "crossfade_ms": 15,
+                "target_lufs": -16.0
+            },
+            "audio_cache": {
+                "max_mb": 256
+            },
+            "audio_store": {
+                "path": "audio_store",
+                "max_mb": 4096,
+                "max_age_days": 90,
+                "evict_interval_s": 600
+            },
+            "catalog": {
+                "dsn": None
+            },
+            "semantic_cache": {
+                "enabled": True,
+                "threshold": 0.92,
+                "max_entries": 5000,
+                "audit_log": "logs/semantic_cache_audit.jsonl"
+            },
+            "telephony": {
+                "lead_ms": 100,
+                "burst_ms": 60,
+                "jitter_depth": 3,
+                "max_calls": 200
+            },
+            "call_events": {
+                "enabled": True,
+                "path": "logs/call-events",
+                "segment_mb": 16,
+                "segment_seconds": 300,
+                "compact_seconds": 3600
+            },
+            "startup": {
+                "warm_up": True,
+                "preload_prompts": False,
+                "config_reload_seconds": 2.0,
+                "required_steps": ["tts", "stt", "chat"],
+                "warm_up_retry_seconds": 10.0
+            },
+            "prompt_templates": {
+                "greeting": "Góðan daginn, þetta er Reykjavíkurborg. Hvernig get ég aðstoðað þig í dag?",
+                "hold": "Augnablik, ég kanna stöðuna og kem aftur til þín fljótlega. Vinsamlegast haltu á línunni.",
+                "transfer": "Takk fyrir. Ég gef þér samband við {department}.",
+                "callback": "Takk, {name}. Starfsmaður frá {department} hefur samband við þig fljótlega."
+            },
+            "scenarios": {
+                "reception": {
+                    "start": "greeting",
+                    "states": {
+                        "greeting": {
+                            "prompt": "greeting",
+                            "next": {
+                                "transfer": {"weight": 3, "keywords": ["samband við", "tala við", "deild", "svið"]},
+                                "hold": {"weight": 2, "keywords": ["stöðu", "umsókn", "erind"]},
+                                "callback": {"weight": 1, "keywords": ["hring", "hafa samband", "við mig"]}
+                            }
+                        },
+                        "hold": {
+                            "prompt": "hold",
+                            "next": {"transfer": {"weight": 1}}
+                        },
+                        "transfer": {
+                            "prompt": "transfer",
+                            "slots": {
+                                "department": {
+                                    "þjónustuveri": ["þjónustuver", "upplýsing"],
+                                    "velferðarsviði": ["velferð", "fjárhagsaðstoð", "félagsþjónust", "heimaþjónust"],
+                                    "skóla- og frístundasviði": ["skól", "frístund"],
+                                    "umhverfis- og skipulagssviði": ["skipulag", "byggingarleyfi", "sorp", "framkvæmd"]
+                                }
+                            },
+                            "defaults": {"department": "þjónustuveri"}
+                        },
+                        "callback": {
+                            "prompt": "callback",
+                            "slots": {
+                                "department": {
+                                    "þjónustuveri": ["þjónustuver", "upplýsing"],
+                                    "velferðarsviði": ["velferð", "fjárhagsaðstoð", "félagsþjónust", "heimaþjónust"],
+                                    "skóla- og frístundasviði": ["skól", "frístund"],
+                                    "umhverfis- og skipulagssviði": ["skipulag", "byggingarleyfi", "sorp", "framkvæmd"]
+                                }
+                            },
+                            "defaults": {"department": "þjónustuveri"}
+                        }
+                    }
+                }
+            },
+            "scenario_speculation": {
+                "min_probability": 0.1,
+                "max_fragments": 10,
+                "prior_strength": 10
+            },
+            "admission": {
+                "interactive_concurrency": 4,
+                "batch_concurrency": 2,
+                "max_queue": 32,
+                "interactive_deadline_ms": 1500,
+                "client_rate_per_s": 5,
+                "client_burst": 20,
+                "api_keys": []
+            },
+            "rate_limits": {
+                "openai": {
+                    "max_concurrent": 4,
+                    "requests_per_minute": 50
+                }
             }
         }
-        self.config = self.load_config()
+        self.snapshot = self._build(version=0)
+        self._mtime = self._stat()
+        self._listeners: List[Callable[[ConfigSnapshot], Optional[Callable[[], None]]]] = []
+        self._reload_lock = threading.Lock()
+        self._watcher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
 
     def load_config(self) -> Dict[str, Any]:
-        """Load configuration from environment and config file"""
-        # Load environment variables first
-        env_config = {
-            "openai_key": os.environ.get("OPENAI_API_KEY"),
-            "elevenlabs_key": os.environ.get("ELEVENLABS_API_KEY"),
-            "azure_key": os.environ.get("AZURE_SPEECH_KEY")
-        }
-        
-        # Merge with file config if exists
+        """Merge defaults, config file and environment, in increasing precedence"""
+        values = self.defaults
         if self.config_path.exists():
             with open(self.config_path, 'r') as f:
-                file_config = json.load(f)
-                return {**file_config, **env_config}
-                
-        return {**self.defaults, **env_config}
+                values = deep_merge(values, json.load(f))
+
+        # PODCAST_<KEY> overrides, JSON-decoded where possible
+        for name, raw in os.environ.items():
+            if name.startswith(ENV_PREFIX) and raw:
+                try:
+                    value = json.loads(raw)
+                except json.JSONDecodeError:
+                    value = raw
+                values = deep_merge(values, {name[len(ENV_PREFIX):].lower(): value})
+
+        for key, env_name in ENV_KEYS.items():
+            if os.environ.get(env_name):
+                values = {**values, key: os.environ[env_name]}
+        return values
+
+    def _build(self, version: int) -> ConfigSnapshot:
+        return ConfigSnapshot.from_dict(self.load_config(), version=version)
+
+    def _stat(self) -> Optional[float]:
+        try:
+            return self.config_path.stat().st_mtime
+        except OSError:
+            return None
+
+    @property
+    def config(self) -> Mapping[str, Any]:
+        return self.snapshot.values
 
     def create_default_config(self) -> Dict[str, Any]:
         """Create default config file"""
@@ -46,19 +265,81 @@ class ConfigManager:
         return self.defaults
 
     def get(self, key: str, default=None) -> Any:
-        """Get config value with env var override"""
-        env_val = os.getenv(f"PODCAST_{key.upper()}")
-        if env_val:
+        """Get a config value from the current snapshot"""
+        return self.snapshot.values.get(key, default)
+
+    def on_reload(self, callback: Callable[[ConfigSnapshot], Optional[Callable[[], None]]]) -> None:
+        """
+        Register a callback preparing for each reload.
+
+        The callback receives the candidate snapshot before it is applied and may
+        return a function to run once it is; raising rejects the reload.
+        """
+        self._listeners.append(callback)
+
+    def reload(self) -> bool:
+        """
+        Re-read the file and environment and swap in a new snapshot.
+
+        A file that fails to parse or validate, or that a listener fails to
+        prepare for, leaves the current snapshot in place.
+
+        Returns:
+            True if a new snapshot was applied
+        """
+        with self._reload_lock:
+            self._mtime = self._stat()
             try:
-                return json.loads(env_val)
-            except json.JSONDecodeError:
-                return env_val
-        return self.config.get(key, default)
+                snapshot = self._build(version=self.snapshot.version + 1)
+            except (OSError, ValueError) as e:
+                logger.error(f"Config reload failed, keeping version {self.snapshot.version}: {e}")
+                return False
+            if snapshot.values == self.snapshot.values:
+                return False
+            commits = []
+            for callback in list(self._listeners):
+                try:
+                    commits.append(callback(snapshot))
+                except Exception as e:
+                    logger.error(f"Config reload rejected by listener, keeping version {self.snapshot.version}: {e}")
+                    return False
+            # Readers see either the old or the new snapshot, never a mix
+            self.snapshot = snapshot
+            logger.info(f"Config reloaded from {self.config_path} (version {snapshot.version})")
+            for commit in commits:
+                if commit:
+                    try:
+                        commit()
+                    except Exception as e:
+                        logger.error(f"Config reload listener failed: {e}")
+        return True
+
+    def watch(self, interval: float = 2.0) -> None:
+        """Poll the config file's mtime on a daemon thread and reload when it changes"""
+        if self._watcher:
+            return
+
+        def poll():
+            while not self._stop.wait(interval):
+                if self._stat() != self._mtime:
+                    self.reload()
+
+        self._watcher = threading.Thread(target=poll, name="config-watch", daemon=True)
+        self._watcher.start()
+
+    def reload_on_signal(self, signum: int = getattr(signal, "SIGHUP", 0)) -> None:
+        """Reload when the process receives ``signum`` (SIGHUP by default); main thread only"""
+        if signum:
+            # Reload off the signal handler so listeners may block
+            signal.signal(signum, lambda *_: threading.Thread(target=self.reload, daemon=True).start())
+
+    def close(self) -> None:
+        self._stop.set()
 
     @property
     def podcast_script(self) -> Path:
-        return Path(self.get("podcast_script"))
+        return Path(self.snapshot.podcast_script)
 
     @property
     def output_dir(self) -> Path:
-        return Path(self.get("output_dir"))
\ No newline at end of file
+        return Path(self.snapshot.output_dir)
\ No newline at end of file
@@ -1,23 +1,90 @@
 #!/usr/bin/env python3
 from pathlib import Path
+import os
 import re
+import json
+import stat
+import hashlib
 import logging
 import shutil
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Sequence, Tuple
+
+# Checked in order: a document mentioning any TTS term is filed under voice/tts
+# even if it also mentions calls or comparisons
+CATEGORY_KEYWORDS = [
+    ('voice/tts', ['tts', 'text-to-speech', 'voice synthesis']),
+    ('voice/stt', ['stt', 'speech-to-text', 'transcription']),
+    ('calls/scenarios', ['call', 'phone', 'response']),
+    ('comparisons', ['comparison', 'versus', 'vs'])
+]
+
+class KeywordMatcher:
+    """
+    Finds the highest-priority keyword group present anywhere in a text.
+
+    With pyahocorasick installed, every keyword is matched in one pass over the
+    text by an Aho-Corasick automaton, stopping early at a top-priority hit.
+    Without it, each group falls back to substring checks, which CPython runs
+    in C and which are competitive while the keyword list stays short.
+    """
+
+    def __init__(self, groups: Sequence[Tuple[str, Sequence[str]]]):
+        """
+        Build the matcher.
+
+        Args:
+            groups: (label, keywords) pairs, highest priority first
+        """
+        self.groups = [(label, [k.lower() for k in keywords]) for label, keywords in groups]
+        self.automaton = None
+        try:
+            import ahocorasick
+        except ImportError:
+            return
+
+        self.automaton = ahocorasick.Automaton()
+        for rank, (_, keywords) in enumerate(self.groups):
+            for keyword in keywords:
+                if keyword not in self.automaton:
+                    self.automaton.add_word(keyword, rank)
+        self.automaton.make_automaton()
+
+    def match(self, text: str) -> Optional[str]:
+        """Label of the highest-priority group with a keyword in ``text``, or None."""
+        if self.automaton is None:
+            for label, keywords in self.groups:
+                if any(keyword in text for keyword in keywords):
+                    return label
+            return None
+
+        best = len(self.groups)
+        for _, rank in self.automaton.iter(text):
+            if rank < best:
+                best = rank
+                if best == 0:
+                    break
+        return self.groups[best][0] if best < len(self.groups) else None
 
 class DocumentationMigrator:
     """Utility class to migrate existing documentation to the new structure."""
     
-    def __init__(self, base_dir: Path):
+    def __init__(self, base_dir: Path, workers: int = 8):
         """
         Initialize the documentation migrator.
         
         Args:
             base_dir: Base directory containing the AI documentation
+            workers: Files hashed or migrated concurrently
         """
         self.base_dir = base_dir
         self.backup_dir = base_dir / "backup"
+        # Snapshot file contents, stored once each and hardlinked into every snapshot
+        self.objects_dir = self.backup_dir / "objects"
+        self.index_path = self.backup_dir / "index.json"
+        self.workers = workers
+        self.matcher = KeywordMatcher(CATEGORY_KEYWORDS)
         self.setup_logging()
         
     def setup_logging(self) -> None:
@@ -31,14 +98,97 @@ class DocumentationMigrator:
             ]
         )
         self.logger = logging.getLogger("doc_migrator")
-    
-    def backup_existing_docs(self) -> None:
-        """Create a backup of existing documentation."""
+
+    def _walk(self, directory: Path) -> List[Path]:
+        """All regular files below ``directory``, skipping the backup tree."""
+        files = []
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                path = Path(entry.path)
+                if entry.is_dir(follow_symlinks=False):
+                    if path != self.backup_dir:
+                        files.extend(self._walk(path))
+                elif entry.is_file(follow_symlinks=False):
+                    files.append(path)
+        return files
+
+    def _load_index(self) -> Dict[str, List]:
+        if self.index_path.exists():
+            try:
+                return json.loads(self.index_path.read_text(encoding='utf-8'))
+            except json.JSONDecodeError:
+                self.logger.warning(f"Ignoring unreadable snapshot index: {self.index_path}")
+        return {}
+
+    def _store_object(self, path: Path) -> str:
+        """Hash a file and copy it into the object store unless its content is already there."""
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        sha = digest.hexdigest()
+
+        obj = self.objects_dir / sha[:2] / sha
+        if not obj.exists():
+            obj.parent.mkdir(parents=True, exist_ok=True)
+            tmp = obj.with_name(f".{sha}.{os.getpid()}.{id(path)}.tmp")
+            shutil.copy2(path, tmp)
+            # Objects are shared by every snapshot; keep them from being edited through one
+            os.chmod(tmp, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+            os.replace(tmp, obj)
+        return sha
+
+    def backup_existing_docs(self) -> Path:
+        """
+        Create an incremental snapshot of the base directory.
+
+        Each file's content is stored once under ``backup/objects`` and every
+        snapshot is a tree of hardlinks to those objects, so a snapshot of an
+        unchanged tree costs only directory entries. Files whose size and mtime
+        match the previous snapshot are not re-read, and the backup tree itself
+        is never included.
+
+        Returns:
+            Path of the new snapshot directory
+        """
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         backup_path = self.backup_dir / f"backup_{timestamp}"
-        
         self.logger.info(f"Creating backup at: {backup_path}")
-        shutil.copytree(self.base_dir, backup_path, dirs_exist_ok=True)
+
+        index = self._load_index()
+        files = self._walk(self.base_dir)
+
+        def snapshot_file(path: Path) -> Tuple[str, List]:
+            rel = path.relative_to(self.base_dir).as_posix()
+            info = path.stat()
+            entry = index.get(rel)
+            if (entry and entry[0] == info.st_size and entry[1] == info.st_mtime_ns
+                    and (self.objects_dir / entry[2][:2] / entry[2]).exists()):
+                sha = entry[2]
+            else:
+                sha = self._store_object(path)
+
+            target = backup_path / rel
+            target.parent.mkdir(parents=True, exist_ok=True)
+            obj = self.objects_dir / sha[:2] / sha
+            try:
+                os.link(obj, target)
+            except OSError:
+                # Filesystems without hardlinks (or at the link limit) get a plain copy
+                shutil.copy2(obj, target)
+            return rel, [info.st_size, info.st_mtime_ns, sha]
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            new_index = dict(executor.map(snapshot_file, files))
+
+        backup_path.mkdir(parents=True, exist_ok=True)
+        tmp = self.index_path.with_suffix('.tmp')
+        tmp.write_text(json.dumps(new_index), encoding='utf-8')
+        os.replace(tmp, self.index_path)
+
+        reused = sum(1 for rel, entry in new_index.items() if index.get(rel) == entry)
+        self.logger.info(f"Backed up {len(new_index)} files ({reused} unchanged since the last snapshot)")
+        return backup_path
     
     def categorize_document(self, content: str) -> str:
         """
@@ -50,18 +200,7 @@ class DocumentationMigrator:
         Returns:
             String indicating the document category
         """
-        content_lower = content.lower()
-        
-        if any(term in content_lower for term in ['tts', 'text-to-speech', 'voice synthesis']):
-            return 'voice/tts'
-        elif any(term in content_lower for term in ['stt', 'speech-to-text', 'transcription']):
-            return 'voice/stt'
-        elif any(term in content_lower for term in ['call', 'phone', 'response']):
-            return 'calls/scenarios'
-        elif any(term in content_lower for term in ['comparison', 'versus', 'vs']):
-            return 'comparisons'
-        else:
-            return ''
+        return self.matcher.match(content.lower()) or ''
     
     def migrate_document(self, source_path: Path) -> None:
         """
@@ -99,14 +238,17 @@ class DocumentationMigrator:
             # Create backup first
             self.backup_existing_docs()
             
-            # Find all markdown files
-            md_files = list(self.base_dir.glob("**/*.md"))
+            # Find all markdown files outside the backup tree and hidden directories
+            md_files = [
+                path for path in self._walk(self.base_dir)
+                if path.suffix == '.md'
+                and not any(part.startswith('.') for part in path.relative_to(self.base_dir).parts[:-1])
+            ]
             self.logger.info(f"Found {len(md_files)} markdown files to migrate")
             
-            # Migrate each file
-            for file_path in md_files:
-                if not any(p.name.startswith('.') for p in file_path.parents):
-                    self.migrate_document(file_path)
+            # Migrate files concurrently; reading and moving is I/O bound
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                list(executor.map(self.migrate_document, md_files))
             
             self.logger.info("Documentation migration completed successfully")
             
@@ -121,10 +263,12 @@ def main():
     parser = argparse.ArgumentParser(description="Migrate documentation to new structure")
     parser.add_argument('--dir', type=Path, default=Path.cwd(),
                       help="Base directory containing the documentation")
+    parser.add_argument('--workers', type=int, default=8,
+                      help="Files hashed or migrated concurrently")
     args = parser.parse_args()
     
-    migrator = DocumentationMigrator(args.dir)
+    migrator = DocumentationMigrator(args.dir, workers=args.workers)
     migrator.migrate_all_docs()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,8 +1,16 @@
 import streamlit as st
-import requests
 import os
+import sys
+from pathlib import Path
 from dotenv import load_dotenv
 
+# Resolve src/ from the repository root rather than the config/src copy
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.chat.client import ChatClient
+from src.chat.context import ConversationContext
+from src.chat.retrieval import RetrievalIndex
+
 # Load environment variables
 load_dotenv()
 
@@ -16,6 +24,16 @@ st.set_page_config(
     layout="wide"
 )
 
+@st.cache_resource
+def get_conversation_context(api_key: str, model: str) -> ConversationContext:
+    """Shared client and context manager, kept across reruns and sessions"""
+    return ConversationContext(ChatClient(api_key, model=model), model=model)
+
+@st.cache_resource
+def get_retrieval_index() -> RetrievalIndex:
+    """Documentation index, loaded once and shared across reruns and sessions"""
+    return RetrievalIndex(Path("ai-docs"))
+
 # Initialize session state for messages if it doesn't exist
 if "messages" not in st.session_state:
     st.session_state.messages = [
@@ -56,7 +74,7 @@ st.title("AI Agent Web Interface")
 
 # Display chat messages
 for message in st.session_state.messages:
-    if message["role"] \!= "system":
+    if message["role"] != "system":
         with st.chat_message(message["role"]):
             st.write(message["content"])
 
@@ -75,17 +93,14 @@ if prompt := st.chat_input("What can I help you with?"):
     if not api_key_to_use:
         st.error("Please enter an OpenAI API key")
     else:
-        # Prepare API request
-        headers = {
-            "Authorization": f"Bearer {api_key_to_use}",
-            "Content-Type": "application/json"
-        }
-        
-        payload = {
-            "model": model,
-            "messages": st.session_state.messages,
-            "temperature": temperature
-        }
+        # Only the recent turns within the token budget are sent
+        conversation = get_conversation_context(api_key_to_use, model)
+        system_prompt = st.session_state.messages[0]["content"]
+        # Only changed docs are re-indexed; unchanged ones cost a directory scan
+        retrieval = get_retrieval_index()
+        retrieval.refresh()
+        messages = conversation.build(system_prompt, st.session_state.messages[1:],
+                                      context=retrieval.context(prompt))
         
         # Display assistant response
         with st.chat_message("assistant"):
@@ -93,17 +108,10 @@ if prompt := st.chat_input("What can I help you with?"):
             full_response = ""
             
             try:
-                # Make API request
-                response = requests.post(
-                    "https://api.openai.com/v1/chat/completions",
-                    headers=headers,
-                    json=payload
-                )
-                response.raise_for_status()
-                
-                # Extract response
-                full_response = response.json()["choices"][0]["message"]["content"]
-                message_placeholder.write(full_response)
+                # Stream the response into the placeholder
+                for token in conversation.client.stream(messages, model=model, temperature=temperature):
+                    full_response += token
+                    message_placeholder.write(full_response)
             except Exception as e:
                 full_response = f"Error: {str(e)}"
                 message_placeholder.error(full_response)
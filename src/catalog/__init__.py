@@ -0,0 +1,3 @@
+"""
+Render Catalog Module
+"""
\ No newline at end of file
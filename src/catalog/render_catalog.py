@@ -0,0 +1,399 @@
+#!/usr/bin/env python3
+"""
+Postgres catalog of rendered audio.
+
+One row per render (cache key, text hash, voice, provider, format, duration,
+size, latency, storage location, created and last-used times). New renders
+and cache hits are buffered in memory and written in batches, new rows via
+COPY into a staging table, so the request path never waits on the database.
+"""
+import argparse
+import asyncio
+import hashlib
+import io
+import json
+import logging
+import os
+import time
+import wave
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+logger = logging.getLogger("catalog.renders")
+
+COLUMNS = ("render_key", "text_hash", "voice", "provider", "format", "duration_ms",
+           "bytes", "latency_ms", "location", "created_at", "last_used_at", "hits")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS renders (
+    render_key   TEXT        PRIMARY KEY,
+    text_hash    TEXT        NOT NULL,
+    voice        TEXT        NOT NULL,
+    provider     TEXT        NOT NULL,
+    format       TEXT        NOT NULL,
+    duration_ms  INTEGER,
+    bytes        BIGINT      NOT NULL,
+    latency_ms   INTEGER,
+    location     TEXT        NOT NULL,
+    created_at   TIMESTAMPTZ NOT NULL DEFAULT now(),
+    last_used_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    hits         BIGINT      NOT NULL DEFAULT 0
+);
+-- Same text across voices and providers
+CREATE INDEX IF NOT EXISTS renders_text_hash_idx ON renders (text_hash);
+-- LRU eviction scans the coldest rows first
+CREATE INDEX IF NOT EXISTS renders_last_used_idx ON renders (last_used_at);
+-- TTL expiry; BRIN stays tiny because rows arrive in creation order
+CREATE INDEX IF NOT EXISTS renders_created_brin ON renders USING BRIN (created_at);
+"""
+
+# A batch may hold one key twice (two concurrent misses on the same text); an upsert
+# may not touch a row twice, so only the most recently used copy is merged
+UPSERT_STAGED = """
+INSERT INTO renders
+SELECT DISTINCT ON (render_key) * FROM renders_staging ORDER BY render_key, last_used_at DESC
+ON CONFLICT (render_key) DO UPDATE
+    SET last_used_at = GREATEST(renders.last_used_at, EXCLUDED.last_used_at),
+        location = EXCLUDED.location
+"""
+
+APPLY_HITS = """
+UPDATE renders AS r
+   SET last_used_at = GREATEST(r.last_used_at, v.used_at), hits = r.hits + v.n
+  FROM unnest($1::text[], $2::timestamptz[], $3::bigint[]) AS v(render_key, used_at, n)
+ WHERE r.render_key = v.render_key
+"""
+
+# SQLSTATE classes worth retrying: connection, transaction rollback (deadlock,
+# serialization), insufficient resources, operator intervention (shutdown)
+TRANSIENT_SQLSTATES = ("08", "40", "53", "57")
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def audio_duration_ms(data: bytes, fmt: str = "mp3") -> Optional[int]:
+    """Playing time of encoded audio, or None if it cannot be parsed."""
+    try:
+        if fmt == "mp3":
+            from src.podcast.assembly import parse_mp3
+            stream = parse_mp3(data)
+            return int(stream.duration * 1000) if stream else None
+        if fmt == "wav":
+            with wave.open(io.BytesIO(data)) as wav:
+                return int(wav.getnframes() * 1000 / wav.getframerate())
+    except Exception as e:
+        logger.debug(f"Could not measure {fmt} duration: {e}")
+    return None
+
+def is_transient(error: BaseException) -> bool:
+    """Whether a failed write may succeed when retried unchanged."""
+    if isinstance(error, (ValueError, TypeError)):
+        # Rows that cannot be encoded (asyncpg's DataError) fail the same way every time
+        return False
+    sqlstate = getattr(error, "sqlstate", None)
+    if sqlstate:
+        return str(sqlstate).startswith(TRANSIENT_SQLSTATES)
+    # Lost connections, timeouts and pool errors carry no SQLSTATE
+    return True
+
+def dedupe_rows(rows: Iterable[tuple]) -> List[tuple]:
+    """One row per render key: the most recently used copy, with the earliest creation time and summed hits."""
+    key_at, created_at, used_at, hits_at = (COLUMNS.index(c) for c in ("render_key", "created_at", "last_used_at", "hits"))
+    merged: Dict[str, tuple] = {}
+    for row in rows:
+        previous = merged.get(row[key_at])
+        if previous is None:
+            merged[row[key_at]] = row
+            continue
+        newest = row if row[used_at] >= previous[used_at] else previous
+        newest = list(newest)
+        newest[created_at] = min(row[created_at], previous[created_at])
+        newest[hits_at] = row[hits_at] + previous[hits_at]
+        merged[row[key_at]] = tuple(newest)
+    return list(merged.values())
+
+def render_row(render: Dict[str, Any]) -> tuple:
+    """Row tuple in ``COLUMNS`` order from a render description."""
+    now = datetime.now(timezone.utc)
+    return (
+        render["render_key"],
+        render.get("text_hash") or text_hash(render["text"]),
+        render["voice"],
+        render["provider"],
+        render.get("format", "mp3"),
+        render.get("duration_ms"),
+        int(render["bytes"]),
+        render.get("latency_ms"),
+        str(render["location"]),
+        render.get("created_at") or now,
+        render.get("last_used_at") or now,
+        int(render.get("hits", 0)),
+    )
+
+class RenderCatalog:
+    """Async, pooled Postgres client for the render catalog with write-behind batching."""
+
+    def __init__(self, dsn: str, min_size: int = 1, max_size: int = 10, batch_size: int = 1000,
+                 flush_interval: float = 1.0, quarantine_path: Optional[Path] = Path("logs/catalog-quarantine.jsonl")):
+        """
+        Initialize the catalog.
+
+        Args:
+            dsn: Postgres connection URL
+            min_size: Connections kept open in the pool
+            max_size: Upper bound on pooled connections
+            batch_size: Buffered renders that trigger an immediate flush
+            flush_interval: Seconds between background flushes
+            quarantine_path: JSONL file receiving rows the database rejects; they
+                are only logged if None
+        """
+        self.dsn = dsn
+        self.quarantine_path = quarantine_path
+        self.min_size = min_size
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.pool = None
+        self._pending: List[tuple] = []
+        self._hits: Dict[str, List] = {}   # render_key -> [last used, count]
+        self._flusher: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+
+    async def connect(self) -> "RenderCatalog":
+        try:
+            import asyncpg
+        except ImportError:
+            raise RuntimeError("asyncpg library not installed. Run 'pip install asyncpg'")
+
+        self.pool = await asyncpg.create_pool(self.dsn, min_size=self.min_size, max_size=self.max_size)
+        async with self.pool.acquire() as conn:
+            await conn.execute(SCHEMA)
+        self._flusher = asyncio.create_task(self._flush_periodically())
+        return self
+
+    async def close(self) -> None:
+        if self._flusher:
+            self._flusher.cancel()
+        await self.flush()
+        if self.pool:
+            await self.pool.close()
+
+    # Request path: buffer only, called from the event loop thread
+
+    def record(self, render: Dict[str, Any]) -> None:
+        """Queue a new render for the next batch."""
+        self._pending.append(render_row(render))
+        if len(self._pending) >= self.batch_size:
+            asyncio.get_running_loop().create_task(self.flush())
+
+    def touch(self, render_key: str) -> None:
+        """Count a cache hit; hits are applied in bulk on flush."""
+        entry = self._hits.get(render_key)
+        if entry is None:
+            self._hits[render_key] = [datetime.now(timezone.utc), 1]
+        else:
+            entry[0] = datetime.now(timezone.utc)
+            entry[1] += 1
+
+    # Batched writes
+
+    async def _flush_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Render catalog flush failed: {e}")
+
+    async def flush(self) -> int:
+        """Write buffered renders and hits; returns the number of rows written."""
+        async with self._flush_lock:
+            rows, self._pending = self._pending, []
+            hits, self._hits = self._hits, {}
+            if not self.pool or not (rows or hits):
+                return 0
+            try:
+                written = await self._ingest_isolating(rows)
+            except Exception:
+                # Transient: keep the batch for the next attempt; the upsert makes a retry harmless
+                self._pending = (rows + self._pending)[-self.batch_size * 100:]
+                self._restore_hits(hits)
+                raise
+            if hits:
+                keys = list(hits)
+                try:
+                    async with self.pool.acquire() as conn:
+                        await conn.execute(APPLY_HITS, keys, [hits[k][0] for k in keys], [hits[k][1] for k in keys])
+                except Exception as e:
+                    if not is_transient(e):
+                        logger.error(f"Dropping {len(keys)} render hits the database rejected: {e}")
+                        return written
+                    self._restore_hits(hits)
+                    raise
+            return written
+
+    def _restore_hits(self, hits: Dict[str, List]) -> None:
+        for key, (used, n) in hits.items():
+            entry = self._hits.setdefault(key, [used, 0])
+            entry[0], entry[1] = max(entry[0], used), entry[1] + n
+
+    async def _ingest_isolating(self, rows: List[tuple]) -> int:
+        """
+        Ingest rows, bisecting a batch the database rejects to quarantine only the bad rows.
+
+        Raises:
+            Exception: Transient errors, for the caller to retry the whole batch
+        """
+        try:
+            return await self.ingest(rows)
+        except Exception as e:
+            if is_transient(e):
+                raise
+            if len(rows) == 1:
+                self._quarantine(rows[0], e)
+                return 0
+        middle = len(rows) // 2
+        return await self._ingest_isolating(rows[:middle]) + await self._ingest_isolating(rows[middle:])
+
+    def _quarantine(self, row: tuple, error: BaseException) -> None:
+        logger.error(f"Render catalog rejected row {row[0]}: {error}")
+        if not self.quarantine_path:
+            return
+        record = {**{c: (v.isoformat() if isinstance(v, datetime) else v) for c, v in zip(COLUMNS, row)},
+                  "error": str(error)}
+        try:
+            self.quarantine_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.quarantine_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        except OSError as e:
+            logger.error(f"Could not quarantine render row: {e}")
+
+    async def ingest(self, rows: Iterable[tuple]) -> int:
+        """Bulk insert rows via COPY into a staging table, then merge into ``renders``."""
+        rows = dedupe_rows(rows)
+        if not rows:
+            return 0
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.execute("CREATE TEMP TABLE IF NOT EXISTS renders_staging "
+                                   "(LIKE renders INCLUDING DEFAULTS) ON COMMIT DELETE ROWS")
+                await conn.copy_records_to_table("renders_staging", records=rows, columns=COLUMNS)
+                await conn.execute(UPSERT_STAGED)
+        return len(rows)
+
+    # Indexed reads
+
+    async def lookup(self, render_key: str) -> Optional[Dict[str, Any]]:
+        async with self.pool.acquire() as conn:
+            row = await conn.fetchrow("SELECT * FROM renders WHERE render_key = $1", render_key)
+        return dict(row) if row else None
+
+    async def least_recently_used(self, limit: int = 1000) -> List[Dict[str, Any]]:
+        """Coldest renders first, for evicting stored audio."""
+        async with self.pool.acquire() as conn:
+            rows = await conn.fetch("SELECT render_key, location, bytes, last_used_at FROM renders "
+                                    "ORDER BY last_used_at LIMIT $1", limit)
+        return [dict(r) for r in rows]
+
+    async def expired(self, ttl: timedelta, limit: int = 1000) -> List[Dict[str, Any]]:
+        """Renders created before ``now - ttl``."""
+        async with self.pool.acquire() as conn:
+            rows = await conn.fetch("SELECT render_key, location, bytes, created_at FROM renders "
+                                    "WHERE created_at < now() - $1::interval ORDER BY created_at LIMIT $2",
+                                    ttl, limit)
+        return [dict(r) for r in rows]
+
+    async def delete(self, render_keys: List[str]) -> int:
+        async with self.pool.acquire() as conn:
+            result = await conn.execute("DELETE FROM renders WHERE render_key = ANY($1::text[])", render_keys)
+        return int(result.split()[-1])
+
+    async def usage(self, since: timedelta = timedelta(days=1)) -> List[Dict[str, Any]]:
+        """Renders, bytes, hits and latency percentiles per provider and voice."""
+        async with self.pool.acquire() as conn:
+            rows = await conn.fetch("""
+                SELECT provider, voice, count(*) AS renders, sum(bytes) AS bytes, sum(hits) AS hits,
+                       percentile_cont(0.5) WITHIN GROUP (ORDER BY latency_ms) AS p50_latency_ms,
+                       percentile_cont(0.95) WITHIN GROUP (ORDER BY latency_ms) AS p95_latency_ms
+                  FROM renders
+                 WHERE created_at >= now() - $1::interval
+                 GROUP BY provider, voice
+                 ORDER BY renders DESC
+            """, since)
+        return [dict(r) for r in rows]
+
+def podcast_rows(output_dir: Path) -> Iterable[Dict[str, Any]]:
+    """Renders described by the ``metadata.json`` files ``generate_podcast.py`` writes."""
+    from src.voice.audio_cache import cache_key
+
+    for metadata_file in sorted(Path(output_dir).glob("segment_*/metadata.json")):
+        with open(metadata_file, encoding="utf-8") as f:
+            metadata = json.load(f)
+        created = datetime.fromtimestamp(metadata_file.stat().st_mtime, timezone.utc)
+        for part in metadata.get("parts", []):
+            if "text" not in part or "voice" not in part:
+                continue
+            path = Path(part["file"])
+            yield {
+                "render_key": cache_key(part["text"], part["voice"], part["provider"], "mp3"),
+                "text": part["text"],
+                "voice": part["voice"],
+                "provider": part["provider"],
+                "bytes": path.stat().st_size if path.exists() else int(part["size_kb"] * 1024),
+                "duration_ms": audio_duration_ms(path.read_bytes()) if path.exists() else None,
+                "latency_ms": int(part["duration"] * 1000),
+                "location": str(path),
+                "created_at": created,
+                "last_used_at": created
+            }
+
+async def _ingest(dsn: str, output_dir: Path, batch_size: int) -> int:
+    catalog = await RenderCatalog(dsn, batch_size=batch_size).connect()
+    total = 0
+    try:
+        batch = []
+        for render in podcast_rows(output_dir):
+            batch.append(render_row(render))
+            if len(batch) >= batch_size:
+                total += await catalog.ingest(batch)
+                batch = []
+        total += await catalog.ingest(batch)
+    finally:
+        await catalog.close()
+    return total
+
+async def _report(dsn: str, days: float) -> List[Dict[str, Any]]:
+    catalog = await RenderCatalog(dsn).connect()
+    try:
+        return await catalog.usage(timedelta(days=days))
+    finally:
+        await catalog.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Render catalog maintenance")
+    parser.add_argument("--dsn", default=os.getenv("POSTGRES_URL"), help="Postgres URL (default: $POSTGRES_URL)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    ingest = sub.add_parser("ingest", help="Bulk-load podcast metadata.json files")
+    ingest.add_argument("output_dir", type=Path)
+    ingest.add_argument("--batch-size", type=int, default=5000)
+    usage = sub.add_parser("usage", help="Per provider/voice usage")
+    usage.add_argument("--days", type=float, default=1.0)
+    args = parser.parse_args()
+
+    if not args.dsn:
+        print("❌ No database configured. Set POSTGRES_URL or pass --dsn")
+        return
+
+    if args.command == "ingest":
+        started = time.perf_counter()
+        total = asyncio.run(_ingest(args.dsn, args.output_dir, args.batch_size))
+        print(f"✅ Ingested {total} renders in {time.perf_counter() - started:.2f}s")
+    else:
+        for row in asyncio.run(_report(args.dsn, args.days)):
+            print(f"{row['provider']:<10} {row['voice']:<10} {row['renders']:>8} renders "
+                  f"{row['hits'] or 0:>8} hits {int(row['bytes'] or 0) / 1e6:>9.1f} MB "
+                  f"p50 {row['p50_latency_ms'] or 0:>6.0f} ms p95 {row['p95_latency_ms'] or 0:>6.0f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,3 @@
+"""
+Chat Completion Module
+"""
\ No newline at end of file
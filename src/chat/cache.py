@@ -0,0 +1,50 @@
+import hashlib
+import json
+import logging
+from typing import Dict, List, Optional
+
+logger = logging.getLogger("chat.cache")
+
+def normalize_message(content: str) -> str:
+    """Lowercase and collapse whitespace so trivially different wordings share a key."""
+    return " ".join(content.lower().split())
+
+class ResponseCache:
+    """Caches deterministic chat answers in Redis keyed on the normalized conversation prefix."""
+
+    def __init__(self, redis_client, ttl: int = 86400, prefix: str = "chat:answer:"):
+        """
+        Initialize the response cache.
+
+        Args:
+            redis_client: Configured ``redis.Redis`` instance
+            ttl: Seconds a cached answer is kept
+            prefix: Namespace for cache keys
+        """
+        self.redis = redis_client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def key_for(self, messages: List[Dict], model: str) -> str:
+        """Build the cache key for a conversation up to and including the latest question."""
+        normalized = [[m["role"], normalize_message(m.get("content") or "")] for m in messages]
+        digest = hashlib.sha256(json.dumps([model, normalized], ensure_ascii=False).encode("utf-8")).hexdigest()
+        return f"{self.prefix}{digest}"
+
+    def get(self, messages: List[Dict], model: str) -> Optional[str]:
+        """Return a cached answer, or None on a miss or if Redis is unavailable."""
+        try:
+            value = self.redis.get(self.key_for(messages, model))
+        except Exception as e:
+            logger.warning(f"Response cache lookup failed: {e}")
+            return None
+        if value is None:
+            return None
+        return value.decode("utf-8") if isinstance(value, bytes) else value
+
+    def set(self, messages: List[Dict], model: str, answer: str) -> None:
+        """Store an answer; failures are logged and otherwise ignored."""
+        try:
+            self.redis.setex(self.key_for(messages, model), self.ttl, answer.encode("utf-8"))
+        except Exception as e:
+            logger.warning(f"Response cache store failed: {e}")
@@ -0,0 +1,104 @@
+import json
+import logging
+from typing import Dict, Iterator, List, Tuple
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger("chat.client")
+
+OPENAI_API_BASE = "https://api.openai.com/v1"
+EMBEDDING_MODEL = "text-embedding-3-small"
+
+class ChatClient:
+    """OpenAI chat completions client sharing one pooled HTTP session."""
+
+    def __init__(self, api_key: str, model: str = "gpt-4", base_url: str = OPENAI_API_BASE,
+                 timeout: Tuple[float, float] = (5.0, 60.0), pool_size: int = 10):
+        """
+        Initialize the chat client.
+
+        Args:
+            api_key: OpenAI API key
+            model: Default chat model
+            base_url: API base URL
+            timeout: (connect, read) timeout in seconds; read applies between streamed chunks
+            pool_size: Number of keep-alive connections kept per host
+        """
+        self.api_key = api_key
+        self.model = model
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+        # Retries only cover failures before a response body is read
+        retry = Retry(total=2, backoff_factor=0.5, status_forcelist=[429, 502, 503, 504],
+                      allowed_methods=["POST"], raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json"
+        })
+
+    def _post(self, messages: List[Dict], stream: bool, **params) -> requests.Response:
+        payload = {"model": params.pop("model", None) or self.model, "messages": messages, **params}
+        if stream:
+            payload["stream"] = True
+        response = self.session.post(
+            f"{self.base_url}/chat/completions",
+            json=payload,
+            stream=stream,
+            timeout=self.timeout
+        )
+        response.raise_for_status()
+        return response
+
+    def warm_up(self) -> None:
+        """Open a pooled connection to the API so the first reply skips the TLS handshake."""
+        self.session.get(f"{self.base_url}/models/{self.model}", timeout=self.timeout).close()
+
+    def complete(self, messages: List[Dict], **params) -> str:
+        """Return the full assistant reply for a conversation."""
+        response = self._post(messages, stream=False, **params)
+        return response.json()["choices"][0]["message"]["content"]
+
+    def embed(self, texts: List[str], model: str = EMBEDDING_MODEL) -> List[List[float]]:
+        """Return one embedding vector per input text, in input order."""
+        response = self.session.post(
+            f"{self.base_url}/embeddings",
+            json={"model": model, "input": texts},
+            timeout=self.timeout
+        )
+        response.raise_for_status()
+        data = sorted(response.json()["data"], key=lambda item: item["index"])
+        return [item["embedding"] for item in data]
+
+    def stream(self, messages: List[Dict], **params) -> Iterator[str]:
+        """
+        Yield the assistant reply token by token as it is generated.
+
+        Args:
+            messages: Conversation in OpenAI message format
+            **params: Extra completion parameters such as model or temperature
+        """
+        with self._post(messages, stream=True, **params) as response:
+            for line in response.iter_lines(decode_unicode=False):
+                if not line or not line.startswith(b"data:"):
+                    continue
+                data = line[5:].strip()
+                if data == b"[DONE]":
+                    break
+                try:
+                    delta = json.loads(data)["choices"][0].get("delta", {})
+                except (ValueError, KeyError, IndexError):
+                    logger.warning(f"Skipping malformed stream chunk: {data[:100]!r}")
+                    continue
+                content = delta.get("content")
+                if content:
+                    yield content
+
+    def close(self) -> None:
+        self.session.close()
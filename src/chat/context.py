@@ -0,0 +1,180 @@
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+from src.chat.client import ChatClient
+
+logger = logging.getLogger("chat.context")
+
+# Per-message framing overhead used by OpenAI chat models
+TOKENS_PER_MESSAGE = 4
+REPLY_PRIMING_TOKENS = 3
+
+SUMMARY_PROMPT = (
+    "Summarize the conversation so far for a colleague taking over the call. "
+    "Keep names, case numbers, departments, dates and any open requests. "
+    "Answer in the language of the conversation, in at most {words} words."
+)
+
+@lru_cache(maxsize=8)
+def _encoding(model: str):
+    try:
+        import tiktoken
+    except ImportError:
+        logger.warning("tiktoken not installed, estimating token counts. Run 'pip install tiktoken'")
+        return None
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        # The BPE files are downloaded on first use and may be unreachable
+        logger.warning(f"Could not load tokenizer for {model}, estimating token counts: {e}")
+        return None
+
+@lru_cache(maxsize=16384)
+def count_tokens(text: str, model: str = "gpt-4") -> int:
+    """Count tokens in a text with the model's tokenizer (memoized per text)."""
+    encoding = _encoding(model)
+    if encoding is None:
+        # Icelandic averages roughly three characters per token
+        return len(text) // 3 + 1
+    return len(encoding.encode(text))
+
+def message_tokens(message: Dict, model: str = "gpt-4") -> int:
+    """Tokens a single chat message costs in a prompt."""
+    return TOKENS_PER_MESSAGE + count_tokens(message.get("content") or "", model)
+
+class ConversationContext:
+    """Keeps chat prompts within a token budget, summarizing older turns in the background."""
+
+    def __init__(self, client: ChatClient, model: str = "gpt-4", max_prompt_tokens: int = 3000,
+                 summary_model: str = "gpt-3.5-turbo", summary_words: int = 150,
+                 summary_step: int = 6, max_summaries: int = 1024):
+        """
+        Initialize the conversation context.
+
+        Args:
+            client: Chat client used for background summaries
+            model: Model the prompts are built for (selects the tokenizer)
+            max_prompt_tokens: Budget for system prompt, summary and recent turns
+            summary_model: Cheaper model used to summarize dropped turns
+            summary_words: Target length of a rolling summary
+            summary_step: Summaries are refreshed once per this many dropped messages
+            max_summaries: Number of prefix summaries kept in memory
+        """
+        self.client = client
+        self.model = model
+        self.max_prompt_tokens = max_prompt_tokens
+        self.summary_model = summary_model
+        self.summary_words = summary_words
+        self.summary_step = max(1, summary_step)
+        self.max_summaries = max_summaries
+
+        self._summaries: "OrderedDict[str, str]" = OrderedDict()
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="summarizer")
+
+    @staticmethod
+    def _prefix_digests(history: List[Dict]) -> List[str]:
+        """Chain hashes so digests[i] identifies history[:i]."""
+        digests = [""]
+        h = hashlib.sha1()
+        for message in history:
+            h.update(message["role"].encode("utf-8"))
+            h.update(b"\0")
+            h.update((message.get("content") or "").encode("utf-8"))
+            h.update(b"\0")
+            digests.append(h.copy().hexdigest())
+        return digests
+
+    def build(self, system_prompt: str, history: List[Dict],
+              context: Optional[str] = None) -> List[Dict]:
+        """
+        Build the messages to send for the latest turn.
+
+        Args:
+            system_prompt: System instruction placed first
+            history: User/assistant messages, ending with the new user message
+            context: Optional extra system text (e.g. retrieved passages)
+
+        Returns:
+            Messages fitting ``max_prompt_tokens``; older turns are replaced by the
+            most recent available summary.
+        """
+        system = [{"role": "system", "content": system_prompt}]
+        if context:
+            system.append({"role": "system", "content": context})
+
+        budget = self.max_prompt_tokens - REPLY_PRIMING_TOKENS
+        budget -= sum(message_tokens(m, self.model) for m in system)
+        budget -= self.summary_words * 2  # room for the summary
+
+        # Walk back from the newest message, always keeping it
+        start = len(history)
+        used = 0
+        while start > 0:
+            cost = message_tokens(history[start - 1], self.model)
+            if used + cost > budget and start < len(history):
+                break
+            used += cost
+            start -= 1
+
+        if start == 0:
+            return system + list(history)
+
+        digests = self._prefix_digests(history)
+        boundary = start - start % self.summary_step
+        summary = None
+        with self._lock:
+            for i in range(start, 0, -1):
+                if digests[i] in self._summaries:
+                    summary = self._summaries[digests[i]]
+                    self._summaries.move_to_end(digests[i])
+                    covered = i
+                    break
+            else:
+                covered = 0
+        if boundary > covered:
+            self._schedule(history[:boundary], digests, covered, summary)
+
+        if summary:
+            system.append({"role": "system", "content": f"Summary of the earlier conversation: {summary}"})
+        return system + list(history[start:])
+
+    def _schedule(self, prefix: List[Dict], digests: List[str], covered: int, summary: Optional[str]) -> None:
+        """Summarize ``prefix`` off the request path, building on an earlier summary."""
+        key = digests[len(prefix)]
+        with self._lock:
+            if key in self._pending or key in self._summaries:
+                return
+            self._pending.add(key)
+        self._executor.submit(self._summarize, key, prefix[covered:], summary)
+
+    def _summarize(self, key: str, messages: List[Dict], previous: Optional[str]) -> None:
+        try:
+            transcript = "\n".join(f"{m['role']}: {m.get('content') or ''}" for m in messages)
+            if previous:
+                transcript = f"Earlier summary: {previous}\n\n{transcript}"
+            result = self.client.complete([
+                {"role": "system", "content": SUMMARY_PROMPT.format(words=self.summary_words)},
+                {"role": "user", "content": transcript}
+            ], model=self.summary_model, temperature=0)
+            with self._lock:
+                self._summaries[key] = result.strip()
+                while len(self._summaries) > self.max_summaries:
+                    self._summaries.popitem(last=False)
+        except Exception as e:
+            logger.warning(f"Background summary failed: {e}")
+        finally:
+            with self._lock:
+                self._pending.discard(key)
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,318 @@
+import json
+import logging
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger("chat.retrieval")
+
+# Okapi BM25 parameters
+K1 = 1.2
+B = 0.75
+
+POSTING_DTYPE = np.dtype([("passage", "<u4"), ("tf", "<u2")])
+INDEX_VERSION = 1
+
+TOKEN_RE = re.compile(r"[^\W\d_]+|\d+")
+HEADING_RE = re.compile(r"^(#{1,6})\s+(.*)$")
+
+STOPWORDS = frozenset("""
+    og að er í á það sem til við um en ekki ég þú hann hún við þið þeir þær þau með fyrir af var eru
+    eða frá hjá sig sér þetta þessi þá ef svo hvað hver hvar hvernig hvenær get getur má mér mig þig
+    hefur hafa verður vera
+    the a an and or of to in is are for on with be this that it as by at from can will your you
+    what which how where when
+""".split())
+
+# Common Icelandic inflectional endings (plus English plural -s), longest first. Only one is
+# stripped and only when a stem of at least three letters remains, so "borgin", "borgum" and
+# "borgir" all become "borg" while short forms like "tts" are left alone.
+SUFFIXES = sorted("""
+    unnar innar inum unum anna unni inni inu arnir urnar ingar ingu inga ana ina inn ins ið um ar ir ur an in s a i u
+""".split(), key=len, reverse=True)
+
+def stem(token: str) -> str:
+    for suffix in SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= 3:
+            return token[:-len(suffix)]
+    return token
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased, stemmed terms of a text with stopwords removed."""
+    return [stem(t) for t in TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+def split_passages(text: str, max_words: int = 120) -> List[Tuple[str, str]]:
+    """
+    Split markdown into passages of roughly ``max_words`` words.
+
+    Passages never span headings; each is returned with its nearest heading.
+
+    Returns:
+        (heading, text) pairs
+    """
+    passages = []
+    heading, chunk, words = "", [], 0
+
+    def flush():
+        nonlocal chunk, words
+        if chunk:
+            passages.append((heading, "\n\n".join(chunk)))
+        chunk, words = [], 0
+
+    for block in re.split(r"\n\s*\n", text):
+        block = block.strip()
+        if not block:
+            continue
+        match = HEADING_RE.match(block.splitlines()[0])
+        if match:
+            flush()
+            heading = match.group(2).strip()
+            block = "\n".join(block.splitlines()[1:]).strip()
+            if not block:
+                continue
+        count = len(block.split())
+        if words and words + count > max_words:
+            flush()
+        chunk.append(block)
+        words += count
+    flush()
+    return passages
+
+class RetrievalIndex:
+    """
+    BM25 index over markdown passages, kept on disk and memory-mapped.
+
+    Postings for every term are stored contiguously in one ``postings.npy``
+    array (passage id, term frequency) that is opened with ``mmap_mode``, so
+    loading the index costs almost nothing and a query only touches the
+    postings of its own terms. Per-file analysis is cached, so a refresh only
+    re-reads files whose size or modification time changed.
+    """
+
+    def __init__(self, docs_dir: Path = Path("ai-docs"), index_dir: Optional[Path] = None,
+                 pattern: str = "**/*.md", max_words: int = 120):
+        """
+        Initialize the index.
+
+        Args:
+            docs_dir: Directory with the documentation
+            index_dir: Where the index files are written; defaults to ``docs_dir/.index``
+            pattern: Glob selecting the indexed files
+            max_words: Target passage length
+        """
+        self.docs_dir = Path(docs_dir)
+        self.index_dir = Path(index_dir) if index_dir else self.docs_dir / ".index"
+        self.pattern = pattern
+        self.max_words = max_words
+
+        self.manifest: Dict[str, List[int]] = {}
+        self.vocab: Dict[str, Tuple[int, int]] = {}
+        self.passages: List[Dict[str, str]] = []
+        self.postings = np.zeros(0, dtype=POSTING_DTYPE)
+        self.lengths = np.zeros(0, dtype=np.float32)
+        self.avgdl = 0.0
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._load()
+
+    def _load(self) -> None:
+        meta_path = self.index_dir / "meta.json"
+        if not meta_path.exists():
+            return
+        try:
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+            if meta.get("version") != INDEX_VERSION:
+                return
+            self.manifest = meta["manifest"]
+            self.vocab = {term: tuple(span) for term, span in meta["vocab"].items()}
+            self.passages = meta["passages"]
+            self.avgdl = meta["avgdl"]
+            self.postings = np.load(self.index_dir / "postings.npy", mmap_mode="r")
+            self.lengths = np.load(self.index_dir / "lengths.npy", mmap_mode="r")
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Ignoring unreadable retrieval index in {self.index_dir}: {e}")
+            self.manifest, self.vocab, self.passages = {}, {}, []
+
+    def _scan(self) -> Dict[str, List[int]]:
+        files = {}
+        for path in sorted(self.docs_dir.glob(self.pattern)):
+            if self.index_dir in path.parents or not path.is_file():
+                continue
+            info = path.stat()
+            files[path.relative_to(self.docs_dir).as_posix()] = [info.st_size, info.st_mtime_ns]
+        return files
+
+    def _analyze(self, rel: str) -> List[Dict]:
+        text = (self.docs_dir / rel).read_text(encoding="utf-8", errors="replace")
+        return [
+            {"heading": heading, "text": body, "terms": dict(Counter(tokenize(f"{heading}\n{body}")))}
+            for heading, body in split_passages(text, self.max_words)
+        ]
+
+    def refresh(self) -> bool:
+        """
+        Bring the index up to date with the documentation directory.
+
+        Returns:
+            True if anything changed and the index was rewritten
+        """
+        with self._refresh_lock:
+            files = self._scan()
+            if files == self.manifest:
+                return False
+            self._rebuild(files)
+            return True
+
+    def _rebuild(self, files: Dict[str, List[int]]) -> None:
+        started = time.perf_counter()
+        analysis_path = self.index_dir / "analysis.json"
+        analysis = {}
+        if analysis_path.exists():
+            try:
+                analysis = json.loads(analysis_path.read_text(encoding="utf-8"))
+            except json.JSONDecodeError:
+                pass
+
+        changed = [rel for rel, fingerprint in files.items()
+                   if rel not in analysis or self.manifest.get(rel) != fingerprint]
+        analysis = {rel: analysis[rel] for rel in files if rel not in changed}
+        for rel in changed:
+            analysis[rel] = self._analyze(rel)
+
+        # Merge every file's passages into one postings array grouped by term
+        passages, lengths = [], []
+        term_postings: Dict[str, List[Tuple[int, int]]] = {}
+        for rel in sorted(analysis):
+            for passage in analysis[rel]:
+                pid = len(passages)
+                passages.append({"path": rel, "heading": passage["heading"], "text": passage["text"]})
+                lengths.append(sum(passage["terms"].values()))
+                for term, tf in passage["terms"].items():
+                    term_postings.setdefault(term, []).append((pid, min(tf, 65535)))
+
+        vocab, offset = {}, 0
+        postings = np.zeros(sum(len(p) for p in term_postings.values()), dtype=POSTING_DTYPE)
+        for term in sorted(term_postings):
+            entries = term_postings[term]
+            postings[offset:offset + len(entries)] = entries
+            vocab[term] = (offset, len(entries))
+            offset += len(entries)
+        lengths = np.asarray(lengths, dtype=np.float32)
+        avgdl = float(lengths.mean()) if lengths.size else 0.0
+
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        # Rename over the old files; readers still holding the old mmaps keep a valid view
+        for name, array in (("postings.npy", postings), ("lengths.npy", lengths)):
+            with open(self.index_dir / f"{name}.tmp", "wb") as f:
+                np.save(f, array)
+            os.replace(self.index_dir / f"{name}.tmp", self.index_dir / name)
+        for name, data in (("analysis.json", analysis),
+                           ("meta.json", {"version": INDEX_VERSION, "manifest": files, "vocab": vocab,
+                                          "passages": passages, "avgdl": avgdl})):
+            tmp = self.index_dir / f"{name}.tmp"
+            tmp.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+            os.replace(tmp, self.index_dir / name)
+
+        with self._lock:
+            self.manifest, self.vocab, self.passages, self.avgdl = files, vocab, passages, avgdl
+            self.postings = np.load(self.index_dir / "postings.npy", mmap_mode="r")
+            self.lengths = np.load(self.index_dir / "lengths.npy", mmap_mode="r")
+        logger.info(f"Indexed {len(changed)} changed of {len(files)} files, {len(passages)} passages "
+                    f"in {time.perf_counter() - started:.2f}s")
+
+    def search(self, query: str, k: int = 3) -> List[Dict]:
+        """
+        Top-k passages for a query by BM25.
+
+        Returns:
+            Passages (path, heading, text, score), best first; empty if nothing matches
+        """
+        with self._lock:
+            vocab, passages, postings, lengths, avgdl = (self.vocab, self.passages, self.postings,
+                                                         self.lengths, self.avgdl)
+        terms = [t for t in set(tokenize(query)) if t in vocab]
+        if not terms or not passages:
+            return []
+
+        n = len(passages)
+        scores = np.zeros(n, dtype=np.float32)
+        for term in terms:
+            offset, df = vocab[term]
+            hits = postings[offset:offset + df]
+            ids, tf = hits["passage"], hits["tf"].astype(np.float32)
+            idf = math.log(1.0 + (n - df + 0.5) / (df + 0.5))
+            norm = K1 * (1.0 - B + B * lengths[ids] / avgdl)
+            # Each passage appears once per term, so plain fancy-index addition is safe
+            scores[ids] += idf * tf * (K1 + 1.0) / (tf + norm)
+
+        k = min(k, int(np.count_nonzero(scores)))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [dict(passages[i], score=float(scores[i])) for i in top]
+
+    def context(self, query: str, k: int = 3, max_chars: int = 1500) -> Optional[str]:
+        """
+        Retrieved passages formatted as a system message for ``ConversationContext.build``.
+
+        Returns:
+            The context text, or None if no passage matches
+        """
+        hits = self.search(query, k)
+        if not hits:
+            return None
+        budget = max_chars
+        sections = []
+        for hit in hits:
+            if budget <= 0:
+                break
+            source = f"{hit['path']} - {hit['heading']}" if hit["heading"] else hit["path"]
+            text = hit["text"][:budget]
+            budget -= len(text)
+            sections.append(f"[{source}]\n{text}")
+        return ("Relevant excerpts from the city hall documentation. Use them when they answer "
+                "the question and say so when they do not.\n\n" + "\n\n".join(sections))
+
+def benchmark(index: RetrievalIndex, rounds: int = 2000) -> None:
+    """Measure query latency over questions built from indexed headings."""
+    queries = [p["heading"] or p["text"][:60] for p in index.passages] or ["rödd"]
+    start = time.perf_counter()
+    for i in range(rounds):
+        index.search(queries[i % len(queries)])
+    elapsed = time.perf_counter() - start
+    print(f"{len(index.passages)} passages, {len(index.vocab)} terms")
+    print(f"search: {elapsed / rounds * 1e6:>8.0f} µs/query")
+
+def main():
+    """Build the index and search it from the command line, or run the benchmark."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="BM25 retrieval over the AI documentation")
+    parser.add_argument("query", nargs="*", help="Question to search for")
+    parser.add_argument("--docs", type=Path, default=Path("ai-docs"), help="Documentation directory")
+    parser.add_argument("-k", type=int, default=3, help="Passages to return")
+    parser.add_argument("--benchmark", action="store_true", help="Measure query latency")
+    args = parser.parse_args()
+
+    index = RetrievalIndex(args.docs)
+    started = time.perf_counter()
+    changed = index.refresh()
+    print(f"Index {'rebuilt' if changed else 'up to date'} in {time.perf_counter() - started:.3f}s")
+
+    if args.benchmark or not args.query:
+        benchmark(index)
+        return
+    for hit in index.search(" ".join(args.query), args.k):
+        print(f"\n{hit['score']:.2f}  {hit['path']} - {hit['heading']}")
+        print(hit["text"][:300])
+
+if __name__ == "__main__":
+    main()
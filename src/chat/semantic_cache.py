@@ -0,0 +1,380 @@
+import json
+import logging
+import math
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.chat.cache import normalize_message
+from src.server.metrics import REGISTRY
+
+logger = logging.getLogger("chat.semantic_cache")
+
+LOOKUPS = REGISTRY.counter("semantic_cache_lookups_total", "Semantic answer cache lookups by result",
+                           labels=("result",))
+SIMILARITY = REGISTRY.histogram("semantic_cache_similarity", "Similarity of the nearest cached question",
+                                buckets=(0.5, 0.6, 0.7, 0.8, 0.85, 0.9, 0.92, 0.94, 0.96, 0.98, 1.0))
+FALSE_HITS = REGISTRY.counter("semantic_cache_false_hits_total",
+                              "Cache hits reported as answering a different question")
+
+PUNCTUATION = re.compile(r"[^\w\s]")
+
+def normalize_question(text: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace."""
+    return normalize_message(PUNCTUATION.sub(" ", text))
+
+class VectorIndex:
+    """
+    Nearest-neighbour search over unit vectors by cosine similarity.
+
+    Small sets are searched exactly with one matrix-vector product. Past
+    ``ivf_threshold`` vectors the index switches to an inverted file: vectors
+    are clustered with spherical k-means, stored as int8 codes (a quarter of
+    the memory), and a query scores only the ``nprobe`` closest clusters. The
+    clustering is retrained whenever the set has doubled since the last run.
+    """
+
+    def __init__(self, ivf_threshold: int = 20000, nprobe: int = 8):
+        """
+        Initialize the index.
+
+        Args:
+            ivf_threshold: Vector count at which search switches from exact to IVF
+            nprobe: Clusters scanned per IVF query
+        """
+        self.ivf_threshold = ivf_threshold
+        self.nprobe = nprobe
+        self.size = 0
+        self._vectors: Optional[np.ndarray] = None   # float32 rows in exact mode, int8 codes in IVF mode
+        self._valid = np.zeros(0, dtype=bool)
+        self._assign = np.zeros(0, dtype=np.int32)
+        self.centroids: Optional[np.ndarray] = None
+        self._trained_size = 0
+        self._free: List[int] = []
+
+    @property
+    def ivf(self) -> bool:
+        return self.centroids is not None
+
+    def _grow(self, dim: int) -> None:
+        capacity = max(64, 2 * len(self._valid))
+        dtype = np.int8 if self.ivf else np.float32
+        vectors = np.zeros((capacity, dim), dtype=dtype)
+        if self._vectors is not None:
+            vectors[:self.size] = self._vectors[:self.size]
+        self._vectors = vectors
+        self._valid = np.concatenate([self._valid, np.zeros(capacity - len(self._valid), dtype=bool)])
+        self._assign = np.concatenate([self._assign, np.zeros(capacity - len(self._assign), dtype=np.int32)])
+
+    def _rows(self) -> np.ndarray:
+        """Stored vectors as float32, dequantizing IVF codes."""
+        rows = self._vectors[:self.size]
+        return rows.astype(np.float32) / 127.0 if self.ivf else rows
+
+    def _train(self) -> None:
+        data = self._rows()
+        nlist = max(1, int(math.sqrt(self.size)))
+        rng = np.random.default_rng(0)
+        # Train on a sample; assigning every vector afterwards is one matrix product
+        sample = data[rng.choice(self.size, size=min(self.size, 64 * nlist), replace=False)]
+        centroids = sample[rng.choice(len(sample), size=nlist, replace=False)].copy()
+        for _ in range(10):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            for c in range(nlist):
+                members = sample[labels == c]
+                if len(members):
+                    mean = members.sum(axis=0)
+                    centroids[c] = mean / (np.linalg.norm(mean) or 1.0)
+
+        self._assign[:self.size] = np.argmax(data @ centroids.T, axis=1)
+        codes = np.zeros((len(self._valid), data.shape[1]), dtype=np.int8)
+        codes[:self.size] = np.clip(np.round(data * 127.0), -127, 127)
+        self._vectors = codes
+        self.centroids = centroids
+        self._trained_size = self.size
+        logger.info(f"Trained IVF index: {self.size} vectors in {nlist} clusters")
+
+    def add(self, vector: Sequence[float]) -> int:
+        """Add a vector (normalized on the way in); returns its id."""
+        vector = np.asarray(vector, dtype=np.float32)
+        vector = vector / (np.linalg.norm(vector) or 1.0)
+        if self._free:
+            # Reuse removed slots so a cache with steady eviction stays the same size
+            index = self._free.pop()
+        else:
+            if self._vectors is None or self.size == len(self._valid):
+                self._grow(len(vector))
+            index = self.size
+            self.size += 1
+
+        if self.ivf:
+            self._vectors[index] = np.clip(np.round(vector * 127.0), -127, 127)
+            self._assign[index] = int(np.argmax(self.centroids @ vector))
+        else:
+            self._vectors[index] = vector
+        self._valid[index] = True
+
+        if self.size >= self.ivf_threshold and (not self.ivf or self.size >= 2 * self._trained_size):
+            self._train()
+        return index
+
+    def remove(self, index: int) -> None:
+        if self._valid[index]:
+            self._valid[index] = False
+            self._free.append(index)
+
+    def search(self, vector: Sequence[float], k: int = 1) -> List[Tuple[int, float]]:
+        """
+        Closest stored vectors to a query.
+
+        Returns:
+            (id, cosine similarity) pairs, most similar first
+        """
+        if not self.size:
+            return []
+        query = np.asarray(vector, dtype=np.float32)
+        query = query / (np.linalg.norm(query) or 1.0)
+
+        if self.ivf:
+            probes = np.argsort(-(self.centroids @ query))[:self.nprobe]
+            candidates = np.flatnonzero(np.isin(self._assign[:self.size], probes) & self._valid[:self.size])
+            scores = (self._vectors[candidates].astype(np.float32) @ query) / 127.0
+        else:
+            candidates = np.flatnonzero(self._valid[:self.size])
+            scores = self._vectors[candidates] @ query
+
+        if not len(candidates):
+            return []
+        k = min(k, len(candidates))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(candidates[i]), float(scores[i])) for i in top]
+
+@dataclass
+class CachedAnswer:
+    """A stored answer returned for a near-duplicate question."""
+
+    entry_id: int
+    question: str
+    answer: str
+    score: float
+    # Synthesized sentences per voice: [(sentence text, audio bytes), ...]
+    audio: Dict[str, List[Tuple[str, bytes]]] = field(default_factory=dict)
+
+class SemanticCache:
+    """
+    Answers repeated questions asked in different words without a chat round trip.
+
+    Questions are normalized and embedded; a lookup returns the stored answer of
+    the most similar earlier question in the same scope if the cosine similarity
+    reaches ``threshold``. Every hit is written to an audit log, hits close to the
+    threshold are flagged for review, and hits reported as wrong are counted and
+    evicted.
+    """
+
+    def __init__(self, embed: Callable[[List[str]], List[List[float]]], threshold: float = 0.92,
+                 max_entries: int = 5000, audit_path: Optional[Path] = None, review_margin: float = 0.03,
+                 index: Optional[VectorIndex] = None):
+        """
+        Initialize the cache.
+
+        Args:
+            embed: Returns one embedding per input text, e.g. ``ChatClient.embed``
+            threshold: Minimum cosine similarity for a hit
+            max_entries: Answers kept before least recently used ones are evicted
+            audit_path: JSON lines file receiving every hit and false-hit report
+            review_margin: Hits scoring below ``threshold + review_margin`` are flagged for review
+            index: Vector index to use; defaults to an exact index that switches to IVF when large
+        """
+        self.embed = embed
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.audit_path = Path(audit_path) if audit_path else None
+        self.review_margin = review_margin
+        self.index = index or VectorIndex()
+
+        self._entries: "OrderedDict[int, Dict]" = OrderedDict()
+        self._slots: Dict[int, int] = {}   # index slot -> entry id
+        self._next_id = 0
+        self._exact: Dict[Tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+        self._audit_lock = threading.Lock()
+        self.hits = self.misses = self.false_hits = 0
+
+    def _audit(self, record: Dict) -> None:
+        if not self.audit_path:
+            return
+        try:
+            with self._audit_lock:
+                self.audit_path.parent.mkdir(parents=True, exist_ok=True)
+                with open(self.audit_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps({"time": time.time(), **record}, ensure_ascii=False) + "\n")
+        except OSError as e:
+            logger.warning(f"Semantic cache audit write failed: {e}")
+
+    def _embed(self, normalized: str) -> Optional[np.ndarray]:
+        try:
+            return np.asarray(self.embed([normalized])[0], dtype=np.float32)
+        except Exception as e:
+            logger.warning(f"Question embedding failed: {e}")
+            return None
+
+    def lookup(self, question: str, scope: str = "") -> Optional[CachedAnswer]:
+        """
+        Find a cached answer for a question.
+
+        Args:
+            question: The caller's question as asked
+            scope: Answers are only shared between lookups with the same scope
+                (e.g. model and system prompt)
+
+        Returns:
+            The cached answer, or None on a miss or if embedding fails
+        """
+        normalized = normalize_question(question)
+        with self._lock:
+            entry_id = self._exact.get((scope, normalized))
+        score = 1.0
+
+        if entry_id is None:
+            vector = self._embed(normalized)
+            if vector is None:
+                LOOKUPS.inc("error")
+                return None
+            with self._lock:
+                matches = [(self._slots[slot], s) for slot, s in self.index.search(vector, k=8)
+                           if self._entries[self._slots[slot]]["scope"] == scope]
+            if matches:
+                entry_id, score = matches[0]
+                SIMILARITY.observe(score)
+            if not matches or score < self.threshold:
+                with self._lock:
+                    self.misses += 1
+                LOOKUPS.inc("miss")
+                return None
+
+        with self._lock:
+            entry = self._entries.get(entry_id)
+            if entry is None:
+                self.misses += 1
+                LOOKUPS.inc("miss")
+                return None
+            self._entries.move_to_end(entry_id)
+            self.hits += 1
+            hit = CachedAnswer(entry_id, entry["question"], entry["answer"], score, dict(entry["audio"]))
+        LOOKUPS.inc("hit")
+
+        self._audit({"event": "hit", "entry": entry_id, "question": question, "matched": hit.question,
+                     "score": round(score, 4), "review": score < self.threshold + self.review_margin})
+        return hit
+
+    def store(self, question: str, answer: str, scope: str = "") -> Optional[int]:
+        """
+        Cache an answer to a question.
+
+        Returns:
+            The entry id, or None if the question could not be embedded
+        """
+        normalized = normalize_question(question)
+        vector = self._embed(normalized)
+        if vector is None:
+            return None
+        with self._lock:
+            previous = self._exact.pop((scope, normalized), None)
+            if previous is not None:
+                self._evict(previous)
+            entry_id = self._next_id
+            self._next_id += 1
+            slot = self.index.add(vector)
+            self._slots[slot] = entry_id
+            self._entries[entry_id] = {"question": question, "normalized": normalized, "answer": answer,
+                                       "scope": scope, "slot": slot, "audio": {}}
+            self._exact[(scope, normalized)] = entry_id
+            while len(self._entries) > self.max_entries:
+                self._evict(next(iter(self._entries)))
+        return entry_id
+
+    def _evict(self, entry_id: int) -> None:
+        """Drop an entry. Caller holds the lock."""
+        entry = self._entries.pop(entry_id, None)
+        if entry is None:
+            return
+        self.index.remove(entry["slot"])
+        del self._slots[entry["slot"]]
+        if self._exact.get((entry["scope"], entry["normalized"])) == entry_id:
+            del self._exact[(entry["scope"], entry["normalized"])]
+
+    def store_audio(self, entry_id: int, voice: str, sentences: List[Tuple[str, bytes]]) -> None:
+        """Attach the synthesized reply for a voice to a cached answer."""
+        with self._lock:
+            entry = self._entries.get(entry_id)
+            if entry is not None:
+                entry["audio"][voice] = list(sentences)
+
+    def report_false_hit(self, entry_id: int, question: Optional[str] = None) -> bool:
+        """
+        Record that a hit answered a different question, and evict the answer.
+
+        Returns:
+            True if the entry was still cached
+        """
+        with self._lock:
+            entry = self._entries.get(entry_id)
+            self.false_hits += 1
+            self._evict(entry_id)
+        FALSE_HITS.inc()
+        self._audit({"event": "false_hit", "entry": entry_id, "question": question,
+                     "matched": entry["question"] if entry else None})
+        return entry is not None
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "false_hits": self.false_hits,
+                "false_hit_rate": self.false_hits / self.hits if self.hits else 0.0
+            }
+
+def benchmark(dim: int = 1536, sizes: Sequence[int] = (1000, 10000, 50000), queries: int = 200) -> None:
+    """Measure search latency of the exact and IVF index on random unit vectors."""
+    rng = np.random.default_rng(1)
+    for size in sizes:
+        data = rng.standard_normal((size, dim)).astype(np.float32)
+        index = VectorIndex(ivf_threshold=20000)
+        started = time.perf_counter()
+        for row in data:
+            index.add(row)
+        build = time.perf_counter() - started
+
+        # Queries are perturbed copies of stored vectors, like rephrased questions
+        picks = rng.choice(size, size=queries)
+        noisy = data[picks] + 0.3 * rng.standard_normal((queries, dim)).astype(np.float32)
+        started = time.perf_counter()
+        found = sum(index.search(q)[0][0] == p for q, p in zip(noisy, picks))
+        elapsed = time.perf_counter() - started
+        mode = "ivf" if index.ivf else "exact"
+        print(f"{size:>6} vectors ({mode:>5}): build {build:6.2f}s, "
+              f"search {elapsed / queries * 1000:6.2f} ms/query, recall@1 {found / queries:.2f}")
+
+def main():
+    """Run the vector search benchmark."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Semantic answer cache")
+    parser.add_argument("--benchmark", action="store_true", help="Measure vector search latency")
+    parser.add_argument("--dim", type=int, default=1536, help="Embedding dimension")
+    args = parser.parse_args()
+    benchmark(dim=args.dim)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,3 @@
+"""
+Evaluation Dataset Module
+"""
\ No newline at end of file
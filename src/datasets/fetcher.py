@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+Manifest-driven, resumable and verified fetching of evaluation audio.
+
+A dataset manifest is a JSON file::
+
+    {
+      "name": "icelandic_samples",
+      "files": [
+        {"name": "sample1.mp3", "url": "https://...", "size": 123456,
+         "sha256": "...", "license": "CC BY 4.0", "transcript": "..."}
+      ]
+    }
+
+``size`` and ``sha256`` may be null until pinned with ``--pin``. Until then the
+first verified download of each file is pinned locally in ``<dest>/.pins.json``
+and later runs are checked against it; ``--require-pinned`` refuses such entries
+instead. Files that are already present and valid are skipped; partial downloads
+resume with HTTP Range.
+A mirror (local directory, file:// or http(s) base URL) replaces each file's URL
+with ``<mirror>/<name>``, so CI can provision corpora without the internet.
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import unquote, urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger("datasets.fetcher")
+
+CHUNK_SIZE = 1024 * 1024
+TIMEOUT = (5.0, 30.0)
+MIRROR_ENV = "SAMPLE_AUDIO_MIRROR"
+PINS_NAME = ".pins.json"
+
+def load_manifest(path: Path) -> Dict[str, Any]:
+    with open(path, encoding="utf-8") as f:
+        manifest = json.load(f)
+    for entry in manifest.get("files", []):
+        if "name" not in entry or "url" not in entry:
+            raise ValueError(f"Manifest entry needs 'name' and 'url': {entry}")
+    return manifest
+
+def save_manifest(path: Path, manifest: Dict[str, Any]) -> None:
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(manifest, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+    os.replace(tmp, path)
+
+def sha256_file(path: Path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest
+
+def is_valid(path: Path, entry: Dict[str, Any]) -> bool:
+    """Whether a local file matches its manifest entry (size first, then hash)."""
+    if not path.exists():
+        return False
+    if entry.get("size") is not None and path.stat().st_size != entry["size"]:
+        return False
+    if entry.get("sha256"):
+        return sha256_file(path).hexdigest() == entry["sha256"]
+    return True
+
+def source_url(entry: Dict[str, Any], mirror: Optional[str]) -> str:
+    if not mirror:
+        return entry["url"]
+    if "://" not in mirror:
+        mirror = Path(mirror).absolute().as_uri()
+    return f"{mirror.rstrip('/')}/{entry['name']}"
+
+class DatasetFetcher:
+    """Parallel fetcher for the files of one dataset manifest."""
+
+    def __init__(self, workers: int = 4, mirror: Optional[str] = None, retries: int = 3,
+                 require_pinned: bool = False):
+        """
+        Initialize the fetcher.
+
+        Args:
+            workers: Concurrent downloads
+            mirror: Optional base replacing each file's URL
+            retries: Attempts per file; each attempt resumes the partial file
+            require_pinned: Fail entries without a sha256 in the manifest instead of
+                pinning their first download locally
+        """
+        self.workers = workers
+        self.mirror = mirror if mirror is not None else os.environ.get(MIRROR_ENV)
+        self.retries = retries
+        self.require_pinned = require_pinned
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def _open(self, url: str, offset: int) -> Tuple[Iterator[bytes], bool]:
+        """Chunks from ``offset`` on, and whether the source honoured the offset."""
+        parsed = urlparse(url)
+        if parsed.scheme == "file":
+            f = open(unquote(parsed.path), "rb")
+            f.seek(offset)
+
+            def read():
+                with f:
+                    yield from iter(lambda: f.read(CHUNK_SIZE), b"")
+            return read(), True
+
+        headers = {"Range": f"bytes={offset}-"} if offset else {}
+        response = self.session.get(url, headers=headers, stream=True, timeout=TIMEOUT)
+        if response.status_code == 416:
+            # Nothing past the end: the partial file is already complete
+            response.close()
+            return iter(()), True
+        response.raise_for_status()
+        return response.iter_content(chunk_size=CHUNK_SIZE), response.status_code == 206
+
+    def _download(self, entry: Dict[str, Any], path: Path) -> int:
+        """Download one file via a resumable ``.part`` file; returns bytes transferred."""
+        part = path.with_name(path.name + ".part")
+        offset = part.stat().st_size if part.exists() else 0
+        chunks, resumed = self._open(source_url(entry, self.mirror), offset)
+
+        if resumed and offset:
+            digest = sha256_file(part)
+            mode = "ab"
+        else:
+            digest, mode = hashlib.sha256(), "wb"
+
+        transferred = 0
+        with open(part, mode) as f:
+            for chunk in chunks:
+                f.write(chunk)
+                digest.update(chunk)
+                transferred += len(chunk)
+
+        size = part.stat().st_size
+        if entry.get("size") is not None and size != entry["size"]:
+            if size > entry["size"]:
+                part.unlink()
+            raise IOError(f"{entry['name']}: expected {entry['size']} bytes, got {size}")
+        if entry.get("sha256") and digest.hexdigest() != entry["sha256"]:
+            part.unlink()
+            raise IOError(f"{entry['name']}: sha256 mismatch")
+
+        os.replace(part, path)
+        return transferred
+
+    def fetch_one(self, entry: Dict[str, Any], dest: Path) -> Dict[str, Any]:
+        path = dest / entry["name"]
+        if is_valid(path, entry):
+            return {"name": entry["name"], "status": "valid", "bytes": 0, "seconds": 0.0}
+
+        started = time.perf_counter()
+        error = None
+        transferred = 0
+        for attempt in range(1, self.retries + 1):
+            try:
+                transferred += self._download(entry, path)
+                return {"name": entry["name"], "status": "downloaded", "bytes": transferred,
+                        "seconds": time.perf_counter() - started}
+            except (requests.RequestException, IOError) as e:
+                error = str(e)
+                logger.warning(f"{entry['name']}: attempt {attempt} failed: {error}")
+                time.sleep(min(2 ** attempt * 0.25, 4.0))
+        return {"name": entry["name"], "status": "failed", "bytes": transferred,
+                "seconds": time.perf_counter() - started, "error": error}
+
+    def fetch(self, manifest: Dict[str, Any], dest: Path) -> Dict[str, Any]:
+        """
+        Bring ``dest`` in line with a manifest.
+
+        Entries without a sha256 are verified against the local pins of earlier
+        runs; their first download is pinned.
+
+        Returns:
+            Per-file results plus totals and throughput in MB/s
+        """
+        dest.mkdir(parents=True, exist_ok=True)
+        pins_path = dest / PINS_NAME
+        pins = load_pins(pins_path)
+
+        def run(entry: Dict[str, Any]) -> Dict[str, Any]:
+            if not entry.get("sha256"):
+                if self.require_pinned:
+                    return {"name": entry["name"], "status": "failed", "bytes": 0, "seconds": 0.0,
+                            "error": "no sha256 in the manifest"}
+                pin = pins.get(entry["name"])
+                if pin and (entry.get("size") is None or entry["size"] == pin["size"]):
+                    entry = {**entry, **pin}
+                else:
+                    logger.warning(f"{entry['name']}: no sha256 in the manifest, pinning the first download")
+            return self.fetch_one(entry, dest)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            results = list(executor.map(run, manifest.get("files", [])))
+        elapsed = time.perf_counter() - started
+
+        changed = False
+        for entry, result in zip(manifest.get("files", []), results):
+            if entry.get("sha256") or result["status"] == "failed":
+                continue
+            if result["status"] == "downloaded" or entry["name"] not in pins:
+                path = dest / entry["name"]
+                pins[entry["name"]] = {"size": path.stat().st_size, "sha256": sha256_file(path).hexdigest()}
+                changed = True
+        if changed:
+            save_manifest(pins_path, pins)
+
+        total = sum(r["bytes"] for r in results)
+        return {
+            "files": results,
+            "bytes": total,
+            "seconds": elapsed,
+            "mb_per_s": total / 1e6 / elapsed if elapsed > 0 else 0.0,
+            "failed": [r["name"] for r in results if r["status"] == "failed"]
+        }
+
+def load_pins(path: Path) -> Dict[str, Dict[str, Any]]:
+    """Sizes and hashes recorded for unpinned entries by earlier runs."""
+    if not path.exists():
+        return {}
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except ValueError:
+        logger.warning(f"Ignoring unreadable pins file {path}")
+        return {}
+
+def pin_manifest(manifest: Dict[str, Any], dest: Path) -> int:
+    """Record size and sha256 of downloaded files whose entries lack them."""
+    pinned = 0
+    for entry in manifest.get("files", []):
+        path = dest / entry["name"]
+        if path.exists() and (entry.get("sha256") is None or entry.get("size") is None):
+            entry["size"] = path.stat().st_size
+            entry["sha256"] = sha256_file(path).hexdigest()
+            pinned += 1
+    return pinned
+
+def write_mirror(manifest: Dict[str, Any], source: Path, mirror_dir: Path) -> None:
+    """Copy a fetched dataset into a directory usable as ``--mirror``."""
+    mirror_dir.mkdir(parents=True, exist_ok=True)
+    for entry in manifest.get("files", []):
+        if (source / entry["name"]).exists():
+            shutil.copy2(source / entry["name"], mirror_dir / entry["name"])
+
+def fetch_dataset(manifest_path: Path, dest: Path, workers: int = 4, mirror: Optional[str] = None,
+                  require_pinned: bool = False) -> Dict[str, Any]:
+    """Convenience entry point for test suites: fetch everything a manifest lists."""
+    fetcher = DatasetFetcher(workers=workers, mirror=mirror, require_pinned=require_pinned)
+    return fetcher.fetch(load_manifest(manifest_path), dest)
+
+def print_report(report: Dict[str, Any]) -> None:
+    for result in report["files"]:
+        if result["status"] == "failed":
+            print(f"❌ {result['name']}: {result.get('error')}")
+        elif result["status"] == "valid":
+            print(f"✅ {result['name']} already present and valid")
+        else:
+            print(f"✅ {result['name']} ({result['bytes'] / 1e6:.2f} MB in {result['seconds']:.2f}s)")
+    print(f"\nTransferred {report['bytes'] / 1e6:.2f} MB in {report['seconds']:.2f}s "
+          f"({report['mb_per_s']:.2f} MB/s)")
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Fetch an evaluation dataset from its manifest")
+    parser.add_argument("manifest", type=Path, help="Dataset manifest JSON")
+    parser.add_argument("--dest", type=Path, help="Target directory (default: the manifest's name)")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--mirror", help=f"Directory or base URL to fetch from instead (default: ${MIRROR_ENV})")
+    parser.add_argument("--pin", action="store_true", help="Record size and sha256 of fetched files in the manifest")
+    parser.add_argument("--require-pinned", action="store_true", help="Fail files whose manifest entry has no sha256")
+    parser.add_argument("--write-mirror", type=Path, help="Copy the fetched files into this mirror directory")
+    args = parser.parse_args(argv)
+
+    manifest = load_manifest(args.manifest)
+    dest = args.dest or Path(manifest.get("name", args.manifest.stem))
+    fetcher = DatasetFetcher(workers=args.workers, mirror=args.mirror, require_pinned=args.require_pinned)
+    report = fetcher.fetch(manifest, dest)
+    print_report(report)
+
+    if args.pin and pin_manifest(manifest, dest):
+        save_manifest(args.manifest, manifest)
+        print(f"✅ Pinned sizes and hashes in {args.manifest}")
+    if args.write_mirror:
+        write_mirror(manifest, dest, args.write_mirror)
+        print(f"✅ Mirror written to {args.write_mirror}")
+    return report
+
+if __name__ == "__main__":
+    main()
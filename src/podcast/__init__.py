@@ -0,0 +1,3 @@
+"""
+Podcast Rendering Module
+"""
\ No newline at end of file
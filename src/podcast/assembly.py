@@ -0,0 +1,470 @@
+import logging
+import time
+import wave
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger("podcast.assembly")
+
+# MPEG audio Layer III tables, indexed by header fields
+MPEG1, MPEG2, MPEG25 = 3, 2, 0
+BITRATES = {
+    MPEG1: [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    MPEG2: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160]
+}
+BITRATES[MPEG25] = BITRATES[MPEG2]
+SAMPLE_RATES = {MPEG1: [44100, 48000, 32000], MPEG2: [22050, 24000, 16000], MPEG25: [11025, 12000, 8000]}
+MONO = 3
+
+# One global_gain step scales the decoded signal by 2^(1/4)
+GAIN_STEP_DB = 20 * np.log10(2 ** 0.25)
+
+@dataclass
+class Mp3Stream:
+    """Layer III frames of one file, with the stream parameters they must share to be joined."""
+    data: bytes
+    frames: List[Tuple[int, int]]   # (offset, length) into data
+    version: int
+    sample_rate: int
+    channel_mode: int
+    crc: bool
+
+    @property
+    def channels(self) -> int:
+        return 1 if self.channel_mode == MONO else 2
+
+    @property
+    def samples_per_frame(self) -> int:
+        return 1152 if self.version == MPEG1 else 576
+
+    @property
+    def duration(self) -> float:
+        return len(self.frames) * self.samples_per_frame / self.sample_rate
+
+    def format(self) -> Tuple[int, int, int]:
+        return self.version, self.sample_rate, self.channels
+
+@dataclass
+class AssemblyReport:
+    """What ``assemble`` did: the output, how it was joined and the gain applied to each part."""
+    output_file: Path
+    method: str                      # "frames" (no re-encode) or "pcm" (decode/concat/encode)
+    duration: float
+    loudness: List[Optional[float]] = field(default_factory=list)
+    gains_db: List[float] = field(default_factory=list)
+
+def _parse_header(header: int) -> Optional[Tuple[int, int, int, int, bool]]:
+    """(version, frame length, sample rate, channel mode, crc) of a Layer III header, or None."""
+    if header >> 21 != 0x7FF:
+        return None
+    version = (header >> 19) & 3
+    layer = (header >> 17) & 3
+    bitrate_index = (header >> 12) & 15
+    rate_index = (header >> 10) & 3
+    if version == 1 or layer != 1 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+    bitrate = BITRATES[version][bitrate_index] * 1000
+    sample_rate = SAMPLE_RATES[version][rate_index]
+    padding = (header >> 9) & 1
+    length = (144 if version == MPEG1 else 72) * bitrate // sample_rate + padding
+    return version, length, sample_rate, (header >> 6) & 3, not (header >> 16) & 1
+
+def _side_info_size(version: int, channel_mode: int) -> int:
+    if version == MPEG1:
+        return 17 if channel_mode == MONO else 32
+    return 9 if channel_mode == MONO else 17
+
+def parse_mp3(data: bytes) -> Optional[Mp3Stream]:
+    """
+    Index the Layer III frames of an MP3 file.
+
+    ID3v2/ID3v1 tags and the Xing/Info/VBRI header frame are skipped, since
+    they describe the original file rather than audio. Junk between frames
+    is skipped by resynchronizing on the next pair of valid headers.
+
+    Returns:
+        The stream, or None if the data is not a single-format Layer III stream
+    """
+    pos = 0
+    if data[:3] == b"ID3" and len(data) >= 10:
+        size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+        pos = 10 + size + (10 if data[5] & 0x10 else 0)
+
+    frames = []
+    stream_format = None
+    end = len(data)
+    while pos + 4 <= end:
+        parsed = _parse_header(int.from_bytes(data[pos:pos + 4], "big"))
+        if parsed is not None and pos + parsed[1] <= end:
+            # Outside the main run, require the following header too so stray sync bits are not taken as frames
+            nxt = pos + parsed[1]
+            confirmed = frames and frames[-1][0] + frames[-1][1] == pos
+            if not confirmed and nxt + 4 <= end:
+                confirmed = _parse_header(int.from_bytes(data[nxt:nxt + 4], "big")) is not None
+            if confirmed or nxt == end:
+                version, length, sample_rate, channel_mode, crc = parsed
+                fmt = (version, sample_rate, 1 if channel_mode == MONO else 2)
+                if stream_format is None:
+                    stream_format = (version, sample_rate, channel_mode, crc)
+                elif fmt != (stream_format[0], stream_format[1], 1 if stream_format[2] == MONO else 2):
+                    return None
+                frames.append((pos, length))
+                pos += length
+                continue
+        if data[pos:pos + 3] == b"TAG" and end - pos == 128:
+            break
+        nxt = data.find(b"\xff", pos + 1)
+        if nxt < 0:
+            break
+        pos = nxt
+
+    if not frames:
+        return None
+    version, sample_rate, channel_mode, crc = stream_format
+    offset, length = frames[0]
+    info = offset + 4 + (2 if crc else 0) + _side_info_size(version, channel_mode)
+    if data[info:info + 4] in (b"Xing", b"Info") or data[offset + 36:offset + 40] == b"VBRI":
+        frames = frames[1:]
+    crc = any(not (data[o + 1] & 1) for o, _ in frames)
+    return Mp3Stream(data, frames, version, sample_rate, channel_mode, crc)
+
+def silent_frame(stream: Mp3Stream) -> bytes:
+    """
+    A lowest-bitrate frame matching the stream whose side info and main data are all zero.
+
+    With no Huffman data every spectral line is zero, so decoders output
+    silence without any re-encoding.
+    """
+    version_bits = {MPEG1: 3, MPEG2: 2, MPEG25: 0}[stream.version]
+    rate_index = SAMPLE_RATES[stream.version].index(stream.sample_rate)
+    header = (0x7FF << 21) | (version_bits << 19) | (1 << 17) | (1 << 16) | (1 << 12) | (rate_index << 10)
+    header |= stream.channel_mode << 6
+    length = (144 if stream.version == MPEG1 else 72) * BITRATES[stream.version][1] * 1000 // stream.sample_rate
+    return header.to_bytes(4, "big") + bytes(length - 4)
+
+def _gain_positions(version: int, channel_mode: int) -> List[int]:
+    """Bit offsets of every global_gain field within the side info."""
+    channels = 1 if channel_mode == MONO else 2
+    if version == MPEG1:
+        start = 9 + (5 if channels == 1 else 3) + 4 * channels
+        return [start + (granule * channels + ch) * 59 + 21 for granule in range(2) for ch in range(channels)]
+    start = 8 + channels
+    return [start + ch * 63 + 21 for ch in range(channels)]
+
+def adjust_gain(stream: Mp3Stream, steps: int) -> bytes:
+    """
+    Stream frames with every granule's global_gain shifted by ``steps`` (1.5 dB each).
+
+    This is lossless and reversible; silent granules (gain 0) are left as they are.
+    """
+    if not steps:
+        return b"".join(stream.data[o:o + n] for o, n in stream.frames)
+    out = bytearray()
+    side_bytes = _side_info_size(stream.version, stream.channel_mode)
+    positions = _gain_positions(stream.version, stream.channel_mode)
+    total_bits = side_bytes * 8
+    for offset, length in stream.frames:
+        frame = bytearray(stream.data[offset:offset + length])
+        start = 4 + (0 if frame[1] & 1 else 2)
+        side = int.from_bytes(frame[start:start + side_bytes], "big")
+        for bit in positions:
+            shift = total_bits - bit - 8
+            gain = (side >> shift) & 0xFF
+            if gain:
+                side = side & ~(0xFF << shift) | (min(255, max(1, gain + steps)) << shift)
+        frame[start:start + side_bytes] = side.to_bytes(side_bytes, "big")
+        out += frame
+    return bytes(out)
+
+def _biquads(sample_rate: int) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """ITU-R BS.1770 K-weighting (high shelf, then RLB high-pass) designed for any sample rate."""
+    gain_db, q, fc = 3.99984385397, 0.7071752369554193, 1681.974450955533
+    k = np.tan(np.pi * fc / sample_rate)
+    vh = 10 ** (gain_db / 20)
+    vb = vh ** 0.499666774155
+    a0 = 1 + k / q + k * k
+    shelf = (np.array([vh + vb * k / q + k * k, 2 * (k * k - vh), vh - vb * k / q + k * k]) / a0,
+             np.array([1.0, 2 * (k * k - 1) / a0, (1 - k / q + k * k) / a0]))
+
+    q, fc = 0.5003270373253953, 38.13547087613982
+    k = np.tan(np.pi * fc / sample_rate)
+    a0 = 1 + k / q + k * k
+    highpass = (np.array([1.0, -2.0, 1.0]), np.array([1.0, 2 * (k * k - 1) / a0, (1 - k / q + k * k) / a0]))
+    return [shelf, highpass]
+
+def k_weighting_response(sample_rate: int, nfft: int) -> np.ndarray:
+    """Frequency response of the K-weighting filter on an rfft grid of size ``nfft``."""
+    z = np.exp(-1j * np.pi * np.arange(nfft // 2 + 1) / (nfft // 2))
+    response = np.ones(nfft // 2 + 1, dtype=np.complex128)
+    for b, a in _biquads(sample_rate):
+        response *= (b[0] + b[1] * z + b[2] * z * z) / (a[0] + a[1] * z + a[2] * z * z)
+    return response
+
+def k_weight(samples: np.ndarray, sample_rate: int, taps: int = 8192, chunk: int = 1 << 18) -> np.ndarray:
+    """
+    Apply K-weighting to (frames, channels) samples.
+
+    The IIR filter is replaced by its impulse response truncated to ``taps``
+    (it has decayed by far more than the float32 noise floor by then) and
+    applied by FFT overlap-add, so the work is a few large vectorized
+    transforms instead of a per-sample recursion.
+    """
+    impulse = np.fft.irfft(k_weighting_response(sample_rate, 4 * taps))[:taps]
+    nfft = 1 << int(np.ceil(np.log2(chunk + taps - 1)))
+    spectrum = np.fft.rfft(impulse, nfft)[:, None]
+    n = len(samples)
+    out = np.zeros((n + taps - 1, samples.shape[1]), dtype=np.float32)
+    for start in range(0, n, chunk):
+        block = samples[start:start + chunk]
+        filtered = np.fft.irfft(np.fft.rfft(block, nfft, axis=0) * spectrum, nfft, axis=0)
+        stop = min(start + len(block) + taps - 1, len(out))
+        out[start:stop] += filtered[:stop - start]
+    return out[:n]
+
+def integrated_loudness(samples: np.ndarray, sample_rate: int) -> float:
+    """
+    Integrated loudness in LUFS per ITU-R BS.1770-4 (400 ms blocks, 75% overlap, two-stage gating).
+
+    Args:
+        samples: Float samples in [-1, 1], shape (frames,) or (frames, channels); mono and stereo only
+
+    Returns:
+        Loudness in LUFS, or -inf for silence
+    """
+    if samples.ndim == 1:
+        samples = samples[:, None]
+    weighted = k_weight(samples.astype(np.float32, copy=False), sample_rate)
+    hop = int(round(0.1 * sample_rate))
+    hops = len(weighted) // hop
+    if hops < 4:
+        power = np.atleast_1d(np.mean(weighted.astype(np.float64) ** 2, axis=0).sum())
+    else:
+        # Energy per 100 ms hop, then 400 ms blocks as sums of four consecutive hops
+        energy = np.einsum("hsc,hsc->h", weighted[:hops * hop].reshape(hops, hop, -1),
+                           weighted[:hops * hop].reshape(hops, hop, -1), dtype=np.float64)
+        cumulative = np.concatenate([[0.0], np.cumsum(energy)])
+        power = (cumulative[4:] - cumulative[:-4]) / (4 * hop)
+
+    with np.errstate(divide="ignore"):
+        block_loudness = -0.691 + 10 * np.log10(power)
+    gated = power[block_loudness > -70.0]
+    if not gated.size:
+        return float("-inf")
+    relative = -0.691 + 10 * np.log10(gated.mean()) - 10.0
+    gated = power[block_loudness > max(-70.0, relative)]
+    return float(-0.691 + 10 * np.log10(gated.mean()))
+
+def normalization_gain(loudness: float, peak: float, target_lufs: float, ceiling_db: float = -1.0) -> float:
+    """Gain in dB bringing ``loudness`` to the target without pushing the sample peak over the ceiling."""
+    if not np.isfinite(loudness) or peak <= 0:
+        return 0.0
+    return float(min(target_lufs - loudness, ceiling_db - 20 * np.log10(peak)))
+
+def read_pcm(path: Path, sample_rate: Optional[int] = None, channels: Optional[int] = None) -> Tuple[np.ndarray, int]:
+    """
+    Decode an audio file to float32 samples of shape (frames, channels).
+
+    16-bit WAV is read directly; anything else, or a conversion of rate or
+    channel count, goes through pydub (and so ffmpeg).
+
+    Returns:
+        (samples, sample rate)
+    """
+    path = Path(path)
+    if path.suffix.lower() == ".wav":
+        with wave.open(str(path), "rb") as wav:
+            if wav.getsampwidth() == 2 and sample_rate in (None, wav.getframerate()) \
+                    and channels in (None, wav.getnchannels()):
+                samples = np.frombuffer(wav.readframes(wav.getnframes()), dtype="<i2")
+                return (samples.reshape(-1, wav.getnchannels()).astype(np.float32) / 32768.0,
+                        wav.getframerate())
+
+    try:
+        from pydub import AudioSegment
+    except ImportError:
+        raise RuntimeError("pydub library not installed. Run 'pip install pydub'")
+    segment = AudioSegment.from_file(str(path)).set_sample_width(2)
+    if sample_rate:
+        segment = segment.set_frame_rate(sample_rate)
+    if channels:
+        segment = segment.set_channels(channels)
+    samples = np.array(segment.get_array_of_samples(), dtype=np.int16)
+    return samples.reshape(-1, segment.channels).astype(np.float32) / 32768.0, segment.frame_rate
+
+def write_pcm(samples: np.ndarray, sample_rate: int, output_file: Path) -> None:
+    """Encode float samples to the format named by the output suffix."""
+    pcm = (np.clip(samples, -1.0, 1.0) * 32767).astype("<i2")
+    if output_file.suffix.lower() == ".wav":
+        with wave.open(str(output_file), "wb") as wav:
+            wav.setnchannels(pcm.shape[1])
+            wav.setsampwidth(2)
+            wav.setframerate(sample_rate)
+            wav.writeframes(pcm.tobytes())
+        return
+
+    try:
+        from pydub import AudioSegment
+    except ImportError:
+        raise RuntimeError("pydub library not installed. Run 'pip install pydub'")
+    AudioSegment(pcm.tobytes(), frame_rate=sample_rate, sample_width=2, channels=pcm.shape[1]).export(
+        str(output_file), format=output_file.suffix.lstrip(".") or "mp3")
+
+def _measure(path: Path) -> Tuple[float, float]:
+    samples, rate = read_pcm(path)
+    return integrated_loudness(samples, rate), float(np.abs(samples).max(initial=0.0))
+
+def _join_frames(streams: List[Mp3Stream], output_file: Path, gap_ms: int,
+                 target_lufs: Optional[float], files: List[Path]) -> AssemblyReport:
+    loudness, gains = [], []
+    for path in files:
+        if target_lufs is None:
+            loudness.append(None)
+            gains.append(0.0)
+            continue
+        try:
+            level, peak = _measure(path)
+        except Exception as e:
+            # Measuring needs a decoder; joining does not, so keep going at the original level
+            logger.warning(f"Cannot measure loudness of {path.name}, leaving its level as is: {e}")
+            level, peak = None, 0.0
+        loudness.append(level)
+        gains.append(normalization_gain(level, peak, target_lufs) if level is not None else 0.0)
+
+    first = streams[0]
+    gap_frames = int(round(gap_ms / 1000 * first.sample_rate / first.samples_per_frame))
+    silence = silent_frame(first) * gap_frames
+    duration = 0.0
+    tmp = output_file.with_name(f".{output_file.name}.part")
+    try:
+        with open(tmp, "wb") as out:
+            for index, (stream, gain) in enumerate(zip(streams, gains)):
+                if index and silence:
+                    out.write(silence)
+                    duration += gap_frames * first.samples_per_frame / first.sample_rate
+                # Round boosts down so the quantized gain never passes the peak ceiling
+                steps = int(np.floor(gain / GAIN_STEP_DB)) if gain > 0 else int(round(gain / GAIN_STEP_DB))
+                gains[index] = float(steps * GAIN_STEP_DB)
+                out.write(adjust_gain(stream, steps))
+                duration += stream.duration
+        tmp.replace(output_file)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    return AssemblyReport(output_file, "frames", duration, loudness, gains)
+
+def _join_pcm(files: List[Path], output_file: Path, gap_ms: int, target_lufs: Optional[float]) -> AssemblyReport:
+    parts = []
+    sample_rate = channels = None
+    for path in files:
+        samples, rate = read_pcm(path, sample_rate, channels)
+        sample_rate, channels = rate, samples.shape[1]
+        parts.append(samples)
+
+    loudness, gains = [], []
+    for samples in parts:
+        if target_lufs is None:
+            loudness.append(None)
+            gains.append(0.0)
+            continue
+        level = integrated_loudness(samples, sample_rate)
+        loudness.append(level)
+        gains.append(normalization_gain(level, float(np.abs(samples).max(initial=0.0)), target_lufs))
+
+    gap = np.zeros((int(gap_ms * sample_rate / 1000), channels), dtype=np.float32)
+    pieces = []
+    for index, (samples, gain) in enumerate(zip(parts, gains)):
+        if index and len(gap):
+            pieces.append(gap)
+        pieces.append(samples * np.float32(10 ** (gain / 20)) if gain else samples)
+    combined = np.concatenate(pieces)
+    write_pcm(combined, sample_rate, output_file)
+    return AssemblyReport(output_file, "pcm", len(combined) / sample_rate, loudness, gains)
+
+def assemble(files: List[Path], output_file: Path, gap_ms: int = 0,
+             target_lufs: Optional[float] = None) -> Optional[AssemblyReport]:
+    """
+    Concatenate audio files in order with silence between them, optionally loudness-normalizing each.
+
+    When the output is MP3 and every input is an MP3 stream with the same
+    MPEG version, sample rate and channel count, frames are copied as they are:
+    gaps are silent frames and gain is applied through each frame's
+    global_gain field in 1.5 dB steps, so nothing is re-encoded. Otherwise the
+    files are decoded, joined as PCM and encoded once.
+
+    Args:
+        files: Audio files to join, in playback order
+        output_file: Destination file; format is taken from its suffix
+        gap_ms: Milliseconds of silence inserted between consecutive files
+        target_lufs: Integrated loudness each file is brought to, or None to keep levels
+
+    Returns:
+        Report of the assembly, or None if there was nothing to assemble
+    """
+    if not files:
+        return None
+    files = [Path(f) for f in files]
+    output_file = Path(output_file)
+
+    if output_file.suffix.lower() == ".mp3" and all(f.suffix.lower() == ".mp3" for f in files):
+        streams = [parse_mp3(f.read_bytes()) for f in files]
+        if all(streams) and len({s.format() for s in streams}) == 1 and not any(s.crc for s in streams):
+            return _join_frames(streams, output_file, gap_ms, target_lufs, files)
+        logger.info(f"Inputs for {output_file.name} differ in format; re-encoding")
+    return _join_pcm(files, output_file, gap_ms, target_lufs)
+
+def benchmark(minutes: float = 60.0, sample_rate: int = 24000) -> None:
+    """Time loudness measurement and normalization of a synthetic episode."""
+    rng = np.random.default_rng(0)
+    n = int(minutes * 60 * sample_rate)
+    # Noise bursts with pauses, roughly the envelope of speech
+    envelope = np.repeat(rng.uniform(0, 1, n // sample_rate + 1) > 0.3, sample_rate)[:n]
+    samples = (rng.normal(0, 0.1, n) * envelope).astype(np.float32)[:, None]
+
+    started = time.perf_counter()
+    loudness = integrated_loudness(samples, sample_rate)
+    elapsed = time.perf_counter() - started
+    gain = normalization_gain(loudness, float(np.abs(samples).max()), -16.0)
+    normalized = integrated_loudness(samples * np.float32(10 ** (gain / 20)), sample_rate)
+    print(f"{minutes:.0f} min at {sample_rate} Hz: {loudness:.2f} LUFS measured in {elapsed:.2f}s "
+          f"({minutes * 60 / elapsed:.0f}x real time)")
+    print(f"gain {gain:+.2f} dB -> {normalized:.2f} LUFS")
+
+def main():
+    """Join audio files from the command line, measure their loudness, or run the benchmark."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Join audio files with loudness normalization")
+    parser.add_argument("files", nargs="*", type=Path, help="Audio files in playback order")
+    parser.add_argument("-o", "--output", type=Path, help="Output file; format from its suffix")
+    parser.add_argument("--gap-ms", type=int, default=0, help="Silence between files")
+    parser.add_argument("--target-lufs", type=float, help="Normalize each file to this integrated loudness")
+    parser.add_argument("--measure", action="store_true", help="Only print each file's loudness")
+    parser.add_argument("--benchmark", action="store_true", help="Time loudness measurement of an hour of audio")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark()
+        return
+    if not args.files:
+        parser.error("no input files")
+    if args.measure:
+        for path in args.files:
+            loudness, peak = _measure(path)
+            print(f"{path}: {loudness:.2f} LUFS, peak {20 * np.log10(max(peak, 1e-9)):.2f} dBFS")
+        return
+    if not args.output:
+        parser.error("--output is required when joining files")
+
+    started = time.perf_counter()
+    report = assemble(args.files, args.output, args.gap_ms, args.target_lufs)
+    print(f"✅ Wrote {report.output_file} ({report.duration:.1f}s, {report.method}) "
+          f"in {time.perf_counter() - started:.2f}s")
+    for path, loudness, gain in zip(args.files, report.loudness, report.gains_db):
+        if loudness is not None:
+            print(f"  {path.name}: {loudness:.2f} LUFS, gain {gain:+.2f} dB")
+
+if __name__ == "__main__":
+    main()
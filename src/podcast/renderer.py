@@ -0,0 +1,224 @@
+from pathlib import Path
+import threading
+import queue
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Optional, Dict, List, Any, Iterable
+from src.setup.config_manager import ConfigManager
+from src.podcast.assembly import assemble
+
+logger = logging.getLogger("podcast.renderer")
+
+class RateLimiter:
+    """Limits concurrency and request rate for a single TTS provider."""
+
+    def __init__(self, max_concurrent: int = 4, requests_per_minute: Optional[float] = None):
+        """
+        Initialize the rate limiter.
+
+        Args:
+            max_concurrent: Maximum number of requests in flight at once
+            requests_per_minute: Optional ceiling on request starts per minute
+        """
+        self._semaphore = threading.BoundedSemaphore(max(1, int(max_concurrent)))
+        self._interval = 60.0 / requests_per_minute if requests_per_minute else 0.0
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def __enter__(self) -> "RateLimiter":
+        self._semaphore.acquire()
+        if self._interval:
+            with self._lock:
+                now = time.monotonic()
+                slot = max(now, self._next_slot)
+                self._next_slot = slot + self._interval
+            if slot > now:
+                time.sleep(slot - now)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._semaphore.release()
+
+class PodcastRenderer:
+    """Renders podcast segments concurrently and assembles them in script order."""
+
+    def __init__(self, config: ConfigManager, tts_provider, max_workers: Optional[int] = None):
+        """
+        Initialize the renderer.
+
+        Args:
+            config: Configuration providing voices, rate limits and audio settings
+            tts_provider: TTS provider used to synthesize each part
+            max_workers: Optional override for the size of the synthesis pool
+        """
+        self.config = config
+        self.tts_provider = tts_provider
+        self.voices = {k.lower(): v for k, v in (config.get("voices") or {}).items()}
+
+        audio_settings = config.get("audio_settings") or {}
+        self.speaker_gap_ms = int(audio_settings.get("speaker_gap_ms", 400))
+        self.segment_gap_ms = int(audio_settings.get("segment_gap_ms", 1000))
+        # Providers and voices differ in level, so every part is brought to one loudness
+        target = audio_settings.get("target_lufs", -16.0)
+        self.target_lufs = float(target) if target is not None else None
+
+        provider_name = getattr(tts_provider, "name", "default")
+        limits = (config.get("rate_limits") or {}).get(provider_name, {})
+        self.limiter = RateLimiter(
+            max_concurrent=limits.get("max_concurrent", 4),
+            requests_per_minute=limits.get("requests_per_minute")
+        )
+        self.max_workers = max_workers or int(limits.get("max_concurrent", 4))
+
+    def voice_for(self, speaker: str) -> str:
+        """Return the configured voice for a speaker."""
+        try:
+            return self.voices[speaker.lower()]
+        except KeyError:
+            raise ValueError(f"No voice configured for speaker '{speaker}' (see 'voices' in config)")
+
+    def _synthesize(self, job: Dict[str, Any]) -> Optional[Dict]:
+        """Synthesize one part while holding a provider slot."""
+        with self.limiter:
+            return self.tts_provider.generate_speech(job["text"], job["output_file"], job["voice"])
+
+    def render(self, events: Iterable[Dict[str, Any]], output_dir: Path,
+               segment: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Render speaker turns as they are parsed and assemble the episode.
+
+        Args:
+            events: Segment and part events as yielded by ``iter_script``
+            output_dir: Directory receiving per-segment folders and the episode file
+            segment: Optional segment index to render on its own
+
+        Returns:
+            Report with per-segment results, assembled files and timing totals
+        """
+        start_time = time.perf_counter()
+        completed = queue.Queue()
+        states: Dict[int, Dict[str, Any]] = {}
+        outstanding = 0
+        current = None
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for event in events:
+                seg_idx = event["segment_index"]
+                if segment is not None and seg_idx != segment:
+                    continue
+
+                # A new segment header closes the previous one
+                if current is not None and current != seg_idx:
+                    self._close(current, states[current], output_dir)
+                current = seg_idx
+
+                state = self._state(states, event, output_dir)
+                if event["type"] == "part":
+                    job = {
+                        "segment": seg_idx,
+                        "index": event["index"],
+                        "speaker": event["speaker"],
+                        "text": self.tts_provider.prepare_text(event["text"]),
+                        "voice": self.voice_for(event["speaker"]),
+                        "output_file": output_dir / f"segment_{seg_idx}" / f"{event['index']:02d}_{event['speaker'].lower()}.mp3"
+                    }
+                    state["submitted"] += 1
+                    outstanding += 1
+                    future = executor.submit(self._synthesize, job)
+                    future.add_done_callback(lambda f, job=job: completed.put((job, f)))
+
+                # Handle whatever finished while we were parsing
+                while not completed.empty():
+                    self._collect(*completed.get(), states, output_dir)
+                    outstanding -= 1
+
+            for state_idx, state in states.items():
+                self._close(state_idx, state, output_dir)
+
+            while outstanding:
+                self._collect(*completed.get(), states, output_dir)
+                outstanding -= 1
+
+        ordered = [state["file"] for _, state in sorted(states.items()) if state["file"]]
+        # Segments are already normalized part by part, so the episode is only joined
+        episode_file = self._assemble(ordered, output_dir / "episode.mp3", self.segment_gap_ms, None)
+
+        provider_time = sum(r["duration"] for state in states.values() for r in state["results"].values())
+        wall_time = time.perf_counter() - start_time
+
+        return {
+            "segments": {
+                seg_idx: {
+                    "segment": state["segment"],
+                    "parts": [state["results"][i] for i in sorted(state["results"])],
+                    "file": str(state["file"]) if state["file"] else None
+                }
+                for seg_idx, state in sorted(states.items())
+            },
+            "episode": str(episode_file) if episode_file else None,
+            "wall_time": wall_time,
+            "provider_time": provider_time
+        }
+
+    def _state(self, states: Dict[int, Dict], event: Dict, output_dir: Path) -> Dict[str, Any]:
+        """Return the bookkeeping entry for an event's segment, creating it on first sight."""
+        seg_idx = event["segment_index"]
+        if seg_idx not in states:
+            (output_dir / f"segment_{seg_idx}").mkdir(parents=True, exist_ok=True)
+            states[seg_idx] = {
+                "segment": event["segment"],
+                "submitted": 0,
+                "finished": 0,
+                "closed": False,
+                "assembled": False,
+                "results": {},
+                "file": None
+            }
+        return states[seg_idx]
+
+    def _collect(self, job: Dict[str, Any], future, states: Dict[int, Dict], output_dir: Path) -> None:
+        """Record a finished synthesis and assemble its segment if it was the last one."""
+        try:
+            result = future.result()
+        except Exception as e:
+            logger.error(f"Part {job['index']} of segment {job['segment']} failed: {e}")
+            result = None
+
+        state = states[job["segment"]]
+        if result:
+            result["speaker"] = job["speaker"]
+            result["voice"] = job["voice"]
+            result["text"] = job["text"]
+            state["results"][job["index"]] = result
+            print(f"✅ Generated {job['output_file'].name} ({result['size_kb']:.2f}KB in {result['duration']:.2f}s)")
+        else:
+            print(f"❌ Failed {job['output_file'].name}")
+
+        state["finished"] += 1
+        self._maybe_assemble(job["segment"], state, output_dir)
+
+    def _close(self, seg_idx: int, state: Dict[str, Any], output_dir: Path) -> None:
+        """Mark a segment as fully parsed."""
+        if not state["closed"]:
+            state["closed"] = True
+            self._maybe_assemble(seg_idx, state, output_dir)
+
+    def _maybe_assemble(self, seg_idx: int, state: Dict[str, Any], output_dir: Path) -> None:
+        """Join a segment's parts in script order once all of them are done."""
+        if state["assembled"] or not state["closed"] or state["finished"] < state["submitted"]:
+            return
+        state["assembled"] = True
+        files = [Path(state["results"][i]["file"]) for i in sorted(state["results"])]
+        state["file"] = self._assemble(files, output_dir / f"segment_{seg_idx}" / "segment.mp3", self.speaker_gap_ms,
+                                       self.target_lufs)
+
+    def _assemble(self, files: List[Path], output_file: Path, gap_ms: int,
+                  target_lufs: Optional[float]) -> Optional[Path]:
+        """Assemble files, logging rather than raising so rendered parts are kept."""
+        try:
+            report = assemble(files, output_file, gap_ms, target_lufs)
+            return report.output_file if report else None
+        except Exception as e:
+            logger.error(f"Failed to assemble {output_file}: {e}")
+            return None
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Single-pass streaming parser for podcast scripts.
+
+Scripts are markdown with segment headers (``## **[Segment 1: Title]**``),
+emoji-tagged speaker turns (``🎙 **Kynnir:** ...``) that may span several
+lines and paragraphs, and stage directions on their own line (``*(tónlist)*``).
+"""
+import io
+import re
+import time
+from typing import Dict, Iterable, Iterator, List, Union, Any
+
+# One alternative per line kind; the first group that matches names the token
+LINE_PATTERN = re.compile(r"""
+    ^\#{1,6}\s*\*\*\[(?P<segment>[^:\]]+)[^\]]*\]\*\*       # segment header
+  | ^(?P<emoji>[^\w\s*#(\[>-][^\w\s*]*)\s*                   # emoji speaker tag
+     \*\*(?P<speaker>[^*:]+):\*\*\s*(?P<text>.*)$
+  | ^\*\((?P<direction>.*)\)\*\s*$                           # stage direction
+  | ^(?P<heading>\#{1,6}\s.*)$                               # any other heading
+  | ^(?P<rule>(?:-{3,}|\*{3,}|_{3,}))\s*$                    # horizontal rule
+  | ^(?P<blank>\s*)$                                         # paragraph break
+""", re.VERBOSE)
+
+INLINE_DIRECTION = re.compile(r"\s*\*\([^)]*\)\*\s*")
+
+def _lines(source: Union[str, Iterable[str]]) -> Iterable[str]:
+    """Iterate over lines without materializing the whole script."""
+    if isinstance(source, str):
+        return io.StringIO(source)
+    return source
+
+def _clean(paragraphs: List[List[str]]) -> str:
+    """Join a turn's lines into text, dropping inline stage directions."""
+    text = "\n\n".join(" ".join(lines) for lines in paragraphs if lines)
+    return INLINE_DIRECTION.sub(" ", text).strip()
+
+def iter_script(source: Union[str, Iterable[str]]) -> Iterator[Dict[str, Any]]:
+    """
+    Tokenize a podcast script in a single pass.
+
+    Args:
+        source: Script text or any iterable of lines (e.g. an open file)
+
+    Yields:
+        ``{"type": "segment", ...}`` when a segment header is read and
+        ``{"type": "part", ...}`` as soon as each speaker turn is complete.
+        Turns before the first segment header are ignored.
+    """
+    segment_index = -1
+    segment_name = ""
+    part_index = 0
+    speaker = None
+    paragraphs: List[List[str]] = []
+
+    def finish_turn():
+        nonlocal part_index
+        text = _clean(paragraphs)
+        if speaker and text and segment_index >= 0:
+            part_index += 1
+            return {
+                "type": "part",
+                "segment_index": segment_index,
+                "segment": segment_name,
+                "index": part_index - 1,
+                "speaker": speaker,
+                "text": text
+            }
+        return None
+
+    for raw_line in _lines(source):
+        line = raw_line.rstrip("\n")
+        match = LINE_PATTERN.match(line)
+        kind = match.lastgroup if match else None
+
+        if kind == "blank":
+            if speaker and paragraphs[-1]:
+                paragraphs.append([])
+            continue
+
+        if kind is None:
+            # Plain text continues the current turn
+            if speaker:
+                paragraphs[-1].append(line.strip())
+            continue
+
+        part = finish_turn()
+        if part:
+            yield part
+        speaker, paragraphs = None, []
+
+        if match.group("segment") is not None:
+            segment_index += 1
+            segment_name = match.group("segment").strip()
+            part_index = 0
+            yield {"type": "segment", "segment_index": segment_index, "segment": segment_name}
+        elif match.group("speaker") is not None:
+            speaker = match.group("speaker").strip().upper()
+            paragraphs = [[match.group("text").strip()]]
+
+    part = finish_turn()
+    if part:
+        yield part
+
+def iter_parts(source: Union[str, Iterable[str]]) -> Iterator[Dict[str, Any]]:
+    """Yield only the speaker turns of a script."""
+    return (event for event in iter_script(source) if event["type"] == "part")
+
+def extract_segments(source: Union[str, Iterable[str]]) -> List[Dict[str, Any]]:
+    """
+    Parse a whole script into segments.
+
+    Returns:
+        List of ``{"segment": name, "parts": [{"speaker", "text"}, ...]}``
+    """
+    segments = []
+    for event in iter_script(source):
+        if event["type"] == "segment":
+            segments.append({"segment": event["segment"], "parts": []})
+        else:
+            segments[-1]["parts"].append({"speaker": event["speaker"], "text": event["text"]})
+    return segments
+
+def _synthetic_script(turns: int) -> str:
+    """Build a script with multi-paragraph turns for benchmarking."""
+    out = []
+    for i in range(turns):
+        if i % 50 == 0:
+            out.append(f"## **[Segment {i // 50}: Prófun]**\n")
+        if i % 7 == 0:
+            out.append("*(tónlist spilar)*\n")
+        tag = "🎙 **Kynnir:**" if i % 2 == 0 else "👨‍💻 **Gestur:**"
+        out.append(f"{tag} Góðan daginn, þetta er setning númer {i}.\n"
+                   "Hún heldur áfram á næstu línu *(hlær)* og endar hér.\n\n"
+                   "Önnur málsgrein í sama svari.\n\n")
+    return "".join(out)
+
+def benchmark(sizes=(2000, 4000, 8000, 16000, 32000)) -> None:
+    """Show that parse time grows linearly with script length."""
+    print(f"{'turns':>8} {'MB':>7} {'seconds':>9} {'us/turn':>8} {'MB/s':>7}")
+    for turns in sizes:
+        script = _synthetic_script(turns)
+        size_mb = len(script.encode("utf-8")) / 1e6
+        start = time.perf_counter()
+        parsed = sum(1 for _ in iter_parts(script))
+        elapsed = time.perf_counter() - start
+        assert parsed == turns, f"expected {turns} turns, parsed {parsed}"
+        print(f"{turns:>8} {size_mb:>7.2f} {elapsed:>9.3f} {elapsed / turns * 1e6:>8.2f} {size_mb / elapsed:>7.1f}")
+
+def main():
+    """Parse a script and print its structure, or run the benchmark."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Parse a podcast script")
+    parser.add_argument("script", nargs="?", type=str, help="Path to the markdown script")
+    parser.add_argument("--benchmark", action="store_true", help="Run the scaling benchmark")
+    args = parser.parse_args()
+
+    if args.benchmark or not args.script:
+        benchmark()
+        return
+
+    with open(args.script, 'r', encoding='utf-8') as f:
+        for event in iter_script(f):
+            if event["type"] == "segment":
+                print(f"\n[{event['segment_index']}] {event['segment']}")
+            else:
+                print(f"  {event['index']:02d} {event['speaker']}: {event['text'][:70]}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,3 @@
+"""
+Multi-Process Serving Module
+"""
\ No newline at end of file
@@ -0,0 +1,312 @@
+import hashlib
+import heapq
+import hmac
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import Deque, Dict, Iterable, Iterator, Optional, Set
+
+from src.server.metrics import REGISTRY
+from src.server.cancellation import CANCELLED, SAVED, WASTED, Cancelled, CancelToken
+
+logger = logging.getLogger("server.admission")
+
+INTERACTIVE = "interactive"
+BATCH = "batch"
+PRIORITIES = (INTERACTIVE, BATCH)   # dispatch order
+
+QUEUE_WAIT = REGISTRY.histogram("tts_queue_wait_seconds", "Time a TTS request waited for a provider slot",
+                                labels=("priority",))
+SHED = REGISTRY.counter("tts_requests_shed_total", "TTS requests rejected before reaching the provider",
+                        labels=("priority", "reason"))
+RATE_LIMITED = REGISTRY.counter("api_requests_rate_limited_total", "Requests rejected by per-client rate limits")
+
+class Overloaded(Exception):
+    """Raised when a request is shed instead of queued."""
+
+    def __init__(self, reason: str, retry_after: float = 1.0):
+        super().__init__(f"Service overloaded ({reason})")
+        self.reason = reason
+        self.retry_after = retry_after
+
+class TokenBucket:
+    """Classic token bucket: ``rate`` tokens per second up to ``burst``."""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def take(self, now: float, tokens: float = 1.0) -> float:
+        """
+        Take tokens if available.
+
+        Returns:
+            0.0 on success, otherwise seconds until enough tokens will have accrued
+        """
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= tokens:
+            self.tokens -= tokens
+            return 0.0
+        return (tokens - self.tokens) / self.rate if self.rate > 0 else float("inf")
+
+class ClientRateLimiter:
+    """Per-client token buckets; idle clients are forgotten once ``max_clients`` is reached."""
+
+    def __init__(self, rate: float, burst: float, max_clients: int = 10000):
+        """
+        Initialize the limiter.
+
+        Args:
+            rate: Requests per second each client may sustain
+            burst: Requests a client may make at once after being idle
+            max_clients: Buckets kept before least recently seen clients are dropped
+        """
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def check(self, client: str) -> float:
+        """Return 0.0 if the client may proceed, else the suggested retry delay in seconds."""
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            bucket = self._buckets.get(client)
+            if bucket is None:
+                bucket = self._buckets[client] = TokenBucket(self.rate, self.burst)
+                if len(self._buckets) > self.max_clients:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(client)
+            wait = bucket.take(time.monotonic())
+        if wait:
+            RATE_LIMITED.inc()
+        return wait
+
+def match_api_key(presented: str, keys: Iterable[str]) -> Optional[str]:
+    """
+    Compare a presented API key with the configured ones in constant time.
+
+    Returns:
+        A short fingerprint of the matching key, usable as a client identity
+        without keeping the key itself around, or None if none matches
+    """
+    found = None
+    for key in keys:
+        # Every key is compared so timing does not reveal which one matched
+        if hmac.compare_digest(presented.encode("utf-8"), str(key).encode("utf-8")):
+            found = hashlib.sha256(str(key).encode("utf-8")).hexdigest()[:12]
+    return found
+
+class _Waiter:
+    __slots__ = ("priority", "granted", "enqueued", "started")
+
+    def __init__(self, priority: str):
+        self.priority = priority
+        self.granted = False
+        self.enqueued = time.monotonic()
+        self.started = 0.0
+
+class PriorityScheduler:
+    """
+    Admission control in front of a provider shared by live calls and batch work.
+
+    Interactive requests are always dispatched before batch ones, each class has
+    its own concurrency cap under a shared provider cap, the wait queue is bounded,
+    and interactive requests that cannot start before their deadline are shed
+    instead of adding to the backlog.
+    """
+
+    def __init__(self, max_concurrent: int = 4, interactive_concurrency: int = 4,
+                 batch_concurrency: int = 2, max_queue: int = 32, interactive_deadline: float = 1.5):
+        """
+        Initialize the scheduler.
+
+        Args:
+            max_concurrent: Provider calls in flight across both classes
+            interactive_concurrency: Cap on interactive calls in flight
+            batch_concurrency: Cap on batch calls in flight, leaving headroom for live calls
+            max_queue: Waiting requests beyond which new ones are rejected
+            interactive_deadline: Seconds an interactive request may wait for a slot
+        """
+        self.max_concurrent = max_concurrent
+        self.limits = {INTERACTIVE: interactive_concurrency, BATCH: batch_concurrency}
+        self.max_queue = max_queue
+        self.interactive_deadline = interactive_deadline
+        self.running = {p: 0 for p in PRIORITIES}
+        self._active: Set[_Waiter] = set()
+        self.queues: Dict[str, Deque[_Waiter]] = {p: deque() for p in PRIORITIES}
+        # Moving average of provider call time, used to predict queue wait
+        self.service_time = {p: 0.5 for p in PRIORITIES}
+        self._cond = threading.Condition()
+
+    def _dispatch(self) -> None:
+        """Grant free slots to waiters, interactive first. Caller holds the lock."""
+        for priority in PRIORITIES:
+            queue = self.queues[priority]
+            while (queue and sum(self.running.values()) < self.max_concurrent
+                   and self.running[priority] < self.limits[priority]):
+                waiter = queue.popleft()
+                waiter.granted = True
+                waiter.started = time.monotonic()
+                self._active.add(waiter)
+                self.running[priority] += 1
+        self._cond.notify_all()
+
+    def _expected_wait(self, priority: str) -> float:
+        """
+        Rough wait for a new request. Caller holds the lock.
+
+        Busy slots free up as their requests are expected to finish (average
+        service time minus time already spent), then each request queued ahead
+        takes the earliest free slot for one average service time.
+        """
+        ahead = len(self.queues[INTERACTIVE]) + (len(self.queues[BATCH]) if priority == BATCH else 0)
+        slots = max(1, min(self.limits[priority], self.max_concurrent))
+        now = time.monotonic()
+        # The binding cap decides whose slots this request waits for
+        if self.running[priority] >= self.limits[priority]:
+            busy = [w for w in self._active if w.priority == priority]
+        elif sum(self.running.values()) >= self.max_concurrent:
+            busy = list(self._active)
+        else:
+            busy = []
+        free_at = sorted(max(0.0, self.service_time[w.priority] - (now - w.started)) for w in busy)[:slots]
+        free_at += [0.0] * (slots - len(free_at))
+        heapq.heapify(free_at)
+        for _ in range(ahead):
+            heapq.heappush(free_at, heapq.heappop(free_at) + self.service_time[priority])
+        return free_at[0]
+
+    def _shed(self, priority: str, reason: str, retry_after: float) -> Overloaded:
+        SHED.inc(priority, reason)
+        return Overloaded(reason, retry_after)
+
+    @contextmanager
+    def slot(self, priority: str = INTERACTIVE, deadline: Optional[float] = None,
+             cancel: Optional[CancelToken] = None) -> Iterator[None]:
+        """
+        Hold a provider slot for the duration of the block.
+
+        Args:
+            priority: ``interactive`` or ``batch``
+            deadline: Seconds the request may wait; defaults to the interactive
+                deadline for interactive requests and no limit for batch
+            cancel: Token that withdraws the request from the queue when cancelled
+
+        Raises:
+            Overloaded: If the queue is full or the deadline cannot be met
+            Cancelled: If the token is cancelled before a slot is granted
+        """
+        if priority not in self.limits:
+            raise ValueError(f"Unknown priority: {priority}")
+        if deadline is None and priority == INTERACTIVE:
+            deadline = self.interactive_deadline
+
+        waiter = _Waiter(priority)
+        # A cancel wakes the queue so the waiter can leave at once
+        unregister = cancel.on_cancel(self._wake) if cancel else (lambda: None)
+        try:
+            with self._cond:
+                if sum(len(q) for q in self.queues.values()) >= self.max_queue:
+                    raise self._shed(priority, "queue_full", self.service_time[priority])
+                if deadline is not None and self._expected_wait(priority) > deadline:
+                    raise self._shed(priority, "deadline", self._expected_wait(priority))
+
+                self.queues[priority].append(waiter)
+                self._dispatch()
+                expires = None if deadline is None else waiter.enqueued + deadline
+                while not waiter.granted:
+                    if cancel is not None and cancel.cancelled:
+                        self.queues[priority].remove(waiter)
+                        raise Cancelled(cancel.reason)
+                    remaining = None if expires is None else expires - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        self.queues[priority].remove(waiter)
+                        raise self._shed(priority, "deadline", self.service_time[priority])
+                    self._cond.wait(remaining)
+        finally:
+            unregister()
+
+        started = time.monotonic()
+        QUEUE_WAIT.observe(started - waiter.enqueued, priority)
+        try:
+            yield
+        finally:
+            with self._cond:
+                self.running[priority] -= 1
+                self._active.discard(waiter)
+                self.service_time[priority] = 0.8 * self.service_time[priority] + 0.2 * (time.monotonic() - started)
+                self._dispatch()
+
+    def _wake(self) -> None:
+        with self._cond:
+            self._cond.notify_all()
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        with self._cond:
+            return {p: {"running": self.running[p], "queued": len(self.queues[p])} for p in PRIORITIES}
+
+class ScheduledTTS:
+    """
+    TTS provider proxy whose synthesis calls go through a scheduler at a fixed priority.
+
+    Calls given a cancel token are withdrawn from the queue or aborted
+    mid-stream when it fires; the provider time spent on cancelled audio is
+    counted as wasted and the time not spent as saved.
+    """
+
+    def __init__(self, provider, scheduler: PriorityScheduler, priority: str = INTERACTIVE):
+        self.provider = provider
+        self.scheduler = scheduler
+        self.priority = priority
+        self.name = provider.name
+        # Moving average of provider seconds per input character, for estimating avoided work
+        self.seconds_per_char = 0.01
+
+    def synthesize(self, text: str, voice: str, response_format: str = "mp3",
+                   cancel: Optional[CancelToken] = None) -> bytes:
+        if cancel is None:
+            with self.scheduler.slot(self.priority):
+                return self.provider.synthesize(text, voice, response_format=response_format)
+
+        expected = len(text) * self.seconds_per_char
+        started = finished = None
+        try:
+            cancel.raise_if_cancelled()
+            with self.scheduler.slot(self.priority, cancel=cancel):
+                started = time.monotonic()
+                audio = self.provider.synthesize(text, voice, response_format=response_format, cancel=cancel)
+                finished = time.monotonic()
+            if text:
+                self.seconds_per_char = 0.8 * self.seconds_per_char + 0.2 * (finished - started) / len(text)
+            # Audio that finished after the listener went away is never heard
+            cancel.raise_if_cancelled()
+            return audio
+        except Cancelled as e:
+            if started is None:
+                CANCELLED.inc("queued", e.reason)
+                SAVED.inc(e.reason, amount=expected)
+            elif finished is None:
+                elapsed = time.monotonic() - started
+                CANCELLED.inc("in_flight", e.reason)
+                WASTED.inc(e.reason, amount=elapsed)
+                SAVED.inc(e.reason, amount=max(0.0, expected - elapsed))
+            else:
+                CANCELLED.inc("completed", e.reason)
+                WASTED.inc(e.reason, amount=finished - started)
+            raise
+
+    def generate_speech(self, text, output_file, voice):
+        with self.scheduler.slot(self.priority):
+            return self.provider.generate_speech(text, output_file, voice)
+
+    def __getattr__(self, name):
+        # prepare_text, warm_up and settings pass straight through
+        return getattr(self.provider, name)
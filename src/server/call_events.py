@@ -0,0 +1,381 @@
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger("server.call_events")
+
+# Latency histogram edges in seconds: 1 ms to 5 min, about 5% apart
+EDGES = np.geomspace(0.001, 300.0, 241)
+N_BUCKETS = len(EDGES) + 1   # plus underflow and overflow
+HOUR = 3600
+
+OPEN_SUFFIX = ".jsonl.open"
+SEGMENT_SUFFIX = ".jsonl"
+
+class CallEventLog:
+    """
+    Append-only structured log of per-call pipeline events.
+
+    Events are buffered in memory and appended as JSON lines by a background
+    thread to a segment file owned by this process. Segments are sealed (renamed
+    from ``.jsonl.open`` to ``.jsonl``) when they reach ``segment_bytes`` or
+    ``segment_seconds``, and sealed segments are periodically compacted into
+    per-hour latency histograms that queries read instead of the raw lines.
+    """
+
+    def __init__(self, root: Path = Path("logs/call-events"), segment_bytes: int = 16 * 1024 * 1024,
+                 segment_seconds: float = 300.0, flush_interval: float = 1.0,
+                 compact_interval: Optional[float] = 3600.0):
+        """
+        Initialize the log and start its writer thread.
+
+        Args:
+            root: Directory holding segments and summaries
+            segment_bytes: Size at which the current segment is sealed
+            segment_seconds: Age at which the current segment is sealed
+            flush_interval: Seconds between appends of buffered events
+            compact_interval: Seconds between compactions, or None to leave compaction to the CLI
+        """
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.segment_bytes = segment_bytes
+        self.segment_seconds = segment_seconds
+        self.flush_interval = flush_interval
+        self.compact_interval = compact_interval
+
+        self._buffer: List[str] = []
+        self._lock = threading.Lock()
+        self._segment: Optional[Path] = None
+        self._segment_started = 0.0
+        self._last_compaction = time.monotonic()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="call-events", daemon=True)
+        self._thread.start()
+
+    def emit(self, call_id: str, stage: str, provider: str, latency: float, bytes: int = 0,
+             ts: Optional[float] = None) -> None:
+        """Record one event; only buffers, the file write happens on the writer thread."""
+        line = json.dumps({"ts": ts or time.time(), "call": call_id, "stage": stage, "provider": provider,
+                           "latency": round(latency, 6), "bytes": bytes}, ensure_ascii=False)
+        with self._lock:
+            self._buffer.append(line)
+
+    def _seal(self) -> None:
+        if self._segment is not None and self._segment.exists():
+            os.replace(self._segment, self._segment.with_name(self._segment.name[:-len(".open")]))
+        self._segment = None
+
+    def flush(self) -> None:
+        with self._lock:
+            lines, self._buffer = self._buffer, []
+        if lines:
+            if self._segment is None:
+                self._segment_started = time.time()
+                self._segment = self.root / f"events-{int(self._segment_started * 1000)}-{os.getpid()}{OPEN_SUFFIX}"
+            with open(self._segment, "a", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+        if self._segment is not None and (
+                self._segment.stat().st_size >= self.segment_bytes
+                or time.time() - self._segment_started >= self.segment_seconds):
+            self._seal()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+                if self.compact_interval and time.monotonic() - self._last_compaction >= self.compact_interval:
+                    self._last_compaction = time.monotonic()
+                    compact(self.root)
+            except Exception as e:
+                logger.error(f"Call event log write failed: {e}")
+
+    def close(self) -> None:
+        """Flush outstanding events and seal the current segment."""
+        self._stop.set()
+        self._thread.join()
+        self.flush()
+        self._seal()
+
+def _sealed_segments(root: Path, stale_seconds: float) -> List[Path]:
+    """Sealed segments, plus open ones left behind by processes that stopped writing."""
+    now = time.time()
+    segments = sorted(root.glob(f"events-*{SEGMENT_SUFFIX}"))
+    segments += [p for p in sorted(root.glob(f"events-*{OPEN_SUFFIX}")) if now - p.stat().st_mtime > stale_seconds]
+    return segments
+
+def read_segments(paths: Iterable[Path], since: float = 0.0) -> Dict[str, np.ndarray]:
+    """Parse segment lines into columns, skipping events before ``since`` and torn lines."""
+    ts, stage, provider, latency, size = [], [], [], [], []
+    for path in paths:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        event = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    if event["ts"] < since:
+                        continue
+                    ts.append(event["ts"])
+                    stage.append(event["stage"])
+                    provider.append(event["provider"])
+                    latency.append(event["latency"])
+                    size.append(event.get("bytes", 0))
+        except FileNotFoundError:
+            # Sealed or compacted while we were listing
+            continue
+    return {
+        "ts": np.asarray(ts, dtype=np.float64),
+        "stage": np.asarray(stage, dtype=object),
+        "provider": np.asarray(provider, dtype=object),
+        "latency": np.asarray(latency, dtype=np.float64),
+        "bytes": np.asarray(size, dtype=np.int64)
+    }
+
+def summarize(events: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """
+    Collapse events into one row per (hour, stage, provider).
+
+    Returns:
+        Columns ``hour``, ``stage``, ``provider``, ``count``, ``latency_sum``,
+        ``bytes_sum`` and ``hist`` (one latency histogram per row)
+    """
+    if not len(events["ts"]):
+        return _empty_summary()
+    hours = (events["ts"] // HOUR * HOUR).astype(np.int64)
+    stages, stage_ids = np.unique(events["stage"].astype(str), return_inverse=True)
+    providers, provider_ids = np.unique(events["provider"].astype(str), return_inverse=True)
+
+    keys = np.stack([hours, stage_ids, provider_ids], axis=1)
+    rows, row_ids = np.unique(keys, axis=0, return_inverse=True)
+    row_ids = row_ids.reshape(-1)
+    buckets = np.searchsorted(EDGES, events["latency"], side="right")
+
+    hist = np.zeros((len(rows), N_BUCKETS), dtype=np.int64)
+    np.add.at(hist, (row_ids, buckets), 1)
+    return {
+        "hour": rows[:, 0],
+        "stage": stages[rows[:, 1]],
+        "provider": providers[rows[:, 2]],
+        "count": hist.sum(axis=1),
+        "latency_sum": np.bincount(row_ids, weights=events["latency"], minlength=len(rows)),
+        "bytes_sum": np.bincount(row_ids, weights=events["bytes"], minlength=len(rows)).astype(np.int64),
+        "hist": hist
+    }
+
+def _empty_summary() -> Dict[str, np.ndarray]:
+    return {
+        "hour": np.zeros(0, dtype=np.int64), "stage": np.zeros(0, dtype=str), "provider": np.zeros(0, dtype=str),
+        "count": np.zeros(0, dtype=np.int64), "latency_sum": np.zeros(0), "bytes_sum": np.zeros(0, dtype=np.int64),
+        "hist": np.zeros((0, N_BUCKETS), dtype=np.int64)
+    }
+
+def _concat(parts: Sequence[Dict[str, np.ndarray]]) -> Dict[str, np.ndarray]:
+    parts = [p for p in parts if len(p["hour"])]
+    if not parts:
+        return _empty_summary()
+    return {key: np.concatenate([p[key] for p in parts]) for key in parts[0]}
+
+def compact(root: Path, stale_seconds: float = 2 * HOUR, keep_raw: bool = False) -> int:
+    """
+    Fold sealed segments into a columnar summary file and remove them.
+
+    A summary lists the segments it was built from, so a compaction that
+    stopped between writing the summary and removing its sources is finished
+    by the next one rather than counted twice.
+
+    Returns:
+        Number of events compacted
+    """
+    root = Path(root)
+    lock = root / "compact.lock"
+    try:
+        fd = os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except FileExistsError:
+        if time.time() - lock.stat().st_mtime < 600:
+            return 0
+        # Left behind by a compaction that died
+        lock.unlink(missing_ok=True)
+        fd = os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    os.close(fd)
+
+    try:
+        done = set()
+        for summary in root.glob("summary-*.npz"):
+            with np.load(summary, allow_pickle=False) as data:
+                done.update(str(s) for s in data["sources"])
+        segments = []
+        for path in _sealed_segments(root, stale_seconds):
+            if path.name in done:
+                path.unlink(missing_ok=True)
+            else:
+                segments.append(path)
+        if not segments:
+            return 0
+
+        events = read_segments(segments)
+        table = summarize(events)
+        if len(events["ts"]):
+            name = f"summary-{int(events['ts'].min())}-{int(events['ts'].max())}-{uuid.uuid4().hex[:8]}.npz"
+            tmp = root / f".{name}.tmp"
+            with open(tmp, "wb") as f:
+                np.savez(f, sources=np.asarray([p.name for p in segments]), **table)
+            os.replace(tmp, root / name)
+
+        for path in segments:
+            if keep_raw:
+                (root / "archive").mkdir(exist_ok=True)
+                os.replace(path, root / "archive" / path.name)
+            else:
+                path.unlink(missing_ok=True)
+        logger.info(f"Compacted {len(events['ts'])} call events from {len(segments)} segments")
+        return len(events["ts"])
+    finally:
+        lock.unlink(missing_ok=True)
+
+def load_summaries(root: Path, since: float = 0.0) -> Dict[str, np.ndarray]:
+    """Summary rows for hours ending after ``since``; files entirely older are not opened."""
+    parts = []
+    for path in Path(root).glob("summary-*.npz"):
+        try:
+            last_ts = int(path.name.split("-")[2])
+        except (IndexError, ValueError):
+            continue
+        if last_ts < since - HOUR:
+            continue
+        with np.load(path, allow_pickle=False) as data:
+            table = {key: data[key] for key in ("hour", "stage", "provider", "count", "latency_sum",
+                                                "bytes_sum", "hist")}
+        keep = table["hour"] + HOUR > since
+        parts.append({key: value[keep] for key, value in table.items()})
+    return _concat(parts)
+
+def percentile_from_hist(hist: np.ndarray, q: float) -> float:
+    """Approximate percentile (0-100) of a latency histogram, interpolating within the bucket."""
+    total = hist.sum()
+    if not total:
+        return float("nan")
+    rank = q / 100.0 * total
+    cumulative = np.cumsum(hist)
+    bucket = int(np.searchsorted(cumulative, rank, side="left"))
+    lower = 0.0 if bucket == 0 else EDGES[min(bucket - 1, len(EDGES) - 1)]
+    upper = EDGES[min(bucket, len(EDGES) - 1)]
+    before = cumulative[bucket - 1] if bucket else 0
+    fraction = (rank - before) / hist[bucket] if hist[bucket] else 0.0
+    # Buckets are log-spaced, so interpolate geometrically except in the underflow bucket
+    if lower > 0:
+        return float(lower * (upper / lower) ** fraction)
+    return float(upper * fraction)
+
+def query(root: Path, stage: str, q: float = 95.0, since: float = 0.0,
+          group_by: str = "provider") -> List[Dict]:
+    """
+    Latency percentile of a stage, grouped by provider (or stage), since a timestamp.
+
+    Compacted data is selected by hour, so the window may start up to an hour
+    early for events that were already compacted; raw segments are filtered exactly.
+
+    Returns:
+        One row per group: group, count, percentile value, mean latency and total bytes
+    """
+    root = Path(root)
+    raw = read_segments(sorted(root.glob(f"events-*{SEGMENT_SUFFIX}")) + sorted(root.glob(f"events-*{OPEN_SUFFIX}")),
+                        since=since)
+    table = _concat([load_summaries(root, since), summarize(raw)])
+    selected = table["stage"] == stage
+    groups = table[group_by][selected]
+    results = []
+    for group in np.unique(groups):
+        rows = selected.copy()
+        rows[selected] = groups == group
+        count = int(table["count"][rows].sum())
+        results.append({
+            group_by: str(group),
+            "count": count,
+            f"p{q:g}": percentile_from_hist(table["hist"][rows].sum(axis=0), q),
+            "mean": float(table["latency_sum"][rows].sum() / count) if count else float("nan"),
+            "bytes": int(table["bytes_sum"][rows].sum())
+        })
+    return sorted(results, key=lambda r: r[group_by])
+
+def parse_window(text: str) -> float:
+    """Seconds in a window such as ``90s``, ``15m``, ``24h`` or ``7d``."""
+    units = {"s": 1, "m": 60, "h": HOUR, "d": 24 * HOUR}
+    if text[-1] in units:
+        return float(text[:-1]) * units[text[-1]]
+    return float(text)
+
+def benchmark(root: Path, events: int = 2_000_000) -> None:
+    """Write synthetic events, compact them and time a day-window percentile query."""
+    rng = np.random.default_rng(0)
+    root.mkdir(parents=True, exist_ok=True)
+    now = time.time()
+    providers = np.array(["openai", "azure", "google"])
+    stages = np.array(["stt", "first_sentence", "first_audio", "total"])
+    ts = now - rng.uniform(0, 2 * 24 * HOUR, events)
+    prov = providers[rng.integers(0, len(providers), events)]
+    stg = stages[rng.integers(0, len(stages), events)]
+    lat = rng.lognormal(mean=-0.5, sigma=0.6, size=events)
+
+    started = time.perf_counter()
+    chunk = 200_000
+    for i in range(0, events, chunk):
+        lines = [json.dumps({"ts": t, "call": "bench", "stage": s, "provider": p, "latency": round(l, 6), "bytes": 0})
+                 for t, s, p, l in zip(ts[i:i + chunk], stg[i:i + chunk], prov[i:i + chunk], lat[i:i + chunk])]
+        (root / f"events-{i}-bench{SEGMENT_SUFFIX}").write_text("\n".join(lines) + "\n", encoding="utf-8")
+    print(f"wrote {events} events in {time.perf_counter() - started:.1f}s")
+
+    started = time.perf_counter()
+    compact(root)
+    print(f"compact: {time.perf_counter() - started:.1f}s")
+
+    started = time.perf_counter()
+    rows = query(root, "first_audio", 95, since=now - 24 * HOUR)
+    print(f"query: {(time.perf_counter() - started) * 1000:.0f} ms")
+    exact = {p: np.percentile(lat[(prov == p) & (stg == "first_audio") & (ts >= now - 24 * HOUR)], 95) for p in providers}
+    for row in rows:
+        print(f"  {row['provider']:<8} n={row['count']:<8} p95={row['p95']:.3f}s (exact {exact[row['provider']]:.3f}s)")
+
+def main():
+    """Query and compact the call event log from the command line."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Structured call event log")
+    parser.add_argument("--root", type=Path, default=Path("logs/call-events"), help="Event log directory")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    q = commands.add_parser("query", help="Latency percentile of a stage per provider")
+    q.add_argument("--stage", default="first_audio", help="Stage to report, e.g. first_audio, stt, total")
+    q.add_argument("-p", "--percentile", type=float, default=95.0, help="Percentile to report, e.g. 50, 95 or 99")
+    q.add_argument("--since", default="24h", help="Window such as 90m, 24h or 7d")
+    q.add_argument("--by", choices=["provider", "stage"], default="provider")
+
+    c = commands.add_parser("compact", help="Fold sealed segments into summaries")
+    c.add_argument("--keep-raw", action="store_true", help="Move compacted segments to archive/ instead of deleting")
+
+    b = commands.add_parser("benchmark", help="Time compaction and a day-window query on synthetic events")
+    b.add_argument("--events", type=int, default=2_000_000)
+    args = parser.parse_args()
+
+    if args.command == "compact":
+        print(f"Compacted {compact(args.root, keep_raw=args.keep_raw)} events")
+    elif args.command == "benchmark":
+        benchmark(args.root, args.events)
+    else:
+        rows = query(args.root, args.stage, args.percentile, time.time() - parse_window(args.since), args.by)
+        if not rows:
+            print(f"No {args.stage} events in the last {args.since}")
+        key = f"p{args.percentile:g}"
+        for row in rows:
+            print(f"{row[args.by]:<16} n={row['count']:<10} {key}={row[key] * 1000:8.0f} ms  "
+                  f"mean={row['mean'] * 1000:8.0f} ms  bytes={row['bytes']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+import logging
+import threading
+from typing import Callable, List, Optional
+
+from src.server.metrics import REGISTRY
+
+logger = logging.getLogger("server.cancellation")
+
+CANCELLED = REGISTRY.counter("tts_cancelled_total", "TTS requests cancelled, by where they were stopped",
+                             labels=("stage", "reason"))
+WASTED = REGISTRY.counter("tts_wasted_synthesis_seconds_total",
+                          "Provider seconds spent on audio that was cancelled before anyone heard it",
+                          labels=("reason",))
+SAVED = REGISTRY.counter("tts_saved_synthesis_seconds_total",
+                         "Estimated provider seconds avoided by cancelling queued or in-flight syntheses",
+                         labels=("reason",))
+
+class Cancelled(Exception):
+    """Raised when work is abandoned because its caller went away or was interrupted."""
+
+    def __init__(self, reason: str = "cancelled"):
+        super().__init__(f"Cancelled ({reason})")
+        self.reason = reason
+
+class CancelToken:
+    """
+    Thread-safe cancellation flag shared by everything working on one request.
+
+    Blocking operations register callbacks with ``on_cancel`` that unblock
+    them (closing a provider HTTP stream, waking a scheduler queue), so a
+    cancel takes effect immediately instead of at the next check.
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks: List[Callable[[], None]] = []
+        self.reason: Optional[str] = None
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self, reason: str = "cancelled") -> bool:
+        """
+        Cancel the request and run the registered callbacks.
+
+        Returns:
+            False if it was already cancelled
+        """
+        with self._lock:
+            if self._event.is_set():
+                return False
+            self.reason = reason
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.debug(f"Cancel callback failed: {e}")
+        return True
+
+    def on_cancel(self, callback: Callable[[], None]) -> Callable[[], None]:
+        """
+        Run ``callback`` when the token is cancelled, or right away if it already is.
+
+        Returns:
+            A function that unregisters the callback
+        """
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return lambda: self._discard(callback)
+        callback()
+        return lambda: None
+
+    def _discard(self, callback: Callable[[], None]) -> None:
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+    def raise_if_cancelled(self) -> None:
+        if self._event.is_set():
+            raise Cancelled(self.reason)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._event.wait(timeout)
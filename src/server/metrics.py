@@ -0,0 +1,102 @@
+import bisect
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Seconds; spans cache hits through slow provider calls
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{v}"' for n, v in zip(names, values)) + "}"
+
+class Counter:
+    """Monotonic counter, optionally split by label values."""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name, self.help, self.label_names = name, help, tuple(labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, *labels: str) -> float:
+        with self._lock:
+            return self._values.get(labels, 0.0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.label_names, labels)} {value:g}")
+        return lines
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus text format."""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name, self.help, self.label_names = name, help, tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], List[float]] = {}   # bucket counts + [sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str) -> None:
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0.0] * (len(self.buckets) + 2)
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def count(self, *labels: str) -> int:
+        with self._lock:
+            series = self._series.get(labels)
+            return int(series[-1]) if series else 0
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, series in sorted(self._series.items()):
+                cumulative = 0.0
+                for bound, hits in zip(self.buckets, series):
+                    cumulative += hits
+                    lines.append(f"{self.name}_bucket{_labels(self.label_names + ('le',), labels + (f'{bound:g}',))} {cumulative:g}")
+                lines.append(f"{self.name}_bucket{_labels(self.label_names + ('le',), labels + ('+Inf',))} {series[-1]:g}")
+                lines.append(f"{self.name}_sum{_labels(self.label_names, labels)} {series[-2]:g}")
+                lines.append(f"{self.name}_count{_labels(self.label_names, labels)} {series[-1]:g}")
+        return lines
+
+class Registry:
+    """Collection of metrics exposed together on ``/metrics``."""
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, help: str, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help, **kwargs)
+            return metric
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, help, labels=labels)
+
+    def histogram(self, name: str, help: str, labels: Sequence[str] = (),
+                  buckets: Optional[Sequence[float]] = None) -> Histogram:
+        return self._get_or_create(Histogram, name, help, labels=labels, buckets=buckets or DEFAULT_BUCKETS)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(line for metric in metrics for line in metric.render()) + "\n"
+
+# Process-wide registry
+REGISTRY = Registry()
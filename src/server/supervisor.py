@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Pre-forking supervisor for the Halloisland API.
+
+Binds the listening socket and creates the shared audio cache once, then forks
+uvicorn workers that all accept on that socket and read and write that cache.
+SIGHUP rolls the workers: a fresh generation is started (re-reading config.json)
+and the old one drains in-flight requests before exiting. SIGTERM/SIGINT drain
+everything and exit.
+"""
+import argparse
+import importlib
+import logging
+import os
+import signal
+import socket
+import time
+from typing import Dict
+
+from src.setup.config_manager import ConfigManager
+from src.voice import shared_cache
+from src.voice.shared_cache import SharedAudioCache
+
+logger = logging.getLogger("server.supervisor")
+
+class Supervisor:
+    """Runs and replaces a pool of forked uvicorn workers sharing one socket and one audio cache."""
+
+    def __init__(self, app: str = "api:app", workers: int = 0, host: str = "0.0.0.0", port: int = 80,
+                 cache_mb: int = 256, drain_seconds: float = 30.0):
+        """
+        Initialize the supervisor.
+
+        Args:
+            app: Application in ``module:attribute`` form
+            workers: Worker processes; defaults to the CPU count
+            host: Interface to bind
+            port: Port to bind
+            cache_mb: Size of the shared audio cache
+            drain_seconds: Time a stopping worker gets to finish in-flight requests
+        """
+        self.app = app
+        self.workers = workers or os.cpu_count() or 1
+        self.host = host
+        self.port = port
+        self.cache_mb = cache_mb
+        self.drain_seconds = drain_seconds
+        self.generation = 0
+        self.children: Dict[int, int] = {}   # pid -> generation
+        self._reload = False
+        self._stopping = False
+
+    def _bind(self) -> socket.socket:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((self.host, self.port))
+        sock.listen(2048)
+        sock.set_inheritable(True)
+        return sock
+
+    def _spawn(self, sock: socket.socket) -> int:
+        pid = os.fork()
+        if pid:
+            self.children[pid] = self.generation
+            return pid
+
+        # Worker: default signal handling so uvicorn can install its own graceful shutdown
+        for signum in (signal.SIGHUP, signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, signal.SIG_DFL)
+        import uvicorn
+        config = uvicorn.Config(self.app, lifespan="on", timeout_graceful_shutdown=int(self.drain_seconds))
+        code = 0
+        try:
+            uvicorn.Server(config).run(sockets=[sock])
+        except Exception as e:
+            logger.error(f"Worker {os.getpid()} failed: {e}")
+            code = 1
+        os._exit(code)
+
+    def _signal(self, signum, frame) -> None:
+        if signum == signal.SIGHUP:
+            self._reload = True
+        else:
+            self._stopping = True
+
+    def _stop(self, pids, deadline: float) -> None:
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        while any(pid in self.children for pid in pids) and time.monotonic() < deadline:
+            self._reap()
+            time.sleep(0.1)
+        for pid in [p for p in pids if p in self.children]:
+            logger.warning(f"Worker {pid} did not drain in time, killing it")
+            os.kill(pid, signal.SIGKILL)
+        self._reap(block=True, pids=pids)
+
+    def _reap(self, block: bool = False, pids=None) -> None:
+        for pid in list(pids if pids is not None else self.children):
+            if pid not in self.children:
+                continue
+            try:
+                done, status = os.waitpid(pid, 0 if block else os.WNOHANG)
+            except ChildProcessError:
+                done, status = pid, 0
+            if done:
+                generation = self.children.pop(pid)
+                if generation == self.generation and not self._stopping:
+                    logger.warning(f"Worker {pid} exited with status {status}, restarting")
+                    self._spawn(self._sock)
+
+    def run(self) -> None:
+        """Serve until SIGTERM or SIGINT."""
+        self._sock = self._bind()
+        cache = SharedAudioCache(max_bytes=self.cache_mb * 1024 * 1024)
+        shared_cache.install(cache)
+
+        # Import the app once so workers share its code pages copy-on-write
+        importlib.import_module(self.app.split(":")[0])
+
+        for signum in (signal.SIGHUP, signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, self._signal)
+
+        for _ in range(self.workers):
+            self._spawn(self._sock)
+        logger.info(f"Serving {self.app} on {self.host}:{self.port} with {self.workers} workers "
+                    f"and a {self.cache_mb} MB shared audio cache")
+
+        try:
+            while not self._stopping:
+                if self._reload:
+                    self._reload = False
+                    old = [pid for pid, gen in self.children.items() if gen == self.generation]
+                    self.generation += 1
+                    logger.info(f"Reload: starting worker generation {self.generation}, draining {len(old)} workers")
+                    for _ in range(self.workers):
+                        self._spawn(self._sock)
+                    self._stop(old, time.monotonic() + self.drain_seconds)
+                self._reap()
+                time.sleep(0.5)
+        finally:
+            logger.info("Shutting down, draining workers")
+            self._stopping = True
+            self._stop(list(self.children), time.monotonic() + self.drain_seconds)
+            self._sock.close()
+            shared_cache.install(None)
+            cache.close(unlink=True)
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the Halloisland API with pre-forked workers")
+    parser.add_argument("--app", default="api:app", help="Application as module:attribute")
+    parser.add_argument("--workers", type=int, default=0, help="Worker processes (default: CPU count)")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "80")))
+    parser.add_argument("--cache-mb", type=int, help="Shared audio cache size (default: audio_cache.max_mb)")
+    parser.add_argument("--drain-seconds", type=float, default=30.0,
+                        help="Time workers get to finish in-flight requests when stopping")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    cache_mb = args.cache_mb or int((ConfigManager().get("audio_cache") or {}).get("max_mb", 256))
+    Supervisor(args.app, args.workers, args.host, args.port, cache_mb, args.drain_seconds).run()
+
+if __name__ == "__main__":
+    main()
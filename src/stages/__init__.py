@@ -0,0 +1,3 @@
+"""
+Memoized Stage Runner Module
+"""
\ No newline at end of file
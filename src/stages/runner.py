@@ -0,0 +1,142 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+logger = logging.getLogger("stages.runner")
+
+@dataclass
+class Stage:
+    """One unit of work with declared inputs and outputs."""
+
+    name: str
+    func: Callable[..., Any]
+    inputs: List[Path] = field(default_factory=list)       # files or directories whose contents key the memo
+    params: Dict[str, Any] = field(default_factory=dict)   # JSON-serializable arguments, also part of the key
+    outputs: List[Path] = field(default_factory=list)      # must all exist for a memoized result to be reused
+    deps: List[str] = field(default_factory=list)          # stages that must finish first; their results key the memo
+    memoize: bool = True
+    expand: Optional[Callable[[Any], Iterable["Stage"]]] = None  # stages to add once this one's result is known
+
+def _hash_path(digest: "hashlib._Hash", path: Path) -> None:
+    """Fold a file or directory tree into a digest by path, size and mtime."""
+    path = Path(path)
+    if not path.exists():
+        digest.update(f"{path}:missing".encode())
+        return
+    files = sorted(p for p in path.rglob("*") if p.is_file()) if path.is_dir() else [path]
+    for file in files:
+        stat = file.stat()
+        digest.update(f"{file}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+
+class StageRunner:
+    """
+    Runs stages in dependency order, concurrently where possible, skipping any
+    stage whose inputs, parameters and upstream results are unchanged since its
+    last successful run.
+    """
+
+    def __init__(self, cache_dir: Path = Path(".stage_cache"), workers: int = 4):
+        """
+        Initialize the runner.
+
+        Args:
+            cache_dir: Where memoized stage results are kept
+            workers: Stages run concurrently
+        """
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.workers = workers
+        self.stages: Dict[str, Stage] = {}
+        self.results: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, stage: Stage) -> Stage:
+        if stage.name in self.stages:
+            raise ValueError(f"Duplicate stage: {stage.name}")
+        self.stages[stage.name] = stage
+        return stage
+
+    def fingerprint(self, stage: Stage) -> str:
+        digest = hashlib.sha256(stage.name.encode())
+        digest.update(json.dumps(stage.params, sort_keys=True, default=str).encode())
+        for path in stage.inputs:
+            _hash_path(digest, path)
+        for dep in stage.deps:
+            digest.update(self.results[dep]["fingerprint"].encode())
+            digest.update(json.dumps(self.results[dep]["result"], sort_keys=True, default=str).encode())
+        return digest.hexdigest()
+
+    def _memo_path(self, stage: Stage) -> Path:
+        safe = "".join(c if c.isalnum() or c in "-_." else "_" for c in stage.name)
+        return self.cache_dir / f"{safe}.json"
+
+    def _run_stage(self, stage: Stage, force: bool) -> Dict[str, Any]:
+        started = time.perf_counter()
+        key = self.fingerprint(stage)
+        memo_path = self._memo_path(stage)
+
+        if stage.memoize and not force and memo_path.exists():
+            try:
+                memo = json.loads(memo_path.read_text(encoding="utf-8"))
+                if memo["fingerprint"] == key and all(Path(p).exists() for p in stage.outputs):
+                    return {"status": "cached", "result": memo["result"], "fingerprint": key,
+                            "seconds": time.perf_counter() - started}
+            except (json.JSONDecodeError, KeyError):
+                pass
+
+        result = stage.func(**stage.params)
+
+        if stage.memoize:
+            tmp = memo_path.with_suffix(".tmp")
+            tmp.write_text(json.dumps({"fingerprint": key, "result": result}, default=str), encoding="utf-8")
+            os.replace(tmp, memo_path)
+        return {"status": "ran", "result": result, "fingerprint": key, "seconds": time.perf_counter() - started}
+
+    def run(self, force: bool = False) -> Dict[str, Dict[str, Any]]:
+        """
+        Run every registered stage, including stages added by ``expand``.
+
+        Returns:
+            Per-stage status (``ran``, ``cached``, ``failed`` or ``skipped``), result and seconds
+        """
+        pending = dict(self.stages)
+        running = {}
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            while pending or running:
+                # Start everything whose dependencies are settled
+                for name, stage in list(pending.items()):
+                    states = [self.results.get(dep, {}).get("status") for dep in stage.deps]
+                    if any(s in ("failed", "skipped") for s in states):
+                        self.results[name] = {"status": "skipped", "result": None, "fingerprint": "", "seconds": 0.0}
+                        del pending[name]
+                    elif all(s in ("ran", "cached") for s in states):
+                        running[executor.submit(self._run_stage, stage, force)] = stage
+                        del pending[name]
+
+                if not running:
+                    missing = {dep for s in pending.values() for dep in s.deps if dep not in self.stages}
+                    raise ValueError(f"Stages cannot run; unknown or circular dependencies: {sorted(missing) or sorted(pending)}")
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    stage = running.pop(future)
+                    try:
+                        self.results[stage.name] = future.result()
+                    except Exception as e:
+                        logger.error(f"Stage {stage.name} failed: {e}")
+                        self.results[stage.name] = {"status": "failed", "result": None, "fingerprint": "",
+                                                    "seconds": 0.0, "error": str(e)}
+                        continue
+                    if stage.expand:
+                        for new_stage in stage.expand(self.results[stage.name]["result"]):
+                            pending[self.add(new_stage).name] = new_stage
+
+        return self.results
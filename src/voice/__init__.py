@@ -0,0 +1,3 @@
+"""
+Voice Processing Module
+"""
\ No newline at end of file
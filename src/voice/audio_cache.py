@@ -0,0 +1,58 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+def cache_key(text: str, voice: str, provider: str, response_format: str = "mp3") -> str:
+    """Stable key for one rendering of a text."""
+    payload = json.dumps([provider, voice, response_format, text], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class AudioCache:
+    """Thread-safe in-process LRU cache of synthesized audio, bounded by total bytes."""
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024):
+        """
+        Initialize the audio cache.
+
+        Args:
+            max_bytes: Total audio size kept before least recently used entries are evicted
+        """
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            data = self._entries.get(key)
+            if data is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return data
+
+    def set(self, key: str, data: bytes) -> None:
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous)
+            self._entries[key] = data
+            self._size += len(data)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._size, "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,129 @@
+import logging
+import os
+import re
+import tempfile
+import time
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+MEDIA_TYPES = {"mp3": "audio/mpeg", "wav": "audio/wav"}
+KEY_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+# A hit refreshes a file's mtime at most this often, so reads rarely write metadata
+TOUCH_INTERVAL = 3600
+# Temp files this old belong to writes that never finished
+STALE_TMP_SECONDS = 3600
+
+logger = logging.getLogger("voice.audio_store")
+
+class AudioStore:
+    """
+    Content-addressed audio on disk; a file never changes once written under its key.
+
+    A file's mtime records when it was last served, so ``evict`` can drop the
+    least recently used renders once the store outgrows its budget.
+    """
+
+    def __init__(self, root: Path, max_bytes: Optional[int] = None, max_age: Optional[float] = None,
+                 low_watermark: float = 0.9):
+        """
+        Initialize the store.
+
+        Args:
+            root: Directory holding the audio, fanned out by the first two key characters
+            max_bytes: Size above which ``evict`` removes least recently used files
+            max_age: Seconds after its last use that ``evict`` removes a file
+            low_watermark: Fraction of ``max_bytes`` that eviction brings the store down to
+        """
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.low_watermark = low_watermark
+
+    @staticmethod
+    def valid(key: str, ext: str) -> bool:
+        return bool(KEY_PATTERN.match(key)) and ext in MEDIA_TYPES
+
+    def path_for(self, key: str, ext: str) -> Path:
+        if not self.valid(key, ext):
+            raise ValueError(f"Invalid audio key: {key}.{ext}")
+        return self.root / key[:2] / f"{key}.{ext}"
+
+    def get(self, key: str, ext: str) -> Optional[Path]:
+        """Path of a stored render, or None; marks the render as used."""
+        path = self.path_for(key, ext)
+        try:
+            if path.stat().st_mtime < time.time() - TOUCH_INTERVAL:
+                os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def put(self, key: str, ext: str, data: bytes) -> Path:
+        """Store a render atomically; an existing file for the key is kept as is."""
+        path = self.path_for(key, ext)
+        if path.exists():
+            return path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+        return path
+
+    def _scan(self) -> List[Tuple[float, int, Path]]:
+        """(last use, size, path) of every stored render; removes abandoned temp files."""
+        files = []
+        stale = time.time() - STALE_TMP_SECONDS
+        for shard in os.scandir(self.root):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                try:
+                    stat = entry.stat()
+                    if entry.name.endswith(".tmp"):
+                        if stat.st_mtime < stale:
+                            os.unlink(entry.path)
+                        continue
+                except FileNotFoundError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, Path(entry.path)))
+        return files
+
+    def evict(self) -> List[str]:
+        """
+        Remove renders unused for longer than ``max_age``, then the least recently
+        used ones while the store is larger than ``max_bytes``.
+
+        Returns:
+            Keys of the removed renders, e.g. to drop them from the render catalog
+        """
+        if not self.max_bytes and not self.max_age:
+            return []
+        files = sorted(self._scan())
+        total = sum(size for _, size, _ in files)
+        cutoff = time.time() - self.max_age if self.max_age else None
+        target = self.max_bytes * self.low_watermark if self.max_bytes and total > self.max_bytes else None
+
+        evicted = []
+        for used, size, path in files:
+            expired = cutoff is not None and used < cutoff
+            if not expired and (target is None or total <= target):
+                break
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            total -= size
+            evicted.append(path.stem)
+        if evicted:
+            logger.info(f"Evicted {len(evicted)} renders from {self.root}, {total / 1e6:.1f} MB left")
+        return evicted
+
+    @staticmethod
+    def url(key: str, ext: str) -> str:
+        return f"/api/audio/{key}.{ext}"
@@ -0,0 +1,414 @@
+#!/usr/bin/env python3
+"""
+Icelandic text normalization for speech synthesis.
+
+Rewrites numbers, dates, times, currency, phone numbers, kennitala and common abbreviations
+into words and canonicalizes whitespace and punctuation, so that equivalent
+inputs share one cache key and every provider reads them the same way.
+"""
+import re
+import time
+import unicodedata
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+CASES = ("nf", "þf", "þgf", "ef")
+
+# Numbers 1-4 agree with the counted noun in gender and case
+SMALL = {
+    1: {"kk": ("einn", "einn", "einum", "eins"),
+        "kvk": ("ein", "eina", "einni", "einnar"),
+        "hk": ("eitt", "eitt", "einu", "eins")},
+    2: {"kk": ("tveir", "tvo", "tveimur", "tveggja"),
+        "kvk": ("tvær", "tvær", "tveimur", "tveggja"),
+        "hk": ("tvö", "tvö", "tveimur", "tveggja")},
+    3: {"kk": ("þrír", "þrjá", "þremur", "þriggja"),
+        "kvk": ("þrjár", "þrjár", "þremur", "þriggja"),
+        "hk": ("þrjú", "þrjú", "þremur", "þriggja")},
+    4: {"kk": ("fjórir", "fjóra", "fjórum", "fjögurra"),
+        "kvk": ("fjórar", "fjórar", "fjórum", "fjögurra"),
+        "hk": ("fjögur", "fjögur", "fjórum", "fjögurra")},
+}
+UNITS = (None, None, None, None, None, "fimm", "sex", "sjö", "átta", "níu", "tíu", "ellefu", "tólf",
+         "þrettán", "fjórtán", "fimmtán", "sextán", "sautján", "átján", "nítján")
+TENS = (None, None, "tuttugu", "þrjátíu", "fjörutíu", "fimmtíu", "sextíu", "sjötíu", "áttatíu", "níutíu")
+
+HUNDRAD = (("hundrað", "hundrað", "hundraði", "hundraðs"), ("hundruð", "hundruð", "hundruðum", "hundraða"))
+THUSUND = (("þúsund", "þúsund", "þúsund", "þúsunds"), ("þúsund", "þúsund", "þúsundum", "þúsunda"))
+MILLJON = (("milljón", "milljón", "milljón", "milljónar"), ("milljónir", "milljónir", "milljónum", "milljóna"))
+
+# Accusative ordinals as used in dates ("fjórtánda mars"); with the tens, every 1-99 can be formed
+DATE_ORDINALS = {
+    1: "fyrsta", 2: "annan", 3: "þriðja", 4: "fjórða", 5: "fimmta", 6: "sjötta", 7: "sjöunda",
+    8: "áttunda", 9: "níunda", 10: "tíunda", 11: "ellefta", 12: "tólfta", 13: "þrettánda",
+    14: "fjórtánda", 15: "fimmtánda", 16: "sextánda", 17: "sautjánda", 18: "átjánda",
+    19: "nítjánda", 20: "tuttugasta", 30: "þrítugasta", 40: "fertugasta", 50: "fimmtugasta",
+    60: "sextugasta", 70: "sjötugasta", 80: "áttugasta", 90: "nítugasta",
+}
+
+MONTHS = ("janúar", "febrúar", "mars", "apríl", "maí", "júní", "júlí", "ágúst",
+          "september", "október", "nóvember", "desember")
+MONTH_ABBREVIATIONS = {
+    "jan": "janúar", "feb": "febrúar", "mar": "mars", "apr": "apríl", "jún": "júní", "júl": "júlí",
+    "ág": "ágúst", "ágú": "ágúst", "sep": "september", "sept": "september", "okt": "október",
+    "nóv": "nóvember", "des": "desember",
+}
+
+ABBREVIATIONS = {
+    "t.d.": "til dæmis",
+    "o.s.frv.": "og svo framvegis",
+    "þ.e.a.s.": "það er að segja",
+    "þ.e.": "það er",
+    "m.a.": "meðal annars",
+    "o.fl.": "og fleira",
+    "u.þ.b.": "um það bil",
+    "m.t.t.": "með tilliti til",
+    "sbr.": "samanber",
+    "skv.": "samkvæmt",
+    "ca.": "sirka",
+    "nr.": "númer",
+    "kl.": "klukkan",
+    "klst.": "klukkustundir",
+    "mín.": "mínútur",
+    "dags.": "dagsett",
+    "ehf.": "einkahlutafélag",
+    "hf.": "hlutafélag",
+    "gr.": "grein",
+    "mgr.": "málsgrein",
+    "Rvk.": "Reykjavík",
+}
+
+# Word form following a number -> (gender, case) of the counted noun
+NOUN_FORMS = {}
+for _gender, _forms in (
+    ("kvk", {"nf": "króna krónur mínúta mínútur klukkustund klukkustundir vika vikur sekúndur evra evrur milljónir",
+             "þf": "krónu mínútu klukkustund viku sekúndu evru milljón",
+             "þgf": "krónum mínútum klukkustundum vikum sekúndum evrum milljónum",
+             "ef": "króna mínútna klukkustunda vikna sekúndna"}),
+    ("kk", {"nf": "dagur dagar mánuður mánuðir metrar kílómetrar menn gestir dollari dollarar",
+            "þgf": "dögum mánuðum metrum kílómetrum mönnum gestum dollurum",
+            "ef": "daga mánaða manna gesta"}),
+    ("hk", {"nf": "ár börn stig hús herbergi prósent skipti sæti",
+            "þgf": "árum börnum stigum húsum herbergjum sætum",
+            "ef": "ára barna stiga húsa herbergja sæta"}),
+):
+    for _case, _words in _forms.items():
+        for _word in _words.split():
+            NOUN_FORMS.setdefault(_word, (_gender, _case))
+
+PREPOSITION_CASES = {
+    "um": "þf", "gegnum": "þf", "kringum": "þf", "umfram": "þf",
+    "frá": "þgf", "af": "þgf", "hjá": "þgf", "úr": "þgf", "að": "þgf", "gegn": "þgf", "með": "þgf",
+    "til": "ef", "milli": "ef", "vegna": "ef", "án": "ef",
+}
+
+CURRENCIES = {
+    "kr": ("kvk", "króna", "krónur"), "isk": ("kvk", "króna", "krónur"), "krónur": ("kvk", "króna", "krónur"),
+    "€": ("kvk", "evra", "evrur"), "eur": ("kvk", "evra", "evrur"),
+    "$": ("kk", "dollari", "dollarar"), "usd": ("kk", "dollari", "dollarar"),
+}
+
+NUMBER = r"\d{1,3}(?:\.\d{3})+|\d+"
+DECIMAL = rf"(?:{NUMBER})(?:,\d+)?"
+_month_names = "|".join(MONTHS)
+_month_abbreviations = "|".join(sorted(MONTH_ABBREVIATIONS, key=len, reverse=True))
+_abbreviations = "|".join(re.escape(a) for a in sorted(ABBREVIATIONS, key=len, reverse=True))
+
+# One pass over the text; the first named group that matches selects the rewrite.
+# The leading guard rejects positions inside words and whitespace in one step,
+# so the alternatives only run where a token can start.
+TOKEN_PATTERN = re.compile(rf"""
+    (?=[\d€$+]|(?<!\w)[^\W\d_])
+    (?:
+    (?P<kennitala>\b\d{{6}}-\d{{4}}\b)
+  | (?P<phone>(?<![\w,.+-])(?P<ph_country>\+354\s?)?(?P<ph_number>[4-8]\d{{2}}[ -]\d{{4}})(?![\w-]|[.,]\d))
+  | (?P<numdate>\b(?P<nd_day>\d{{1,2}})\.(?P<nd_month>\d{{1,2}})\.(?P<nd_year>\d{{4}})\b)
+  | (?P<date>\b(?P<d_day>\d{{1,2}})\.\s+(?P<d_month>(?i:{_month_names})|(?i:{_month_abbreviations})\.)
+        (?:\s+(?P<d_year>\d{{4}})\b)?)
+  | (?P<time>\b(?:(?P<t_kl>(?i:kl\.?|klukkan))\s*)?(?P<t_hour>[01]?\d|2[0-3]|24(?=[:.]00))
+        (?:(?(t_kl)[:.]|:)(?P<t_min>[0-5]\d))(?!\d)
+      | \b(?P<tk_kl>(?i:kl\.?|klukkan))\s*(?P<tk_hour>[01]?\d|2[0-4])\b(?![.,:]\d))
+  | (?P<currency_pre>(?P<cp_unit>kr\.?|€|\$)\s?(?P<cp_amount>{DECIMAL})(?!\d))
+  | (?P<currency>(?P<c_amount>{DECIMAL})\s?(?P<c_unit>kr\.?|ISK|EUR|USD|krónur|krónum|króna|€|\$)(?!\w))
+  | (?P<percent>(?P<p_amount>{DECIMAL})\s?%)
+  | (?P<ordinal>(?<![\w,.])(?P<o_num>\d{{1,2}})\.(?=\s+[a-záéíóúýþæöð]))
+  | (?P<abbrev>(?<!\w)(?i:{_abbreviations})(?!\w))
+  | (?P<number>(?<![\w,.])(?P<n_int>{NUMBER})(?:,(?P<n_dec>\d+))?(?!\w|\.\d))
+  | (?P<version>(?<![\w,.])\d+(?:\.\d+)+(?!\w|[.,]\d))
+    )
+""", re.VERBOSE)
+
+QUOTES = {"„": '"', "“": '"', "”": '"', "«": '"', "»": '"', "‚": "'", "‘": "'", "’": "'",
+          "–": "-", "—": "-", " ": " "}
+# A character-class scan is much cheaper than str.translate on non-ASCII text
+QUOTE_PATTERN = re.compile("[" + "".join(QUOTES) + "]")
+SPACE_BEFORE_PUNCT = re.compile(r"\s+([,.;:!?])")
+ELLIPSIS = re.compile(r"\.{3,}")
+WHITESPACE = re.compile(r"\s+")
+NEXT_WORD = re.compile(r"\s*(\w+)")
+PREV_WORD = re.compile(r"(?<!\w)(\w+)\s*$")
+
+def _small(n: int, gender: str, case: str) -> str:
+    if n <= 4:
+        return SMALL[n][gender][CASES.index(case)]
+    return UNITS[n]
+
+def _below_100(n: int, gender: str, case: str) -> List[str]:
+    if n < 20:
+        return [_small(n, gender, case)]
+    tens, units = divmod(n, 10)
+    if units == 0:
+        return [TENS[tens]]
+    return [TENS[tens], "og", _small(units, gender, case)]
+
+def _below_1000(n: int, gender: str, case: str) -> List[str]:
+    hundreds, rest = divmod(n, 100)
+    words = []
+    if hundreds == 1:
+        words.append(HUNDRAD[0][CASES.index(case)])
+    elif hundreds:
+        words += [_small(hundreds, "hk", case), HUNDRAD[1][CASES.index(case)]]
+    if rest:
+        rest_words = _below_100(rest, gender, case)
+        if hundreds and "og" not in rest_words:
+            words.append("og")
+        words += rest_words
+    return words
+
+def _plural_noun(n: int) -> bool:
+    """Icelandic uses the singular after numbers ending in 1, except 11."""
+    return not (n % 10 == 1 and n % 100 != 11)
+
+@lru_cache(maxsize=4096)
+def cardinal(n: int, gender: str = "hk", case: str = "nf") -> str:
+    """
+    Spell out a whole number in Icelandic.
+
+    Args:
+        n: Number to spell out
+        gender: Gender of the counted noun ("kk", "kvk" or "hk")
+        case: Grammatical case ("nf", "þf", "þgf" or "ef")
+    """
+    if n == 0:
+        return "núll"
+    if n >= 10 ** 9:
+        return " ".join(_small(int(d), "hk", "nf") if d != "0" else "núll" for d in str(n))
+
+    millions, rest = divmod(n, 10 ** 6)
+    thousands, rest = divmod(rest, 1000)
+    c = CASES.index(case)
+    groups = []
+    if millions:
+        groups.append(_below_1000(millions, "kvk", case) + [MILLJON[_plural_noun(millions)][c]])
+    if thousands:
+        prefix = ["eitt"] if thousands == 1 and case in ("nf", "þf") else _below_1000(thousands, "hk", case)
+        groups.append(prefix + [THUSUND[thousands > 1][c]])
+    if rest:
+        groups.append(_below_1000(rest, gender, case))
+    if len(groups) > 1 and "og" not in groups[-1]:
+        groups[-1] = ["og"] + groups[-1]
+    return " ".join(word for group in groups for word in group)
+
+def date_ordinal(day: int) -> str:
+    if day in DATE_ORDINALS:
+        return DATE_ORDINALS[day]
+    tens, units = divmod(day, 10)
+    return f"{DATE_ORDINALS[tens * 10]} og {DATE_ORDINALS[units]}"
+
+def year(n: int) -> str:
+    """Years 1100-1999 are read in hundreds ("nítján hundruð níutíu og níu")."""
+    if 1100 <= n <= 1999 and n % 1000 >= 100:
+        centuries, rest = divmod(n, 100)
+        words = f"{cardinal(centuries)} hundruð"
+        if not rest:
+            return words
+        rest_words = cardinal(rest)
+        return f"{words} {rest_words}" if " og " in rest_words else f"{words} og {rest_words}"
+    return cardinal(n)
+
+def _parse_int(digits: str) -> int:
+    return int(digits.replace(".", ""))
+
+def _amount(text: str, gender: str, case: str) -> Tuple[str, int]:
+    """Spell an amount with an optional decimal part; returns words and integer part."""
+    whole, _, decimals = text.partition(",")
+    value = _parse_int(whole)
+    words = cardinal(value, gender, case)
+    if decimals:
+        words += " komma " + " ".join(cardinal(int(d)) for d in decimals)
+    return words, value
+
+def _agreement(source: str, start: int, end: int) -> Tuple[str, str]:
+    """Gender from the noun after a number, case from the noun form or a preceding preposition."""
+    gender, case = "hk", "nf"
+    following = NEXT_WORD.match(source, end)
+    if following:
+        form = NOUN_FORMS.get(following.group(1).lower())
+        if form:
+            gender, case = form
+    # Governing prepositions are short; bound the search instead of scanning from the start
+    preceding = PREV_WORD.search(source, max(0, start - 12), start)
+    if preceding:
+        case = PREPOSITION_CASES.get(preceding.group(1).lower(), case)
+    return gender, case
+
+def _keeps_period(source: str, end: int) -> bool:
+    """Whether an abbreviation's final period also ends the sentence."""
+    rest = source[end:].lstrip()
+    return not rest or rest[0].isupper()
+
+def _clock(hour: str, minute: Optional[str]) -> str:
+    words = cardinal(int(hour))
+    if minute and minute != "00":
+        words += " núll " + cardinal(int(minute[1])) if minute[0] == "0" else " " + cardinal(int(minute))
+    return words
+
+def _rewrite(match: "re.Match") -> str:
+    kind = match.lastgroup
+    source = match.string
+    group = match.group
+
+    if kind == "kennitala":
+        digits = group(kind).replace("-", "")
+        pairs = [digits[i:i + 2] for i in range(0, 10, 2)]
+        return ", ".join(("núll " + cardinal(int(p[1]))) if p[0] == "0" else cardinal(int(p)) for p in pairs)
+
+    if kind == "phone":
+        # Read digit by digit, pausing between the groups
+        groups = re.split(r"[ -]", group("ph_number"))
+        if group("ph_country"):
+            groups.insert(0, "354")
+        words = ", ".join(" ".join(cardinal(int(d)) for d in g) for g in groups)
+        return ("plús " if group("ph_country") else "") + words
+
+    if kind == "numdate":
+        day, month = int(group("nd_day")), int(group("nd_month"))
+        if not (1 <= day <= 31 and 1 <= month <= 12):
+            return group(kind)
+        return f"{date_ordinal(day)} {MONTHS[month - 1]} {year(int(group('nd_year')))}"
+
+    if kind == "date":
+        day = int(group("d_day"))
+        if not 1 <= day <= 31:
+            return group(kind)
+        month = group("d_month").lower()
+        month = MONTH_ABBREVIATIONS.get(month.rstrip("."), month)
+        words = f"{date_ordinal(day)} {month}"
+        if group("d_year"):
+            words += " " + year(int(group("d_year")))
+        return words
+
+    if kind == "time":
+        if group("tk_hour") is not None:
+            kl, words = group("tk_kl"), _clock(group("tk_hour"), None)
+        else:
+            kl, words = group("t_kl"), _clock(group("t_hour"), group("t_min"))
+        if not kl:
+            return words
+        return ("Klukkan " if kl[0].isupper() else "klukkan ") + words
+
+    if kind in ("currency", "currency_pre"):
+        amount = group("c_amount") if kind == "currency" else group("cp_amount")
+        unit = (group("c_unit") if kind == "currency" else group("cp_unit")).rstrip(".")
+        gender, singular, plural = CURRENCIES.get(unit.lower(), CURRENCIES["kr"])
+        case = "þgf" if unit.lower() == "krónum" else _agreement(source, match.start(), match.end())[1]
+        words, value = _amount(amount, gender, case)
+        noun = unit if unit.lower() in ("krónum", "króna") else (plural if _plural_noun(value) or "," in amount else singular)
+        suffix = "." if group(kind).endswith(".") and _keeps_period(source, match.end()) else ""
+        return f"{words} {noun}{suffix}"
+
+    if kind == "percent":
+        return _amount(group("p_amount"), "hk", "nf")[0] + " prósent"
+
+    if kind == "abbrev":
+        text = group(kind)
+        expansion = ABBREVIATIONS.get(text) or ABBREVIATIONS.get(text.lower()) or next(
+            v for k, v in ABBREVIATIONS.items() if k.lower() == text.lower())
+        if text[0].isupper() and not expansion[0].isupper():
+            expansion = expansion[0].upper() + expansion[1:]
+        return expansion + ("." if _keeps_period(source, match.end()) else "")
+
+    if kind == "ordinal":
+        number = int(group("o_num"))
+        if number == 2:
+            gender, case = _agreement(source, match.end(), match.end())
+            return {"kk": "annar", "kvk": "önnur", "hk": "annað"}[gender] if case == "nf" else "annan"
+        return date_ordinal(number) if number else group(kind)
+
+    if kind == "version":
+        return " punktur ".join(" ".join(cardinal(int(d)) for d in part) if len(part) > 1 and part[0] == "0"
+                                else cardinal(int(part)) for part in group(kind).split("."))
+
+    # Plain number: agree with the following noun and any governing preposition
+    gender, case = _agreement(source, match.start(), match.end())
+    value = group("n_int")
+    if len(value) > 1 and value.startswith("0"):
+        return " ".join(cardinal(int(d)) for d in value)
+    if len(value) == 4 and not group("n_dec") and 1100 <= int(value) <= 1999 and (gender, case) == ("hk", "nf"):
+        return year(int(value))
+    return _amount(value + ("," + group("n_dec") if group("n_dec") else ""), gender, case)[0]
+
+def canonicalize(text: str) -> str:
+    """Unicode, quote, dash, ellipsis and whitespace canonicalization."""
+    text = QUOTE_PATTERN.sub(lambda m: QUOTES[m.group()], unicodedata.normalize("NFC", text))
+    text = ELLIPSIS.sub("…", text)
+    text = WHITESPACE.sub(" ", text)
+    return SPACE_BEFORE_PUNCT.sub(r"\1", text).strip()
+
+@lru_cache(maxsize=65536)
+def normalize_text(text: str) -> str:
+    """
+    Normalize Icelandic text for synthesis and cache keys.
+
+    ``"kl. 14:00"``, ``"kl 14"`` and ``"klukkan 14"`` all become
+    ``"klukkan fjórtán"``; ``"1.500 kr."`` becomes
+    ``"eitt þúsund og fimm hundruð krónur"``.
+    """
+    return TOKEN_PATTERN.sub(_rewrite, canonicalize(text))
+
+BENCHMARK_SENTENCES = (
+    "Fundurinn er kl. 14:00 þann 14. mars 2025 í Ráðhúsinu.",
+    "Gjaldið er 1.500 kr. og greiðist t.d. með korti.",
+    "Kennitalan mín er 010190-2939, sími hjá þjónustuveri.",
+    "Opið frá kl 9 til kl. 16.30 alla virka daga.",
+    "Umsóknarfrestur rennur út 01.04.2025 o.s.frv.",
+    "Þetta tekur u.þ.b. 3 vikur og kostar 21 krónu á mínútu.",
+    "Við eigum   „fjögur“ herbergi laus — og 2 hús.",
+    "Verðið hækkaði um 3,5% frá árinu 1999.",
+)
+
+def benchmark(rounds: int = 5000) -> None:
+    """Measure normalization throughput on unique (uncached) and repeated sentences."""
+    unique = [f"{s} Mál nr. {i}." for i in range(rounds) for s in BENCHMARK_SENTENCES]
+
+    normalize_text.cache_clear()
+    start = time.perf_counter()
+    for sentence in unique:
+        normalize_text(sentence)
+    cold = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for sentence in unique:
+        normalize_text(sentence)
+    warm = time.perf_counter() - start
+
+    print(f"{len(unique)} sentences")
+    print(f"cold: {len(unique) / cold:>10.0f} sentences/s")
+    print(f"warm: {len(unique) / warm:>10.0f} sentences/s")
+
+def main():
+    """Normalize text from the command line, or run the benchmark."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Icelandic text normalization")
+    parser.add_argument("text", nargs="*", help="Text to normalize")
+    parser.add_argument("--benchmark", action="store_true", help="Run the throughput benchmark")
+    args = parser.parse_args()
+
+    if args.benchmark or not args.text:
+        benchmark()
+        return
+    print(normalize_text(" ".join(args.text)))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+import logging
+import queue
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from src.chat.client import ChatClient
+from src.chat.context import ConversationContext
+from src.chat.semantic_cache import SemanticCache
+from src.server.call_events import CallEventLog
+from src.server.cancellation import Cancelled, CancelToken
+
+logger = logging.getLogger("voice.pipeline")
+
+RECEPTION_PROMPT = (
+    "You are an AI phone assistant for Reykjavik City Hall, providing friendly, calm, "
+    "and professional responses in Icelandic. Your replies are read aloud, so answer in "
+    "short spoken sentences without lists or markdown."
+)
+
+# Sentence end followed by whitespace and a capitalized word; digits are excluded so
+# Icelandic ordinals ("14. mars") and "kl. 14" do not split
+SENTENCE_END = re.compile(r'(?<=[.!?…])["”»)]?\s+(?=["„“«(]?[A-ZÁÉÍÓÚÝÞÆÖÐ])|\n+')
+
+def iter_sentences(tokens: Iterable[str], min_chars: int = 8) -> Iterator[str]:
+    """
+    Group streamed tokens into sentences as soon as each one is complete.
+
+    Args:
+        tokens: Text fragments in arrival order
+        min_chars: Sentences shorter than this are merged with the next one
+    """
+    buffer = ""
+    for token in tokens:
+        buffer += token
+        while True:
+            match = SENTENCE_END.search(buffer, min_chars)
+            if not match:
+                break
+            sentence = buffer[:match.start()].strip()
+            buffer = buffer[match.end():]
+            if sentence:
+                yield sentence
+    if buffer.strip():
+        yield buffer.strip()
+
+class SpeechPipeline:
+    """Speech-to-speech turn: STT, then streamed LLM reply, then sentence-chunked TTS."""
+
+    def __init__(self, stt_provider, chat_client: ChatClient, tts_provider, voice: str,
+                 system_prompt: str = RECEPTION_PROMPT, context: Optional[ConversationContext] = None,
+                 max_parallel_tts: int = 3, answer_cache: Optional[SemanticCache] = None,
+                 events: Optional[CallEventLog] = None):
+        """
+        Initialize the pipeline.
+
+        Args:
+            stt_provider: Provider used to transcribe the caller's audio
+            chat_client: Client streaming the assistant's reply
+            tts_provider: Provider synthesizing each reply sentence
+            voice: Default assistant voice
+            system_prompt: Instruction for the chat model
+            context: Optional token-budgeted conversation context
+            max_parallel_tts: Sentences synthesized concurrently
+            answer_cache: Optional cache answering repeated opening questions
+            events: Optional call event log receiving each turn's stage latencies
+        """
+        self.stt = stt_provider
+        self.chat = chat_client
+        self.tts = tts_provider
+        self.voice = voice
+        self.system_prompt = system_prompt
+        self.context = context
+        self.answer_cache = answer_cache
+        self.events = events
+        # Cancel tokens of the turns in progress, by call id, for barge-in
+        self._turns: Dict[str, CancelToken] = {}
+        self._turns_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_parallel_tts, thread_name_prefix="pipeline-tts")
+        # Storing answers embeds the question; a slow embedding must not hold a TTS worker
+        self._cache_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="answer-cache")
+
+    def _messages(self, history: List[Dict], transcript: str) -> List[Dict]:
+        turns = list(history) + [{"role": "user", "content": transcript}]
+        if self.context:
+            return self.context.build(self.system_prompt, turns)
+        return [{"role": "system", "content": self.system_prompt}] + turns
+
+    @property
+    def _cache_scope(self) -> str:
+        """Cached answers are only reused for the model and system prompt that wrote them."""
+        return f"{self.chat.model}\n{self.system_prompt}"
+
+    def _remember(self, question: str, voice: str, spoken_reply: List) -> None:
+        entry_id = self.answer_cache.store(question, " ".join(s for s, _ in spoken_reply), scope=self._cache_scope)
+        if entry_id is not None:
+            self.answer_cache.store_audio(entry_id, voice, spoken_reply)
+
+    def _record(self, call_id: Optional[str], timings: Dict[str, float], audio_bytes: int,
+                cached_text: bool = False, cached_audio: bool = False) -> None:
+        """Write the turn's stage latencies to the call event log, tagged with the provider behind each."""
+        if not self.events:
+            return
+        tts = "semantic_cache" if cached_audio else getattr(self.tts, "name", "tts")
+        providers = {
+            "stt": getattr(self.stt, "name", "stt"),
+            "cache_lookup": "semantic_cache",
+            "first_sentence": "semantic_cache" if cached_text else self.chat.model,
+            "first_audio": tts,
+            "total": tts
+        }
+        call_id = call_id or "-"
+        for stage, latency in timings.items():
+            self.events.emit(call_id, stage, providers.get(stage, stage), latency,
+                             bytes=audio_bytes if stage in ("first_audio", "total") else 0)
+
+    def barge_in(self, call_id: str) -> bool:
+        """
+        Stop the reply currently being spoken on a call because the caller talked over it.
+
+        Returns:
+            True if a turn was in progress
+        """
+        with self._turns_lock:
+            cancel = self._turns.get(call_id)
+        return bool(cancel and cancel.cancel("barge_in"))
+
+    def close(self) -> None:
+        """Stop the synthesis and cache pools and the context summarizer; turns in progress still finish."""
+        self._executor.shutdown(wait=False)
+        self._cache_executor.shutdown(wait=False)
+        if self.context:
+            self.context.close()
+
+    def run(self, audio: bytes, filename: str, history: Optional[List[Dict]] = None,
+            voice: Optional[str] = None, call_id: Optional[str] = None,
+            cancel: Optional[CancelToken] = None, audio_format: str = "mp3") -> Iterator[Dict[str, Any]]:
+        """
+        Run one conversational turn, yielding events as soon as they are available.
+
+        A new turn on a call barges in on the previous one, and closing the
+        generator (the client went away) cancels the turn; either way queued
+        and in-flight syntheses are stopped. ``audio_format`` is passed to the
+        TTS provider, e.g. ``pcm`` for telephony transcoding.
+
+        Yields:
+            ``{"type": "transcript", "text"}`` once STT is final, then
+            ``{"type": "sentence", "index", "text", "audio"}`` per reply sentence in
+            order, then ``{"type": "done", "timings"}`` (with ``cached`` when the
+            reply came from the answer cache), or ``{"type": "cancelled", "reason"}``
+            if the turn was cancelled. Stage latencies are also written to
+            the call event log under ``call_id`` when one is configured.
+        """
+        cancel = cancel or CancelToken()
+        if call_id:
+            with self._turns_lock:
+                previous, self._turns[call_id] = self._turns.get(call_id), cancel
+            if previous:
+                previous.cancel("barge_in")
+        try:
+            yield from self._turn(audio, filename, history, voice, call_id, cancel, audio_format)
+        except GeneratorExit:
+            cancel.cancel("disconnect")
+            raise
+        finally:
+            if call_id:
+                with self._turns_lock:
+                    if self._turns.get(call_id) is cancel:
+                        del self._turns[call_id]
+
+    def _synthesize(self, text: str, voice: str, cancel: CancelToken, audio_format: str) -> bytes:
+        if audio_format == "mp3":
+            return self.tts.synthesize(text, voice, cancel=cancel)
+        return self.tts.synthesize(text, voice, response_format=audio_format, cancel=cancel)
+
+    def _turn(self, audio: bytes, filename: str, history: Optional[List[Dict]], voice: Optional[str],
+              call_id: Optional[str], cancel: CancelToken, audio_format: str) -> Iterator[Dict[str, Any]]:
+        started = time.perf_counter()
+        voice = voice or self.voice
+        # Cached audio is kept per voice and format
+        audio_key = voice if audio_format == "mp3" else f"{voice}/{audio_format}"
+        timings: Dict[str, float] = {}
+
+        transcript = self.stt.transcribe(audio, filename)
+        timings["stt"] = time.perf_counter() - started
+        yield {"type": "transcript", "text": transcript}
+
+        # Only opening questions are shared between callers; later turns depend on the conversation
+        opening = not any(m.get("role") == "assistant" for m in history or [])
+        cached = None
+        if self.answer_cache and opening:
+            cached = self.answer_cache.lookup(transcript, scope=self._cache_scope)
+            timings["cache_lookup"] = time.perf_counter() - started - timings["stt"]
+
+        if cached and cached.audio.get(audio_key):
+            for index, (sentence, audio_bytes) in enumerate(cached.audio[audio_key]):
+                if index == 0:
+                    timings["first_audio"] = time.perf_counter() - started
+                yield {"type": "sentence", "index": index, "text": sentence, "audio": audio_bytes}
+            timings["total"] = time.perf_counter() - started
+            self._record(call_id, timings, sum(len(a) for _, a in cached.audio[audio_key]),
+                         cached_text=True, cached_audio=True)
+            yield {"type": "done", "timings": timings,
+                   "cached": {"entry": cached.entry_id, "score": cached.score}}
+            return
+
+        messages = None if cached else self._messages(history or [], transcript)
+        pending: "queue.Queue" = queue.Queue()
+        stop = threading.Event()
+        spoken_reply: List = []
+
+        def produce():
+            # LLM tokens are read on their own thread so audio can be yielded while they arrive
+            try:
+                tokens = iter([cached.answer]) if cached else self.chat.stream(messages)
+                for index, sentence in enumerate(iter_sentences(tokens)):
+                    if stop.is_set() or cancel.cancelled:
+                        break
+                    if index == 0:
+                        timings["first_sentence"] = time.perf_counter() - started
+                    spoken = self.tts.prepare_text(sentence)
+                    future = self._executor.submit(self._synthesize, spoken, voice, cancel, audio_format)
+                    pending.put((index, sentence, future))
+            except Exception as e:
+                pending.put(e)
+            finally:
+                pending.put(None)
+
+        producer = threading.Thread(target=produce, name="pipeline-llm", daemon=True)
+        producer.start()
+        # Wake the reader at once instead of after the sentence being generated
+        unregister = cancel.on_cancel(lambda: pending.put(Cancelled(cancel.reason)))
+
+        try:
+            while True:
+                item = pending.get()
+                if item is None:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                index, sentence, future = item
+                audio_bytes = future.result()
+                if index == 0:
+                    timings["first_audio"] = time.perf_counter() - started
+                spoken_reply.append((sentence, audio_bytes))
+                yield {"type": "sentence", "index": index, "text": sentence, "audio": audio_bytes}
+
+            # The producer may have stopped for a cancel before the wake-up was queued
+            cancel.raise_if_cancelled()
+            timings["total"] = time.perf_counter() - started
+            logger.info(f"Pipeline turn finished: {timings}")
+            self._record(call_id, timings, sum(len(a) for _, a in spoken_reply), cached_text=bool(cached))
+            done = {"type": "done", "timings": timings}
+            if cached:
+                self.answer_cache.store_audio(cached.entry_id, audio_key, spoken_reply)
+                done["cached"] = {"entry": cached.entry_id, "score": cached.score}
+            elif self.answer_cache and opening and spoken_reply:
+                # Embedding the question is a network call; keep it off the reply path
+                self._cache_executor.submit(self._remember, transcript, audio_key, spoken_reply)
+            yield done
+        except Cancelled as e:
+            timings["total"] = time.perf_counter() - started
+            logger.info(f"Pipeline turn cancelled ({e.reason}) after {timings['total']:.2f}s")
+            yield {"type": "cancelled", "reason": e.reason, "timings": timings}
+        except GeneratorExit:
+            cancel.cancel("disconnect")
+            raise
+        finally:
+            # Client went away, caller barged in or an error occurred: stop reading and drop queued work
+            unregister()
+            stop.set()
+            while True:
+                try:
+                    item = pending.get_nowait()
+                except queue.Empty:
+                    break
+                # Once cancelled, queued syntheses stop on the token and are counted as saved
+                if isinstance(item, tuple) and not cancel.cancelled:
+                    item[2].cancel()
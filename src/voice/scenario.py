@@ -0,0 +1,502 @@
+import logging
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+from src.server.cancellation import CancelToken
+from src.server.metrics import REGISTRY
+from src.voice.templates import PromptTemplate, TemplateRenderer
+
+logger = logging.getLogger("voice.scenario")
+
+PROMPTS = REGISTRY.counter("scenario_prompts_total",
+                           "Scenario prompts played, by where their audio came from: hit (speculated for "
+                           "this call), warm (already cached), late (speculation still running) or miss",
+                           labels=("scenario", "outcome"))
+PROMPT_SECONDS = REGISTRY.histogram("scenario_prompt_seconds", "Time to render a scenario prompt",
+                                    labels=("outcome",))
+SPECULATED = REGISTRY.counter("scenario_speculated_fragments_total",
+                              "Fragments synthesized speculatively, by whether the call went on to play them",
+                              labels=("scenario", "result"))
+
+OUTCOMES = ("hit", "warm", "late", "miss")
+
+@dataclass
+class Transition:
+    """Edge to another state, taken when the caller's words contain one of its keywords."""
+    target: str
+    weight: float
+    keywords: Tuple[str, ...] = ()
+
+@dataclass
+class State:
+    """A scripted step of a call: the prompt played on entry and where the call can go next."""
+    name: str
+    prompt: str
+    transitions: List[Transition] = field(default_factory=list)
+    # Slot name -> candidate value -> keywords that select it
+    slots: Dict[str, Dict[str, Tuple[str, ...]]] = field(default_factory=dict)
+    # Slot values used when nothing the caller said selects one
+    defaults: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def final(self) -> bool:
+        return not self.transitions
+
+@dataclass
+class Scenario:
+    name: str
+    start: str
+    states: Dict[str, State]
+
+@dataclass
+class PromptResult:
+    """Audio of the prompt played on entering a state."""
+    call_id: str
+    state: str
+    prompt: str
+    audio: np.ndarray
+    outcome: str
+    seconds: float
+    final: bool
+
+def _keywords(values) -> Tuple[str, ...]:
+    return tuple(str(v).casefold() for v in values or ())
+
+def compile_scenario(name: str, spec: Mapping[str, Any], templates: Dict[str, PromptTemplate]) -> Scenario:
+    """
+    Compile a scenario from config into a state graph, checking every reference.
+
+    A spec looks like::
+
+        {"start": "greeting",
+         "states": {
+             "greeting": {"prompt": "greeting",
+                          "next": {"transfer": {"weight": 3, "keywords": ["samband"]},
+                                   "hold": {"weight": 1}}},
+             "transfer": {"prompt": "transfer",
+                          "slots": {"department": {"velferðarsviði": ["velferð"]}},
+                          "defaults": {"department": "þjónustuveri"}}}}
+
+    A transition without keywords is taken when no keyword matches. Weights are
+    the prior transition probabilities, refined by the transitions callers take.
+
+    Raises:
+        ValueError: If the start state, a transition target or a prompt is unknown
+    """
+    states = {}
+    for state_name, state_spec in (spec.get("states") or {}).items():
+        prompt = state_spec.get("prompt", state_name)
+        if prompt not in templates:
+            raise ValueError(f"Scenario '{name}' state '{state_name}' uses unknown prompt template '{prompt}'")
+        transitions = []
+        for target, edge in (state_spec.get("next") or {}).items():
+            edge = edge if isinstance(edge, Mapping) else {"weight": edge}
+            transitions.append(Transition(target, float(edge.get("weight", 1.0)), _keywords(edge.get("keywords"))))
+        slots = {
+            slot: {value: _keywords(keywords) for value, keywords in candidates.items()}
+            for slot, candidates in (state_spec.get("slots") or {}).items()
+        }
+        states[state_name] = State(state_name, prompt, transitions, slots, dict(state_spec.get("defaults") or {}))
+
+    start = spec.get("start")
+    if start not in states:
+        raise ValueError(f"Scenario '{name}' starts in unknown state '{start}'")
+    for state in states.values():
+        for transition in state.transitions:
+            if transition.target not in states:
+                raise ValueError(f"Scenario '{name}' state '{state.name}' leads to unknown state '{transition.target}'")
+    return Scenario(name, start, states)
+
+@dataclass
+class _Call:
+    scenario: Scenario
+    state: State
+    voice: str
+    slots: Dict[str, str] = field(default_factory=dict)
+    heard: List[str] = field(default_factory=list)
+    cancel: CancelToken = field(default_factory=CancelToken)
+    # Fragments this call prefetched, and those it played
+    speculated: Dict[str, Future] = field(default_factory=dict)
+    played: set = field(default_factory=set)
+
+class ScenarioEngine:
+    """
+    Runs calls through compiled scenarios with speculative prompt synthesis.
+
+    On entering a state the engine estimates, from the scenario's weights and
+    the transitions earlier callers took, how likely each next prompt and
+    slot value is, and prefetches the fragments above ``min_probability``
+    into the audio cache in the background. When the caller's answer arrives
+    the scripted reply is usually already synthesized and only needs splicing.
+    """
+
+    def __init__(self, renderer: TemplateRenderer, scenarios: Dict[str, Scenario],
+                 min_probability: float = 0.1, max_fragments: int = 10, prior_strength: float = 10.0):
+        """
+        Initialize the engine.
+
+        Args:
+            renderer: Template renderer whose cache receives the prefetched fragments
+            scenarios: Compiled scenarios by name
+            min_probability: Fragments less likely than this to be played next are not prefetched
+            max_fragments: Fragments prefetched per state entered
+            prior_strength: Observed transitions needed to outweigh the configured weights
+        """
+        self.renderer = renderer
+        self.scenarios = scenarios
+        self.min_probability = min_probability
+        self.max_fragments = max_fragments
+        self.prior_strength = prior_strength
+        self._calls: Dict[str, _Call] = {}
+        # (scenario, state) -> target -> count, and (scenario, state, slot) -> value -> count
+        self._transitions: Dict[Tuple[str, ...], Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self._values: Dict[Tuple[str, ...], Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self._outcomes: Dict[str, int] = {outcome: 0 for outcome in OUTCOMES}
+        self._lock = threading.Lock()
+
+    def adopt(self, previous: "ScenarioEngine") -> None:
+        """Take over the calls and learned transition counts of the engine this one replaces."""
+        with previous._lock:
+            calls, transitions, values = dict(previous._calls), previous._transitions, previous._values
+            outcomes = dict(previous._outcomes)
+        with self._lock:
+            self._transitions.update(transitions)
+            self._values.update(values)
+            self._outcomes = outcomes
+            for call_id, call in calls.items():
+                scenario = self.scenarios.get(call.scenario.name)
+                if scenario and call.state.name in scenario.states:
+                    call.scenario, call.state = scenario, scenario.states[call.state.name]
+                    self._calls[call_id] = call
+
+    def _probabilities(self, counts: Dict[str, int], priors: Dict[str, float]) -> Dict[str, float]:
+        """Configured weights as a Dirichlet prior, updated with observed counts."""
+        total_prior = sum(priors.values()) or 1.0
+        scores = {k: self.prior_strength * w / total_prior + counts.get(k, 0) for k, w in priors.items()}
+        total = sum(scores.values()) or 1.0
+        return {k: s / total for k, s in scores.items()}
+
+    def next_prompts(self, scenario: Scenario, state: State) -> List[Tuple[str, float]]:
+        """
+        Fragments that may be played after ``state``, with the probability of each.
+
+        Returns:
+            (fragment text, probability) pairs, most likely first
+        """
+        with self._lock:
+            transition_counts = dict(self._transitions.get((scenario.name, state.name), {}))
+            value_counts = {
+                (t.target, slot): dict(self._values.get((scenario.name, t.target, slot), {}))
+                for t in state.transitions for slot in scenario.states[t.target].slots
+            }
+        p_next = self._probabilities(transition_counts, {t.target: t.weight for t in state.transitions})
+
+        fragments: Dict[str, float] = defaultdict(float)
+        for target, p in p_next.items():
+            nxt = scenario.states[target]
+            for text in self.renderer.fragment_texts(nxt.prompt):
+                fragments[text] += p
+            template = self.renderer.templates[nxt.prompt]
+            for kind, slot, suffix in template.fragments:
+                if kind != "slot" or slot not in nxt.slots:
+                    continue
+                # Slots without candidates (a caller's name) cannot be guessed
+                p_value = self._probabilities(value_counts[(target, slot)], {v: 1.0 for v in nxt.slots[slot]})
+                for value, q in p_value.items():
+                    fragments[self.renderer.tts.prepare_text(value.strip() + suffix)] += p * q
+        return sorted(fragments.items(), key=lambda item: -item[1])
+
+    def _speculate(self, call: _Call, state: State) -> None:
+        if state.final:
+            return
+        wanted = [text for text, p in self.next_prompts(call.scenario, state)
+                  if p >= self.min_probability][:self.max_fragments]
+        started = self.renderer.prefetch(wanted, call.voice, call.cancel)
+        call.speculated.update(started)
+        if started:
+            logger.debug(f"Prefetching {len(started)} fragments after state '{state.name}'")
+
+    def _unfilled(self, state: State, slots: Dict[str, str]) -> List[str]:
+        return [slot for slot in self.renderer.templates[state.prompt].slots if slot not in slots]
+
+    def _enter(self, call_id: str, call: _Call, state: State, slots: Dict[str, str]) -> PromptResult:
+        """Render the state's prompt, then move the call into it; a failed render leaves the call where it was."""
+        started = time.perf_counter()
+        slots = {**call.slots, **slots}
+        values = {slot: slots[slot] for slot in self.renderer.templates[state.prompt].slots}
+        texts = self.renderer.fragment_texts(state.prompt, values)
+
+        missing = [t for t in texts if not self.renderer.cached(t, call.voice)]
+        if not missing:
+            outcome = "hit" if any(t in call.speculated for t in texts) else "warm"
+        elif all(self.renderer.pending(t, call.voice) for t in missing):
+            outcome = "late"
+        else:
+            outcome = "miss"
+        # Prefetch the states after this one while its prompt is spliced and played
+        self._speculate(call, state)
+        audio = self.renderer.render_pcm(state.prompt, call.voice, values)
+        call.state, call.slots = state, slots
+        call.played.update(texts)
+
+        seconds = time.perf_counter() - started
+        PROMPTS.inc(call.scenario.name, outcome)
+        PROMPT_SECONDS.observe(seconds, outcome)
+        with self._lock:
+            self._outcomes[outcome] += 1
+        result = PromptResult(call_id, state.name, state.prompt, audio, outcome, seconds, state.final)
+        if state.final:
+            self.end(call_id)
+        return result
+
+    def start(self, scenario: str, call_id: str, voice: str, slots: Optional[Dict[str, str]] = None) -> PromptResult:
+        """
+        Start a call in the scenario's first state and render its prompt.
+
+        Raises:
+            KeyError: If the scenario is unknown
+            ValueError: If the prompt needs a slot value that was not given
+        """
+        compiled = self.scenarios[scenario]
+        first = compiled.states[compiled.start]
+        slots = {**first.defaults, **(slots or {})}
+        unfilled = self._unfilled(first, slots)
+        if unfilled:
+            raise ValueError(f"Scenario '{scenario}' needs slot values to start: {', '.join(unfilled)}")
+        call = _Call(compiled, first, voice)
+        try:
+            result = self._enter(call_id, call, first, slots)
+        except Exception:
+            call.cancel.cancel("failed")
+            raise
+        if not result.final:
+            with self._lock:
+                previous, self._calls[call_id] = self._calls.get(call_id), call
+            if previous:
+                self._finish(previous)
+        return result
+
+    def _match(self, state: State, text: str) -> Optional[Transition]:
+        """Transition with the most keyword hits, ties to the likelier one; the keyword-less fallback otherwise."""
+        text = text.casefold()
+        best, best_hits = None, 0
+        for transition in state.transitions:
+            hits = sum(keyword in text for keyword in transition.keywords)
+            if hits > best_hits or (hits and hits == best_hits and transition.weight > best.weight):
+                best, best_hits = transition, hits
+        if best:
+            return best
+        return next((t for t in state.transitions if not t.keywords), None)
+
+    def advance(self, call_id: str, text: Optional[str] = None, state: Optional[str] = None,
+                slots: Optional[Dict[str, str]] = None) -> Optional[PromptResult]:
+        """
+        Move a call on after the caller spoke, and render the next state's prompt.
+
+        Args:
+            call_id: Call started with ``start``
+            text: Caller's transcript, matched against transition and slot keywords
+            state: Explicit next state, e.g. chosen by the chat model; overrides ``text``
+            slots: Slot values known to the caller of this method
+
+        Returns:
+            The prompt, or None if no scripted transition matches, or the next
+            prompt needs a slot value nobody supplied (the caller's name), and
+            the reply has to come from the conversational pipeline; the call
+            then stays where it is
+
+        Raises:
+            KeyError: If the call is not in progress
+            ValueError: If ``state`` is not reachable from the current state,
+                or its prompt needs slot values that were not given
+        """
+        with self._lock:
+            call = self._calls[call_id]
+        current = call.state
+        if state is not None:
+            transition = next((t for t in current.transitions if t.target == state), None)
+            if transition is None:
+                raise ValueError(f"State '{state}' is not reachable from '{current.name}'")
+        else:
+            transition = self._match(current, text or "")
+            if transition is None:
+                return None
+
+        nxt = call.scenario.states[transition.target]
+        slots = dict(slots or {})
+        heard = call.heard + [text.casefold()] if text else list(call.heard)
+        # Earlier answers count too: "a status question" followed by a transfer
+        joined = " ".join(heard)
+        for slot, candidates in nxt.slots.items():
+            if slot in slots:
+                continue
+            value = next((v for v, keywords in candidates.items() if any(k in joined for k in keywords)), None)
+            if value is None and slot not in call.slots:
+                value = nxt.defaults.get(slot)
+            if value is not None:
+                slots[slot] = value
+
+        # Nothing about the call changes until the next prompt is known to be renderable
+        unfilled = self._unfilled(nxt, {**call.slots, **slots})
+        if unfilled:
+            if state is not None:
+                raise ValueError(f"State '{nxt.name}' needs slot values: {', '.join(unfilled)}")
+            logger.info(f"Call {call_id}: '{nxt.name}' needs {', '.join(unfilled)}, leaving the reply to the pipeline")
+            return None
+        result = self._enter(call_id, call, nxt, slots)
+        call.heard = heard
+        with self._lock:
+            self._transitions[(call.scenario.name, current.name)][nxt.name] += 1
+            for slot, value in slots.items():
+                if value in nxt.slots.get(slot, {}):
+                    self._values[(call.scenario.name, nxt.name, slot)][value] += 1
+        return result
+
+    def _finish(self, call: _Call) -> None:
+        # Prefetches nobody needs any more are cancelled; finished ones stay cached for other calls
+        call.cancel.cancel("hangup")
+        for text, future in call.speculated.items():
+            if future.done() and future.exception() is None:
+                SPECULATED.inc(call.scenario.name, "used" if text in call.played else "unused")
+
+    def end(self, call_id: str) -> bool:
+        """
+        End a call, stopping its outstanding prefetches.
+
+        Returns:
+            False if the call was not in progress
+        """
+        with self._lock:
+            call = self._calls.pop(call_id, None)
+        if call is None:
+            return False
+        self._finish(call)
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            outcomes = dict(self._outcomes)
+            calls = len(self._calls)
+        speculated = outcomes["hit"] + outcomes["late"] + outcomes["miss"]
+        return {
+            "calls": calls,
+            "prompts": outcomes,
+            # Of the prompts that were not already cached, the share speculation had ready
+            "hit_rate": outcomes["hit"] / speculated if speculated else None
+        }
+
+def compile_scenarios(specs: Mapping[str, Any], templates: Dict[str, PromptTemplate]) -> Dict[str, Scenario]:
+    return {name: compile_scenario(name, spec, templates) for name, spec in (specs or {}).items()}
+
+class _SimulatedTTS:
+    """Provider stand-in with a fixed latency per request plus per character, returning a PCM tone."""
+    name = "simulated"
+
+    def __init__(self, latency: float, per_char: float):
+        self.latency = latency
+        self.per_char = per_char
+
+    def prepare_text(self, text: str) -> str:
+        return text
+
+    def synthesize(self, text: str, voice: str, response_format: str = "mp3", cancel=None) -> bytes:
+        if cancel is not None and cancel.wait(self.latency + self.per_char * len(text)):
+            cancel.raise_if_cancelled()
+        elif cancel is None:
+            time.sleep(self.latency + self.per_char * len(text))
+        t = np.arange(int(0.05 * len(text) * 24000)) / 24000
+        return (np.sin(2 * np.pi * 220 * t) * 8000).astype("<i2").tobytes()
+
+def benchmark(calls: int = 60, concurrency: int = 10, think: float = 0.8, latency: float = 0.15) -> None:
+    """
+    Simulate callers walking the default reception scenario, with and without speculation.
+
+    Callers take the transitions in a different mix than the configured
+    weights, so the run also shows the estimates adapting. ``think`` is the
+    time a caller spends listening and answering before the next prompt.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    from src.setup.config_manager import ConfigManager
+    from src.voice.audio_cache import AudioCache
+
+    config = ConfigManager()
+    utterances = [
+        ("Gætirðu gefið mér samband við leikskólann?", 0.45),
+        ("Mig langar að vita stöðuna á umsókninni minni", 0.25),
+        ("Getur einhver hringt í mig út af fjárhagsaðstoð?", 0.1),
+        ("Ég þarf að tala við einhvern um byggingarleyfi", 0.2),
+    ]
+    texts, weights = zip(*utterances)
+
+    def run(min_probability: float) -> None:
+        tts = _SimulatedTTS(latency, 0.005)
+        renderer = TemplateRenderer(tts, AudioCache(), prefetch_workers=4)
+        for name, text in (config.get("prompt_templates") or {}).items():
+            renderer.register(name, text)
+        engine = ScenarioEngine(renderer, compile_scenarios(config.get("scenarios"), renderer.templates),
+                                min_probability=min_probability)
+        rng = np.random.default_rng(0)
+        paths = [rng.choice(len(texts), p=np.array(weights) / sum(weights)) for _ in range(calls)]
+        # Prompts after the greeting, the ones speculation can prepare
+        later: List[float] = []
+        fallbacks = []
+
+        def call(index: int) -> None:
+            call_id = f"bench-{index}"
+            result = engine.start("reception", call_id, "alloy")
+            text = texts[paths[index]]
+            while not result.final:
+                time.sleep(think)
+                # Callback needs the caller's name, which only the conversational pipeline asks for
+                result = engine.advance(call_id, text)
+                if result is None:
+                    fallbacks.append(call_id)
+                    engine.end(call_id)
+                    break
+                later.append(result.seconds)
+
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(call, range(calls)))
+        stats = engine.stats()
+        label = "speculation" if min_probability <= 1 else "no speculation"
+        hit_rate = "n/a" if stats["hit_rate"] is None else f"{stats['hit_rate']:.0%}"
+        print(f"{label:>15}: prompts {stats['prompts']}, hit rate {hit_rate}, after the greeting "
+              f"mean {np.mean(later) * 1000:.0f} ms, p95 {np.percentile(later, 95) * 1000:.0f} ms, "
+              f"{len(fallbacks)} calls left to the pipeline")
+
+    run(float("inf"))
+    run(0.1)
+
+def main():
+    """Inspect compiled scenarios, or run the speculation benchmark."""
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Call scenario tools")
+    parser.add_argument("--benchmark", action="store_true", help="Simulate calls with and without speculation")
+    parser.add_argument("--calls", type=int, default=60, help="Simulated calls")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(args.calls)
+        return
+
+    from src.setup.config_manager import ConfigManager
+    config = ConfigManager()
+    templates = {name: PromptTemplate(name, text) for name, text in (config.get("prompt_templates") or {}).items()}
+    for name, scenario in compile_scenarios(config.get("scenarios"), templates).items():
+        print(f"✅ {name}: starts in '{scenario.start}'")
+        for state in scenario.states.values():
+            edges = ", ".join(f"{t.target} ({t.weight:g})" for t in state.transitions) or "end"
+            print(f"   {state.name} [{state.prompt}] -> {edges}")
+            for slot, candidates in state.slots.items():
+                print(f"      {{{slot}}}: {json.dumps(list(candidates), ensure_ascii=False)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+import hashlib
+import logging
+import multiprocessing
+import os
+import time
+from multiprocessing import shared_memory
+from typing import Dict, Optional
+
+import numpy as np
+
+# Index slots are grouped into buckets of this many ways; a full bucket evicts its oldest entry
+WAYS = 8
+
+INDEX_DTYPE = np.dtype([
+    ("k0", "<u8"), ("k1", "<u8"),   # 128-bit digest of the cache key
+    ("slab", "<i4"),                # first slab of the entry's contiguous run
+    ("nslabs", "<i4"),              # 0 marks an empty slot
+    ("length", "<i8"),
+    ("seq", "<u8"),                 # insertion order, for eviction within a bucket
+])
+
+# Header fields (int64): slab size, slab count, bucket count, ring cursor, seq, hits, misses, bytes,
+# the seqlock version (odd while a write is in progress) and the pid of the current writer
+H_SLAB_SIZE, H_SLABS, H_BUCKETS, H_CURSOR, H_SEQ, H_HITS, H_MISSES, H_BYTES, H_VERSION, H_WRITER = range(10)
+HEADER_FIELDS = 10
+
+# A writer waits this long before checking whether the lock holder is still alive
+LOCK_TIMEOUT = 0.5
+# Lookups racing a write retry this many times before reporting a miss
+READ_RETRIES = 64
+
+logger = logging.getLogger("voice.shared_cache")
+
+_current: Optional["SharedAudioCache"] = None
+
+def current() -> Optional["SharedAudioCache"]:
+    """The shared cache installed by the serving supervisor, if any."""
+    return _current
+
+def install(cache: Optional["SharedAudioCache"]) -> None:
+    """Make ``cache`` visible to workers forked after this call."""
+    global _current
+    _current = cache
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+class SharedAudioCache:
+    """
+    Audio cache in one shared-memory segment, usable by every forked worker.
+
+    The segment holds a small header, a bucketed index and a ring of fixed-size
+    slabs. Each entry occupies a contiguous run of slabs; new entries are written
+    at the ring cursor and evict whatever entries they overwrite, so memory stays
+    fixed no matter how many workers share it.
+
+    Lookups take no lock: a seqlock version in the header tells them to retry when
+    a write overlapped. Writers share a lock; a writer that finds it held by a
+    worker that died mid-write takes it over and resets the cache.
+    """
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024, slab_size: int = 64 * 1024,
+                 max_entries: int = 16384):
+        """
+        Create the shared segment. Must be called before workers are forked.
+
+        Args:
+            max_bytes: Size of the slab area
+            slab_size: Allocation unit; entries are rounded up to whole slabs
+            max_entries: Index capacity, rounded up to whole buckets
+        """
+        n_slabs = max(1, max_bytes // slab_size)
+        n_buckets = max(1, -(-max_entries // WAYS))
+        self._layout(n_slabs, n_buckets)
+
+        size = self._offsets["data"] + n_slabs * slab_size
+        self._shm = shared_memory.SharedMemory(create=True, size=size)
+        self._map(slab_size, n_slabs, n_buckets)
+        self.header[:] = 0
+        self.header[[H_SLAB_SIZE, H_SLABS, H_BUCKETS]] = (slab_size, n_slabs, n_buckets)
+        self.index["nslabs"] = 0
+        self.owner[:] = -1
+        context = multiprocessing.get_context("fork")
+        self._lock = context.Lock()
+        self._recovery = context.Lock()
+
+    def _layout(self, n_slabs: int, n_buckets: int) -> None:
+        self._offsets = {}
+        offset = 0
+        for name, nbytes in (("header", HEADER_FIELDS * 8),
+                             ("index", n_buckets * WAYS * INDEX_DTYPE.itemsize),
+                             ("owner", n_slabs * 4)):
+            self._offsets[name] = offset
+            offset += -(-nbytes // 64) * 64
+        self._offsets["data"] = offset
+
+    def _map(self, slab_size: int, n_slabs: int, n_buckets: int) -> None:
+        buf = self._shm.buf
+        o = self._offsets
+        self.header = np.ndarray(HEADER_FIELDS, dtype="<i8", buffer=buf, offset=o["header"])
+        self.index = np.ndarray(n_buckets * WAYS, dtype=INDEX_DTYPE, buffer=buf, offset=o["index"])
+        self.owner = np.ndarray(n_slabs, dtype="<i4", buffer=buf, offset=o["owner"])
+        self.data = np.ndarray(n_slabs * slab_size, dtype=np.uint8, buffer=buf, offset=o["data"])
+        self._view = buf[o["data"]:o["data"] + n_slabs * slab_size].toreadonly()
+        self.slab_size, self.n_slabs, self.n_buckets = slab_size, n_slabs, n_buckets
+        self.max_bytes = n_slabs * slab_size
+
+    @staticmethod
+    def _digest(key: str):
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        return int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little")
+
+    def _find(self, k0: int, k1: int) -> int:
+        start = (k0 % self.n_buckets) * WAYS
+        ways = self.index[start:start + WAYS]
+        hit = np.flatnonzero((ways["k0"] == k0) & (ways["k1"] == k1) & (ways["nslabs"] > 0))
+        return start + int(hit[0]) if hit.size else -1
+
+    def _evict(self, slot: int) -> None:
+        entry = self.index[slot]
+        first, count = int(entry["slab"]), int(entry["nslabs"])
+        if count:
+            self.owner[first:first + count] = -1
+            self.header[H_BYTES] -= int(entry["length"])
+            self.index["nslabs"][slot] = 0
+
+    def _lookup(self, k0: int, k1: int):
+        """(slot, first byte, length) of an entry as of a consistent version, or None."""
+        for attempt in range(READ_RETRIES):
+            version = int(self.header[H_VERSION])
+            if version % 2 == 0:
+                slot = self._find(k0, k1)
+                found = (slot, int(self.index["slab"][slot]) * self.slab_size,
+                         int(self.index["length"][slot])) if slot >= 0 else None
+                if int(self.header[H_VERSION]) == version:
+                    return found
+            if attempt:
+                time.sleep(0)
+        return None
+
+    def get(self, key: str) -> Optional[memoryview]:
+        """
+        Audio stored under ``key`` as a read-only view into the shared segment.
+
+        The view is not copied: its slabs are only reused once the ring cursor
+        has come all the way round, so use it at once and copy it with
+        ``bytes()`` to keep it past the current request.
+        """
+        found = self._lookup(*self._digest(key))
+        # Counters are statistics; an increment lost to a racing worker is harmless
+        if found is None:
+            self.header[H_MISSES] += 1
+            return None
+        self.header[H_HITS] += 1
+        _, start, length = found
+        return self._view[start:start + length]
+
+    def set(self, key: str, data: bytes) -> None:
+        needed = max(1, -(-len(data) // self.slab_size))
+        if needed > self.n_slabs:
+            return
+        k0, k1 = self._digest(key)
+
+        if not self._acquire():
+            return
+        try:
+            self.header[H_VERSION] += 1
+            existing = self._find(k0, k1)
+            if existing >= 0:
+                self._evict(existing)
+
+            # Claim a contiguous run at the ring cursor, wrapping if the tail is too short
+            first = int(self.header[H_CURSOR])
+            if first + needed > self.n_slabs:
+                first = 0
+            for owner in np.unique(self.owner[first:first + needed]):
+                if owner >= 0:
+                    self._evict(int(owner))
+
+            start = (k0 % self.n_buckets) * WAYS
+            ways = self.index[start:start + WAYS]
+            empty = np.flatnonzero(ways["nslabs"] == 0)
+            slot = start + (int(empty[0]) if empty.size else int(np.argmin(ways["seq"])))
+            self._evict(slot)
+
+            offset = first * self.slab_size
+            self.data[offset:offset + len(data)] = np.frombuffer(data, dtype=np.uint8)
+            self.owner[first:first + needed] = slot
+            self.header[H_SEQ] += 1
+            self.index[slot] = (k0, k1, first, needed, len(data), int(self.header[H_SEQ]))
+            self.header[H_BYTES] += len(data)
+            self.header[H_CURSOR] = (first + needed) % self.n_slabs
+        finally:
+            self.header[H_VERSION] += 1
+            self._release()
+
+    def _acquire(self) -> bool:
+        """
+        Take the writer lock, recovering it from a worker that died holding it.
+
+        Returns:
+            False if the write should be skipped because a live writer held the
+            lock past the timeout
+        """
+        while not self._lock.acquire(timeout=LOCK_TIMEOUT):
+            holder = int(self.header[H_WRITER])
+            if not holder or _alive(holder):
+                logger.warning(f"Shared audio cache lock busy (worker {holder or 'unknown'}), skipping write")
+                return False
+            # Nobody will release a dead worker's lock: one writer inherits it, and
+            # since the dead worker's write may be half done, starts from an empty cache
+            if not self._recovery.acquire(timeout=LOCK_TIMEOUT):
+                return False
+            try:
+                if int(self.header[H_WRITER]) != holder:
+                    continue
+                self.header[H_WRITER] = os.getpid()
+            finally:
+                self._recovery.release()
+            logger.error(f"Worker {holder} died holding the shared audio cache lock, resetting the cache")
+            self._reset()
+            return True
+        self.header[H_WRITER] = os.getpid()
+        return True
+
+    def _release(self) -> None:
+        self.header[H_WRITER] = 0
+        self._lock.release()
+
+    def _reset(self) -> None:
+        self.header[H_VERSION] += 1 - int(self.header[H_VERSION]) % 2
+        self.index["nslabs"] = 0
+        self.owner[:] = -1
+        self.header[[H_CURSOR, H_BYTES]] = 0
+        self.header[H_VERSION] += 1
+
+    def __contains__(self, key: str) -> bool:
+        return self._lookup(*self._digest(key)) is not None
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": int(np.count_nonzero(self.index["nslabs"])),
+            "bytes": int(self.header[H_BYTES]),
+            "hits": int(self.header[H_HITS]),
+            "misses": int(self.header[H_MISSES])
+        }
+
+    def close(self, unlink: bool = False) -> None:
+        """Detach from the segment; the supervisor also unlinks it on shutdown."""
+        self.header = self.index = self.owner = self.data = None
+        self._view.release()
+        self._view = None
+        self._shm.close()
+        if unlink:
+            self._shm.unlink()
@@ -0,0 +1,60 @@
+from abc import ABC, abstractmethod
+import os
+from src.setup.config_manager import ConfigManager
+
+class STTProvider(ABC):
+    """Abstract base class for STT providers"""
+
+    name = "base"
+
+    def __init__(self, config: ConfigManager):
+        self.config = config
+
+    def warm_up(self) -> None:
+        """Open provider connections ahead of the first request"""
+        pass
+
+    @abstractmethod
+    def transcribe(self, audio: bytes, filename: str, language: str = "is") -> str:
+        """Return the final transcript of a recorded utterance"""
+        pass
+
+class OpenAIWhisperSTT(STTProvider):
+    """OpenAI Whisper STT implementation"""
+
+    name = "openai"
+
+    def __init__(self, config: ConfigManager):
+        super().__init__(config)
+        self._openai = None
+
+    def _client(self):
+        if self._openai is None:
+            import openai
+            self._openai = openai.OpenAI(
+                api_key=self.config.get("openai_key") or os.environ.get("OPENAI_API_KEY", "")
+            )
+        return self._openai
+
+    def warm_up(self) -> None:
+        self._client().models.retrieve("whisper-1")
+
+    def transcribe(self, audio: bytes, filename: str, language: str = "is") -> str:
+        response = self._client().audio.transcriptions.create(
+            model="whisper-1",
+            file=(filename, audio),
+            language=language
+        )
+        return response.text.strip()
+
+class STTFactory:
+    """Factory class for creating STT providers"""
+
+    @staticmethod
+    def create_provider(config: ConfigManager) -> STTProvider:
+        provider = config.get("stt_provider", "openai").lower()
+
+        if provider == "openai":
+            return OpenAIWhisperSTT(config)
+        else:
+            raise ValueError(f"Unsupported STT provider: {provider}")
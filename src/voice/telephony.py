@@ -0,0 +1,556 @@
+import asyncio
+import base64
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from math import gcd
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.server.cancellation import CancelToken
+from src.voice.templates import PCM_FORMAT, PCM_SAMPLE_RATE, pcm_to_wav
+
+logger = logging.getLogger("voice.telephony")
+
+# Media stream format of Twilio/Vonage-style telephony: 20 ms of 8 kHz G.711 μ-law per message
+SAMPLE_RATE = 8000
+FRAME_MS = 20
+FRAME_SAMPLES = SAMPLE_RATE * FRAME_MS // 1000
+ULAW_SILENCE = 0xFF
+
+def _ulaw_tables() -> Tuple[np.ndarray, np.ndarray]:
+    """G.711 μ-law decode table (256 codes) and encode table (every int16 value)."""
+    codes = ~np.arange(256, dtype=np.int32) & 0xFF
+    exponent = (codes >> 4) & 7
+    magnitude = (((codes & 0x0F) << 3) + 0x84 << exponent) - 0x84
+    decode = np.where(codes & 0x80, -magnitude, magnitude).astype(np.int16)
+
+    # Same 14-bit arithmetic as the reference g711.c, so codes match other implementations bit for bit
+    samples = np.arange(-32768, 32768, dtype=np.int32) >> 2
+    magnitude = np.minimum(np.abs(samples), 8159) + 33
+    segment = np.searchsorted(np.array([0x3F, 0x7F, 0xFF, 0x1FF, 0x3FF, 0x7FF, 0xFFF, 0x1FFF]), magnitude)
+    code = np.where(segment >= 8, 0x7F, segment << 4 | (magnitude >> (segment + 1)) & 0x0F)
+    encode = (code ^ np.where(samples < 0, 0x7F, 0xFF)).astype(np.uint8)
+    # Index by the int16 bit pattern so encoding is a single take()
+    return decode, np.roll(encode, -32768)
+
+ULAW_DECODE, ULAW_ENCODE = _ulaw_tables()
+
+def ulaw_decode(data: bytes) -> np.ndarray:
+    """μ-law bytes to int16 samples."""
+    return ULAW_DECODE[np.frombuffer(data, dtype=np.uint8)]
+
+def ulaw_encode(samples: np.ndarray) -> bytes:
+    """int16 samples to μ-law bytes."""
+    return ULAW_ENCODE[samples.astype(np.int16, copy=False).view(np.uint16)].tobytes()
+
+class Resampler:
+    """
+    Streaming rational resampler for mono PCM using a polyphase windowed-sinc filter.
+
+    State is carried between chunks, so sentence audio can be converted as it
+    arrives without clicks at chunk boundaries. Each chunk is converted with
+    one gather and one matrix product.
+    """
+
+    def __init__(self, src_rate: int, dst_rate: int, zero_crossings: int = 6):
+        divisor = gcd(src_rate, dst_rate)
+        self.up, self.down = dst_rate // divisor, src_rate // divisor
+        cutoff = min(1.0, self.up / self.down) * 0.95
+        self.half = int(np.ceil(zero_crossings / cutoff))
+        self.offsets = np.arange(-self.half + 1, self.half + 1)
+        x = self.offsets[None, :] - np.arange(self.up)[:, None] / self.up
+        filters = cutoff * np.sinc(cutoff * x) * np.kaiser(2 * self.half, 6.0)[None, :]
+        self.filters = (filters / filters.sum(axis=1, keepdims=True)).astype(np.float32)
+        self.reset()
+
+    def reset(self) -> None:
+        self.history = np.zeros(2 * self.half, dtype=np.float32)
+        self.position = (self.half - 1) * self.up
+
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        """Convert the next chunk of int16 samples; output lags input by the filter half-length."""
+        if self.up == self.down:
+            return samples.astype(np.int16, copy=False)
+        buffer = np.concatenate([self.history, samples.astype(np.float32)])
+        limit = (len(buffer) - self.half) * self.up
+        times = np.arange(self.position, limit, self.down)
+        if len(times):
+            base, phase = times // self.up, times % self.up
+            window = buffer[base[:, None] + self.offsets[None, :]]
+            out = np.einsum("nk,nk->n", window, self.filters[phase])
+            self.position = int(times[-1]) + self.down
+        else:
+            out = np.zeros(0, dtype=np.float32)
+        keep = 2 * self.half
+        self.position -= (len(buffer) - keep) * self.up
+        self.history = buffer[-keep:]
+        return np.clip(np.round(out), -32768, 32767).astype(np.int16)
+
+class JitterBuffer:
+    """
+    Reorders inbound media frames by sequence number and conceals lost ones.
+
+    Frames are released in order as soon as they are contiguous. A gap is
+    waited on until ``depth`` later frames have arrived, then filled with
+    silence, so a lost packet costs at most ``depth`` frames of delay.
+    """
+
+    def __init__(self, depth: int = 3, frame_bytes: int = FRAME_SAMPLES):
+        self.depth = depth
+        self.frame_bytes = frame_bytes
+        self.frames: Dict[int, bytes] = {}
+        self.next_seq: Optional[int] = None
+        self.stats = {"received": 0, "late": 0, "duplicate": 0, "concealed": 0}
+
+    def push(self, seq: int, payload: bytes) -> List[bytes]:
+        """Add a frame; returns the frames now ready, in order."""
+        self.stats["received"] += 1
+        if self.next_seq is None:
+            self.next_seq = seq
+        if seq < self.next_seq:
+            self.stats["late"] += 1
+            return []
+        if seq in self.frames:
+            self.stats["duplicate"] += 1
+            return []
+        self.frames[seq] = payload
+        return self._drain(self.depth)
+
+    def flush(self) -> List[bytes]:
+        """Release everything still held, concealing gaps."""
+        return self._drain(0)
+
+    def _drain(self, depth: int) -> List[bytes]:
+        ready = []
+        while self.frames:
+            frame = self.frames.pop(self.next_seq, None)
+            if frame is None:
+                if len(self.frames) <= depth:
+                    break
+                frame = bytes([ULAW_SILENCE]) * self.frame_bytes
+                self.stats["concealed"] += 1
+            ready.append(frame)
+            self.next_seq += 1
+        return ready
+
+class Endpointer:
+    """
+    Energy-based speech detector that cuts the caller's audio into utterances.
+
+    The noise floor is tracked while the caller is silent; speech starts once
+    frames stay ``margin_db`` above it for ``start_ms`` and ends after
+    ``end_ms`` below it. A short pre-roll keeps the first syllable.
+    """
+
+    def __init__(self, start_ms: int = 60, end_ms: int = 600, max_ms: int = 15000, pre_roll_ms: int = 200,
+                 margin_db: float = 12.0, min_db: float = -50.0):
+        self.start_frames = max(1, start_ms // FRAME_MS)
+        self.end_frames = max(1, end_ms // FRAME_MS)
+        self.max_frames = max_ms // FRAME_MS
+        self.margin_db = margin_db
+        self.min_db = min_db
+        self.noise_db = -60.0
+        self.pre_roll: Deque[np.ndarray] = deque(maxlen=max(1, pre_roll_ms // FRAME_MS))
+        self.frames: List[np.ndarray] = []
+        self.in_speech = False
+        self.loud = self.quiet = 0
+
+    def feed(self, frame: np.ndarray) -> Tuple[bool, Optional[np.ndarray]]:
+        """
+        Add one frame of int16 samples.
+
+        Returns:
+            (speech just started, finished utterance or None)
+        """
+        energy = float(np.mean(frame.astype(np.float32) ** 2)) / 32768.0 ** 2
+        level = 10 * np.log10(energy + 1e-12)
+        loud = level > max(self.noise_db + self.margin_db, self.min_db)
+
+        if not self.in_speech:
+            self.pre_roll.append(frame)
+            self.loud = self.loud + 1 if loud else 0
+            if not loud:
+                self.noise_db = 0.95 * self.noise_db + 0.05 * level
+            if self.loud >= self.start_frames:
+                self.in_speech = True
+                self.frames = list(self.pre_roll)
+                self.quiet = 0
+                return True, None
+            return False, None
+
+        self.frames.append(frame)
+        self.quiet = 0 if loud else self.quiet + 1
+        if self.quiet >= self.end_frames or len(self.frames) >= self.max_frames:
+            utterance = np.concatenate(self.frames[:len(self.frames) - self.quiet + 5])
+            self.in_speech = False
+            self.frames, self.loud = [], 0
+            self.pre_roll.clear()
+            return False, utterance
+        return False, None
+
+class MediaStreamSession:
+    """
+    One phone call over a Twilio/Vonage-style media-stream WebSocket.
+
+    Caller frames go through the jitter buffer and endpointer; each finished
+    utterance becomes a pipeline turn. Reply audio is requested as PCM,
+    resampled to 8 kHz, μ-law encoded and paced out in 20 ms frames no more
+    than ``lead_ms`` ahead of real time, so a barge-in can clear what the
+    caller has not heard yet. Pipeline turns run on their own threads, which
+    keeps the event loop free for hundreds of concurrent calls.
+    """
+
+    def __init__(self, websocket, pipeline, voice: Optional[str] = None, lead_ms: int = 100,
+                 burst_ms: int = 60, jitter_depth: int = 3, pcm_rate: int = PCM_SAMPLE_RATE,
+                 authorize: Optional[Callable[[Dict[str, Any]], bool]] = None):
+        """
+        Initialize the session.
+
+        Args:
+            websocket: Accepted Starlette WebSocket
+            pipeline: SpeechPipeline answering each utterance
+            voice: Assistant voice; the pipeline default if None
+            lead_ms: Audio sent ahead of real time to absorb network jitter
+            burst_ms: Audio sent per wake-up of the pacer, so hundreds of calls
+                do not each wake the event loop every 20 ms
+            jitter_depth: Frames a gap in the inbound stream is waited on
+            pcm_rate: Sample rate of the provider's PCM output
+            authorize: Check run on the ``start`` message, for providers that can
+                only pass credentials as stream parameters; the call is closed
+                with policy violation if it returns False
+        """
+        self.websocket = websocket
+        self.pipeline = pipeline
+        self.voice = voice
+        self.lead = lead_ms / 1000
+        self.burst = min(burst_ms, lead_ms) / 1000
+        self.pcm_rate = pcm_rate
+        self.authorize = authorize
+        self.authorized = authorize is None
+        self.jitter = JitterBuffer(jitter_depth)
+        self.endpointer = Endpointer()
+        self.stream_sid: Optional[str] = None
+        self.call_id = uuid.uuid4().hex
+        # Conversation so far; only touched on the event loop
+        self.history: List[Dict[str, str]] = []
+        # What each unfinished turn has heard and said, by its cancel token
+        self._turn_log: Dict[CancelToken, Dict[str, Any]] = {}
+        self.outbound: "asyncio.Queue" = asyncio.Queue()
+        self.marks: set = set()
+        self.turn: Optional[CancelToken] = None
+        self.loop = asyncio.get_running_loop()
+        self._send_lock = asyncio.Lock()
+
+    @property
+    def speaking(self) -> bool:
+        return bool(self.marks) or not self.outbound.empty() or (self.turn is not None and not self.turn.cancelled)
+
+    async def _send(self, message: Dict[str, Any]) -> None:
+        async with self._send_lock:
+            await self.websocket.send_text(json.dumps(message))
+
+    async def run(self) -> None:
+        sender = asyncio.create_task(self._sender())
+        try:
+            while True:
+                message = json.loads(await self.websocket.receive_text())
+                event = message.get("event")
+                if event == "media":
+                    if not self.authorized:
+                        break
+                    self._on_media(message["media"])
+                elif event == "start":
+                    start = message.get("start", {})
+                    if not self.authorized:
+                        if not self.authorize(start):
+                            logger.warning("Media stream rejected: invalid or missing credentials")
+                            await self.websocket.close(code=1008)
+                            break
+                        self.authorized = True
+                    self.stream_sid = message.get("streamSid") or start.get("streamSid")
+                    self.call_id = start.get("callSid") or self.stream_sid or self.call_id
+                    logger.info(f"Media stream started for call {self.call_id}")
+                elif event == "mark":
+                    self.marks.discard(message.get("mark", {}).get("name"))
+                elif event == "stop":
+                    break
+        except Exception as e:
+            # WebSocketDisconnect and transport errors all end the call
+            logger.info(f"Media stream for call {self.call_id} closed: {type(e).__name__}")
+        finally:
+            if self.turn:
+                self.turn.cancel("disconnect")
+            sender.cancel()
+            logger.info(f"Call {self.call_id} ended, jitter stats {self.jitter.stats}")
+
+    def _on_media(self, media: Dict[str, Any]) -> None:
+        if media.get("track", "inbound") != "inbound":
+            return
+        seq = int(media.get("chunk") or media.get("sequenceNumber") or self.jitter.next_seq or 0)
+        for frame in self.jitter.push(seq, base64.b64decode(media["payload"])):
+            started, utterance = self.endpointer.feed(ulaw_decode(frame))
+            if started and self.speaking:
+                self._barge_in()
+            if utterance is not None:
+                self._start_turn(utterance)
+
+    def _barge_in(self) -> None:
+        """The caller talks over the reply: stop synthesis and drop audio not yet played."""
+        if self.turn:
+            self.turn.cancel("barge_in")
+        while not self.outbound.empty():
+            self.outbound.get_nowait()
+        self.marks.clear()
+        if self.stream_sid:
+            asyncio.create_task(self._send({"event": "clear", "streamSid": self.stream_sid}))
+
+    def _start_turn(self, utterance: np.ndarray) -> None:
+        previous = self.turn
+        if previous:
+            previous.cancel("barge_in")
+            # Whatever the interrupted turn got to say goes into the history before the next turn reads it
+            self._commit_turn(previous)
+        cancel = self.turn = CancelToken()
+        self._turn_log[cancel] = {"user": None, "reply": []}
+        threading.Thread(target=self._pump, args=(pcm_to_wav(utterance, SAMPLE_RATE), cancel, list(self.history)),
+                         name=f"call-{self.call_id[:8]}", daemon=True).start()
+
+    def _pump(self, wav: bytes, cancel: CancelToken, history: List[Dict[str, str]]) -> None:
+        """Drive one pipeline turn on this thread and hand transcripts and encoded frames to the event loop."""
+        resampler = Resampler(self.pcm_rate, SAMPLE_RATE)
+        try:
+            for event in self.pipeline.run(wav, "caller.wav", history, self.voice,
+                                           call_id=self.call_id, cancel=cancel, audio_format=PCM_FORMAT):
+                if cancel.cancelled:
+                    break
+                if event["type"] == "transcript":
+                    self.loop.call_soon_threadsafe(self._log_turn, cancel, "user", event["text"])
+                elif event["type"] == "sentence":
+                    pcm = resampler.process(np.frombuffer(event["audio"], dtype="<i2"))
+                    self.loop.call_soon_threadsafe(self._enqueue, ulaw_encode(pcm), f"s{event['index']}", cancel)
+                    self.loop.call_soon_threadsafe(self._log_turn, cancel, "reply", event["text"])
+        except Exception as e:
+            logger.error(f"Turn failed on call {self.call_id}: {e}")
+        finally:
+            self.loop.call_soon_threadsafe(self._end_turn, cancel)
+
+    def _log_turn(self, cancel: CancelToken, role: str, text: str) -> None:
+        log = self._turn_log.get(cancel)
+        # A turn already committed (barged in on) keeps only what it had said by then
+        if log is None or cancel.cancelled:
+            return
+        if role == "user":
+            log["user"] = text
+        else:
+            log["reply"].append(text)
+
+    def _commit_turn(self, cancel: CancelToken) -> None:
+        log = self._turn_log.pop(cancel, None)
+        if log and log["user"]:
+            self.history.append({"role": "user", "content": log["user"]})
+            if log["reply"]:
+                self.history.append({"role": "assistant", "content": " ".join(log["reply"])})
+
+    def _enqueue(self, audio: bytes, mark: str, cancel: CancelToken) -> None:
+        if cancel.cancelled:
+            return
+        for start in range(0, len(audio), FRAME_SAMPLES):
+            frame = audio[start:start + FRAME_SAMPLES]
+            self.outbound.put_nowait(frame.ljust(FRAME_SAMPLES, bytes([ULAW_SILENCE])))
+        self.outbound.put_nowait(mark)
+
+    def _end_turn(self, cancel: CancelToken) -> None:
+        self._commit_turn(cancel)
+        if self.turn is cancel:
+            self.turn = None
+
+    async def _sender(self) -> None:
+        """Send queued frames at real-time pace, at most ``lead`` seconds ahead of playback."""
+        clock = 0.0
+        while True:
+            item = await self.outbound.get()
+            if isinstance(item, str):
+                self.marks.add(item)
+                await self._send({"event": "mark", "streamSid": self.stream_sid, "mark": {"name": item}})
+                continue
+            now = self.loop.time()
+            # After an idle period the playout clock restarts from now
+            clock = max(clock, now)
+            if clock - now > self.lead:
+                await asyncio.sleep(clock - now - self.lead + self.burst)
+            await self._send({"event": "media", "streamSid": self.stream_sid,
+                              "media": {"payload": base64.b64encode(item).decode("ascii")}})
+            clock += FRAME_MS / 1000
+
+def _caller_audio(seconds: float, rng: np.random.Generator) -> np.ndarray:
+    """Speech-like test signal at 8 kHz: voiced bursts with short pauses, then silence."""
+    n = int(seconds * SAMPLE_RATE)
+    t = np.arange(n) / SAMPLE_RATE
+    syllables = (np.sin(2 * np.pi * 4 * t) > -0.3).astype(np.float32)
+    voiced = np.sin(2 * np.pi * 140 * t) + 0.5 * np.sin(2 * np.pi * 280 * t) + rng.normal(0, 0.2, n)
+    return (voiced * syllables * 6000).astype(np.int16)
+
+async def simulate_call(url: str, index: int, speech: np.ndarray, listen: float, jitter_ms: float,
+                        loss: float, barge_in_after: Optional[float], rng: np.random.Generator) -> Dict[str, Any]:
+    """
+    Play one caller against the media-stream endpoint and measure what comes back.
+
+    The caller sends ``speech`` then silence as paced 20 ms frames (with
+    optional send jitter and loss), acknowledges marks once their audio has
+    played on a simulated playout clock, and optionally talks over the reply.
+    """
+    try:
+        import websockets
+    except ImportError:
+        raise RuntimeError("websockets library not installed. Run 'pip install websockets'")
+
+    stream_sid = f"MZ{uuid.uuid4().hex}"
+    result = {"call": index, "frames": 0, "underruns": 0, "cleared": False, "first_audio": None}
+    async with websockets.connect(url, max_size=None) as ws:
+        await ws.send(json.dumps({"event": "connected", "protocol": "Call", "version": "1.0.0"}))
+        await ws.send(json.dumps({"event": "start", "sequenceNumber": "1", "streamSid": stream_sid, "start": {
+            "streamSid": stream_sid, "callSid": f"CA{uuid.uuid4().hex}", "tracks": ["inbound"],
+            "mediaFormat": {"encoding": "audio/x-mulaw", "sampleRate": SAMPLE_RATE, "channels": 1}}}))
+
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        speech_end = started + len(speech) / SAMPLE_RATE
+        playout = None
+        pending_marks: Deque[Tuple[float, str]] = deque()
+        barge = np.zeros(0, dtype=np.int16)
+
+        async def receive():
+            nonlocal playout, barge
+            async for raw in ws:
+                message = json.loads(raw)
+                now = loop.time()
+                if message["event"] == "media":
+                    if result["first_audio"] is None:
+                        result["first_audio"] = now - speech_end
+                        if barge_in_after is not None:
+                            barge = _caller_audio(0.8, rng)
+                    # Playout clock: each frame plays 20 ms after the previous one, or on arrival if late
+                    if playout is not None and now > playout:
+                        result["underruns"] += 1
+                    playout = max(playout or now, now) + FRAME_MS / 1000
+                    result["frames"] += 1
+                elif message["event"] == "mark":
+                    pending_marks.append((playout or now, message["mark"]["name"]))
+                elif message["event"] == "clear":
+                    result["cleared"] = True
+                    playout = None
+
+        async def send():
+            nonlocal barge
+            seq, sent_at = 2, started
+            frame_index = 0
+            while loop.time() < speech_end + listen:
+                if frame_index < len(speech) // FRAME_SAMPLES:
+                    pcm = speech[frame_index * FRAME_SAMPLES:(frame_index + 1) * FRAME_SAMPLES]
+                elif len(barge) and result["first_audio"] is not None and \
+                        loop.time() - speech_end - result["first_audio"] >= barge_in_after:
+                    pcm, barge = barge[:FRAME_SAMPLES], barge[FRAME_SAMPLES:]
+                else:
+                    pcm = rng.normal(0, 30, FRAME_SAMPLES).astype(np.int16)
+                frame_index += 1
+                if rng.random() >= loss:
+                    await ws.send(json.dumps({"event": "media", "sequenceNumber": str(seq), "streamSid": stream_sid,
+                                              "media": {"track": "inbound", "chunk": str(frame_index),
+                                                        "timestamp": str(frame_index * FRAME_MS),
+                                                        "payload": base64.b64encode(ulaw_encode(pcm)).decode()}}))
+                seq += 1
+                while pending_marks and pending_marks[0][0] <= loop.time():
+                    await ws.send(json.dumps({"event": "mark", "streamSid": stream_sid,
+                                              "mark": {"name": pending_marks.popleft()[1]}}))
+                sent_at += FRAME_MS / 1000
+                delay = sent_at - loop.time() + (rng.uniform(0, jitter_ms) / 1000 if jitter_ms else 0)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            await ws.send(json.dumps({"event": "stop", "streamSid": stream_sid}))
+
+        receiver = asyncio.create_task(receive())
+        await send()
+        receiver.cancel()
+    return result
+
+async def simulate(url: str, calls: int, speech_seconds: float, listen: float, jitter_ms: float = 0.0,
+                   loss: float = 0.0, barge_in_after: Optional[float] = None, stagger: float = 0.02,
+                   api_key: Optional[str] = None) -> None:
+    """Run concurrent simulated callers and print time-to-first-audio and pacing statistics."""
+    if api_key:
+        from urllib.parse import quote
+        url += ("&" if "?" in url else "?") + f"token={quote(api_key)}"
+    rng = np.random.default_rng(0)
+    speech = _caller_audio(speech_seconds, rng)
+
+    async def staggered(i):
+        await asyncio.sleep(i * stagger)
+        return await simulate_call(url, i, speech, listen, jitter_ms, loss, barge_in_after,
+                                   np.random.default_rng(i))
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(staggered(i) for i in range(calls)), return_exceptions=True)
+    failed = [r for r in results if isinstance(r, Exception)]
+    results = [r for r in results if not isinstance(r, Exception)]
+    answered = [r["first_audio"] for r in results if r["first_audio"] is not None]
+    print(f"{calls} calls in {time.perf_counter() - started:.1f}s: {len(answered)} answered, {len(failed)} failed")
+    if failed:
+        print(f"❌ first failure: {failed[0]!r}")
+    if answered:
+        print(f"time to first audio after speech: p50 {np.percentile(answered, 50) * 1000:.0f} ms, "
+              f"p95 {np.percentile(answered, 95) * 1000:.0f} ms")
+        frames = sum(r["frames"] for r in results)
+        underruns = sum(r["underruns"] for r in results)
+        print(f"reply frames {frames}, playout underruns {underruns} ({underruns / max(frames, 1):.2%})")
+    if barge_in_after is not None:
+        print(f"cleared after barge-in: {sum(r['cleared'] for r in results)}/{len(results)}")
+
+def benchmark(seconds: float = 600.0) -> None:
+    """Time the outbound transcode path (24 kHz PCM to 8 kHz μ-law) and the inbound decode."""
+    rng = np.random.default_rng(0)
+    pcm = (rng.normal(0, 3000, int(seconds * PCM_SAMPLE_RATE))).astype(np.int16)
+    resampler = Resampler(PCM_SAMPLE_RATE, SAMPLE_RATE)
+    started = time.perf_counter()
+    # Sentence-sized chunks, as the session converts them
+    encoded = b"".join(ulaw_encode(resampler.process(pcm[i:i + 3 * PCM_SAMPLE_RATE]))
+                       for i in range(0, len(pcm), 3 * PCM_SAMPLE_RATE))
+    elapsed = time.perf_counter() - started
+    print(f"transcode: {seconds:.0f}s of audio in {elapsed * 1000:.0f} ms ({seconds / elapsed:.0f}x real time)")
+
+    started = time.perf_counter()
+    for i in range(0, len(encoded), FRAME_SAMPLES):
+        ulaw_decode(encoded[i:i + FRAME_SAMPLES])
+    elapsed = time.perf_counter() - started
+    print(f"decode: {elapsed / (len(encoded) / FRAME_SAMPLES) * 1e6:.1f} µs/frame")
+
+def main():
+    """Simulated phone calls against the media-stream endpoint, or the transcode benchmark."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Telephony media-stream tools")
+    parser.add_argument("--benchmark", action="store_true", help="Time μ-law transcoding")
+    parser.add_argument("--url", default="ws://127.0.0.1:80/api/media-stream", help="Media-stream endpoint")
+    parser.add_argument("--calls", type=int, default=1, help="Concurrent simulated calls")
+    parser.add_argument("--speech", type=float, default=1.5, help="Seconds the caller speaks")
+    parser.add_argument("--listen", type=float, default=8.0, help="Seconds to stay on the line afterwards")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Random extra delay per sent frame")
+    parser.add_argument("--loss", type=float, default=0.0, help="Fraction of caller frames dropped")
+    parser.add_argument("--barge-in", type=float, help="Talk over the reply this many seconds into it")
+    parser.add_argument("--api-key", default=os.environ.get("HALLO_API_KEY"),
+                        help="Key from admission.api_keys (default: $HALLO_API_KEY)")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark()
+        return
+    asyncio.run(simulate(args.url, args.calls, args.speech, args.listen, args.jitter_ms, args.loss, args.barge_in,
+                         api_key=args.api_key))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+import io
+import logging
+import re
+import string
+import threading
+import wave
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from src.server.cancellation import CancelToken
+from src.voice.audio_cache import AudioCache, cache_key
+
+logger = logging.getLogger("voice.templates")
+
+# OpenAI "pcm" output: 24 kHz, 16-bit signed little-endian, mono
+PCM_SAMPLE_RATE = 24000
+PCM_FORMAT = "pcm"
+
+class PromptTemplate:
+    """A spoken prompt split into static fragments and named slots."""
+
+    def __init__(self, name: str, text: str):
+        """
+        Parse a template such as ``"Ég gef þér samband við {department}."``.
+
+        Args:
+            name: Template identifier
+            text: Template text using ``str.format`` style slots
+        """
+        self.name = name
+        self.text = text
+        # (kind, value, suffix); punctuation right after a slot is spoken with the slot
+        self.fragments: List[Tuple[str, str, str]] = []
+
+        for literal, field, _, _ in string.Formatter().parse(text):
+            if self.fragments and self.fragments[-1][0] == "slot":
+                lead = re.match(r"\W*", literal).group()
+                kind, value, _ = self.fragments[-1]
+                self.fragments[-1] = (kind, value, lead.strip())
+                literal = literal[len(lead):]
+            if literal.strip():
+                self.fragments.append(("static", literal.strip(), ""))
+            if field:
+                self.fragments.append(("slot", field, ""))
+
+    @property
+    def static_fragments(self) -> List[str]:
+        return [value for kind, value, _ in self.fragments if kind == "static"]
+
+    @property
+    def slots(self) -> List[str]:
+        return [value for kind, value, _ in self.fragments if kind == "slot"]
+
+def _trim_silence(samples: np.ndarray, threshold: int = 180, pad: int = 240) -> np.ndarray:
+    """Drop leading and trailing near-silence, keeping ``pad`` samples of margin."""
+    loud = np.flatnonzero(np.abs(samples) > threshold)
+    if loud.size == 0:
+        return samples[:0]
+    return samples[max(0, loud[0] - pad):loud[-1] + pad + 1]
+
+def crossfade_join(pieces: List[np.ndarray], fade_samples: int) -> np.ndarray:
+    """Concatenate int16 PCM pieces with an equal-power crossfade at each join."""
+    pieces = [p for p in pieces if p.size]
+    if not pieces:
+        return np.zeros(0, dtype=np.int16)
+
+    out = pieces[0].astype(np.float32)
+    for piece in pieces[1:]:
+        nxt = piece.astype(np.float32)
+        n = min(fade_samples, out.size, nxt.size)
+        if n:
+            t = np.linspace(0.0, np.pi / 2, n, dtype=np.float32)
+            overlap = out[-n:] * np.cos(t) + nxt[:n] * np.sin(t)
+            out = np.concatenate([out[:-n], overlap, nxt[n:]])
+        else:
+            out = np.concatenate([out, nxt])
+    return np.clip(out, -32768, 32767).astype(np.int16)
+
+def pcm_to_wav(samples: np.ndarray, sample_rate: int = PCM_SAMPLE_RATE) -> bytes:
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(samples.astype("<i2").tobytes())
+    return buffer.getvalue()
+
+class TemplateRenderer:
+    """Renders prompt templates by splicing cached static fragments with freshly synthesized slots."""
+
+    def __init__(self, tts_provider, cache: AudioCache, crossfade_ms: int = 15, max_workers: int = 4,
+                 prefetch_tts=None, prefetch_workers: int = 2, prefetch_wait: float = 1.5):
+        """
+        Initialize the renderer.
+
+        Args:
+            tts_provider: Provider able to return raw PCM from ``synthesize``
+            cache: Cache holding fragment and slot audio
+            crossfade_ms: Length of the crossfade at each join
+            max_workers: Concurrent fragment syntheses
+            prefetch_tts: Provider for speculative fragments, e.g. one scheduled at
+                batch priority; defaults to ``tts_provider``
+            prefetch_workers: Concurrent speculative syntheses, kept off the render workers
+            prefetch_wait: Seconds a render waits for a prefetch of the same fragment
+                before synthesizing it itself, so a live call never waits out
+                the batch queue
+        """
+        self.tts = tts_provider
+        self.prefetch_tts = prefetch_tts or tts_provider
+        self.prefetch_wait = prefetch_wait
+        self.cache = cache
+        self.fade_samples = int(PCM_SAMPLE_RATE * crossfade_ms / 1000)
+        self.templates: Dict[str, PromptTemplate] = {}
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="template-tts")
+        self._prefetch_executor = ThreadPoolExecutor(max_workers=prefetch_workers, thread_name_prefix="template-prefetch")
+        # Syntheses in progress by cache key, so a render waits for one instead of repeating it
+        self._inflight: Dict[str, Future] = {}
+        self._prefetching: set = set()
+        self._inflight_lock = threading.Lock()
+
+    def register(self, name: str, text: str) -> PromptTemplate:
+        template = PromptTemplate(name, text)
+        self.templates[name] = template
+        return template
+
+    def _key(self, text: str, voice: str) -> str:
+        return cache_key(text, voice, self.tts.name, PCM_FORMAT)
+
+    def _synthesize(self, tts, text: str, voice: str, key: str, cancel: Optional[CancelToken] = None) -> bytes:
+        raw = np.frombuffer(tts.synthesize(text, voice, response_format=PCM_FORMAT, cancel=cancel), dtype="<i2")
+        data = _trim_silence(raw).tobytes()
+        self.cache.set(key, data)
+        return data
+
+    def _fragment(self, text: str, voice: str) -> np.ndarray:
+        """PCM for one fragment, synthesized only on a cache miss."""
+        text = self.tts.prepare_text(text)
+        key = self._key(text, voice)
+        data = self.cache.get(key)
+        if data is None:
+            with self._inflight_lock:
+                pending = self._inflight.get(key)
+                if pending is None:
+                    # Concurrent renders of the same fragment wait for this one
+                    own = self._inflight[key] = Future()
+            if pending is not None:
+                try:
+                    data = pending.result(timeout=self.prefetch_wait)
+                except Exception as e:
+                    # Still queued at batch priority, shed, failed, or its call hung up:
+                    # synthesize it for this render at the renderer's own priority
+                    logger.debug(f"Not waiting on prefetch of '{text[:40]}': {type(e).__name__}")
+                    data = self._synthesize(self.tts, text, voice, key)
+            else:
+                try:
+                    data = self._synthesize(self.tts, text, voice, key)
+                    own.set_result(data)
+                except BaseException as e:
+                    own.set_exception(e)
+                    raise
+                finally:
+                    self._forget(key)
+        return np.frombuffer(data, dtype="<i2")
+
+    def fragment_texts(self, name: str, slots: Optional[Dict[str, str]] = None) -> List[str]:
+        """Spoken text of each fragment of a template, skipping slots without a value."""
+        slots = slots or {}
+        return [
+            self.tts.prepare_text(value if kind == "static" else str(slots[value]).strip() + suffix)
+            for kind, value, suffix in self.templates[name].fragments
+            if kind == "static" or value in slots
+        ]
+
+    def cached(self, text: str, voice: str) -> bool:
+        return self._key(self.tts.prepare_text(text), voice) in self.cache
+
+    def pending(self, text: str, voice: str) -> Optional[Future]:
+        """The prefetch of a fragment still in progress, if any."""
+        key = self._key(self.tts.prepare_text(text), voice)
+        with self._inflight_lock:
+            return self._inflight.get(key) if key in self._prefetching else None
+
+    def prefetch(self, texts: Iterable[str], voice: str, cancel: Optional[CancelToken] = None) -> Dict[str, Future]:
+        """
+        Synthesize fragments into the cache in the background with ``prefetch_tts``.
+
+        Args:
+            texts: Fragment texts, most wanted first
+            voice: Voice to synthesize them in
+            cancel: Token that abandons the prefetches still queued or in flight
+
+        Returns:
+            Futures of the fragments this call started; cached and already
+            prefetching fragments are skipped
+        """
+        started = {}
+        for text in texts:
+            text = self.tts.prepare_text(text)
+            key = self._key(text, voice)
+            if key in self.cache:
+                continue
+            with self._inflight_lock:
+                if key in self._inflight:
+                    continue
+                future = self._prefetch_executor.submit(self._synthesize, self.prefetch_tts, text, voice, key, cancel)
+                self._inflight[key] = future
+                self._prefetching.add(key)
+            future.add_done_callback(lambda _, key=key: self._forget(key))
+            started[text] = future
+        return started
+
+    def _forget(self, key: str) -> None:
+        with self._inflight_lock:
+            self._inflight.pop(key, None)
+            self._prefetching.discard(key)
+
+    def prepare(self, voice: str, names: Optional[List[str]] = None) -> int:
+        """
+        Pre-synthesize the static fragments of templates for a voice.
+
+        Returns:
+            Number of fragments that were synthesized (cache misses)
+        """
+        texts = {
+            self.tts.prepare_text(text)
+            for name in (names or list(self.templates))
+            for text in self.templates[name].static_fragments
+        }
+        missing = [t for t in texts if self._key(t, voice) not in self.cache]
+        for future in [self._executor.submit(self._fragment, t, voice) for t in missing]:
+            future.result()
+        logger.info(f"Prepared {len(missing)} template fragments for voice {voice}")
+        return len(missing)
+
+    def render_pcm(self, name: str, voice: str, slots: Dict[str, str]) -> np.ndarray:
+        """Render a template to 24 kHz int16 PCM."""
+        template = self.templates[name]
+        missing = set(template.slots) - set(slots)
+        if missing:
+            raise ValueError(f"Missing slot values for template '{name}': {', '.join(sorted(missing))}")
+
+        texts = [
+            value if kind == "static" else str(slots[value]).strip() + suffix
+            for kind, value, suffix in template.fragments
+        ]
+        futures = [self._executor.submit(self._fragment, text, voice) for text in texts]
+        return crossfade_join([f.result() for f in futures], self.fade_samples)
+
+    def render(self, name: str, voice: str, slots: Dict[str, str]) -> bytes:
+        """Render a template to a WAV file in memory."""
+        return pcm_to_wav(self.render_pcm(name, voice, slots))
+
+    def close(self) -> None:
+        """Stop the synthesis pools; work already submitted still finishes."""
+        self._executor.shutdown(wait=False)
+        self._prefetch_executor.shutdown(wait=False)
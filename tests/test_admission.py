@@ -0,0 +1,147 @@
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.server.admission import BATCH, INTERACTIVE, ClientRateLimiter, Overloaded, PriorityScheduler
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition never became true")
+        time.sleep(0.005)
+
+class Holder:
+    """Occupies a scheduler slot on a thread until released."""
+
+    def __init__(self, scheduler, priority=BATCH):
+        self.release = threading.Event()
+        self.thread = threading.Thread(target=self._hold, args=(scheduler, priority))
+        self.thread.start()
+        wait_until(lambda: sum(scheduler.running.values()) == 1)
+
+    def _hold(self, scheduler, priority):
+        with scheduler.slot(priority, deadline=5):
+            self.release.wait(5)
+
+    def done(self):
+        self.release.set()
+        self.thread.join(5)
+
+def test_interactive_work_is_served_before_queued_batch_work():
+    scheduler = PriorityScheduler(max_concurrent=1, interactive_concurrency=1, batch_concurrency=1)
+    holder = Holder(scheduler)
+    order = []
+
+    def request(priority):
+        with scheduler.slot(priority, deadline=5):
+            order.append(priority)
+
+    threads = []
+    for priority in (BATCH, BATCH, INTERACTIVE):
+        queued = len(scheduler.queues[priority])
+        threads.append(threading.Thread(target=request, args=(priority,)))
+        threads[-1].start()
+        wait_until(lambda: len(scheduler.queues[priority]) == queued + 1)
+
+    holder.done()
+    for thread in threads:
+        thread.join(5)
+    # The interactive request arrived last but is dispatched first
+    assert order == [INTERACTIVE, BATCH, BATCH]
+
+def test_batch_cap_leaves_headroom_for_live_calls():
+    scheduler = PriorityScheduler(max_concurrent=2, interactive_concurrency=2, batch_concurrency=1)
+    holder = Holder(scheduler, BATCH)
+    # A second batch request would have to wait, an interactive one starts at once
+    with pytest.raises(Overloaded):
+        with scheduler.slot(BATCH, deadline=0.01):
+            pass
+    with scheduler.slot(INTERACTIVE, deadline=0.01):
+        assert scheduler.stats()[INTERACTIVE] == {"running": 1, "queued": 0}
+    holder.done()
+
+def test_request_that_cannot_meet_its_deadline_is_shed_up_front():
+    scheduler = PriorityScheduler(max_concurrent=1, interactive_deadline=0.05)
+    holder = Holder(scheduler)
+    started = time.monotonic()
+    with pytest.raises(Overloaded) as shed:
+        with scheduler.slot(INTERACTIVE):
+            pass
+    assert shed.value.reason == "deadline"
+    assert shed.value.retry_after > 0
+    # Shed on the predicted wait, without sitting in the queue first
+    assert time.monotonic() - started < 0.05
+    assert scheduler.stats()[INTERACTIVE]["queued"] == 0
+    holder.done()
+
+def test_request_past_its_deadline_leaves_the_queue():
+    scheduler = PriorityScheduler(max_concurrent=1)
+    holder = Holder(scheduler)
+    # A stale estimate lets the request queue, but it still gives up on time
+    scheduler.service_time[INTERACTIVE] = scheduler.service_time[BATCH] = 0.0
+    with pytest.raises(Overloaded) as shed:
+        with scheduler.slot(INTERACTIVE, deadline=0.05):
+            pass
+    assert shed.value.reason == "deadline"
+    assert scheduler.stats()[INTERACTIVE] == {"running": 0, "queued": 0}
+    holder.done()
+
+def test_full_queue_rejects_new_requests():
+    scheduler = PriorityScheduler(max_concurrent=1, max_queue=1)
+    holder = Holder(scheduler)
+    def queued_request():
+        with scheduler.slot(BATCH):
+            pass
+    waiter = threading.Thread(target=queued_request)
+    waiter.start()
+    wait_until(lambda: len(scheduler.queues[BATCH]) == 1)
+    with pytest.raises(Overloaded) as shed:
+        with scheduler.slot(BATCH):
+            pass
+    assert shed.value.reason == "queue_full"
+    holder.done()
+    waiter.join(5)
+
+def test_each_client_has_its_own_bucket():
+    limiter = ClientRateLimiter(rate=0.01, burst=2)
+    assert limiter.check("key:a") == 0.0
+    assert limiter.check("key:a") == 0.0
+    assert limiter.check("key:a") > 0
+    assert limiter.check("key:b") == 0.0
+
+class TestApiAdmission:
+    @pytest.fixture
+    def api(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.setenv("PODCAST_STARTUP", json.dumps({"warm_up": False}))
+        monkeypatch.setenv("PODCAST_CALL_EVENTS", json.dumps({"enabled": False}))
+        monkeypatch.setenv("PODCAST_ADMISSION", json.dumps(
+            {"api_keys": ["alpha", "beta"], "client_rate_per_s": 0.01, "client_burst": 2}))
+        import api
+        return api
+
+    def test_key_over_its_limit_is_rejected_while_others_are_admitted(self, api):
+        with TestClient(api.app) as client:
+            def barge_in(key=None):
+                return client.post("/api/calls/c1/barge-in", headers={"x-api-key": key} if key else {})
+
+            assert [barge_in("alpha").status_code for _ in range(2)] == [200, 200]
+            limited = barge_in("alpha")
+            assert limited.status_code == 429
+            assert int(limited.headers["Retry-After"]) >= 1
+
+            assert barge_in("beta").status_code == 200
+            # Without a key the caller is limited by address, separately from the keys
+            assert barge_in().status_code == 200
+            # A key that is not configured cannot be used to get a fresh bucket
+            assert barge_in("gamma").status_code == 401
+
+    def test_shed_requests_get_503_with_retry_after(self, api):
+        response = asyncio.run(api.overloaded(None, Overloaded("deadline", retry_after=2.4)))
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "2"
@@ -0,0 +1,156 @@
+import wave
+
+import numpy as np
+import pytest
+
+from src.podcast import assembly
+from src.podcast.assembly import MONO, MPEG1, MPEG2, MPEG25, SAMPLE_RATES, adjust_gain, parse_mp3, silent_frame
+
+STEREO = 0
+
+def frame(version=MPEG1, rate_index=0, mode=STEREO, bitrate_index=9, gain=120, crc=False) -> bytes:
+    """A Layer III frame whose granules all have the given global_gain."""
+    header = (0x7FF << 21) | (version << 19) | (1 << 17) | (0 if crc else 1 << 16) \
+        | (bitrate_index << 12) | (rate_index << 10) | (mode << 6)
+    length = assembly._parse_header(header)[1]
+    side_bytes = assembly._side_info_size(version, mode)
+    side = 0
+    for bit in assembly._gain_positions(version, mode):
+        side |= gain << (side_bytes * 8 - bit - 8)
+    data = header.to_bytes(4, "big") + (b"\0\0" if crc else b"") + side.to_bytes(side_bytes, "big")
+    return data + b"\x55" * (length - len(data))
+
+def xing_frame(version=MPEG1, mode=STEREO) -> bytes:
+    data = bytearray(frame(version, mode=mode, gain=0))
+    info = 4 + assembly._side_info_size(version, mode)
+    data[info:info + 4] = b"Xing"
+    return bytes(data)
+
+def id3v2(payload: bytes) -> bytes:
+    size = len(payload)
+    return b"ID3\x04\x00\x00" + bytes([(size >> s) & 0x7F for s in (21, 14, 7, 0)]) + payload
+
+def mp3(*frames: bytes) -> bytes:
+    """A file as an encoder writes it: ID3v2 tag, Xing header frame, audio frames, ID3v1 tag."""
+    # The tag holds bytes that look like a frame header, as embedded cover art often does
+    tag = id3v2(b"\0" * 50 + frame()[:4] + b"\0" * 50)
+    return tag + xing_frame() + b"".join(frames) + b"TAG" + bytes(125)
+
+def gains(stream, index=0):
+    offset, _ = stream.frames[index]
+    start = offset + 4 + (2 if stream.crc else 0)
+    side_bytes = assembly._side_info_size(stream.version, stream.channel_mode)
+    side = int.from_bytes(stream.data[start:start + side_bytes], "big")
+    return [(side >> (side_bytes * 8 - bit - 8)) & 0xFF
+            for bit in assembly._gain_positions(stream.version, stream.channel_mode)]
+
+def test_parse_skips_tags_and_xing_header():
+    audio = [frame(gain=100 + n) for n in range(5)]
+    data = mp3(*audio)
+    stream = parse_mp3(data)
+    assert len(stream.frames) == 5
+    assert b"".join(data[o:o + n] for o, n in stream.frames) == b"".join(audio)
+    assert stream.format() == (MPEG1, 44100, 2)
+    assert not stream.crc
+    assert stream.duration == pytest.approx(5 * 1152 / 44100)
+    assert gains(stream, 3) == [103] * 4
+
+def test_parse_rejects_data_without_frames():
+    assert parse_mp3(b"RIFF" + bytes(1000)) is None
+
+@pytest.mark.parametrize("version, mode", [(MPEG1, STEREO), (MPEG1, MONO), (MPEG2, STEREO), (MPEG25, MONO)])
+def test_gain_adjustment_is_reversible(version, mode):
+    audio = [frame(version, mode=mode, bitrate_index=5, gain=g) for g in (90, 0, 140)]
+    stream = parse_mp3(b"".join(audio))
+    louder = parse_mp3(adjust_gain(stream, 6))
+    assert gains(louder, 0) == [96] * len(gains(stream, 0))
+    # Silent granules stay silent
+    assert set(gains(louder, 1)) == {0}
+    assert adjust_gain(louder, -6) == b"".join(audio)
+
+@pytest.mark.parametrize("version, rate_index, length", [
+    (MPEG1, 0, 104), (MPEG1, 2, 144), (MPEG2, 0, 26), (MPEG2, 1, 24), (MPEG25, 0, 52), (MPEG25, 2, 72),
+])
+def test_silent_frame_matches_the_stream(version, rate_index, length):
+    stream = parse_mp3(frame(version, rate_index, bitrate_index=5) * 2)
+    silence = silent_frame(stream)
+    assert len(silence) == length
+    parsed = parse_mp3(silence * 3)
+    assert parsed.format() == (version, SAMPLE_RATES[version][rate_index], 2)
+    assert len(parsed.frames) == 3
+
+def write_wav(path, seconds=0.5, sample_rate=16000):
+    with wave.open(str(path), "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(bytes(int(seconds * sample_rate) * 2))
+    return path
+
+def test_matching_mp3s_are_joined_frame_by_frame(tmp_path):
+    first, second = tmp_path / "a.mp3", tmp_path / "b.mp3"
+    first.write_bytes(mp3(*[frame(gain=110)] * 3))
+    second.write_bytes(mp3(*[frame(gain=130)] * 4))
+    report = assembly.assemble([first, second], tmp_path / "out.mp3", gap_ms=500)
+    assert report.method == "frames"
+
+    joined = parse_mp3((tmp_path / "out.mp3").read_bytes())
+    gap = round(0.5 * 44100 / 1152)
+    assert len(joined.frames) == 3 + gap + 4
+    assert report.duration == pytest.approx(joined.duration)
+    assert gains(joined, 3 + gap) == [130] * 4
+
+@pytest.mark.parametrize("inputs, output", [
+    # Different sample rates
+    ([mp3(frame()), mp3(frame(rate_index=1))], "out.mp3"),
+    # Different MPEG versions
+    ([mp3(frame()), frame(MPEG2) * 4], "out.mp3"),
+    # CRC-protected frames would need their checksums recomputed
+    ([mp3(frame()), mp3(frame(crc=True))], "out.mp3"),
+    # A WAV among the inputs
+    ([mp3(frame()), None], "out.mp3"),
+    # Output other than MP3
+    ([mp3(frame()), mp3(frame())], "out.wav"),
+])
+def test_mixed_inputs_are_re_encoded(tmp_path, monkeypatch, inputs, output):
+    files = []
+    for index, data in enumerate(inputs):
+        if data is None:
+            files.append(write_wav(tmp_path / f"{index}.wav"))
+        else:
+            files.append(tmp_path / f"{index}.mp3")
+            files[-1].write_bytes(data)
+    calls = []
+    monkeypatch.setattr(assembly, "_join_pcm", lambda *args: calls.append(args) or "pcm")
+    assert assembly.assemble(files, tmp_path / output) == "pcm"
+    assert calls[0][0] == files
+
+def test_wav_files_are_joined_as_pcm(tmp_path):
+    files = [write_wav(tmp_path / "a.wav", 0.5), write_wav(tmp_path / "b.wav", 0.25)]
+    report = assembly.assemble(files, tmp_path / "out.wav", gap_ms=250)
+    assert report.method == "pcm"
+    assert report.duration == pytest.approx(1.0)
+    with wave.open(str(tmp_path / "out.wav"), "rb") as wav:
+        assert wav.getnframes() == 16000
+
+def test_failed_join_leaves_no_partial_file(tmp_path, monkeypatch):
+    files = [tmp_path / "a.mp3", tmp_path / "b.mp3"]
+    for path in files:
+        path.write_bytes(mp3(frame()))
+
+    def broken(stream, steps):
+        raise OSError("disk full")
+    monkeypatch.setattr(assembly, "adjust_gain", broken)
+    with pytest.raises(OSError):
+        assembly.assemble(files, tmp_path / "out.mp3")
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["a.mp3", "b.mp3"]
+
+@pytest.mark.parametrize("sample_rate", [48000, 44100])
+def test_full_scale_sine_reads_minus_3_lufs(sample_rate):
+    # BS.1770: a 0 dBFS 997 Hz sine in one channel measures -3.01 LKFS
+    t = np.arange(5 * sample_rate) / sample_rate
+    sine = np.sin(2 * np.pi * 997 * t).astype(np.float32)
+    assert assembly.integrated_loudness(sine, sample_rate) == pytest.approx(-3.01, abs=0.02)
+
+def test_silence_has_no_loudness():
+    assert assembly.integrated_loudness(np.zeros(48000, dtype=np.float32), 48000) == float("-inf")
@@ -0,0 +1,58 @@
+import hashlib
+import os
+import time
+
+import pytest
+
+from src.voice import audio_store
+from src.voice.audio_store import AudioStore
+
+def key(n: int) -> str:
+    return hashlib.sha256(str(n).encode()).hexdigest()
+
+def put(store: AudioStore, n: int, size: int = 1000, age: float = 0) -> None:
+    path = store.put(key(n), "mp3", bytes(size))
+    when = time.time() - age
+    os.utime(path, (when, when))
+
+def test_least_recently_used_renders_go_first(tmp_path, monkeypatch):
+    monkeypatch.setattr(audio_store, "TOUCH_INTERVAL", 0)
+    store = AudioStore(tmp_path, max_bytes=5000, low_watermark=0.6)
+    for n in range(6):
+        put(store, n, age=600 - n * 60)
+    # Serving the oldest render makes it the most recently used
+    assert store.get(key(0), "mp3") is not None
+
+    evicted = store.evict()
+    assert evicted == [key(1), key(2), key(3)]
+    assert store.get(key(1), "mp3") is None
+    assert all(store.get(key(n), "mp3") for n in (0, 4, 5))
+
+def test_within_budget_nothing_is_evicted(tmp_path):
+    store = AudioStore(tmp_path, max_bytes=10_000)
+    for n in range(3):
+        put(store, n)
+    assert store.evict() == []
+
+def test_expired_renders_are_evicted(tmp_path):
+    store = AudioStore(tmp_path, max_age=3600)
+    put(store, 1, age=7200)
+    put(store, 2, age=60)
+    assert store.evict() == [key(1)]
+    assert store.get(key(2), "mp3") is not None
+
+def test_abandoned_temp_files_are_removed(tmp_path):
+    store = AudioStore(tmp_path, max_bytes=10_000)
+    put(store, 1)
+    tmp = store.path_for(key(1), "mp3").parent / "abc.tmp"
+    tmp.write_bytes(b"partial")
+    old = time.time() - 2 * audio_store.STALE_TMP_SECONDS
+    os.utime(tmp, (old, old))
+    store.evict()
+    assert not tmp.exists()
+
+@pytest.mark.parametrize("kwargs", [{}, {"max_bytes": None, "max_age": None}])
+def test_unbounded_store_never_evicts(tmp_path, kwargs):
+    store = AudioStore(tmp_path, **kwargs)
+    put(store, 1, age=10 ** 8)
+    assert store.evict() == []
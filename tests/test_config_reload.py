@@ -0,0 +1,67 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.setup.config_manager import ConfigManager
+
+def test_listener_failure_keeps_current_snapshot(tmp_path, monkeypatch):
+    config = ConfigManager(str(tmp_path / "config.json"))
+    seen = []
+
+    def listener(snapshot):
+        if snapshot.get("output_dir") == "broken":
+            raise RuntimeError("cannot build")
+        return lambda: seen.append(config.snapshot.get("output_dir"))
+    config.on_reload(listener)
+
+    monkeypatch.setenv("PODCAST_OUTPUT_DIR", "broken")
+    assert config.reload() is False
+    assert config.snapshot.version == 0
+    assert config.get("output_dir") == "podcast_output"
+
+    monkeypatch.setenv("PODCAST_OUTPUT_DIR", "elsewhere")
+    assert config.reload() is True
+    # The commit step runs once the new snapshot is visible
+    assert seen == ["elsewhere"]
+
+class TestServiceReload:
+    @pytest.fixture
+    def api(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.setenv("PODCAST_STARTUP", json.dumps({"warm_up": False, "config_reload_seconds": 0}))
+        monkeypatch.setenv("PODCAST_CALL_EVENTS", json.dumps({"enabled": False}))
+        import api
+        closed = []
+        monkeypatch.setattr(api, "close_services", closed.append)
+        with TestClient(api.app):
+            yield api, closed
+
+    def test_failed_build_keeps_snapshot_and_services(self, api, monkeypatch):
+        api, closed = api
+        services = api.app.state.services
+        config = services["config"]
+
+        def broken(*args, **kwargs):
+            raise RuntimeError("provider unavailable")
+        monkeypatch.setattr(api, "build_services", broken)
+        monkeypatch.setenv("PODCAST_SEMANTIC_CACHE", json.dumps({"threshold": 0.8}))
+        assert config.reload() is False
+        assert config.snapshot.version == 0
+        assert api.app.state.services is services
+        assert closed == []
+
+    def test_replaced_services_close_after_requests_using_them(self, api, monkeypatch):
+        api, closed = api
+        old = api.app.state.services
+        config = old["config"]
+        api._acquire(old)
+        monkeypatch.setenv("PODCAST_SEMANTIC_CACHE", json.dumps({"threshold": 0.8}))
+        assert config.reload() is True
+
+        new = api.app.state.services
+        assert new is not old
+        assert new["answer_cache"].threshold == 0.8
+        assert closed == []
+        api._release(old)
+        assert closed == [old]
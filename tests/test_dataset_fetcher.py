@@ -0,0 +1,71 @@
+import hashlib
+import json
+
+import pytest
+
+from src.datasets.fetcher import PINS_NAME, DatasetFetcher, fetch_dataset
+
+DATA = {"one.wav": b"x" * 5000, "two.wav": bytes(range(256)) * 10}
+
+@pytest.fixture
+def mirror(tmp_path):
+    directory = tmp_path / "mirror"
+    directory.mkdir()
+    for name, data in DATA.items():
+        (directory / name).write_bytes(data)
+    return directory
+
+def manifest(pinned: bool = True) -> dict:
+    return {"name": "samples", "files": [
+        {"name": name, "url": f"https://example.invalid/{name}",
+         "size": len(data) if pinned else None,
+         "sha256": hashlib.sha256(data).hexdigest() if pinned else None}
+        for name, data in DATA.items()
+    ]}
+
+def fetch(mirror, dest, files=None, **kwargs):
+    return DatasetFetcher(workers=2, mirror=str(mirror), retries=1, **kwargs).fetch(files or manifest(), dest)
+
+def test_fetches_from_mirror_and_skips_valid_files(mirror, tmp_path):
+    dest = tmp_path / "dest"
+    report = fetch(mirror, dest)
+    assert report["failed"] == []
+    assert {r["status"] for r in report["files"]} == {"downloaded"}
+    assert (dest / "two.wav").read_bytes() == DATA["two.wav"]
+
+    assert {r["status"] for r in fetch(mirror, dest)["files"]} == {"valid"}
+
+def test_partial_file_is_resumed(mirror, tmp_path):
+    dest = tmp_path / "dest"
+    dest.mkdir()
+    (dest / "one.wav.part").write_bytes(DATA["one.wav"][:1200])
+    report = fetch(mirror, dest)
+    one = next(r for r in report["files"] if r["name"] == "one.wav")
+    assert one["bytes"] == 5000 - 1200
+    assert (dest / "one.wav").read_bytes() == DATA["one.wav"]
+
+def test_hash_mismatch_fails_and_removes_partial(mirror, tmp_path):
+    dest = tmp_path / "dest"
+    (mirror / "two.wav").write_bytes(bytes(2560))
+    report = fetch(mirror, dest)
+    assert report["failed"] == ["two.wav"]
+    assert not (dest / "two.wav").exists()
+    assert not (dest / "two.wav.part").exists()
+
+def test_unpinned_entries_are_pinned_on_first_download(mirror, tmp_path):
+    dest = tmp_path / "dest"
+    assert fetch(mirror, dest, manifest(pinned=False))["failed"] == []
+    pins = json.loads((dest / PINS_NAME).read_text())
+    assert pins["one.wav"] == {"size": 5000, "sha256": hashlib.sha256(DATA["one.wav"]).hexdigest()}
+
+    # A corrupted local copy is caught and the tampered source is refused
+    (dest / "one.wav").write_bytes(b"y" * 5000)
+    (mirror / "one.wav").write_bytes(b"y" * 5000)
+    assert fetch(mirror, dest, manifest(pinned=False))["failed"] == ["one.wav"]
+
+def test_require_pinned_refuses_unpinned_entries(mirror, tmp_path):
+    path = tmp_path / "manifest.json"
+    path.write_text(json.dumps(manifest(pinned=False)))
+    report = fetch_dataset(path, tmp_path / "dest", mirror=str(mirror), require_pinned=True)
+    assert sorted(report["failed"]) == sorted(DATA)
+    assert not (tmp_path / "dest" / "one.wav").exists()
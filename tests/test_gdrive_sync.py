@@ -0,0 +1,175 @@
+import hashlib
+import importlib.util
+import json
+from pathlib import Path
+
+import pytest
+
+SCRIPT = Path(__file__).resolve().parent.parent / "config" / "settings" / "download_from_gdrive.py"
+spec = importlib.util.spec_from_file_location("download_from_gdrive", SCRIPT)
+gdrive = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(gdrive)
+
+class FakeRequest:
+    def __init__(self, result):
+        self.result = result
+
+    def execute(self):
+        return self.result
+
+class FakeFiles:
+    def __init__(self, drive: "FakeDrive"):
+        self.drive = drive
+
+    def list(self, q, spaces, fields, orderBy=None, pageSize=None, pageToken=None):
+        folder_id = q.split("'")[1]
+        children = self.drive.children.get(folder_id, [])
+        start = int(pageToken or 0)
+        page = {"files": children[start:start + self.drive.page_size]}
+        if start + self.drive.page_size < len(children):
+            page["nextPageToken"] = str(start + self.drive.page_size)
+        return FakeRequest(page)
+
+    def get_media(self, fileId):
+        self.drive.fetched.append(fileId)
+        return fileId
+
+class FakeDrive:
+    """A Drive folder tree in memory, listed two entries per page."""
+
+    def __init__(self):
+        self.children = {}
+        self.content = {}
+        self.fetched = []
+        self.fail = set()
+        self.corrupt = set()
+        self.page_size = 2
+
+    def add(self, parent: str, file_id: str, name: str, data: bytes = None, folder: bool = False) -> dict:
+        file = {"id": file_id, "name": name, "modifiedTime": "2025-01-01T00:00:00Z",
+                "mimeType": gdrive.FOLDER_MIME_TYPE if folder else "audio/wav"}
+        if not folder:
+            self.content[file_id] = data
+            file["md5Checksum"] = hashlib.md5(data).hexdigest()
+            file["size"] = str(len(data))
+        self.children.setdefault(parent, []).append(file)
+        return file
+
+    def update(self, file: dict, data: bytes) -> None:
+        self.content[file["id"]] = data
+        file["md5Checksum"] = hashlib.md5(data).hexdigest()
+
+    def files(self):
+        return FakeFiles(self)
+
+    def downloader(self, fh, file_id):
+        drive = self
+
+        class Downloader:
+            def __init__(self):
+                self.offset = 0
+
+            def next_chunk(self):
+                data = drive.content[file_id]
+                if file_id in drive.corrupt:
+                    data = data[::-1]
+                chunk = data[self.offset:self.offset + 3]
+                fh.write(chunk)
+                self.offset += len(chunk)
+                if file_id in drive.fail and self.offset >= len(data) // 2:
+                    raise IOError("connection reset")
+                return None, self.offset >= len(data)
+        return Downloader()
+
+@pytest.fixture
+def drive():
+    drive = FakeDrive()
+    drive.add("root", "a", "a.wav", b"first file")
+    drive.add("root", "b", "b.wav", b"second file")
+    drive.add("root", "sub", "sub", folder=True)
+    drive.add("sub", "c", "c.wav", b"nested file")
+    drive.add("root", "doc", "notes", b"")["mimeType"] = "application/vnd.google-apps.document"
+    return drive
+
+def sync(drive, dest, **kwargs):
+    return gdrive.sync_folder(lambda: drive, "root", dest, workers=2, downloader_factory=drive.downloader, **kwargs)
+
+def test_first_sync_downloads_every_page_and_subfolder(drive, tmp_path):
+    counts = sync(drive, tmp_path)
+    assert counts == {"downloaded": 3, "skipped": 0, "failed": 0}
+    assert (tmp_path / "sub" / "c.wav").read_bytes() == b"nested file"
+    manifest = json.loads((tmp_path / gdrive.MANIFEST_NAME).read_text())
+    assert set(manifest) == {"a.wav", "b.wav", "sub/c.wav"}
+
+def test_unchanged_files_are_skipped_and_changed_ones_fetched(drive, tmp_path):
+    sync(drive, tmp_path)
+    drive.fetched.clear()
+    assert sync(drive, tmp_path) == {"downloaded": 0, "skipped": 3, "failed": 0}
+    assert drive.fetched == []
+
+    drive.update(drive.children["root"][1], b"second file, edited")
+    assert sync(drive, tmp_path) == {"downloaded": 1, "skipped": 2, "failed": 0}
+    assert drive.fetched == ["b"]
+    assert (tmp_path / "b.wav").read_bytes() == b"second file, edited"
+
+def test_deleted_local_copy_is_fetched_again(drive, tmp_path):
+    sync(drive, tmp_path)
+    (tmp_path / "a.wav").unlink()
+    assert sync(drive, tmp_path)["downloaded"] == 1
+
+def test_md5_mismatch_leaves_no_file_behind(drive, tmp_path):
+    drive.corrupt.add("b")
+    counts = sync(drive, tmp_path)
+    assert counts == {"downloaded": 2, "skipped": 0, "failed": 1}
+    assert not (tmp_path / "b.wav").exists()
+    assert not list(tmp_path.glob(".*.part"))
+    assert "b.wav" not in json.loads((tmp_path / gdrive.MANIFEST_NAME).read_text())
+
+def test_interrupted_sync_resumes_with_the_failed_files(drive, tmp_path):
+    drive.fail.add("c")
+    assert sync(drive, tmp_path) == {"downloaded": 2, "skipped": 0, "failed": 1}
+
+    drive.fail.clear()
+    drive.fetched.clear()
+    assert sync(drive, tmp_path) == {"downloaded": 1, "skipped": 2, "failed": 0}
+    assert drive.fetched == ["c"]
+
+def test_names_cannot_escape_the_destination(drive, tmp_path):
+    dest = tmp_path / "mirror"
+    drive.add("root", "evil", "../../escaped.wav", b"outside")
+    drive.add("root", "up", "..", folder=True)
+    drive.add("up", "deep", "x.wav", b"up one level")
+    counts = sync(drive, dest)
+    assert counts["failed"] == 0
+    assert not (tmp_path / "escaped.wav").exists()
+    assert not (tmp_path / "x.wav").exists()
+    assert (dest / ".._.._escaped.wav").read_bytes() == b"outside"
+    assert (dest / "__" / "x.wav").read_bytes() == b"up one level"
+
+def test_duplicate_names_get_separate_files(drive, tmp_path):
+    drive.add("root", "a-duplicate", "a.wav", b"same name, other file")
+    # Names that only collide once made safe count as duplicates too
+    drive.add("root", "b-padded", "b.wav ", b"trailing space")
+    drive.add("root", "sub-duplicate", "sub", folder=True)
+    drive.add("sub-duplicate", "c-duplicate", "c.wav", b"nested duplicate")
+    counts = sync(drive, tmp_path)
+    assert counts == {"downloaded": 6, "skipped": 0, "failed": 0}
+    assert (tmp_path / "a.wav").read_bytes() == b"first file"
+    assert (tmp_path / "a (a-duplic).wav").read_bytes() == b"same name, other file"
+    assert (tmp_path / "b (b-padded).wav").read_bytes() == b"trailing space"
+    assert (tmp_path / "sub" / "c.wav").read_bytes() == b"nested file"
+    assert (tmp_path / "sub (sub-dupl)" / "c.wav").read_bytes() == b"nested duplicate"
+    manifest = json.loads((tmp_path / gdrive.MANIFEST_NAME).read_text())
+    assert manifest["a.wav"]["id"] == "a"
+    assert manifest["a (a-duplic).wav"]["id"] == "a-duplicate"
+
+    # Both copies stay in sync on the next run instead of overwriting each other
+    drive.fetched.clear()
+    assert sync(drive, tmp_path) == {"downloaded": 0, "skipped": 6, "failed": 0}
+    assert drive.fetched == []
+
+@pytest.mark.parametrize("name, expected", [
+    ("a/b.wav", "a_b.wav"), ("..", "__"), (".", "_"), ("", "_"), ("ok.wav", "ok.wav"),
+])
+def test_safe_name(name, expected):
+    assert gdrive.safe_name(name) == expected
@@ -0,0 +1,39 @@
+import pytest
+
+from src.voice.normalize import normalize_text
+
+@pytest.mark.parametrize("text, expected", [
+    # Times, including midnight at the end of the day
+    ("kl. 14:00", "klukkan fjórtán"),
+    ("kl 14", "klukkan fjórtán"),
+    ("Opið til kl. 16.30", "Opið til klukkan sextán þrjátíu"),
+    ("kl. 24:00", "klukkan tuttugu og fjögur"),
+    ("Lokað frá 24:00", "Lokað frá tuttugu og fjögur"),
+    # Dates, with month names in any case
+    ("14. mars 2025", "fjórtánda mars tvö þúsund tuttugu og fimm"),
+    ("Þann 14. Mars kemur", "Þann fjórtánda mars kemur"),
+    ("Þann 3. Okt. kemur", "Þann þriðja október kemur"),
+    ("01.04.2025", "fyrsta apríl tvö þúsund tuttugu og fimm"),
+    # Ordinals up to 99
+    ("Hann lenti í 45. sæti.", "Hann lenti í fertugasta og fimmta sæti."),
+    ("Í 99. sinn", "Í nítugasta og níunda sinn"),
+    ("Í 60. sinn", "Í sextugasta sinn"),
+    ("Í 21. sæti", "Í tuttugasta og fyrsta sæti"),
+    # Version numbers are not thousands separators or sentence ends
+    ("Vefsíða 2.0 er", "Vefsíða tvö punktur núll er"),
+    ("Útgáfa 3.11.7 er komin", "Útgáfa þrjú punktur ellefu punktur sjö er komin"),
+    ("Gjaldið er 1.500 kr.", "Gjaldið er eitt þúsund og fimm hundruð krónur."),
+    # Phone numbers are read digit by digit
+    ("Hringdu í 411 1111 núna.", "Hringdu í fjögur eitt eitt, eitt eitt eitt eitt núna."),
+    ("Síminn er +354 411-1111.", "Síminn er plús þrjú fimm fjögur, fjögur eitt eitt, eitt eitt eitt eitt."),
+    ("010190-2939", "núll eitt, núll eitt, níutíu, tuttugu og níu, þrjátíu og níu"),
+    # Agreement, currency, percent and abbreviations
+    ("frá 3 dögum", "frá þremur dögum"),
+    ("21 krónu á mínútu", "tuttugu og eina krónu á mínútu"),
+    ("Verðið hækkaði um 3,5% frá árinu 1999.",
+     "Verðið hækkaði um þrjú komma fimm prósent frá árinu nítján hundruð níutíu og níu."),
+    ("Þetta tekur u.þ.b. 3 vikur", "Þetta tekur um það bil þrjár vikur"),
+    ("Við eigum   „fjögur“ herbergi — og 2 hús.", 'Við eigum "fjögur" herbergi - og tvö hús.'),
+])
+def test_normalize_text(text, expected):
+    assert normalize_text(text) == expected
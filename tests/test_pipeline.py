@@ -0,0 +1,84 @@
+import threading
+
+import numpy as np
+
+from src.chat.semantic_cache import SemanticCache
+from src.voice.pipeline import SpeechPipeline
+
+QUESTION = "Hvenær er opið hjá ykkur?"
+REPLY = "Opið er frá níu til fimm. Lokað um helgar."
+
+class FakeSTT:
+    def transcribe(self, audio, filename):
+        return audio.decode()
+
+class FakeChat:
+    def __init__(self, model: str):
+        self.model = model
+        self.calls = 0
+
+    def stream(self, messages):
+        self.calls += 1
+        yield from REPLY.split(" ")
+
+class FakeTTS:
+    name = "fake"
+
+    def prepare_text(self, text):
+        return text
+
+    def synthesize(self, text, voice, cancel=None, **kwargs):
+        return text.encode()
+
+def embed(texts):
+    vectors = []
+    for text in texts:
+        vector = np.zeros(64)
+        for word in text.lower().split():
+            vector[hash(word) % 64] += 1
+        vectors.append(vector)
+    return vectors
+
+def turn(pipeline, question=QUESTION, history=None):
+    return list(pipeline.run(question.encode(), "q.wav", history=history))
+
+def flush(pipeline):
+    pipeline._cache_executor.submit(lambda: None).result(timeout=5)
+
+def test_cached_answers_are_scoped_to_the_chat_model():
+    cache = SemanticCache(embed)
+    writer = SpeechPipeline(FakeSTT(), FakeChat("model-a"), FakeTTS(), voice="alloy", answer_cache=cache)
+    turn(writer)
+    flush(writer)
+
+    other_model = SpeechPipeline(FakeSTT(), FakeChat("model-b"), FakeTTS(), voice="alloy", answer_cache=cache)
+    assert "cached" not in turn(other_model)[-1]
+    assert other_model.chat.calls == 1
+
+    same_model = SpeechPipeline(FakeSTT(), FakeChat("model-a"), FakeTTS(), voice="alloy", answer_cache=cache)
+    assert "cached" in turn(same_model)[-1]
+    assert same_model.chat.calls == 0
+
+def test_slow_answer_store_does_not_hold_tts_workers():
+    release = threading.Event()
+    stored = threading.Event()
+
+    def slow_embed(texts):
+        release.wait(5)
+        stored.set()
+        return embed(texts)
+
+    pipeline = SpeechPipeline(FakeSTT(), FakeChat("model-a"), FakeTTS(), voice="alloy",
+                              answer_cache=SemanticCache(slow_embed), max_parallel_tts=1)
+    # The exact-match miss falls through to the (blocked) embedding on the cache worker only
+    pipeline.answer_cache.lookup = lambda question, scope="": None
+    turn(pipeline)
+    # A follow-up turn still gets its audio while the first answer is being stored
+    events = turn(pipeline, "Og á laugardögum?", history=[{"role": "user", "content": QUESTION},
+                                                         {"role": "assistant", "content": REPLY}])
+    assert events[-1]["type"] == "done"
+    assert not stored.is_set()
+    release.set()
+    flush(pipeline)
+    assert stored.is_set()
+    pipeline.close()
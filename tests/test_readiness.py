@@ -0,0 +1,72 @@
+import json
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+@pytest.fixture
+def api(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("PODCAST_STARTUP", json.dumps({"warm_up_retry_seconds": 0.05, "config_reload_seconds": 0}))
+    monkeypatch.setenv("PODCAST_CALL_EVENTS", json.dumps({"enabled": False}))
+    import api
+    return api
+
+def flaky_warm_up(failures: dict):
+    """Warm-up whose steps fail the given number of times before succeeding."""
+    calls = []
+
+    def warm_up(services, only=None):
+        steps = list(only) if only is not None else ["tts", "stt", "chat", "prompts"]
+        calls.append(steps)
+        timings = {}
+        for step in steps:
+            failing = failures.get(step, 0) > 0
+            failures[step] = failures.get(step, 0) - 1
+            timings[step] = -1.0 if failing else 0.01
+        return timings
+    return warm_up, calls
+
+def wait_for(client, status, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        response = client.get("/readyz")
+        if response.json()["status"] == status:
+            return response
+        time.sleep(0.01)
+    raise AssertionError(f"/readyz never reported {status}: {response.json()}")
+
+def test_failed_required_step_keeps_api_unready_until_it_recovers(api, monkeypatch):
+    warm_up, calls = flaky_warm_up({"stt": 3})
+    monkeypatch.setattr(api, "warm_up", warm_up)
+    with TestClient(api.app) as client:
+        response = wait_for(client, "unavailable")
+        assert response.status_code == 503
+        assert response.json()["failed"] == ["stt"]
+
+        response = wait_for(client, "ready")
+        assert response.status_code == 200
+    # Only the failed step is retried
+    assert calls[1:] == [["stt"]] * 3
+
+def test_failed_optional_step_reports_degraded(api, monkeypatch):
+    warm_up, _ = flaky_warm_up({"prompts": 1})
+    monkeypatch.setattr(api, "warm_up", warm_up)
+    with TestClient(api.app) as client:
+        response = wait_for(client, "degraded")
+        assert response.status_code == 200
+        assert response.json()["failed"] == ["prompts"]
+
+def test_reload_with_failing_required_step_is_rejected(api, monkeypatch):
+    warm_up, _ = flaky_warm_up({})
+    monkeypatch.setattr(api, "warm_up", warm_up)
+    with TestClient(api.app) as client:
+        wait_for(client, "ready")
+        services = api.app.state.services
+        config = services["config"]
+
+        monkeypatch.setattr(api, "warm_up", flaky_warm_up({"chat": 1})[0])
+        monkeypatch.setenv("PODCAST_SEMANTIC_CACHE", json.dumps({"threshold": 0.8}))
+        assert config.reload() is False
+        assert api.app.state.services is services
+        assert config.snapshot.version == 0
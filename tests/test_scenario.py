@@ -0,0 +1,156 @@
+import threading
+
+import pytest
+
+from src.voice.audio_cache import AudioCache
+from src.voice.scenario import ScenarioEngine, _SimulatedTTS, compile_scenarios
+from src.voice.templates import TemplateRenderer
+
+VOICE = "alloy"
+TEMPLATES = {
+    "greeting": "Góðan daginn. Hvernig get ég aðstoðað?",
+    "hold": "Augnablik.",
+    "transfer": "Ég gef þér samband við {department}.",
+    "callback": "Takk, {name}. Við hringjum frá {department}.",
+}
+DEPARTMENTS = {"velferðarsviði": ["velferð"], "skólasviði": ["skól"]}
+
+def spec(with_hold: bool = True) -> dict:
+    greeting = {"transfer": {"weight": 3, "keywords": ["samband", "deild"]},
+                "callback": {"weight": 1, "keywords": ["hring"]}}
+    states = {
+        "greeting": {"prompt": "greeting", "next": greeting},
+        "transfer": {"prompt": "transfer", "slots": {"department": DEPARTMENTS},
+                     "defaults": {"department": "þjónustuveri"}},
+        "callback": {"prompt": "callback", "slots": {"department": DEPARTMENTS}},
+    }
+    if with_hold:
+        # No keywords: taken when nothing else matches
+        greeting["hold"] = {"weight": 1}
+        states["hold"] = {"prompt": "hold", "next": {"transfer": {"weight": 1}}}
+    return {"reception": {"start": "greeting", "states": states}}
+
+def make_renderer(prefetch_tts=None) -> TemplateRenderer:
+    renderer = TemplateRenderer(_SimulatedTTS(0, 0), AudioCache(), prefetch_tts=prefetch_tts, prefetch_workers=2)
+    for name, text in TEMPLATES.items():
+        renderer.register(name, text)
+    return renderer
+
+def make_engine(renderer, scenarios=None, **kwargs) -> ScenarioEngine:
+    return ScenarioEngine(renderer, compile_scenarios(scenarios or spec(), renderer.templates), **kwargs)
+
+@pytest.fixture
+def renderer():
+    renderer = make_renderer()
+    yield renderer
+    renderer.close()
+
+@pytest.fixture
+def engine(renderer):
+    return make_engine(renderer)
+
+def settle(engine, call_id):
+    """Wait for the prefetches a call started."""
+    for future in list(engine._calls[call_id].speculated.values()):
+        future.result(timeout=5)
+
+def test_keywords_select_the_transition_and_slot(engine, renderer):
+    engine.start("reception", "c1", VOICE)
+    result = engine.advance("c1", "Gætirðu gefið mér samband við skólann?")
+    assert result.state == "transfer"
+    assert result.final and len(result.audio)
+    assert renderer.cached("skólasviði.", VOICE)
+    # A final state ends the call
+    assert engine.stats()["calls"] == 0
+
+def test_unmatched_answer_takes_the_fallback_and_slots_fill_from_earlier_answers(engine, renderer):
+    engine.start("reception", "c1", VOICE)
+    # Nothing here is a transition keyword, but it names a department
+    assert engine.advance("c1", "Þetta varðar velferð.").state == "hold"
+    assert engine.advance("c1", "Allt í lagi").state == "transfer"
+    assert renderer.cached("velferðarsviði.", VOICE)
+
+    engine.start("reception", "c2", VOICE)
+    assert engine.advance("c2", "Ég vil fá samband").state == "transfer"
+    assert renderer.cached("þjónustuveri.", VOICE)
+
+def test_missing_slot_leaves_the_call_unchanged(engine):
+    engine.start("reception", "c1", VOICE)
+    # The callback prompt needs the caller's name, which no keyword can supply
+    assert engine.advance("c1", "Getið þið hringt í mig vegna skóla?") is None
+    call = engine._calls["c1"]
+    assert call.state.name == "greeting"
+    assert call.heard == [] and call.slots == {}
+    assert engine._transitions == {}
+
+    with pytest.raises(ValueError):
+        engine.advance("c1", state="callback")
+    result = engine.advance("c1", "Getið þið hringt í mig vegna skóla?", slots={"name": "Anna"})
+    assert result.state == "callback"
+
+def test_next_prompt_probabilities_sum_over_transitions(engine):
+    scenario = engine.scenarios["reception"]
+    prompts = engine.next_prompts(scenario, scenario.states["greeting"])
+    p = dict(prompts)
+    assert [q for _, q in prompts] == sorted(p.values(), reverse=True)
+    # Configured weights 3:1:1 with no calls observed yet
+    assert p["Ég gef þér samband við"] == pytest.approx(0.6)
+    assert p["Augnablik."] == pytest.approx(0.2)
+    assert p["Takk,"] == pytest.approx(0.2)
+    # Transfer and callback both end in the department; each value is equally likely
+    assert p["velferðarsviði."] == pytest.approx(0.6 / 2 + 0.2 / 2)
+
+def test_observed_transitions_outweigh_the_configured_weights(engine):
+    for n in range(10):
+        engine.start("reception", f"c{n}", VOICE)
+        engine.advance(f"c{n}", "Halló?")
+    scenario = engine.scenarios["reception"]
+    p = dict(engine.next_prompts(scenario, scenario.states["greeting"]))
+    # Prior of 10 pseudo-calls (2 to hold) plus 10 observed calls to hold
+    assert p["Augnablik."] == pytest.approx(12 / 20)
+
+def test_prompt_outcomes_are_counted(engine):
+    assert engine.start("reception", "c1", VOICE).outcome == "miss"
+    settle(engine, "c1")
+    assert engine.advance("c1", "Samband við velferð, takk").outcome == "hit"
+
+    # Another caller's greeting was cached by the first call, not speculated for this one
+    assert engine.start("reception", "c2", VOICE).outcome == "warm"
+    stats = engine.stats()
+    assert stats["prompts"] == {"hit": 1, "warm": 1, "late": 0, "miss": 1}
+    assert stats["hit_rate"] == pytest.approx(0.5)
+
+def test_prompt_still_being_prefetched_is_late():
+    release = threading.Event()
+
+    class GatedTTS(_SimulatedTTS):
+        def synthesize(self, text, voice, response_format="mp3", cancel=None):
+            release.wait(5)
+            return super().synthesize(text, voice, response_format, cancel)
+
+    renderer = make_renderer(prefetch_tts=GatedTTS(0, 0))
+    engine = make_engine(renderer)
+    engine.start("reception", "c1", VOICE)
+    threading.Timer(0.1, release.set).start()
+    try:
+        assert engine.advance("c1", "Samband við skóla").outcome == "late"
+    finally:
+        release.set()
+        renderer.close()
+
+def test_calls_carry_over_to_a_reloaded_engine(engine, renderer):
+    engine.start("reception", "c1", VOICE)
+    engine.start("reception", "c2", VOICE)
+    engine.advance("c2", "Halló?")
+
+    reloaded = make_engine(renderer, spec(with_hold=False))
+    reloaded.adopt(engine)
+    # c2 waits in a state the new scenario no longer has
+    assert set(reloaded._calls) == {"c1"}
+    assert reloaded._calls["c1"].state is reloaded.scenarios["reception"].states["greeting"]
+    assert reloaded._transitions[("reception", "greeting")] == {"hold": 1}
+    assert reloaded.stats()["prompts"] == engine.stats()["prompts"]
+
+    assert reloaded.advance("c1", "Samband við deild").state == "transfer"
+    with pytest.raises(KeyError):
+        reloaded.advance("c2", "Halló?")
@@ -0,0 +1,74 @@
+import multiprocessing
+import os
+import time
+
+import pytest
+
+from src.voice import shared_cache
+from src.voice.shared_cache import H_VERSION, H_WRITER, SharedAudioCache
+
+@pytest.fixture
+def cache(monkeypatch):
+    monkeypatch.setattr(shared_cache, "LOCK_TIMEOUT", 0.1)
+    cache = SharedAudioCache(max_bytes=64 * 1024, slab_size=1024, max_entries=64)
+    yield cache
+    cache.close(unlink=True)
+
+def die_holding_lock(cache: SharedAudioCache, torn: bool) -> None:
+    """Run in a forked worker: take the writer lock and exit without releasing it."""
+    cache._lock.acquire()
+    cache.header[H_WRITER] = os.getpid()
+    if torn:
+        cache.header[H_VERSION] += 1
+    os._exit(0)
+
+def kill_writer(cache: SharedAudioCache, torn: bool = False) -> None:
+    worker = multiprocessing.get_context("fork").Process(target=die_holding_lock, args=(cache, torn))
+    worker.start()
+    worker.join()
+
+def test_get_returns_a_read_only_view(cache):
+    cache.set("a", b"audio bytes")
+    view = cache.get("a")
+    assert isinstance(view, memoryview)
+    assert view.readonly
+    assert bytes(view) == b"audio bytes"
+    assert cache.get("missing") is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+def test_lookups_do_not_wait_for_writers(cache):
+    cache.set("a", b"kept")
+    cache._lock.acquire()
+    cache.header[H_WRITER] = os.getpid()
+    try:
+        started = time.perf_counter()
+        assert bytes(cache.get("a")) == b"kept"
+        assert "a" in cache
+        assert time.perf_counter() - started < 0.05
+        # A live writer holding the lock makes other writes skip instead of block
+        cache.set("b", b"skipped")
+        assert "b" not in cache
+    finally:
+        cache._release()
+
+def test_lock_of_dead_worker_is_recovered(cache):
+    cache.set("a", b"before")
+    kill_writer(cache)
+    # Reads carry on while the dead worker still owns the lock
+    assert bytes(cache.get("a")) == b"before"
+
+    cache.set("b", b"after")
+    assert bytes(cache.get("b")) == b"after"
+    # The cache was reset, since the dead worker's write may have been half done
+    assert cache.get("a") is None
+    # And the recovered lock is released normally
+    cache.set("c", b"again")
+    assert bytes(cache.get("c")) == b"again"
+
+def test_torn_write_is_a_miss_until_recovered(cache):
+    cache.set("a", b"before")
+    kill_writer(cache, torn=True)
+    assert cache.get("a") is None
+    cache.set("b", b"after")
+    assert cache.header[H_VERSION] % 2 == 0
+    assert bytes(cache.get("b")) == b"after"
@@ -0,0 +1,208 @@
+import base64
+import json
+import time
+
+import numpy as np
+import pytest
+from fastapi import FastAPI, WebSocket
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+from src.voice.telephony import (
+    FRAME_MS, FRAME_SAMPLES, SAMPLE_RATE, JitterBuffer, MediaStreamSession, Resampler,
+    _caller_audio, ulaw_decode, ulaw_encode
+)
+from src.voice.templates import PCM_SAMPLE_RATE
+
+STREAM_SID = "MZtest"
+
+class FakePipeline:
+    """Answers every utterance with a transcript and a few sentences of 24 kHz PCM tone."""
+
+    def __init__(self, sentences: int = 2, seconds: float = 0.6):
+        self.sentences = sentences
+        self.seconds = seconds
+        self.histories = []
+        self.cancels = []
+
+    def run(self, audio, filename, history, voice, call_id=None, cancel=None, audio_format="mp3"):
+        assert audio_format == "pcm"
+        turn = len(self.histories)
+        self.histories.append(list(history))
+        self.cancels.append(cancel)
+        yield {"type": "transcript", "text": f"question {turn}"}
+        t = np.arange(int(self.seconds * PCM_SAMPLE_RATE)) / PCM_SAMPLE_RATE
+        tone = (np.sin(2 * np.pi * 440 * t) * 8000).astype("<i2").tobytes()
+        for index in range(self.sentences):
+            if cancel.wait(0.02):
+                return
+            yield {"type": "sentence", "index": index, "text": f"answer {turn}.{index}", "audio": tone}
+        yield {"type": "done", "timings": {}}
+
+def media(frame_index: int, pcm: np.ndarray) -> dict:
+    return {"event": "media", "streamSid": STREAM_SID,
+            "media": {"track": "inbound", "chunk": str(frame_index),
+                      "payload": base64.b64encode(ulaw_encode(pcm)).decode()}}
+
+def speak(ws, first_index: int, speech_seconds: float = 1.0, silence_seconds: float = 0.8) -> int:
+    """Send an utterance followed by enough silence to end it; returns the next frame index."""
+    rng = np.random.default_rng(first_index)
+    pcm = np.concatenate([_caller_audio(speech_seconds, rng),
+                          rng.normal(0, 30, int(silence_seconds * SAMPLE_RATE)).astype(np.int16)])
+    index = first_index
+    for start in range(0, len(pcm) - FRAME_SAMPLES + 1, FRAME_SAMPLES):
+        ws.send_json(media(index, pcm[start:start + FRAME_SAMPLES]))
+        index += 1
+    return index
+
+@pytest.fixture
+def pipeline():
+    return FakePipeline()
+
+@pytest.fixture
+def client(pipeline):
+    app = FastAPI()
+
+    @app.websocket("/media")
+    async def endpoint(websocket: WebSocket):
+        await websocket.accept()
+        await MediaStreamSession(websocket, pipeline, lead_ms=100, burst_ms=60).run()
+
+    with TestClient(app) as test_client:
+        yield test_client
+
+def start(ws):
+    ws.send_json({"event": "start", "streamSid": STREAM_SID, "start": {"streamSid": STREAM_SID, "callSid": "CAtest"}})
+
+def test_ulaw_round_trip_is_close():
+    samples = np.linspace(-32000, 32000, 4001).astype(np.int16)
+    decoded = ulaw_decode(ulaw_encode(samples)).astype(np.int32)
+    # μ-law keeps about 3% relative error plus a small absolute floor
+    assert np.all(np.abs(decoded - samples) <= np.abs(samples.astype(np.int32)) * 0.04 + 16)
+
+def test_resampler_streaming_matches_one_shot():
+    rng = np.random.default_rng(0)
+    pcm = rng.normal(0, 3000, PCM_SAMPLE_RATE).astype(np.int16)
+    whole = Resampler(PCM_SAMPLE_RATE, SAMPLE_RATE).process(pcm)
+    streaming = Resampler(PCM_SAMPLE_RATE, SAMPLE_RATE)
+    pieces = np.concatenate([streaming.process(pcm[i:i + 1234]) for i in range(0, len(pcm), 1234)])
+    assert np.array_equal(whole, pieces)
+
+def test_jitter_buffer_reorders_conceals_and_counts_late():
+    jitter = JitterBuffer(depth=3)
+    frame = lambda n: bytes([n]) * FRAME_SAMPLES
+    released = []
+    for seq in (1, 3, 2, 4, 6, 7, 8, 9, 2):
+        released += jitter.push(seq, frame(seq))
+    released += jitter.flush()
+    # 2 arrived after 3 but is released in order; 5 was lost and concealed
+    assert [f[0] for f in released[:4]] == [1, 2, 3, 4]
+    assert len(released) == 9
+    assert jitter.stats["late"] >= 1
+
+def test_reply_is_paced_in_real_time(client, pipeline):
+    with client.websocket_connect("/media") as ws:
+        start(ws)
+        speak(ws, 1)
+        arrivals, marks = [], []
+        while len(marks) < pipeline.sentences:
+            message = ws.receive_json()
+            if message["event"] == "media":
+                assert len(base64.b64decode(message["media"]["payload"])) == FRAME_SAMPLES
+                arrivals.append(time.monotonic())
+            elif message["event"] == "mark":
+                marks.append(message["mark"]["name"])
+        ws.send_json({"event": "stop", "streamSid": STREAM_SID})
+
+    audio_seconds = len(arrivals) * FRAME_MS / 1000
+    assert audio_seconds == pytest.approx(pipeline.sentences * pipeline.seconds, abs=0.05)
+    # Never more than the lead (plus one burst) ahead of real time
+    assert arrivals[-1] - arrivals[0] >= audio_seconds - 0.1 - 0.06 - 0.05
+    assert marks == ["s0", "s1"]
+
+def test_caller_talking_over_reply_clears_it(client, pipeline):
+    pipeline.sentences, pipeline.seconds = 4, 1.0
+    with client.websocket_connect("/media") as ws:
+        start(ws)
+        index = speak(ws, 1)
+        while ws.receive_json()["event"] != "media":
+            pass
+        speak(ws, index, speech_seconds=0.5, silence_seconds=0.0)
+        events = []
+        while "clear" not in events:
+            events.append(ws.receive_json()["event"])
+        ws.send_json({"event": "stop", "streamSid": STREAM_SID})
+
+    assert pipeline.cancels[0].cancelled
+    assert pipeline.cancels[0].reason == "barge_in"
+
+def test_history_keeps_turn_order_after_barge_in(client, pipeline):
+    pipeline.sentences, pipeline.seconds = 4, 1.0
+    with client.websocket_connect("/media") as ws:
+        start(ws)
+        index = speak(ws, 1)
+        while ws.receive_json()["event"] != "media":
+            pass
+        # Talk over the first reply, then ask a second question
+        index = speak(ws, index)
+        while len(pipeline.histories) < 2:
+            ws.receive_json()
+        ws.send_json({"event": "stop", "streamSid": STREAM_SID})
+
+    second = pipeline.histories[1]
+    assert [m["role"] for m in second] == ["user", "assistant"]
+    assert second[0]["content"] == "question 0"
+    assert second[1]["content"].startswith("answer 0.0")
+
+def test_start_authorization_rejects_bad_token(pipeline):
+    app = FastAPI()
+
+    @app.websocket("/media")
+    async def endpoint(websocket: WebSocket):
+        await websocket.accept()
+        authorize = lambda start: (start.get("customParameters") or {}).get("token") == "secret"
+        await MediaStreamSession(websocket, pipeline, authorize=authorize).run()
+
+    with TestClient(app) as test_client:
+        with test_client.websocket_connect("/media") as ws:
+            ws.send_json({"event": "start", "streamSid": STREAM_SID,
+                          "start": {"streamSid": STREAM_SID, "customParameters": {"token": "wrong"}}})
+            with pytest.raises(WebSocketDisconnect) as closed:
+                ws.receive_json()
+        assert closed.value.code == 1008
+    assert pipeline.histories == []
+
+class TestEndpointAdmission:
+    """The API's media-stream route refuses streams that are not authenticated."""
+
+    @pytest.fixture
+    def api_client(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.setenv("PODCAST_STARTUP", json.dumps({"warm_up": False}))
+        monkeypatch.setenv("PODCAST_CALL_EVENTS", json.dumps({"enabled": False}))
+        monkeypatch.setenv("PODCAST_ADMISSION", json.dumps({"api_keys": ["secret"]}))
+        import api
+        with TestClient(api.app) as test_client:
+            yield test_client
+
+    def test_rejects_missing_and_wrong_keys(self, api_client):
+        for path, headers in (("/api/media-stream?token=wrong", {}),
+                              ("/api/media-stream", {"x-api-key": "wrong"})):
+            with pytest.raises(WebSocketDisconnect) as closed:
+                with api_client.websocket_connect(path, headers=headers):
+                    pass
+            assert closed.value.code == 1008
+
+    def test_accepts_configured_key(self, api_client):
+        with api_client.websocket_connect("/api/media-stream?token=secret") as ws:
+            ws.send_json({"event": "stop", "streamSid": STREAM_SID})
+
+    def test_refuses_all_streams_without_configured_keys(self, api_client, monkeypatch):
+        import api
+        config = api.app.state.services["config"]
+        monkeypatch.setattr(config, "get", lambda key, default=None: {} if key == "admission" else
+                            config.snapshot.values.get(key, default))
+        with pytest.raises(WebSocketDisconnect) as closed:
+            with api_client.websocket_connect("/api/media-stream?token=secret"):
+                pass
+        assert closed.value.code == 1008
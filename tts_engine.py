@@ -1,6 +1,15 @@
 import os
-from google.cloud import texttospeech
-from google.oauth2 import service_account
+
+# Google Cloud SDK is imported on first use so deployments configured for other
+# providers never pay for it at startup
+texttospeech = None
+
+def _load_google_tts():
+    global texttospeech
+    if texttospeech is None:
+        from google.cloud import texttospeech as module
+        texttospeech = module
+    return texttospeech
 
 class TTSEngine:
     def __init__(self):
@@ -8,6 +17,8 @@ class TTSEngine:
     
     def _authenticate(self):
         """Authenticate with Google Cloud using env credentials"""
+        _load_google_tts()
+        from google.oauth2 import service_account
         try:
             creds = service_account.Credentials.from_service_account_info(
                 json.loads(os.getenv('GOOGLE_CREDENTIALS_JSON'))
@@ -31,16 +42,14 @@ class TTSEngine:
             voice=voice,
             audio_config=audio_config
         ).audio_content
-import os
-from google.cloud import texttospeech
-from google.auth import load_credentials_from_file
-
 class TTSEngine:
     def __init__(self):
         self.client = self._init_client()
         
     def _init_client(self):
         """Initialize Google TTS client with credentials"""
+        _load_google_tts()
+        from google.auth import load_credentials_from_file
         try:
             creds, _ = load_credentials_from_file(
                 'config/google-credentials.json',
@@ -71,10 +80,7 @@ class TTSEngine:
         )
 
         return response.audio_content
-import os
 import json
-from google.cloud import texttospeech
-from google.oauth2 import service_account
 
 class GoogleTTS:
     def __init__(self, config_path='config/google_tts.json'):
@@ -91,6 +97,8 @@ class GoogleTTS:
 
     def _authenticate(self):
         """Authenticate with Google Cloud using service account credentials"""
+        _load_google_tts()
+        from google.oauth2 import service_account
         try:
             creds = service_account.Credentials.from_service_account_info(
                 self.config['service_account']
@@ -128,26 +136,73 @@ from pathlib import Path
 import os
 import time
 import json
+import tempfile
 from typing import Optional, Dict
 from src.setup.config_manager import ConfigManager
+from src.server.cancellation import Cancelled, CancelToken
+
+# Bytes read per step of a streamed synthesis; a cancel is noticed between chunks
+STREAM_CHUNK = 16 * 1024
 
 class TTSProvider(ABC):
     """Abstract base class for TTS providers"""
     
+    name = "base"
+    
     def __init__(self, config: ConfigManager):
         self.config = config
     
     @abstractmethod
     def generate_speech(self, text: str, output_file: Path, voice: str) -> Optional[Dict]:
         pass
+    
+    def warm_up(self) -> None:
+        """Open provider connections ahead of the first request"""
+        pass
+    
+    def prepare_text(self, text: str) -> str:
+        """Return the text as it should be spoken (and cached)"""
+        if not self.config.get("normalize_text", True):
+            return text
+        from src.voice.normalize import normalize_text
+        return normalize_text(text)
+    
+    def synthesize(self, text: str, voice: str, response_format: str = "mp3",
+                   cancel: Optional[CancelToken] = None) -> bytes:
+        """Return synthesized audio as bytes; providers that stream abort early when ``cancel`` fires"""
+        if cancel:
+            cancel.raise_if_cancelled()
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            output_file = Path(tmp_dir) / f"speech.{response_format}"
+            if not self.generate_speech(text, output_file, voice):
+                raise RuntimeError(f"{self.name} TTS generation failed")
+            if cancel:
+                cancel.raise_if_cancelled()
+            return output_file.read_bytes()
 
 class OpenAITTS(TTSProvider):
     """OpenAI TTS implementation"""
     
+    name = "openai"
+    
+    def __init__(self, config: ConfigManager):
+        super().__init__(config)
+        self._openai = None
+    
+    def _client(self):
+        """Shared OpenAI client so connections are pooled across requests"""
+        if self._openai is None:
+            import openai
+            self._openai = openai.OpenAI(api_key=self._get_api_key())
+        return self._openai
+    
+    def warm_up(self) -> None:
+        # A cheap authenticated call leaves a TLS connection in the client's pool
+        self._client().models.retrieve("tts-1")
+    
     def generate_speech(self, text: str, output_file: Path, voice: str) -> Optional[Dict]:
         try:
-            import openai
-            client = openai.OpenAI(api_key=self._get_api_key())
+            client = self._client()
             
             start_time = time.time()
             response = client.audio.speech.create(
@@ -162,6 +217,42 @@ class OpenAITTS(TTSProvider):
         except Exception as e:
             print(f"OpenAI TTS error: {str(e)}")
             return None
+    
+    def synthesize(self, text: str, voice: str, response_format: str = "mp3",
+                   cancel: Optional[CancelToken] = None) -> bytes:
+        if cancel is None:
+            response = self._client().audio.speech.create(
+                model="tts-1",
+                voice=voice,
+                input=text,
+                response_format=response_format
+            )
+            return response.content
+        
+        cancel.raise_if_cancelled()
+        chunks = []
+        with self._client().audio.speech.with_streaming_response.create(
+            model="tts-1",
+            voice=voice,
+            input=text,
+            response_format=response_format
+        ) as response:
+            # Closing the response from the cancelling thread aborts the blocked read
+            # and drops the connection, so the provider stops generating
+            unregister = cancel.on_cancel(response.close)
+            try:
+                for chunk in response.iter_bytes(STREAM_CHUNK):
+                    if cancel.cancelled:
+                        break
+                    chunks.append(chunk)
+            except Exception:
+                if cancel.cancelled:
+                    raise Cancelled(cancel.reason)
+                raise
+            finally:
+                unregister()
+        cancel.raise_if_cancelled()
+        return b"".join(chunks)
 
     def _get_api_key(self) -> str:
         return self.config.get("openai_key") or os.environ.get("OPENAI_API_KEY", "")
@@ -171,7 +262,7 @@ class OpenAITTS(TTSProvider):
             "file": str(output_file),
             "duration": time.time() - start_time,
             "size_kb": output_file.stat().st_size / 1024,
-            "provider": "openai"
+            "provider": self.name
         }
 
 class TTSFactory:
@@ -1,9 +1,13 @@
 import gradio as gr
-import requests
 import os
 from dotenv import load_dotenv
 import redis
-import hashlib
+from pathlib import Path
+from src.chat.client import ChatClient
+from src.chat.cache import ResponseCache
+from src.chat.context import ConversationContext
+from src.chat.retrieval import RetrievalIndex
+from src.chat.semantic_cache import SemanticCache
 
 # Initialize Redis connection
 load_dotenv()
@@ -15,46 +19,70 @@ CACHE_TTL = 86400  # 24 hours cache retention
 
 # Get API key from environment variables
 api_key = os.getenv("OPENAI_API_KEY", "")
+MODEL = "gpt-4"
+SYSTEM_PROMPT = "You are a helpful assistant."
+
+# Shared across requests so connections to the API stay warm
+chat_client = ChatClient(api_key, model=MODEL)
+response_cache = ResponseCache(redis_client, ttl=CACHE_TTL)
+conversation = ConversationContext(chat_client, model=MODEL)
+
+# Answers are grounded in the scenario and service docs; only changed files are re-indexed
+retrieval = RetrievalIndex(Path("ai-docs"))
+retrieval.refresh()
+
+# Opening questions asked in different words share one answer
+SEMANTIC_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+answer_cache = SemanticCache(chat_client.embed, threshold=SEMANTIC_THRESHOLD,
+                             audit_path=Path("logs/semantic_cache_audit.jsonl"))
 
 def chat_with_openai(message, chat_history):
-    """Chat with OpenAI API and return properly formatted messages"""
+    """Chat with OpenAI API, streaming the reply into the chat history"""
+    history = [{"role": m["role"], "content": m["content"]} for m in chat_history]
+    history.append({"role": "user", "content": message})
+    
     if not api_key:
-        return chat_history + [{"role": "assistant", "content": "Please set your OpenAI API key in the .env file"}]
+        yield history + [{"role": "assistant", "content": "Please set your OpenAI API key in the .env file"}]
+        return
     
-    # Prepare conversation history for OpenAI API
-    messages = [{"role": "system", "content": "You are a helpful assistant."}]
+    # Later turns depend on the conversation, so only the first question is shared
+    opening = len(history) == 1
+    if opening:
+        hit = answer_cache.lookup(message, scope=f"{MODEL}:{SYSTEM_PROMPT}")
+        if hit is not None:
+            yield history + [{"role": "assistant", "content": hit.answer}]
+            return
     
-    # Add history to messages
-    messages.extend(chat_history)
+    # Recent turns within the token budget, older ones as a summary, plus matching doc passages
+    context = retrieval.context(message)
+    messages = conversation.build(SYSTEM_PROMPT, history, context=context)
     
-    # Add current message
-    messages.append({"role": "user", "content": message})
+    # Repeated questions are answered from the cache. The key is the raw conversation, not the
+    # built prompt: its summary of older turns is written in the background and changes
+    # between otherwise identical requests.
+    cache_messages = [{"role": "system", "content": SYSTEM_PROMPT}]
+    if context:
+        cache_messages.append({"role": "system", "content": context})
+    cache_messages += history
+    cached = response_cache.get(cache_messages, MODEL)
+    if cached is not None:
+        yield history + [{"role": "assistant", "content": cached}]
+        return
     
-    # Make API request
+    # Stream tokens into the chat as they arrive
+    reply = ""
     try:
-        response = requests.post(
-            "https://api.openai.com/v1/chat/completions",
-            headers={
-                "Authorization": f"Bearer {api_key}",
-                "Content-Type": "application/json"
-            },
-            json={
-                "model": "gpt-4",
-                "messages": messages
-            }
-        )
-        response.raise_for_status()
-        
-        # Get assistant's reply
-        assistant_message = response.json()["choices"][0]["message"]
-        
-        # Return updated history
-        return chat_history + [
-            {"role": "user", "content": message},
-            assistant_message
-        ]
+        for token in chat_client.stream(messages, temperature=0):
+            reply += token
+            yield history + [{"role": "assistant", "content": reply}]
     except Exception as e:
-        return chat_history + [{"role": "assistant", "content": f"Error: {str(e)}"}]
+        yield history + [{"role": "assistant", "content": f"Error: {str(e)}"}]
+        return
+    
+    if reply:
+        response_cache.set(cache_messages, MODEL, reply)
+        if opening:
+            answer_cache.store(message, reply, scope=f"{MODEL}:{SYSTEM_PROMPT}")
 
 def clear_history():
     """Clear chat history"""